@@ -1,6 +1,13 @@
-from .application import app
+def __getattr__(name: str):
+    # App is created on first access, so importing the package (e.g. its models) does not need
+    # configuration file nor database.
+    if name in __all__:
+        from . import application
+        return getattr(application, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 __all__ = [
     'app',
+    'create_app',
 ]
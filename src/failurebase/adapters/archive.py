@@ -0,0 +1,600 @@
+"""Archive module.
+
+Archived events are stored in immutable segment files, one or more per day of server timestamp:
+
+    <directory>/<YYYY>/<MM>/<YYYY-MM-DD>_<first id>-<last id>_<random token>.fbseg
+
+Token keeps names of segments written by concurrent archiving of the same events apart, only one of them
+is kept (the other ones are removed when their deletion of events fails).
+
+Segment starts with magic bytes and JSON index (length prefixed) followed by zlib compressed columns.
+Integer and timestamp columns are arrays of little-endian 64-bit integers (timestamps in microseconds
+since 1970-01-01 of naive server time), text columns are array of 32-bit lengths followed by UTF-8 data.
+Index keeps ranges of ids and timestamps, ids of tests and Bloom filter of words of messages and
+tracebacks, so segments which cannot contain requested events are skipped without decompressing any
+column. Files are read through memory map and only columns needed by the query are decompressed: filters
+are checked column by column (the cheapest first) and the other columns are decompressed only for
+segments whose events are returned.
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import zlib
+import base64
+import struct
+import hashlib
+import time
+import uuid
+import heapq
+import logging
+import threading
+from array import array
+from pathlib import Path
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import NamedTuple, Iterable, Iterator, Callable
+from collections import Counter
+
+from .patterns import like
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FBSEG1\n'
+SUFFIX = '.fbseg'
+
+_EPOCH = datetime(1970, 1, 1)
+_HEADER_LENGTH = struct.Struct('<I')
+_WORDS = re.compile(r'[^\W_]+')
+
+INTEGER_COLUMNS = ('id', 'test_id', 'client_timestamp', 'server_timestamp')
+TEXT_COLUMNS = ('test_uid', 'message', 'traceback')
+
+
+class ArchivedEvent(NamedTuple):
+    """Event stored in archive, uid of test is kept to recognize test whose id was reused."""
+
+    id: int
+    test_id: int
+    test_uid: str
+    message: str
+    traceback: str
+    client_timestamp: datetime
+    server_timestamp: datetime
+
+
+@dataclass(frozen=True)
+class ArchiveFilter:
+    """Filters of archived events, they work like the same filters of events list.
+
+    Test filters are resolved to ids (and uids) of matching tests beforehand, None means any test. Deleted
+    archived events are read once per segment, `deleted_ids` returns ids of them between given ids.
+    """
+
+    start_server_timestamp: datetime | None = None
+    end_server_timestamp: datetime | None = None
+    start_client_timestamp: datetime | None = None
+    end_client_timestamp: datetime | None = None
+    message: str | None = None
+    traceback: str | None = None
+    tests: dict[int, str] | None = None
+    deleted_ids: Callable[[int, int], frozenset[int]] | None = None
+
+    def matches(self, event: ArchivedEvent) -> bool:
+        """Returns True if event passes all filters."""
+
+        return ((self.deleted_ids is None or event.id not in self.deleted_ids(event.id, event.id))
+                and (self.start_server_timestamp is None or self.start_server_timestamp <= event.server_timestamp)
+                and (self.end_server_timestamp is None or event.server_timestamp <= self.end_server_timestamp)
+                and (self.start_client_timestamp is None or self.start_client_timestamp <= event.client_timestamp)
+                and (self.end_client_timestamp is None or event.client_timestamp <= self.end_client_timestamp)
+                and (self.message is None or like(self.message)(event.message))
+                and (self.traceback is None or like(self.traceback)(event.traceback))
+                and (self.tests is None or self.tests.get(event.test_id) == event.test_uid))
+
+
+class BloomFilter:
+    """Bloom filter of words with about 1% false positives."""
+
+    BITS_PER_ITEM = 10
+    HASHES = 7
+
+    def __init__(self, bits: bytearray) -> None:
+        self.bits = bits
+
+    @classmethod
+    def from_words(cls, words: set[str]) -> 'BloomFilter':
+        """Returns filter which contains given words."""
+
+        bloom = cls(bytearray(max(8, (len(words) * cls.BITS_PER_ITEM + 7) // 8)))
+        for word in words:
+            for position in bloom._positions(word):
+                bloom.bits[position >> 3] |= 1 << (position & 7)
+
+        return bloom
+
+    def __contains__(self, word: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(word))
+
+    def _positions(self, word: str) -> Iterator[int]:
+        digest = hashlib.blake2b(word.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        size = len(self.bits) * 8
+
+        return ((first + index * second) % size for index in range(self.HASHES))
+
+
+def words(text: str) -> set[str]:
+    """Returns lowercased words of text."""
+
+    return set(_WORDS.findall(text.lower()))
+
+
+def whole_words(pattern: str) -> set[str]:
+    """Returns words of LIKE pattern (without surrounding `%`) which have to be whole words of text matching it.
+
+    Words at the beginning and at the end of pattern or next to wildcard can be parts of longer words of
+    matching text.
+    """
+
+    pattern = pattern.lower()
+    found = list(_WORDS.finditer(pattern))
+
+    return {word.group() for word in found if 0 < word.start() and word.end() < len(pattern)
+            and pattern[word.start() - 1] not in '%_' and pattern[word.end()] not in '%_'}
+
+
+@dataclass(frozen=True)
+class SegmentIndex:
+    """Index of segment file."""
+
+    path: Path
+    count: int
+    min_id: int
+    max_id: int
+    min_server_timestamp: datetime
+    max_server_timestamp: datetime
+    min_client_timestamp: datetime
+    max_client_timestamp: datetime
+    test_ids: frozenset[int]
+    bloom: BloomFilter
+    columns: dict[str, tuple[int, int]]  # name -> (offset, length) of compressed column
+
+    def may_contain(self, event_filter: ArchiveFilter) -> bool:
+        """Returns False if no event of segment passes filters."""
+
+        if event_filter.start_server_timestamp is not None \
+                and self.max_server_timestamp < event_filter.start_server_timestamp:
+            return False
+        if event_filter.end_server_timestamp is not None \
+                and event_filter.end_server_timestamp < self.min_server_timestamp:
+            return False
+        if event_filter.start_client_timestamp is not None \
+                and self.max_client_timestamp < event_filter.start_client_timestamp:
+            return False
+        if event_filter.end_client_timestamp is not None \
+                and event_filter.end_client_timestamp < self.min_client_timestamp:
+            return False
+        if event_filter.tests is not None and self.test_ids.isdisjoint(event_filter.tests):
+            return False
+
+        patterns = [pattern for pattern in (event_filter.message, event_filter.traceback) if pattern is not None]
+        return all(word in self.bloom for pattern in patterns for word in whole_words(pattern))
+
+
+def _to_microseconds(timestamp: datetime) -> int:
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_microseconds(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _to_bytes(column: array) -> bytes:
+    if sys.byteorder == 'big':
+        column.byteswap()
+
+    return column.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == 'big':
+        column.byteswap()
+
+    return column
+
+
+def _encode_integers(values: Iterable[int]) -> bytes:
+    return _to_bytes(array('q', values))
+
+
+def _encode_texts(values: list[str]) -> bytes:
+    encoded = [value.encode() for value in values]
+
+    return _to_bytes(array('i', map(len, encoded))) + b''.join(encoded)
+
+
+def _decode_texts(data: bytes, count: int) -> list[str]:
+    lengths = _from_bytes('i', data[:count * 4])
+
+    texts = []
+    position = count * 4
+    for length in lengths:
+        texts.append(data[position:position + length].decode())
+        position += length
+
+    return texts
+
+
+class SegmentArchive:
+    """Directory of segment files, archive without directory is disabled (it is always empty)."""
+
+    # Orderings of `select` by integer columns, segments are skipped by ranges of their index.
+    RANGE_ORDERINGS = {
+        'server_timestamp': ('min_server_timestamp', 'max_server_timestamp'),
+        'client_timestamp': ('min_client_timestamp', 'max_client_timestamp'),
+    }
+
+    def __init__(self, directory: str | None, compress_level: int = 6, refresh_interval: float = 10.0) -> None:
+        self.directory = Path(directory) if directory else None
+        self.compress_level = compress_level
+        self.refresh_interval = refresh_interval
+        self._indexes: dict[Path, SegmentIndex] = {}
+        self._sorted_indexes: list[SegmentIndex] | None = None
+        self._listed_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True if events can be archived."""
+
+        return self.directory is not None
+
+    def write(self, events: list[ArchivedEvent]) -> Path:
+        """Stores events (all from the same day, ordered by id) in new segment file, returns its path.
+
+        File is written under temporary name and renamed, so readers never see partially written segment.
+        """
+
+        day = events[0].server_timestamp.date()
+        name = f'{day.isoformat()}_{events[0].id}-{events[-1].id}_{uuid.uuid4().hex[:12]}{SUFFIX}'
+        path = self.directory / f'{day:%Y}' / f'{day:%m}' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        columns = {
+            'id': _encode_integers(event.id for event in events),
+            'test_id': _encode_integers(event.test_id for event in events),
+            'client_timestamp': _encode_integers(_to_microseconds(event.client_timestamp) for event in events),
+            'server_timestamp': _encode_integers(_to_microseconds(event.server_timestamp) for event in events),
+            'test_uid': _encode_texts([event.test_uid for event in events]),
+            'message': _encode_texts([event.message for event in events]),
+            'traceback': _encode_texts([event.traceback for event in events]),
+        }
+        compressed = {name: zlib.compress(data, self.compress_level) for name, data in columns.items()}
+
+        offset = 0
+        positions = {}
+        for name, data in compressed.items():
+            positions[name] = (offset, len(data))
+            offset += len(data)
+
+        all_words = set()
+        for event in events:
+            all_words |= words(event.message)
+            all_words |= words(event.traceback)
+
+        index = {
+            'count': len(events),
+            'min_id': min(event.id for event in events),
+            'max_id': max(event.id for event in events),
+            'min_server_timestamp': min(event.server_timestamp for event in events).isoformat(),
+            'max_server_timestamp': max(event.server_timestamp for event in events).isoformat(),
+            'min_client_timestamp': min(event.client_timestamp for event in events).isoformat(),
+            'max_client_timestamp': max(event.client_timestamp for event in events).isoformat(),
+            'test_ids': sorted({event.test_id for event in events}),
+            'bloom': base64.b64encode(BloomFilter.from_words(all_words).bits).decode(),
+            'columns': positions,
+        }
+        header = json.dumps(index).encode()
+
+        temporary_path = path.with_suffix('.tmp')
+        with open(temporary_path, 'wb') as file:
+            file.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            for data in compressed.values():
+                file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+        index = self._read_index(path)
+        with self._lock:
+            self._indexes[path] = index
+            self._sorted_indexes = None
+
+        return path
+
+    def remove(self, path: Path) -> None:
+        """Removes segment written by this process, it is used only to undo archiving which was not committed."""
+
+        with self._lock:
+            self._indexes.pop(path, None)
+            self._sorted_indexes = None
+        path.unlink(missing_ok=True)
+
+    def get_indexes(self) -> list[SegmentIndex]:
+        """Returns indexes of all segments ordered by the first id, indexes are read once per file.
+
+        Directory is listed again at most every `refresh_interval` seconds, segments written and removed
+        by this process are seen immediately.
+        """
+
+        if self.directory is None:
+            return []
+
+        with self._lock:
+            listed = self._listed_at is not None and time.monotonic() - self._listed_at < self.refresh_interval
+            if listed and self._sorted_indexes is not None:
+                return self._sorted_indexes
+
+        if not listed:
+            self._list_directory()
+
+        with self._lock:
+            if self._sorted_indexes is None:
+                self._sorted_indexes = sorted(self._indexes.values(), key=lambda index: index.min_id)
+            return self._sorted_indexes
+
+    def count(self, event_filter: ArchiveFilter | None = None,
+              resolve_tests: Callable[[set[int]], dict[int, str]] | None = None) -> int:
+        """Returns number of archived events (which pass filters).
+
+        `resolve_tests` returns ids and uids of existing tests out of given ids, events of the other tests
+        are not counted (it is not used when filter has its tests).
+        """
+
+        if event_filter is None:
+            return sum(index.count for index in self.get_indexes())
+
+        return sum(self.count_by_test(event_filter, resolve_tests).values())
+
+    def count_by_test(self, event_filter: ArchiveFilter,
+                      resolve_tests: Callable[[set[int]], dict[int, str]] | None = None) -> Counter:
+        """Returns numbers of archived events which pass filters by ids of their tests."""
+
+        counts = Counter()
+        tests = _TestResolver(event_filter, resolve_tests)
+
+        for index in self.get_indexes():
+            if index.may_contain(event_filter):
+                reader = _SegmentReader(index)
+                test_ids = reader.column('test_id')
+                counts.update(test_ids[position] for position in reader.match(event_filter, tests.of(index)))
+
+        return counts
+
+    def select(self, event_filter: ArchiveFilter, ordering: str, limit: int, bound=None,
+               resolve_tests: Callable[[set[int]], dict[int, str]] | None = None) -> list[ArchivedEvent]:
+        """Returns up to limit the first archived events which pass filters in given ordering.
+
+        Ordering is name of column (`-` prefixed for descending order), with `bound` only events ordered
+        strictly before it are returned. Segments which cannot have such events are skipped when events
+        are ordered by timestamp, so the first pages of events, which are newer than archived ones, do not
+        read archive at all.
+        """
+
+        reverse = ordering.startswith('-')
+        name = ordering.lstrip('-')
+        if isinstance(bound, datetime):
+            bound = _to_microseconds(bound)
+
+        def before(first, second) -> bool:
+            return first > second if reverse else first < second
+
+        indexes = [index for index in self.get_indexes() if index.may_contain(event_filter)]
+        ranges = self.RANGE_ORDERINGS.get(name)
+        if ranges is not None:
+            # the first key which can be in segment (the greatest one for descending order)
+            best = lambda index: _to_microseconds(getattr(index, ranges[1] if reverse else ranges[0]))
+            indexes.sort(key=best, reverse=reverse)
+
+        tests = _TestResolver(event_filter, resolve_tests)
+        selected: list[tuple] = []  # (key, id, reader, position), the first `limit` ones in ordering
+        for index in indexes:
+            worst = selected[-1][0] if len(selected) == limit else bound
+            if ranges is not None and worst is not None and not before(best(index), worst):
+                break
+
+            reader = _SegmentReader(index)
+            positions = reader.match(event_filter, tests.of(index))
+            if not positions:
+                continue
+
+            keys, ids = reader.column(name), reader.column('id')
+            candidates = [(keys[position], ids[position], reader, position) for position in positions
+                          if bound is None or before(keys[position], bound)]
+            pick = heapq.nlargest if reverse else heapq.nsmallest
+            selected = pick(limit, selected + candidates, key=lambda candidate: candidate[:2])
+
+        return [reader.event(position) for _, _, reader, position in selected]
+
+    def first_key(self, event_filter: ArchiveFilter, ordering: str,
+                  resolve_tests: Callable[[set[int]], dict[int, str]] | None = None):
+        """Returns key which no archived event passing filters is ordered before, None if there is no such event.
+
+        When events are ordered by timestamp, the key is read from indexes of segments (it may be ordered
+        before the actual first event), so no column is decompressed.
+        """
+
+        reverse = ordering.startswith('-')
+        name = ordering.lstrip('-')
+
+        ranges = self.RANGE_ORDERINGS.get(name)
+        if ranges is not None:
+            keys = [getattr(index, ranges[1] if reverse else ranges[0]) for index in self.get_indexes()
+                    if index.may_contain(event_filter)]
+            return (max if reverse else min)(keys, default=None)
+
+        first = self.select(event_filter, ordering, 1, resolve_tests=resolve_tests)
+        return getattr(first[0], name) if first else None
+
+    def get_by_id(self, event_id: int) -> ArchivedEvent | None:
+        """Returns archived event with given id or None."""
+
+        for index in self.get_indexes():
+            if index.min_id <= event_id <= index.max_id:
+                reader = _SegmentReader(index)
+                for position, id_ in enumerate(reader.column('id')):
+                    if id_ == event_id:
+                        return reader.event(position)
+
+        return None
+
+    def scan(self, event_filter: ArchiveFilter) -> Iterator[ArchivedEvent]:
+        """Yields archived events which pass filters, ordered by id."""
+
+        for index in self.get_indexes():
+            if index.may_contain(event_filter):
+                reader = _SegmentReader(index)
+                for position in reader.match(event_filter, event_filter.tests):
+                    yield reader.event(position)
+
+    def _list_directory(self) -> None:
+        paths = set(self.directory.glob(f'*/*/*{SUFFIX}')) if self.directory.exists() else set()
+
+        with self._lock:
+            for path in set(self._indexes) - paths:
+                del self._indexes[path]
+            missing = paths - set(self._indexes)
+
+        indexes = {path: self._read_index(path) for path in missing}
+
+        with self._lock:
+            self._indexes.update(indexes)
+            self._sorted_indexes = None
+            self._listed_at = time.monotonic()
+
+    def _read_index(self, path: Path) -> SegmentIndex:
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f'File "{path}" is not archive segment.')
+            header_start = len(MAGIC) + _HEADER_LENGTH.size
+            header_length, = _HEADER_LENGTH.unpack(data[len(MAGIC):header_start])
+            index = json.loads(data[header_start:header_start + header_length])
+
+        columns_start = header_start + header_length
+
+        return SegmentIndex(
+            path=path,
+            count=index['count'],
+            min_id=index['min_id'],
+            max_id=index['max_id'],
+            min_server_timestamp=datetime.fromisoformat(index['min_server_timestamp']),
+            max_server_timestamp=datetime.fromisoformat(index['max_server_timestamp']),
+            min_client_timestamp=datetime.fromisoformat(index['min_client_timestamp']),
+            max_client_timestamp=datetime.fromisoformat(index['max_client_timestamp']),
+            test_ids=frozenset(index['test_ids']),
+            bloom=BloomFilter(bytearray(base64.b64decode(index['bloom']))),
+            columns={name: (columns_start + offset, length) for name, (offset, length) in index['columns'].items()},
+        )
+
+
+class _TestResolver:
+    """Existing tests of segments, they are resolved once per segment test id."""
+
+    def __init__(self, event_filter: ArchiveFilter,
+                 resolve_tests: Callable[[set[int]], dict[int, str]] | None) -> None:
+        self.tests = event_filter.tests
+        self.resolve_tests = resolve_tests if event_filter.tests is None else None
+        self._resolved: dict[int, str] = {}
+        self._checked: set[int] = set()
+
+    def of(self, index: SegmentIndex) -> dict[int, str] | None:
+        """Returns tests whose events of segment are read (None means any test)."""
+
+        if self.resolve_tests is None:
+            return self.tests
+
+        missing = set(index.test_ids) - self._checked
+        if missing:
+            self._resolved.update(self.resolve_tests(missing))
+            self._checked |= missing
+
+        return self._resolved
+
+
+class _SegmentReader:
+    """Columns of segment file, each one is decompressed when it is used for the first time."""
+
+    def __init__(self, index: SegmentIndex) -> None:
+        self.index = index
+        self._columns: dict[str, array | list[str]] = {}
+
+    def column(self, name: str) -> array | list[str]:
+        """Returns values of column (timestamps in microseconds)."""
+
+        if name not in self._columns:
+            offset, length = self.index.columns[name]
+            with open(self.index.path, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                decompressed = zlib.decompress(data[offset:offset + length])
+            self._columns[name] = (_from_bytes('q', decompressed) if name in INTEGER_COLUMNS
+                                   else _decode_texts(decompressed, self.index.count))
+
+        return self._columns[name]
+
+    def match(self, event_filter: ArchiveFilter, tests: dict[int, str] | None) -> list[int]:
+        """Returns positions of events which pass filters and belong to given tests (None means any test).
+
+        Columns are checked one by one, the next one only while some events pass.
+        """
+
+        index = self.index
+        checks = []
+        deleted = event_filter.deleted_ids(index.min_id, index.max_id) if event_filter.deleted_ids else None
+        if deleted:
+            checks.append(('id', lambda value: value not in deleted))
+        for name, start, end in (
+                ('server_timestamp', event_filter.start_server_timestamp, event_filter.end_server_timestamp),
+                ('client_timestamp', event_filter.start_client_timestamp, event_filter.end_client_timestamp)):
+            if start is not None or end is not None:
+                low = _to_microseconds(start) if start is not None else None
+                high = _to_microseconds(end) if end is not None else None
+                checks.append((name, lambda value, low=low, high=high:
+                               (low is None or low <= value) and (high is None or value <= high)))
+        if tests is not None:
+            checks.append(('test_id', tests.__contains__))
+        for name in ('message', 'traceback'):
+            pattern = getattr(event_filter, name)
+            if pattern is not None:
+                checks.append((name, like(pattern)))
+
+        positions = range(index.count)
+        for name, check in checks:
+            values = self.column(name)
+            positions = [position for position in positions if check(values[position])]
+            if not positions:
+                return []
+
+        if tests is not None:
+            test_ids, uids = self.column('test_id'), self.column('test_uid')
+            positions = [position for position in positions if tests[test_ids[position]] == uids[position]]
+
+        return list(positions)
+
+    def event(self, position: int) -> ArchivedEvent:
+        """Returns event at given position."""
+
+        return ArchivedEvent(
+            id=self.column('id')[position],
+            test_id=self.column('test_id')[position],
+            test_uid=self.column('test_uid')[position],
+            message=self.column('message')[position],
+            traceback=self.column('traceback')[position],
+            client_timestamp=_from_microseconds(self.column('client_timestamp')[position]),
+            server_timestamp=_from_microseconds(self.column('server_timestamp')[position]),
+        )
@@ -0,0 +1,259 @@
+"""Backup module.
+
+Backup is gzip compressed NDJSON which does not depend on database engine:
+
+    {"format": "failurebase-backup", "version": 1, "created": "...", "dialect": "sqlite"}
+    {"table": "tests", "columns": ["id", "uid", ...]}
+    [1, "webui/tests/login", ...]
+    ...
+    {"end": true, "rows": 12345}
+
+Tables follow each other in order of their dependencies, timestamps are ISO strings and binary values
+are base64 encoded. The last line makes truncated backup detectable.
+"""
+
+import json
+import gzip
+import zlib
+import base64
+import sqlite3
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from typing import Iterator, Iterable, IO
+from sqlalchemy import Engine, Connection, Table, LargeBinary, DateTime, create_engine, insert, select, func, text
+
+from .models import Base
+from .exceptions import DatabaseNotEmptyError, InvalidBackupError
+
+FORMAT = 'failurebase-backup'
+VERSION = 1
+
+CHUNK_SIZE = 64 * 1024
+
+SQLITE_MAX_RESTARTS = 3
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+def _decoders(table: Table, columns: list[str]) -> list:
+    decoders = []
+    for name in columns:
+        column_type = table.columns[name].type
+        if isinstance(column_type, DateTime):
+            decoders.append(lambda value: None if value is None else datetime.fromisoformat(value))
+        elif isinstance(column_type, LargeBinary):
+            decoders.append(lambda value: None if value is None else base64.b64decode(value))
+        else:
+            decoders.append(None)
+
+    return decoders
+
+
+def dump_lines(connection: Connection, dialect: str, batch_size: int = 1000) -> Iterator[str]:
+    """Yields lines of backup of all tables read with given connection (in its transaction)."""
+
+    yield json.dumps({'format': FORMAT, 'version': VERSION, 'created': datetime.now().isoformat(),
+                      'dialect': dialect})
+
+    rows = 0
+    for table in Base.metadata.sorted_tables:
+        columns = [column.name for column in table.columns]
+        yield json.dumps({'table': table.name, 'columns': columns})
+
+        statement = select(*table.columns).order_by(*table.primary_key.columns)
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for row in result:
+            yield json.dumps([_encode(value) for value in row])
+            rows += 1
+
+    yield json.dumps({'end': True, 'rows': rows})
+
+
+def compress(lines: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Yields gzip compressed chunks of lines (each is terminated by new line)."""
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    buffer = []
+    size = 0
+
+    for line in lines:
+        data = compressor.compress(line.encode() + b'\n')
+        if data:
+            buffer.append(data)
+            size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+
+    buffer.append(compressor.flush())
+    yield b''.join(buffer)
+
+
+def backup(engine: Engine, sqlite_pages_per_step: int = 1024, sqlite_step_sleep: float = 0.0,
+           batch_size: int = 1000) -> Iterator[bytes]:
+    """Yields gzip compressed chunks of consistent snapshot of database.
+
+    SQLite database in write-ahead log mode and other databases are dumped in single read transaction,
+    so writers are not blocked at all. SQLite database in rollback journal mode is first copied with online
+    backup API into temporary file, which is then dumped without touching the live database. The copy is
+    made in steps, between them writers can commit, but every such write restarts the copy, so after
+    `SQLITE_MAX_RESTARTS` restarts the rest is copied in single step (which blocks writers until it is done).
+    """
+
+    dialect = engine.dialect.name
+
+    if dialect != 'sqlite':
+        with engine.connect().execution_options(isolation_level='REPEATABLE READ') as connection:
+            with connection.begin():
+                yield from compress(dump_lines(connection, dialect, batch_size))
+        return
+
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+
+    if journal_mode == 'wal':
+        with engine.connect() as connection:
+            # driver does not begin transaction before reads, all reads of explicit one see the same snapshot
+            connection.exec_driver_sql('BEGIN')
+            yield from compress(dump_lines(connection, dialect, batch_size))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'snapshot.db'
+
+        source = engine.raw_connection()
+        target = sqlite3.connect(path)
+        try:
+            _copy(source.driver_connection, target, sqlite_pages_per_step, sqlite_step_sleep)
+        finally:
+            target.close()
+            source.close()
+
+        snapshot = create_engine(f'sqlite:///{path}')
+        try:
+            with snapshot.connect() as connection:
+                yield from compress(dump_lines(connection, dialect, batch_size))
+        finally:
+            snapshot.dispose()
+
+
+class _TooManyRestarts(Exception):
+    """Aborts stepped copy of SQLite database."""
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, pages_per_step: int, step_sleep: float) -> None:
+    """Copies SQLite database in steps, the copy is finished in single step when it was restarted too many times."""
+
+    if pages_per_step <= 0:
+        source.backup(target)
+        return
+
+    restarts = 0
+    previous_remaining = None
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal restarts, previous_remaining
+        if previous_remaining is not None and remaining >= previous_remaining:
+            restarts += 1
+            if restarts > SQLITE_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        previous_remaining = remaining
+
+    try:
+        source.backup(target, pages=pages_per_step, progress=progress, sleep=step_sleep)
+    except _TooManyRestarts:
+        source.backup(target)
+
+
+def read_lines(file: IO[bytes]) -> Iterator[str]:
+    """Yields lines of gzip compressed backup file."""
+
+    with gzip.open(file, 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            yield line.rstrip('\n')
+
+
+def restore(engine: Engine, lines: Iterable[str], batch_size: int = 1000) -> int:
+    """Loads backup into empty database in single transaction, returns number of restored rows."""
+
+    tables = {table.name: table for table in Base.metadata.sorted_tables}
+    lines = iter(lines)
+
+    try:
+        header = json.loads(next(lines))
+    except (StopIteration, ValueError):
+        raise InvalidBackupError('Backup is empty or it is not NDJSON.') from None
+    if header.get('format') != FORMAT or header.get('version') != VERSION:
+        raise InvalidBackupError(f'Unsupported backup format: {header}.')
+
+    with engine.begin() as connection:
+
+        for table in tables.values():
+            if connection.execute(select(func.count()).select_from(table)).scalar_one():
+                raise DatabaseNotEmptyError(f'Table "{table.name}" is not empty, backup can be restored only '
+                                            f'into empty database.')
+
+        table = columns = decoders = None
+        batch = []
+        rows = 0
+        finished = False
+
+        for line in lines:
+            record = json.loads(line)
+
+            if isinstance(record, list):
+                if table is None:
+                    raise InvalidBackupError('Row precedes table header.')
+                batch.append({name: value if decode is None else decode(value)
+                              for name, value, decode in zip(columns, record, decoders)})
+                if len(batch) >= batch_size:
+                    connection.execute(insert(table), batch)
+                    rows += len(batch)
+                    batch = []
+                continue
+
+            if batch:
+                connection.execute(insert(table), batch)
+                rows += len(batch)
+                batch = []
+
+            if record.get('end'):
+                if record.get('rows') != rows:
+                    raise InvalidBackupError(f'Backup has {record.get("rows")} rows, {rows} were read.')
+                finished = True
+                break
+
+            table = tables.get(record.get('table'))
+            if table is None:
+                raise InvalidBackupError(f'Unknown table: {record.get("table")}.')
+            columns = record['columns']
+            unknown = set(columns) - set(table.columns.keys())
+            if unknown:
+                raise InvalidBackupError(f'Unknown columns of table "{table.name}": {sorted(unknown)}.')
+            decoders = _decoders(table, columns)
+
+        if not finished:
+            raise InvalidBackupError('Backup is truncated.')
+
+        if engine.dialect.name == 'postgresql':
+            _reset_sequences(connection)
+
+    return rows
+
+
+def _reset_sequences(connection: Connection) -> None:
+    """Moves sequences of restored tables past restored ids."""
+
+    for table in Base.metadata.sorted_tables:
+        if list(table.primary_key.columns.keys()) == ['id']:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            ))
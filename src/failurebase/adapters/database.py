@@ -1,26 +1,149 @@
 """Database module."""
 
 import logging
-from sqlalchemy import create_engine, orm
+from contextlib import contextmanager
+from typing import Iterator, Iterable
+from sqlalchemy import create_engine, event, inspect, orm, pool, text, MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateTable
 
-from .models import Base
+from .models import Base, Test
+from . import backup as backups
 
 
 logger = logging.getLogger(__name__)
 
 
+def _enable_wal(dbapi_connection, connection_record) -> None:
+    """Journal mode is kept in database file, so it is actually changed only by the first connection."""
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+    finally:
+        cursor.close()
+
+
 class Database:
+    """Database adapter, `session_factory` creates new session with every call.
+
+    Pool options are used only by databases pooled with `QueuePool` (e.g. not by in-memory SQLite).
+    With `sqlite_wal` SQLite database file is switched to write-ahead log mode.
+    """
 
-    def __init__(self, db_url: str) -> None:
+    def __init__(self, db_url: str, pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30.0,
+                 sqlite_wal: bool = False) -> None:
 
-        self._engine = create_engine(db_url)
+        url = make_url(db_url)
+        pool_options = {}
+        if issubclass(url.get_dialect().get_pool_class(url), pool.QueuePool):
+            pool_options = {'pool_size': pool_size, 'max_overflow': max_overflow, 'pool_timeout': pool_timeout}
 
-        self.session_factory = orm.scoped_session(
-            orm.sessionmaker(
-                bind=self._engine,
-            ),
+        self._engine = create_engine(url, **pool_options)
+
+        if sqlite_wal and url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+            event.listen(self._engine, 'connect', _enable_wal)
+
+        self.session_factory = orm.sessionmaker(
+            bind=self._engine,
         )
 
+    @contextmanager
+    def request_session(self) -> Iterator[orm.Session]:
+        """Yields session shared by units of work of one request, it is closed when request is finished."""
+
+        session = self.session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def pool_metrics(self) -> dict | None:
+        """Returns numbers of connections of pool, None when database is not pooled with `QueuePool`."""
+
+        connections = self._engine.pool
+        if not isinstance(connections, pool.QueuePool):
+            return None
+
+        return {
+            'size': connections.size(),
+            'max_overflow': connections._max_overflow,
+            'checked_out': connections.checkedout(),
+            'overflow': max(connections.overflow(), 0),
+        }
+
+    def backup(self, sqlite_pages_per_step: int = 1024, sqlite_step_sleep: float = 0.0,
+               batch_size: int = 1000) -> Iterator[bytes]:
+        """Yields gzip compressed chunks of consistent snapshot of database."""
+
+        return backups.backup(self._engine, sqlite_pages_per_step, sqlite_step_sleep, batch_size)
+
+    def restore(self, lines: Iterable[str], batch_size: int = 1000) -> int:
+        """Loads backup lines into empty database, returns number of restored rows."""
+
+        return backups.restore(self._engine, lines, batch_size)
+
     def create_database(self) -> None:
+        """Creates missing tables, columns and indexes."""
 
         Base.metadata.create_all(self._engine)
+        self._add_missing_columns_and_indexes()
+        self._drop_unique_test_uid()
+
+    def _add_missing_columns_and_indexes(self) -> None:
+        """Brings tables created by older versions up to date.
+
+        Only additive changes are made here: new nullable columns (existing rows get NULL), new columns
+        with server default (existing rows get the default) and new indexes.
+        """
+
+        inspector = inspect(self._engine)
+
+        with self._engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+                    definition = column.type.compile(dialect=self._engine.dialect)
+                    if column.server_default is not None:
+                        default = column.server_default.arg.replace("'", "''")
+                        definition += f" DEFAULT '{default}'" + ('' if column.nullable else ' NOT NULL')
+                    elif not column.nullable:
+                        continue
+                    logger.info('Adding column %s.%s.', table.name, column.name)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {definition}'))
+
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+    def _drop_unique_test_uid(self) -> None:
+        """Drops unique constraint of test uid made by versions without projects, uid is unique per project.
+
+        SQLite cannot drop constraints, so its tests table is rebuilt (with foreign keys off, which is
+        the default, rows of other tables referencing tests are not touched).
+        """
+
+        inspector = inspect(self._engine)
+        constraints = [constraint for constraint in inspector.get_unique_constraints(Test.__tablename__)
+                       if constraint['column_names'] == ['uid']]
+        if not constraints:
+            return
+
+        logger.info('Dropping unique constraint of %s.uid.', Test.__tablename__)
+
+        with self._engine.begin() as connection:
+            if self._engine.dialect.name != 'sqlite':
+                for constraint in constraints:
+                    connection.execute(text(f'ALTER TABLE {Test.__tablename__} DROP CONSTRAINT {constraint["name"]}'))
+                return
+
+            rebuilt = Test.__table__.to_metadata(MetaData(), name=f'{Test.__tablename__}_rebuilt')
+            columns = ', '.join(column.name for column in rebuilt.columns)
+            connection.execute(CreateTable(rebuilt, include_foreign_key_constraints=[]))
+            connection.execute(text(f'INSERT INTO {rebuilt.name} ({columns}) '
+                                    f'SELECT {columns} FROM {Test.__tablename__}'))
+            connection.execute(text(f'DROP TABLE {Test.__tablename__}'))
+            connection.execute(text(f'ALTER TABLE {rebuilt.name} RENAME TO {Test.__tablename__}'))
+            for index in Test.__table__.indexes:
+                index.create(connection, checkfirst=True)
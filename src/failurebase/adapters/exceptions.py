@@ -2,3 +2,23 @@
 
 class NotFoundError(Exception):
     """Throws when model does not exist."""
+
+
+class ConcurrentUpdateError(Exception):
+    """Throws when rows were changed by other transaction in the meantime."""
+
+
+class RunClosedError(Exception):
+    """Throws when failures are appended to run which was already closed."""
+
+
+class DatabaseNotEmptyError(Exception):
+    """Throws when backup is restored into database which already has some data."""
+
+
+class InvalidBackupError(Exception):
+    """Throws when backup file is truncated or it has unknown format."""
+
+
+class BackupNotSupportedError(Exception):
+    """Throws when storage cannot be backed up or restored."""
@@ -0,0 +1,257 @@
+"""In-memory storage module.
+
+Storage of in-memory repositories, it keeps objects of the same models as database does (they are never
+added to SQLAlchemy session) with secondary indexes maintained on every write:
+
+* id hash maps of all models,
+* sorted indexes of events per order key (`(key, id)` pairs), so ordered pages are read in index order,
+* events of every test and run, tests by uid and inverted index of tests by marks,
+* sorted indexes of suggest segments per project, so prefix lookup is a range scan.
+
+Everything is lost when process ends, which makes it fast disposable failurebase for local pipelines.
+"""
+
+import re
+import json
+import bisect
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Any
+from collections import defaultdict
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import Test, Event, Run, Project, Change
+from .patterns import like
+from .exceptions import BackupNotSupportedError
+
+
+# Order keys of events, they match order clauses of `EventRepository`.
+EVENT_ORDER_KEYS = {
+    'id': lambda event: event.id,
+    'message': lambda event: event.message,
+    'server_timestamp': lambda event: event.server_timestamp,
+    'client_timestamp': lambda event: event.client_timestamp,
+    'test_uid': lambda event: event.test.uid,
+}
+
+# Characters of JSON encoded list of marks which can be matched only across marks.
+_MARKS_SYNTAX = re.compile(r'["\[\],\s]')
+
+
+class SortedIndex:
+    """Sorted list of `(key, id)` pairs."""
+
+    def __init__(self) -> None:
+        self._entries: list[tuple[Any, int]] = []
+
+    def add(self, key, object_id: int) -> None:
+        bisect.insort(self._entries, (key, object_id))
+
+    def remove(self, key, object_id: int) -> None:
+        index = bisect.bisect_left(self._entries, (key, object_id))
+        if index < len(self._entries) and self._entries[index] == (key, object_id):
+            del self._entries[index]
+
+    def ids(self, reverse: bool = False) -> Iterator[int]:
+        """Yields ids in order of keys (and ids)."""
+
+        entries = reversed(self._entries) if reverse else iter(self._entries)
+        return (object_id for _, object_id in entries)
+
+    def range(self, start=None, end=None, include_end: bool = True) -> Iterator[int]:
+        """Yields ids of keys between start and end (None means unbounded), in order of keys."""
+
+        low = 0 if start is None else bisect.bisect_left(self._entries, start, key=lambda entry: entry[0])
+        if end is None:
+            high = len(self._entries)
+        elif include_end:
+            high = bisect.bisect_right(self._entries, end, key=lambda entry: entry[0])
+        else:
+            high = bisect.bisect_left(self._entries, end, key=lambda entry: entry[0])
+
+        return (object_id for _, object_id in itertools.islice(self._entries, low, high))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InMemoryStore:
+    """Objects and indexes of in-memory repositories, shared by all their sessions."""
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.sequences = {name: itertools.count(1) for name in ('events', 'tests', 'runs', 'changes')}
+
+        self.events: dict[int, Event] = {}
+        self.event_indexes = {name: SortedIndex() for name in EVENT_ORDER_KEYS}
+        self.events_by_test: dict[int, set[int]] = defaultdict(set)
+        self.events_by_run: dict[int, set[int]] = defaultdict(set)
+        self.signatures: dict[int, bytes] = {}
+        self.buckets: dict[int, SortedIndex] = defaultdict(SortedIndex)
+        self.event_buckets: dict[int, list[int]] = {}
+
+        self.tests: dict[int, Test] = {}
+        self.tests_by_uid: dict[tuple[str, str], int] = {}
+        self.tests_by_mark: dict[str, set[int]] = defaultdict(set)  # JSON encoded mark -> test ids
+        self.segments: dict[str, list[tuple[str, str, int]]] = defaultdict(list)  # project -> sorted segments
+        self.segments_by_test: dict[int, tuple[str, list[tuple[str, str, int]]]] = {}
+
+        self.runs: dict[int, Run] = {}
+        self.projects: dict[str, Project] = {}
+        self.changes: list[Change] = []
+
+    def next_id(self, sequence: str) -> int:
+        return next(self.sequences[sequence])
+
+    def add_event(self, event: Event) -> None:
+        self.events[event.id] = event
+        for name, key in EVENT_ORDER_KEYS.items():
+            self.event_indexes[name].add(key(event), event.id)
+        self.events_by_test[event.test_id].add(event.id)
+        if event.run_id is not None:
+            self.events_by_run[event.run_id].add(event.id)
+
+    def remove_event(self, event: Event) -> None:
+        del self.events[event.id]
+        for name, key in EVENT_ORDER_KEYS.items():
+            self.event_indexes[name].remove(key(event), event.id)
+        self.events_by_test[event.test_id].discard(event.id)
+        if event.run_id is not None:
+            self.events_by_run[event.run_id].discard(event.id)
+
+    def add_test(self, test: Test) -> None:
+        self.tests[test.id] = test
+        self.tests_by_uid[(test.project, test.uid)] = test.id
+        for mark in self.encoded_marks(test.marks):
+            self.tests_by_mark[mark].add(test.id)
+
+    def remove_test(self, test: Test) -> None:
+        del self.tests[test.id]
+        del self.tests_by_uid[(test.project, test.uid)]
+        for mark in self.encoded_marks(test.marks):
+            self.tests_by_mark[mark].discard(test.id)
+
+    @staticmethod
+    def encoded_marks(marks: str) -> list[str]:
+        """Returns marks as they are written in JSON list of marks (without quotes)."""
+
+        return [json.dumps(mark)[1:-1] for mark in json.loads(marks)]
+
+    def get_tests_by_mark(self, mark: str) -> set[int] | None:
+        """Returns ids of tests whose JSON list of marks contains given string like SQL `contains` does.
+
+        None is returned when the string could match across marks, it cannot be answered by the index.
+        """
+
+        if _MARKS_SYNTAX.search(mark):
+            return None
+
+        matches = like(mark)
+        return set().union(*(test_ids for encoded, test_ids in self.tests_by_mark.items() if matches(encoded)))
+
+    def set_segments(self, test_id: int, project: str | None, segments: list[tuple[str, str, int]]) -> None:
+        """Replaces segments of test, None project removes them."""
+
+        previous = self.segments_by_test.pop(test_id, None)
+        if previous is not None:
+            index = self.segments[previous[0]]
+            for segment in previous[1]:
+                del index[bisect.bisect_left(index, segment)]
+
+        if project is not None and segments:
+            index = self.segments[project]
+            for segment in segments:
+                bisect.insort(index, segment)
+            self.segments_by_test[test_id] = (project, segments)
+
+
+class InMemorySession:
+    """Session of in-memory repositories.
+
+    Session holds the lock of store until it is closed, so transactions are serialized. Writes are applied
+    immediately and undone on rollback, objects returned by repositories are the stored ones, so their
+    attributes have to be changed only right before commit (as services do).
+    """
+
+    def __init__(self, store: InMemoryStore) -> None:
+        self.store = store
+        self._undo: list[Callable[[], None]] = []
+        self._closed = False
+        store.lock.acquire()
+
+    def on_rollback(self, func: Callable[[], None]) -> None:
+        """Registers function which undoes write."""
+
+        self._undo.append(func)
+
+    def flush(self) -> None:
+        """Ids are assigned when objects are added, there is nothing to send."""
+
+    def commit(self) -> None:
+        self._undo.clear()
+
+    def rollback(self) -> None:
+        while self._undo:
+            self._undo.pop()()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.store.lock.release()
+
+
+def set_test(event: Event, test: Test) -> None:
+    """Links event to its test without adding event to events of the test."""
+
+    set_committed_value(event, 'test', test)
+
+
+def update(session: InMemorySession, obj: object, reindex: Callable[[], None] | None = None,
+           deindex: Callable[[], None] | None = None, **values) -> None:
+    """Sets attributes of stored object, the old values are restored on rollback.
+
+    Indexes which depend on changed attributes are removed before and added after the change.
+    """
+
+    old_values = {name: getattr(obj, name) for name in values}
+
+    def apply(changes: dict) -> None:
+        if deindex is not None:
+            deindex()
+        for name, value in changes.items():
+            setattr(obj, name, value)
+        if reindex is not None:
+            reindex()
+
+    apply(values)
+    session.on_rollback(lambda: apply(old_values))
+
+
+class MemoryDatabase:
+    """Replacement of `Database` for in-memory repositories, nothing is stored outside of process."""
+
+    def __init__(self) -> None:
+        self.store = InMemoryStore()
+        self.session_factory = lambda: InMemorySession(self.store)
+
+    @contextmanager
+    def request_session(self) -> Iterator[None]:
+        """Sessions hold lock of store until they are closed, so units of work of request open their own ones."""
+
+        yield None
+
+    def pool_metrics(self) -> None:
+        """There is no connection pool."""
+
+        return None
+
+    def create_database(self) -> None:
+        """Storage is ready when it is created."""
+
+    def backup(self, *args, **kwargs) -> Iterator[bytes]:
+        raise BackupNotSupportedError('In-memory storage cannot be backed up.')
+
+    def restore(self, *args, **kwargs) -> int:
+        raise BackupNotSupportedError('In-memory storage cannot be restored.')
@@ -1,42 +1,245 @@
 """Models module."""
 
+from enum import Enum
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, ForeignKey
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, BigInteger, Float, LargeBinary, DateTime, ForeignKey, Index, select, func
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, column_property
+
+
+# Project of rows stored before projects were introduced and of requests which do not name any.
+DEFAULT_PROJECT = 'default'
 
 
 class Base(DeclarativeBase):
     """Base model class."""
 
 
+class Project(Base):
+    """Settings of project, projects without settings exist implicitly through their tests."""
+
+    __tablename__ = 'projects'
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    retention_days: Mapped[float | None] = mapped_column(Float())
+
+    def __repr__(self):
+        return f'<Project(name={self.name!r})>'
+
+
 class Test(Base):
 
     __tablename__ = 'tests'
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
-    uid: Mapped[str] = mapped_column(String(2000), unique=True)
+    project: Mapped[str] = mapped_column(String(100), default=DEFAULT_PROJECT, server_default=DEFAULT_PROJECT)
+    uid: Mapped[str] = mapped_column(String(2000))
     marks: Mapped[str] = mapped_column(String(2000))
     file: Mapped[str] = mapped_column(String(1000))
-    total_events_count: Mapped[int] = mapped_column(Integer())
+    folded_events_count: Mapped[int] = mapped_column('total_events_count', Integer())
+    first_seen: Mapped[datetime | None] = mapped_column(DateTime())
+    folded_last_seen: Mapped[datetime | None] = mapped_column('last_seen', DateTime())
+    archived_events_count: Mapped[int | None] = mapped_column(Integer(), default=0)  # part of folded count
     events: Mapped[list['Event']] = relationship(back_populates='test', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        Index('ux_tests_project_uid', 'project', 'uid', unique=True),
+    )
+
+    @hybrid_property
+    def total_events_count(self) -> int:
+        """Exact number of events: folded count and deltas which were not folded yet."""
+
+        return self.folded_events_count + (self.pending_events_count or 0)
+
+    @total_events_count.inplace.setter
+    def _total_events_count_setter(self, value: int) -> None:
+        self.folded_events_count = value
+
+    @total_events_count.inplace.expression
+    @classmethod
+    def _total_events_count_expression(cls):
+        return cls.folded_events_count + cls.pending_events_count
+
+    @property
+    def last_seen(self) -> datetime | None:
+        """Server timestamp of the newest event, deltas which were not folded yet are included."""
+
+        if self.pending_last_seen is None or self.folded_last_seen is None:
+            return self.pending_last_seen or self.folded_last_seen
+
+        return max(self.pending_last_seen, self.folded_last_seen)
+
     def __repr__(self):
         return f'<Test(id={self.id})>'
 
 
+class Run(Base):
+    """CI run (build) which reported failures, its summary counters are computed when it is closed."""
+
+    __tablename__ = 'runs'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    project: Mapped[str] = mapped_column(String(100), default=DEFAULT_PROJECT, server_default=DEFAULT_PROJECT)
+    name: Mapped[str | None] = mapped_column(String(200))
+    branch: Mapped[str | None] = mapped_column(String(200))
+    commit: Mapped[str | None] = mapped_column(String(100))
+    started_at: Mapped[datetime] = mapped_column(DateTime())
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime())
+    events_count: Mapped[int | None] = mapped_column(Integer())
+    tests_count: Mapped[int | None] = mapped_column(Integer())
+    new_tests_count: Mapped[int | None] = mapped_column(Integer())
+
+    __table_args__ = (
+        Index('ix_runs_project_started_at', 'project', 'started_at'),
+    )
+
+    def __repr__(self):
+        return f'<Run(id={self.id})>'
+
+
 class Event(Base):
 
     __tablename__ = 'events'
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
+    project: Mapped[str] = mapped_column(String(100), default=DEFAULT_PROJECT, server_default=DEFAULT_PROJECT)
     message: Mapped[str] = mapped_column(String(2000))
     traceback: Mapped[str] = mapped_column(String(3000))
     client_timestamp: Mapped[datetime] = mapped_column(DateTime())
     server_timestamp: Mapped[datetime] = mapped_column(DateTime(), default=datetime.now())
     test_id: Mapped[int] = mapped_column(ForeignKey('tests.id'))
     test: Mapped['Test'] = relationship(back_populates='events')
+    run_id: Mapped[int | None] = mapped_column(ForeignKey('runs.id'))
+
+    __table_args__ = (
+        Index('ix_events_project_server_timestamp', 'project', 'server_timestamp'),
+        Index('ix_events_project_test_id_server_timestamp', 'project', 'test_id', 'server_timestamp'),
+        Index('ix_events_run_id_server_timestamp', 'run_id', 'server_timestamp'),
+    )
 
     def __repr__(self):
         return f'<Event(id={self.id})>'
+
+
+class EventsCountDelta(Base):
+    """Change of events count (and last seen time) of test which is not folded into the test row yet.
+
+    Ingestion appends rows here instead of rewriting the row of test, so failures of the same test do not
+    wait for each other. Deltas are periodically folded into the test row.
+    """
+
+    __tablename__ = 'events_count_deltas'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    test_id: Mapped[int] = mapped_column(ForeignKey('tests.id'), index=True)
+    delta: Mapped[int] = mapped_column(Integer())
+    timestamp: Mapped[datetime | None] = mapped_column(DateTime())
+
+    def __repr__(self):
+        return f'<EventsCountDelta(id={self.id})>'
+
+
+class EventSignature(Base):
+    """MinHash signature of traceback of event (see `failurebase.services.similarity`)."""
+
+    __tablename__ = 'event_signatures'
+
+    event_id: Mapped[int] = mapped_column(ForeignKey('events.id'), primary_key=True)
+    signature: Mapped[bytes] = mapped_column(LargeBinary())
+
+    def __repr__(self):
+        return f'<EventSignature(event_id={self.event_id})>'
+
+
+class EventBucket(Base):
+    """Locality-sensitive hashing bucket of event, events similar to each other likely share some."""
+
+    __tablename__ = 'event_buckets'
+
+    bucket: Mapped[int] = mapped_column(BigInteger(), primary_key=True, autoincrement=False)
+    event_id: Mapped[int] = mapped_column(ForeignKey('events.id'), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f'<EventBucket(bucket={self.bucket}, event_id={self.event_id})>'
+
+
+class TestSegment(Base):
+    """Lowercased part of test uid or file which starts at word boundary, prefixes of segments are suggested.
+
+    Segments are stored in order of project index, so prefix lookup is a range scan (see
+    `failurebase.services.suggest`).
+    """
+
+    __tablename__ = 'test_segments'
+
+    segment: Mapped[str] = mapped_column(String(100), primary_key=True)
+    field: Mapped[str] = mapped_column(String(4), primary_key=True)
+    test_id: Mapped[int] = mapped_column(ForeignKey('tests.id'), primary_key=True, index=True)
+    project: Mapped[str] = mapped_column(String(100), default=DEFAULT_PROJECT, server_default=DEFAULT_PROJECT)
+
+    __table_args__ = (
+        Index('ix_test_segments_project_segment', 'project', 'segment', 'field'),
+    )
+
+    def __repr__(self):
+        return f'<TestSegment(segment={self.segment!r}, test_id={self.test_id})>'
+
+
+class ArchivedEventDeletion(Base):
+    """Tombstone of deleted archived event, segment files are immutable, so the event is only hidden."""
+
+    __tablename__ = 'archived_event_deletions'
+
+    event_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+
+    def __repr__(self):
+        return f'<ArchivedEventDeletion(event_id={self.event_id})>'
+
+
+class ChangeType(str, Enum):
+    """Kinds of changes recorded in change log."""
+
+    EVENT_CREATED = 'event_created'
+    EVENT_DELETED = 'event_deleted'
+    TEST_DELETED = 'test_deleted'  # all events of the test are deleted as well
+    EVENT_ARCHIVED = 'event_archived'  # event moved from database to archive, it is still readable by id
+
+
+class Change(Base):
+    """Entry of append-only change log, its id is the cursor of incremental sync.
+
+    Ids are never reused (also after the newest entries are deleted), so cursor only grows.
+    """
+
+    __tablename__ = 'changes'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    type: Mapped[str] = mapped_column(String(20))
+    object_id: Mapped[int] = mapped_column(Integer())
+    timestamp: Mapped[datetime] = mapped_column(DateTime(), default=datetime.now)
+
+    def __repr__(self):
+        return f'<Change(id={self.id})>'
+
+
+Test.pending_events_count = column_property(
+    select(func.coalesce(func.sum(EventsCountDelta.delta), 0))
+    .where(EventsCountDelta.test_id == Test.id)
+    .correlate_except(EventsCountDelta)
+    .scalar_subquery()
+)
+
+Test.pending_last_seen = column_property(
+    select(func.max(EventsCountDelta.timestamp))
+    .where(EventsCountDelta.test_id == Test.id)
+    .correlate_except(EventsCountDelta)
+    .scalar_subquery()
+)
@@ -0,0 +1,25 @@
+"""Patterns module."""
+
+import re
+from typing import Callable
+
+
+def like(pattern: str) -> Callable[[str], bool]:
+    """Returns predicate matching the same strings as `ILIKE '%pattern%'` of SQLite.
+
+    `%` and `_` are wildcards, comparison ignores case of ASCII letters only.
+    """
+
+    parts = []
+    for char in pattern:
+        if char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        elif char.isascii() and char.isalpha():
+            parts.append(f'[{char.lower()}{char.upper()}]')
+        else:
+            parts.append(re.escape(char))
+    regex = re.compile(''.join(parts), re.DOTALL)
+
+    return lambda value: regex.search(value) is not None
@@ -0,0 +1,59 @@
+"""Change repository module."""
+
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, func
+
+from .base import AbstractRepository, PaginationList
+from ..models import Change, ChangeType, Event
+
+
+class ChangeRepository(AbstractRepository):
+    """Repository to manage `Change` model."""
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects."""
+
+        query = self.session.query(Change).order_by(Change.id)
+        count = query.count()
+        offset = page_number * page_limit
+        chunk = query.offset(offset).limit(page_limit).all()
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_after(self, cursor: int, limit: int, settle_time: float = 0.0) -> list[Change]:
+        """Returns up to limit changes recorded after given cursor, ordered by cursor.
+
+        Ids are taken when changes are inserted, but transactions can commit in other order (e.g. on
+        PostgreSQL), so change with lower id can become visible after higher one. Changes are returned only
+        up to gap in ids which is younger than `settle_time` seconds, older gaps are left by transactions
+        which were rolled back.
+        """
+
+        changes = self.session.query(Change).filter(Change.id > cursor).order_by(Change.id).limit(limit).all()
+
+        settled = datetime.now() - timedelta(seconds=settle_time)
+        for position, change in enumerate(changes):
+            if change.id != cursor + 1 and change.timestamp > settled:
+                return changes[:position]
+            cursor = change.id
+
+        return changes
+
+    def get_last_id(self) -> int:
+        """Returns cursor of the newest change or 0 if there are none."""
+
+        return self.session.query(func.coalesce(func.max(Change.id), 0)).scalar()
+
+    def get_events(self, event_ids: list[int]) -> dict[int, Event]:
+        """Returns still existing events with given ids."""
+
+        events = self.session.execute(select(Event).where(Event.id.in_(set(event_ids)))).scalars()
+
+        return {event.id: event for event in events}
+
+    def add(self, change_type: ChangeType, object_ids: list[int]) -> None:
+        """Records the same change of many objects in current session."""
+
+        if object_ids:
+            self.session.execute(insert(Change), [{'type': change_type.value, 'object_id': object_id}
+                                                  for object_id in object_ids])
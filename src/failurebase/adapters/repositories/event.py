@@ -1,12 +1,28 @@
 """Event repository module."""
 
+import heapq
+import itertools
+from typing import Iterable
+from datetime import datetime
+from sqlalchemy import func, select, insert, update, delete, union_all, cast, extract, literal, Integer, DateTime
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
 from .base import AbstractRepository, PaginationList
-from ..models import Event, Test
-from ..exceptions import NotFoundError
+from ..models import Event, Test, EventSignature, EventBucket, ArchivedEventDeletion, DEFAULT_PROJECT
+from ..archive import SegmentArchive, ArchiveFilter, ArchivedEvent
+from ..exceptions import NotFoundError, ConcurrentUpdateError
 
 
 class EventRepository(AbstractRepository):
-    """Repository to manage `Event` model."""
+    """Repository to manage `Event` model.
+
+    When archive is passed, archived events are read as well (as detached objects), they are returned
+    only while their test exists and until they are deleted (archive keeps their tombstones).
+
+    Repository of project reads only events of the project and creates events in it, repository without
+    project (for maintenance) reads events of all projects.
+    """
 
     POSSIBLE_ORDER_CLAUSES = {
         'message': Event.message.asc(),
@@ -19,14 +35,147 @@ class EventRepository(AbstractRepository):
         '-test_uid': Test.uid.desc()
     }
 
+    # Filters of events which do not need to read events table, counts of tests can be used instead.
+    TEST_FILTERS = ('test_uid', 'test_marks', 'test_file')
+
+    def __init__(self, session: Session, archive: SegmentArchive | None = None, project: str | None = None) -> None:
+        super().__init__(session)
+        self.archive = archive
+        self.project = project
+
+    def _in_project(self, model: type = Event) -> list:
+        """Returns filters which limit objects to project of repository."""
+
+        return [] if self.project is None else [model.project == self.project]
+
     def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
-        """Returns many paginated objects."""
+        """Returns many paginated objects.
+
+        Archived objects which pass filters are merged with stored ones. Stored objects ordered before all
+        archived ones (for orderings by timestamp it is known from indexes of segments) and after them are
+        paged by database, only stored objects ordered among the read archived ones are merged with them.
+        Archived objects are the oldest ones, so the first pages of the default ordering do not read archive.
+        """
+
+        archive_filter = self._get_archive_filter(**kwargs)
+        if archive_filter is None:
+            return self._get_many(page_number, page_limit, **kwargs)
+
+        ordering = kwargs.get('ordering') or '-server_timestamp'
+        name, reverse = ordering.lstrip('-'), ordering.startswith('-')
+        column = Test.uid if name == 'test_uid' else getattr(Event, name)
+        key = (lambda event: event.test.uid) if name == 'test_uid' else (lambda event: getattr(event, name))
+
+        query = self._get_query(**kwargs)
+        count = query.count() + self._count_archived(archive_filter, **kwargs)
+        offset, end = page_number * page_limit, (page_number + 1) * page_limit
+
+        def page(chunk: list[Event]) -> PaginationList:
+            return PaginationList(chunk, count, page_number, page_limit, end < count, page_number > 0)
+
+        # stored objects ordered before the first archived one
+        first_key = self.archive.first_key(archive_filter, ordering, self._resolve_tests)
+        if first_key is None:
+            return page(query.offset(offset).limit(page_limit).all())
+        before = query.filter(column > first_key if reverse else column < first_key).count()
+        if end <= before:
+            return page(query.offset(offset).limit(page_limit).all())
+
+        archived = self.archive.select(archive_filter, ordering, end - before, None, self._resolve_tests)
+        if not archived:
+            return page(query.offset(offset).limit(page_limit).all())
+
+        # stored objects ordered among read archived ones, the following ones are needed only when archive
+        # ran out of objects before the end of page
+        last_key = getattr(archived[-1], name)
+        among = query.filter(column >= last_key if reverse else column <= last_key).count() - before
+        stored = query.offset(before).limit(min(among, end - before)).all()
+        merged = heapq.merge(stored, self._to_events(archived), key=key, reverse=reverse)
+
+        chunk = query.offset(offset).limit(before - offset).all() if offset < before else []
+        chunk.extend(itertools.islice(merged, max(offset - before, 0), end - before))
+        if len(chunk) < page_limit:
+            after_offset = before + among + max(offset - before - among - len(archived), 0)
+            chunk.extend(query.offset(after_offset).limit(page_limit - len(chunk)).all())
+
+        return page(chunk)
+
+    def _get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects stored in database."""
+
+        query = self._get_query(**kwargs)
+        offset = page_number * page_limit
+        count = query.count()
+
+        query = query.offset(offset).limit(page_limit)
+        chunk = query.all()
+        next_page = offset + page_limit < count
+        prev_page = page_number > 0
+
+        return PaginationList(chunk, count, page_number, page_limit, next_page, prev_page)
+
+    def _get_query(self, **kwargs):
+        """Returns ordered query of objects stored in database which pass filters."""
 
         query = self.session.query(Event)
-        filters = []
         order_clause = Event.server_timestamp.desc()
+        filters, related_object = self._get_filters(**kwargs)
+        filters = self._in_project() + filters
+
+        ordering = kwargs.get('ordering')
+        if ordering is not None:
+            order_clause = self.POSSIBLE_ORDER_CLAUSES[ordering]
+            if 'test_' in ordering and related_object is None:
+                related_object = Event.test
+
+        if related_object is not None:
+            query = query.join(related_object)
+
+        if filters:
+            query = query.filter(*filters)
+
+        return query.order_by(order_clause)
+
+    def get_counts_by_test(self, **kwargs) -> list[tuple[str, str, int]]:
+        """Returns (marks, file, number of filtered objects) of tests which have some filtered objects.
+
+        Counts are grouped in single query. When only test filters are passed, maintained events counts of
+        tests (they include archived events, deleted ones are subtracted) are returned and events table is not
+        read at all. Otherwise archived objects are counted separately, so the same test can be returned twice.
+        """
+
+        filters, _ = self._get_filters(**kwargs)
+
+        if all(name in self.TEST_FILTERS or value is None for name, value in kwargs.items()):
+            statement = select(Test.marks, Test.file, Test.total_events_count).where(
+                *self._in_project(Test), *filters, Test.total_events_count > 0
+            )
+            return [tuple(row) for row in self.session.execute(statement).all()]
+
+        statement = (select(Test.marks, Test.file, func.count(Event.id)).join(Event.test)
+                     .where(*self._in_project(), *filters).group_by(Test.id, Test.marks, Test.file))
+        rows = [tuple(row) for row in self.session.execute(statement).all()]
+
+        archive_filter = self._get_archive_filter(**kwargs)
+        if archive_filter is not None:
+            archived_counts = self.archive.count_by_test(archive_filter, self._resolve_tests)
+            tests = self.session.execute(select(Test.id, Test.marks, Test.file)
+                                         .where(Test.id.in_(set(archived_counts)))).all()
+            rows.extend((marks, file, archived_counts[test_id]) for test_id, marks, file in tests)
+
+        return rows
+
+    @staticmethod
+    def _get_filters(**kwargs) -> tuple[list, object]:
+        """Returns filter clauses for passed parameters and relationship which has to be joined (or None)."""
+
+        filters = []
         related_object = None
 
+        run_id = kwargs.get('run_id')
+        if run_id is not None:
+            filters.append(Event.run_id == run_id)
+
         start_server_timestamp = kwargs.get('start_server_timestamp')
         if start_server_timestamp is not None:
             filters.append(start_server_timestamp <= Event.server_timestamp)
@@ -69,51 +218,272 @@ class EventRepository(AbstractRepository):
             if related_object is None:
                 related_object = Event.test
 
-        ordering = kwargs.get('ordering')
-        if ordering is not None:
-            order_clause = self.POSSIBLE_ORDER_CLAUSES[ordering]
-            if 'test_' in ordering and related_object is None:
-                related_object = Event.test
+        return filters, related_object
 
-        if related_object is not None:
-            query = query.join(related_object)
+    def get_by_id(self, event_id: int) -> Event:
+        """Returns single object with given id."""
 
-        if filters:
-            query = query.filter(*filters)
+        event = self.session.query(Event).filter(Event.id == event_id, *self._in_project()).first()
+        if event is None:
+            event = self._get_archived_by_id(event_id)
+        if event is None:
+            raise NotFoundError(f'Event with id = "{event_id}" does not exist.')
 
-        offset = page_number * page_limit
+        return event
 
-        query = query.order_by(order_clause)
-        count = query.count()
+    def get_older(self, before: datetime, limit: int) -> list[Event]:
+        """Returns up to limit the oldest objects created before given time (with their tests), ordered by id."""
 
-        query = query.offset(offset).limit(page_limit)
-        chunk = query.all()
-        next_page = offset + page_limit < count
-        prev_page = page_number > 0
+        return (self.session.query(Event).options(joinedload(Event.test))
+                .filter(*self._in_project(), Event.server_timestamp < before).order_by(Event.id).limit(limit).all())
 
-        return PaginationList(chunk, count, page_number, page_limit, next_page, prev_page)
+    def delete_by_ids(self, event_ids: list[int]) -> None:
+        """Deletes objects (and their signatures) with given ids.
 
-    def get_by_id(self, event_id: int) -> Event:
-        """Returns single object with given id."""
+        Whole deletion is given up when some of the objects were already deleted, so concurrent archiving or
+        retention (e.g. from many workers) never moves or counts the same object twice.
+        """
 
-        event = self.session.query(Event).get(event_id)
-        if event is None:
-            raise NotFoundError(f'Event with id = "{event_id}" does not exist.')
+        self.delete_signatures(event_ids)
+        if self.session.execute(delete(Event).where(Event.id.in_(event_ids))).rowcount != len(event_ids):
+            raise ConcurrentUpdateError('Events were deleted by other transaction.')
 
-        return event
+    def _get_archive_filter(self, **kwargs) -> ArchiveFilter | None:
+        """Returns filter of archived objects or None if nothing is archived.
+
+        Archive does not keep runs of events, so events of run are read only from database.
+        """
+
+        if self.archive is None or not self.archive.get_indexes() or kwargs.get('run_id') is not None:
+            return None
+
+        tests = None
+        if any(kwargs.get(name) is not None for name in self.TEST_FILTERS):
+            filters, _ = self._get_filters(test_uid=kwargs.get('test_uid'), test_marks=kwargs.get('test_marks'),
+                                           test_file=kwargs.get('test_file'))
+            tests = dict(self.session.execute(select(Test.id, Test.uid).where(*self._in_project(Test), *filters))
+                         .all())
+
+        return ArchiveFilter(
+            start_server_timestamp=kwargs.get('start_server_timestamp'),
+            end_server_timestamp=kwargs.get('end_server_timestamp'),
+            start_client_timestamp=kwargs.get('start_client_timestamp'),
+            end_client_timestamp=kwargs.get('end_client_timestamp'),
+            message=kwargs.get('message'), traceback=kwargs.get('traceback'), tests=tests,
+            deleted_ids=self._get_deleted_archived_ids,
+        )
+
+    def _get_deleted_archived_ids(self, first_id: int, last_id: int) -> frozenset[int]:
+        """Returns ids of deleted archived objects between given ids (inclusive)."""
+
+        statement = (select(ArchivedEventDeletion.event_id)
+                     .where(ArchivedEventDeletion.event_id.between(first_id, last_id)))
+
+        return frozenset(self.session.execute(statement).scalars())
+
+    def _resolve_tests(self, test_ids: set[int]) -> dict[int, str]:
+        """Returns ids and uids of existing tests (of project) out of given ids."""
+
+        statement = select(Test.id, Test.uid).where(Test.id.in_(test_ids), *self._in_project(Test))
+
+        return dict(self.session.execute(statement).all())
+
+    def _count_archived(self, archive_filter: ArchiveFilter, **kwargs) -> int:
+        """Returns number of archived objects which pass filters.
+
+        Without other than test filters, numbers of archived events kept by tests are summed, so archive
+        is not read.
+        """
+
+        if all(name in self.TEST_FILTERS or value is None for name, value in kwargs.items() if name != 'ordering'):
+            filters, _ = self._get_filters(test_uid=kwargs.get('test_uid'), test_marks=kwargs.get('test_marks'),
+                                           test_file=kwargs.get('test_file'))
+            statement = select(func.coalesce(func.sum(Test.archived_events_count), 0)).where(
+                *self._in_project(Test), *filters
+            )
+            return self.session.execute(statement).scalar()
+
+        return self.archive.count(archive_filter, self._resolve_tests)
+
+    def _get_archived_by_id(self, event_id: int) -> Event | None:
+        """Returns detached object of archived event with given id or None if it is not archived (or deleted)."""
+
+        if self.archive is None or self.session.get(ArchivedEventDeletion, event_id) is not None:
+            return None
+
+        archived = self.archive.get_by_id(event_id)
+
+        return next(iter(self._to_events([archived])), None) if archived is not None else None
+
+    def _to_events(self, archived: Iterable[ArchivedEvent]) -> list[Event]:
+        """Returns detached objects of archived events whose test still exists (in project of repository)."""
+
+        archived = list(archived)
+        tests = {test.id: test for test in
+                 self.session.query(Test).filter(Test.id.in_({event.test_id for event in archived})).all()}
+
+        events = []
+        for archived_event in archived:
+            test = tests.get(archived_event.test_id)
+            if test is None or test.uid != archived_event.test_uid or self.project not in (None, test.project):
+                continue
+            event = Event(id=archived_event.id, project=test.project, test_id=archived_event.test_id,
+                          message=archived_event.message, traceback=archived_event.traceback,
+                          client_timestamp=archived_event.client_timestamp,
+                          server_timestamp=archived_event.server_timestamp)
+            set_committed_value(event, 'test', test)  # without adding event to test (and to session)
+            events.append(event)
+
+        return events
+
+    def get_newer(self, event_id: int, limit: int) -> list[Event]:
+        """Returns up to limit objects with id greater than given one, ordered by id."""
+
+        return (self.session.query(Event).filter(Event.id > event_id, *self._in_project()).order_by(Event.id)
+                .limit(limit).all())
+
+    def get_last_id(self) -> int:
+        """Returns the greatest id of objects or 0 if there are none."""
+
+        return self.session.query(func.coalesce(func.max(Event.id), 0)).filter(*self._in_project()).scalar()
+
+    def get_by_ids(self, event_ids: list[int]) -> list[Event]:
+        """Returns existing objects with given ids."""
+
+        return self.session.query(Event).filter(Event.id.in_(set(event_ids)), *self._in_project()).all()
+
+    def get_timestamps(self, event_id: int, since: datetime, limit: int) -> list[tuple[int, int, datetime]]:
+        """Returns (id, test id, server timestamp) of up to limit objects created since given time, ordered by id.
+
+        Only objects with id greater than given one are returned.
+        """
+
+        statement = (select(Event.id, Event.test_id, Event.server_timestamp)
+                     .where(Event.id > event_id, Event.server_timestamp >= since).order_by(Event.id).limit(limit))
+
+        return [tuple(row) for row in self.session.execute(statement).all()]
+
+    def get_columns(self, event_id: int, limit: int) -> list[tuple[int, int, int | None, datetime, str]]:
+        """Returns (id, test id, run id, server timestamp, message) of up to limit objects after given id."""
+
+        statement = (select(Event.id, Event.test_id, Event.run_id, Event.server_timestamp, Event.message)
+                     .where(Event.id > event_id, *self._in_project()).order_by(Event.id).limit(limit))
+
+        return [tuple(row) for row in self.session.execute(statement).all()]
+
+    def get_time_range(self, test_id: int) -> tuple[datetime | None, datetime | None]:
+        """Returns server timestamps of the oldest and the newest event of test."""
+
+        statement = select(func.min(Event.server_timestamp), func.max(Event.server_timestamp)).where(
+            *self._in_project(), Event.test_id == test_id
+        )
+
+        return tuple(self.session.execute(statement).one())
+
+    def get_histogram(self, test_id: int, start: datetime, end: datetime, bucket_size: float) -> dict[int, int]:
+        """Returns numbers of events of test created between start and end (inclusive) by bucket index.
+
+        Events are counted in database (with range scan of `(project, test_id, server_timestamp)` index), so
+        only non-empty buckets are transferred. Index of bucket is number of whole `bucket_size` seconds elapsed
+        since start.
+        """
+
+        in_range = (*self._in_project(), Event.test_id == test_id, Event.server_timestamp >= start,
+                    Event.server_timestamp <= end)
+        dialect = self.session.get_bind().dialect.name
+
+        if dialect == 'sqlite':
+            elapsed = (func.julianday(Event.server_timestamp) - func.julianday(literal(start, DateTime()))) * 86400
+            bucket = cast(func.round(elapsed, 3) / bucket_size, Integer)  # julianday is precise to milliseconds
+        elif dialect == 'postgresql':
+            bucket = cast(func.floor(extract('epoch', Event.server_timestamp - start) / bucket_size), Integer)
+        else:
+            counts = {}
+            for timestamp in self.session.execute(select(Event.server_timestamp).where(*in_range)).scalars():
+                index = int((timestamp - start).total_seconds() // bucket_size)
+                counts[index] = counts.get(index, 0) + 1
+            return counts
+
+        statement = select(bucket.label('bucket'), func.count()).where(*in_range).group_by('bucket')
+
+        return {index: count for index, count in self.session.execute(statement).all()}
+
+    def get_without_signature(self, event_id: int, limit: int) -> list[Event]:
+        """Returns up to limit objects with id greater than given one which have no signature, ordered by id."""
+
+        has_signature = select(EventSignature.event_id).where(EventSignature.event_id == Event.id).exists()
+
+        return (self.session.query(Event).filter(Event.id > event_id, ~has_signature).order_by(Event.id)
+                .limit(limit).all())
+
+    def get_signatures(self, event_ids: list[int]) -> dict[int, bytes]:
+        """Returns packed signatures of objects with given ids."""
+
+        statement = select(EventSignature.event_id, EventSignature.signature).where(
+            EventSignature.event_id.in_(set(event_ids))
+        )
+
+        return dict(self.session.execute(statement).all())
+
+    def get_bucket_members(self, buckets: list[int], limit: int) -> list[int]:
+        """Returns ids of the newest (up to limit) objects from each bucket, id is repeated for every bucket.
+
+        Every bucket is read by its own indexed range scan, so crowded buckets do not slow down the search.
+        """
+
+        selects = [
+            select(
+                select(EventBucket.event_id).where(EventBucket.bucket == bucket)
+                .order_by(EventBucket.event_id.desc()).limit(limit).subquery()
+            )
+            for bucket in buckets
+        ]
+        if not selects:
+            return []
+
+        return list(self.session.execute(union_all(*selects)).scalars())
+
+    def add_signatures(self, signatures: list[tuple[int, bytes, list[int]]]) -> None:
+        """Stores packed signatures and buckets of objects, passed as (id, signature, buckets) triples."""
+
+        if signatures:
+            self.session.execute(insert(EventSignature), [{'event_id': event_id, 'signature': signature}
+                                                          for event_id, signature, _ in signatures])
+            self.session.execute(insert(EventBucket), [{'bucket': bucket, 'event_id': event_id}
+                                                       for event_id, _, buckets in signatures
+                                                       for bucket in set(buckets)])
+
+    def delete_signatures(self, event_ids: list[int]) -> None:
+        """Deletes signatures and buckets of objects with given ids."""
+
+        self.session.execute(delete(EventBucket).where(EventBucket.event_id.in_(event_ids)))
+        self.session.execute(delete(EventSignature).where(EventSignature.event_id.in_(event_ids)))
 
     def create(self, event: Event) -> None:
-        """Creates single object in current session."""
+        """Creates single object (in project of repository) in current session."""
 
+        event.project = self.project or DEFAULT_PROJECT
         self.session.add(event)
 
-    def delete_by_id(self, event_id: int) -> None:
-        """Deletes single object with given id."""
+    def delete_by_id(self, event_id: int) -> Event:
+        """Deletes single object with given id.
+
+        Archived object is hidden by tombstone and it is not counted in archived events of its test anymore.
+        """
+
+        event = self.session.query(Event).filter(Event.id == event_id, *self._in_project()).first()
+        if event is not None:
+            self.delete_signatures([event_id])
+            self.session.delete(event)
+            return event
 
-        event = self.session.query(Event).filter(Event.id == event_id).first()
+        event = self._get_archived_by_id(event_id)
         if event is None:
             raise NotFoundError(f'Event with id = "{event_id}" does not exist.')
 
-        self.session.delete(event)
+        self.session.add(ArchivedEventDeletion(event_id=event_id))
+        self.session.execute(update(Test).where(Test.id == event.test_id).values(
+            archived_events_count=func.coalesce(Test.archived_events_count, 0) - 1
+        ))
 
         return event
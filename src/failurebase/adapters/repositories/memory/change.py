@@ -0,0 +1,56 @@
+"""In-memory change repository module."""
+
+import bisect
+from datetime import datetime
+
+from ..base import AbstractRepository, PaginationList
+from ...models import Change, ChangeType, Event
+from ...memory import InMemorySession
+
+
+class MemoryChangeRepository(AbstractRepository):
+    """Repository to manage `Change` model kept in memory, it behaves like `ChangeRepository`."""
+
+    def __init__(self, session: InMemorySession) -> None:
+        super().__init__(session)
+        self.store = session.store
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects."""
+
+        offset = page_number * page_limit
+        count = len(self.store.changes)
+        chunk = self.store.changes[offset:offset + page_limit]
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_after(self, cursor: int, limit: int, settle_time: float = 0.0) -> list[Change]:
+        """Returns up to limit changes recorded after given cursor, ordered by cursor.
+
+        Sessions of store are serialized, so changes become visible in order of their ids and there are
+        no gaps to wait for.
+        """
+
+        start = bisect.bisect_right(self.store.changes, cursor, key=lambda change: change.id)
+
+        return self.store.changes[start:start + limit]
+
+    def get_last_id(self) -> int:
+        """Returns cursor of the newest change or 0 if there are none."""
+
+        return self.store.changes[-1].id if self.store.changes else 0
+
+    def get_events(self, event_ids: list[int]) -> dict[int, Event]:
+        """Returns still existing events with given ids."""
+
+        return {event_id: self.store.events[event_id] for event_id in set(event_ids) if event_id in self.store.events}
+
+    def add(self, change_type: ChangeType, object_ids: list[int]) -> None:
+        """Records the same change of many objects in current session."""
+
+        if object_ids:
+            timestamp = datetime.now()
+            changes = [Change(id=self.store.next_id('changes'), type=change_type.value, object_id=object_id,
+                              timestamp=timestamp) for object_id in object_ids]
+            self.store.changes.extend(changes)
+            self.session.on_rollback(lambda: self.store.changes.__delitem__(slice(-len(changes), None)))
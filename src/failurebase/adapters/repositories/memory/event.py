@@ -0,0 +1,347 @@
+"""In-memory event repository module."""
+
+from datetime import datetime
+from collections import Counter
+
+from ..base import AbstractRepository, PaginationList
+from ..event import EventRepository
+from ...models import Event, DEFAULT_PROJECT
+from ...archive import SegmentArchive
+from ...memory import InMemorySession, set_test
+from ...patterns import like
+from ...exceptions import NotFoundError, ConcurrentUpdateError
+
+
+class MemoryEventRepository(AbstractRepository):
+    """Repository to manage `Event` model kept in memory, it behaves like `EventRepository`.
+
+    Candidates of filtered lists are narrowed down by indexes (events of run, events of tests passing test
+    filters, range of server timestamps) and ordered pages are read from sorted index of order key. Archive
+    is not supported, archived events are not read.
+    """
+
+    # Matched events are sorted on their own when there are less of them than this fraction of all events,
+    # otherwise sorted index of order key is walked.
+    SORT_FRACTION = 0.125
+
+    def __init__(self, session: InMemorySession, archive: SegmentArchive | None = None,
+                 project: str | None = None) -> None:
+        super().__init__(session)
+        self.store = session.store
+        self.project = project
+
+    def _in_project(self, event: Event) -> bool:
+        return self.project is None or event.project == self.project
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects."""
+
+        matched = self._filter(**kwargs)
+
+        ordering = kwargs.get('ordering') or '-server_timestamp'
+        name, reverse = ordering.lstrip('-'), ordering.startswith('-')
+        offset = page_number * page_limit
+
+        index = self.store.event_indexes[name]
+        if len(matched) < len(index) * self.SORT_FRACTION:
+            events = sorted((self.store.events[event_id] for event_id in matched),
+                            key=lambda event: (self._order_key(name, event), event.id), reverse=reverse)
+            chunk = events[offset:offset + page_limit]
+        else:
+            chunk = []
+            skipped = 0
+            for event_id in index.ids(reverse):
+                if event_id not in matched:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                chunk.append(self.store.events[event_id])
+                if len(chunk) == page_limit:
+                    break
+
+        count = len(matched)
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    @staticmethod
+    def _order_key(name: str, event: Event):
+        return event.test.uid if name == 'test_uid' else getattr(event, name)
+
+    def _filter(self, **kwargs) -> set[int]:
+        """Returns ids of objects passing filters (the same ones as filters of `EventRepository`)."""
+
+        candidates = None
+
+        def narrow(event_ids) -> None:
+            nonlocal candidates
+            candidates = set(event_ids) if candidates is None else candidates.intersection(event_ids)
+
+        run_id = kwargs.get('run_id')
+        if run_id is not None:
+            narrow(self.store.events_by_run.get(run_id, ()))
+
+        test_ids = self._filter_tests(kwargs.get('test_uid'), kwargs.get('test_marks'), kwargs.get('test_file'))
+        if test_ids is not None:
+            narrow(event_id for test_id in test_ids for event_id in self.store.events_by_test.get(test_id, ()))
+
+        start, end = kwargs.get('start_server_timestamp'), kwargs.get('end_server_timestamp')
+        if start is not None or end is not None:
+            narrow(self.store.event_indexes['server_timestamp'].range(start, end))
+
+        predicates = []
+
+        start, end = kwargs.get('start_client_timestamp'), kwargs.get('end_client_timestamp')
+        if start is not None:
+            predicates.append(lambda event: start <= event.client_timestamp)
+        if end is not None:
+            predicates.append(lambda event: event.client_timestamp <= end)
+
+        message = kwargs.get('message')
+        if message is not None:
+            message_matches = like(message)
+            predicates.append(lambda event: message_matches(event.message))
+
+        traceback = kwargs.get('traceback')
+        if traceback is not None:
+            traceback_matches = like(traceback)
+            predicates.append(lambda event: traceback_matches(event.traceback))
+
+        if self.project is not None:
+            predicates.append(self._in_project)
+
+        events = self.store.events
+        if candidates is None:
+            candidates = events.keys()
+
+        return {event_id for event_id in candidates if all(predicate(events[event_id]) for predicate in predicates)}
+
+    def _filter_tests(self, test_uid: str | None, test_marks: list[str] | None,
+                      test_file: str | None) -> set[int] | None:
+        """Returns ids of tests passing test filters or None when there are no test filters."""
+
+        if test_uid is None and test_marks is None and test_file is None:
+            return None
+
+        candidates = None
+        predicates = []
+
+        for mark in test_marks or ():
+            test_ids = self.store.get_tests_by_mark(mark)
+            if test_ids is not None:
+                candidates = test_ids if candidates is None else candidates & test_ids
+            else:
+                mark_matches = like(mark)
+                predicates.append(lambda test, matches=mark_matches: matches(test.marks))
+
+        if test_uid is not None:
+            uid_matches = like(test_uid)
+            predicates.append(lambda test: uid_matches(test.uid))
+
+        if test_file is not None:
+            file_matches = like(test_file)
+            predicates.append(lambda test: file_matches(test.file))
+
+        tests = self.store.tests
+        if candidates is None:
+            candidates = tests.keys()
+
+        return {test_id for test_id in candidates if all(predicate(tests[test_id]) for predicate in predicates)}
+
+    def get_counts_by_test(self, **kwargs) -> list[tuple[str, str, int]]:
+        """Returns (marks, file, number of filtered objects) of tests which have some filtered objects.
+
+        When only test filters are passed, maintained events counts of tests are returned.
+        """
+
+        if all(name in EventRepository.TEST_FILTERS or value is None for name, value in kwargs.items()):
+            test_ids = self._filter_tests(kwargs.get('test_uid'), kwargs.get('test_marks'), kwargs.get('test_file'))
+            tests = (self.store.tests[test_id] for test_id in (self.store.tests if test_ids is None else test_ids))
+            return [(test.marks, test.file, test.total_events_count) for test in tests
+                    if test.total_events_count > 0 and (self.project is None or test.project == self.project)]
+
+        counts = Counter(self.store.events[event_id].test_id for event_id in self._filter(**kwargs))
+
+        return [(self.store.tests[test_id].marks, self.store.tests[test_id].file, count)
+                for test_id, count in counts.items()]
+
+    def get_by_id(self, event_id: int) -> Event:
+        """Returns single object with given id."""
+
+        event = self.store.events.get(event_id)
+        if event is None or not self._in_project(event):
+            raise NotFoundError(f'Event with id = "{event_id}" does not exist.')
+
+        return event
+
+    def get_older(self, before: datetime, limit: int) -> list[Event]:
+        """Returns up to limit the oldest objects created before given time, ordered by id."""
+
+        event_ids = sorted(self.store.event_indexes['server_timestamp'].range(end=before, include_end=False))
+        events = (self.store.events[event_id] for event_id in event_ids)
+
+        return [event for event in events if self._in_project(event)][:limit]
+
+    def delete_by_ids(self, event_ids: list[int]) -> None:
+        """Deletes objects (and their signatures) with given ids, nothing is deleted if some of them do not exist."""
+
+        if any(event_id not in self.store.events for event_id in event_ids):
+            raise ConcurrentUpdateError('Events were deleted by other transaction.')
+        for event_id in event_ids:
+            self._delete(self.store.events[event_id])
+
+    def get_newer(self, event_id: int, limit: int) -> list[Event]:
+        """Returns up to limit objects with id greater than given one, ordered by id."""
+
+        events = []
+        for newer_id in self.store.event_indexes['id'].range(start=event_id + 1):
+            event = self.store.events[newer_id]
+            if self._in_project(event):
+                events.append(event)
+                if len(events) == limit:
+                    break
+
+        return events
+
+    def get_last_id(self) -> int:
+        """Returns the greatest id of objects or 0 if there are none."""
+
+        return next((event_id for event_id in self.store.event_indexes['id'].ids(reverse=True)
+                     if self._in_project(self.store.events[event_id])), 0)
+
+    def get_by_ids(self, event_ids: list[int]) -> list[Event]:
+        """Returns existing objects with given ids."""
+
+        events = (self.store.events.get(event_id) for event_id in set(event_ids))
+
+        return [event for event in events if event is not None and self._in_project(event)]
+
+    def get_timestamps(self, event_id: int, since: datetime, limit: int) -> list[tuple[int, int, datetime]]:
+        """Returns (id, test id, server timestamp) of up to limit objects created since given time, ordered by id.
+
+        Only objects with id greater than given one are returned.
+        """
+
+        rows = []
+        for newer_id in self.store.event_indexes['id'].range(start=event_id + 1):
+            event = self.store.events[newer_id]
+            if event.server_timestamp >= since:
+                rows.append((event.id, event.test_id, event.server_timestamp))
+                if len(rows) == limit:
+                    break
+
+        return rows
+
+    def get_columns(self, event_id: int, limit: int) -> list[tuple[int, int, int | None, datetime, str]]:
+        """Returns (id, test id, run id, server timestamp, message) of up to limit objects after given id."""
+
+        return [(event.id, event.test_id, event.run_id, event.server_timestamp, event.message)
+                for event in self.get_newer(event_id, limit)]
+
+    def get_time_range(self, test_id: int) -> tuple[datetime | None, datetime | None]:
+        """Returns server timestamps of the oldest and the newest event of test."""
+
+        timestamps = [self.store.events[event_id].server_timestamp
+                      for event_id in self.store.events_by_test.get(test_id, ())
+                      if self._in_project(self.store.events[event_id])]
+
+        return min(timestamps, default=None), max(timestamps, default=None)
+
+    def get_histogram(self, test_id: int, start: datetime, end: datetime, bucket_size: float) -> dict[int, int]:
+        """Returns numbers of events of test created between start and end (inclusive) by bucket index."""
+
+        counts = Counter()
+        for event_id in self.store.events_by_test.get(test_id, ()):
+            event = self.store.events[event_id]
+            if self._in_project(event) and start <= event.server_timestamp <= end:
+                counts[int((event.server_timestamp - start).total_seconds() // bucket_size)] += 1
+
+        return dict(counts)
+
+    def get_without_signature(self, event_id: int, limit: int) -> list[Event]:
+        """Returns up to limit objects with id greater than given one which have no signature, ordered by id."""
+
+        events = []
+        for newer_id in self.store.event_indexes['id'].range(start=event_id + 1):
+            if newer_id not in self.store.signatures:
+                events.append(self.store.events[newer_id])
+                if len(events) == limit:
+                    break
+
+        return events
+
+    def get_signatures(self, event_ids: list[int]) -> dict[int, bytes]:
+        """Returns packed signatures of objects with given ids."""
+
+        return {event_id: self.store.signatures[event_id] for event_id in set(event_ids)
+                if event_id in self.store.signatures}
+
+    def get_bucket_members(self, buckets: list[int], limit: int) -> list[int]:
+        """Returns ids of the newest (up to limit) objects from each bucket, id is repeated for every bucket."""
+
+        members = []
+        for bucket in buckets:
+            if bucket in self.store.buckets:
+                members.extend(list(self.store.buckets[bucket].ids(reverse=True))[:limit])
+
+        return members
+
+    def add_signatures(self, signatures: list[tuple[int, bytes, list[int]]]) -> None:
+        """Stores packed signatures and buckets of objects, passed as (id, signature, buckets) triples."""
+
+        for event_id, signature, buckets in signatures:
+            self._add_signature(event_id, signature, sorted(set(buckets)))
+            self.session.on_rollback(lambda event_id=event_id: self._remove_signature(event_id))
+
+    def delete_signatures(self, event_ids: list[int]) -> None:
+        """Deletes signatures and buckets of objects with given ids."""
+
+        for event_id in event_ids:
+            if event_id in self.store.signatures:
+                signature, buckets = self._remove_signature(event_id)
+                self.session.on_rollback(lambda event_id=event_id, signature=signature, buckets=buckets:
+                                         self._add_signature(event_id, signature, buckets))
+
+    def _add_signature(self, event_id: int, signature: bytes, buckets: list[int]) -> None:
+        self.store.signatures[event_id] = signature
+        self.store.event_buckets[event_id] = buckets
+        for bucket in buckets:
+            self.store.buckets[bucket].add(event_id, event_id)
+
+    def _remove_signature(self, event_id: int) -> tuple[bytes, list[int]]:
+        signature = self.store.signatures.pop(event_id)
+        buckets = self.store.event_buckets.pop(event_id)
+        for bucket in buckets:
+            self.store.buckets[bucket].remove(event_id, event_id)
+            if not self.store.buckets[bucket]:
+                del self.store.buckets[bucket]
+
+        return signature, buckets
+
+    def create(self, event: Event) -> None:
+        """Creates single object (in project of repository), its id is assigned immediately."""
+
+        event.id = self.store.next_id('events')
+        event.project = self.project or DEFAULT_PROJECT
+        if event.server_timestamp is None:
+            event.server_timestamp = datetime.now()
+        set_test(event, self.store.tests[event.test_id])
+
+        self.store.add_event(event)
+        self.session.on_rollback(lambda: self.store.remove_event(event))
+
+    def delete_by_id(self, event_id: int) -> Event:
+        """Deletes single object with given id."""
+
+        event = self.store.events.get(event_id)
+        if event is None or not self._in_project(event):
+            raise NotFoundError(f'Event with id = "{event_id}" does not exist.')
+
+        self._delete(event)
+
+        return event
+
+    def _delete(self, event: Event) -> None:
+        self.delete_signatures([event.id])
+        self.store.remove_event(event)
+        self.session.on_rollback(lambda: self.store.add_event(event))
@@ -0,0 +1,46 @@
+"""In-memory project repository module."""
+
+from ..base import AbstractRepository, PaginationList
+from ...models import Project
+from ...memory import InMemorySession, update
+
+
+class MemoryProjectRepository(AbstractRepository):
+    """Repository to manage `Project` model kept in memory, it behaves like `ProjectRepository`."""
+
+    def __init__(self, session: InMemorySession) -> None:
+        super().__init__(session)
+        self.store = session.store
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects."""
+
+        projects = self.get_all()
+        offset = page_number * page_limit
+        count = len(projects)
+        chunk = projects[offset:offset + page_limit]
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_all(self) -> list[Project]:
+        """Returns settings of all projects which have some."""
+
+        return [self.store.projects[name] for name in sorted(self.store.projects)]
+
+    def get_with_retention(self) -> list[Project]:
+        """Returns projects whose events are deleted after some time."""
+
+        return [project for project in self.get_all() if project.retention_days is not None]
+
+    def save(self, name: str, **values) -> Project:
+        """Creates or updates settings of project."""
+
+        project = self.store.projects.get(name)
+        if project is None:
+            project = Project(name=name, **values)
+            self.store.projects[name] = project
+            self.session.on_rollback(lambda: self.store.projects.pop(name))
+        else:
+            update(self.session, project, **values)
+
+        return project
@@ -0,0 +1,63 @@
+"""In-memory run repository module."""
+
+from datetime import datetime
+
+from ..base import AbstractRepository, PaginationList
+from ...models import Run, DEFAULT_PROJECT
+from ...memory import InMemorySession
+from ...exceptions import NotFoundError
+
+
+class MemoryRunRepository(AbstractRepository):
+    """Repository to manage `Run` model kept in memory, it behaves like `RunRepository`."""
+
+    def __init__(self, session: InMemorySession, project: str | None = None) -> None:
+        super().__init__(session)
+        self.store = session.store
+        self.project = project
+
+    def _in_project(self, run: Run) -> bool:
+        return self.project is None or run.project == self.project
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects, the most recently started first."""
+
+        branch = kwargs.get('branch')
+        runs = [run for run in self.store.runs.values()
+                if self._in_project(run) and (branch is None or run.branch == branch)]
+        runs.sort(key=lambda run: (run.started_at, run.id), reverse=True)
+
+        offset = page_number * page_limit
+        count = len(runs)
+        chunk = runs[offset:offset + page_limit]
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_by_id(self, run_id: int) -> Run:
+        """Returns single object with given id."""
+
+        run = self.store.runs.get(run_id)
+        if run is None or not self._in_project(run):
+            raise NotFoundError(f'Run with id = "{run_id}" does not exist.')
+
+        return run
+
+    def create(self, run: Run) -> Run:
+        """Creates single object (in project of repository), its id is assigned immediately."""
+
+        run.id = self.store.next_id('runs')
+        run.project = self.project or DEFAULT_PROJECT
+        self.store.runs[run.id] = run
+        self.session.on_rollback(lambda: self.store.runs.pop(run.id))
+
+        return run
+
+    def get_counters(self, run_id: int, started_at: datetime) -> tuple[int, int, int]:
+        """Returns numbers of events, failed tests and tests which failed for the first time in run."""
+
+        event_ids = self.store.events_by_run.get(run_id, ())
+        test_ids = {self.store.events[event_id].test_id for event_id in event_ids}
+        new_tests_count = sum(1 for test_id in test_ids if self.store.tests[test_id].first_seen is not None
+                              and self.store.tests[test_id].first_seen >= started_at)
+
+        return len(event_ids), len(test_ids), new_tests_count
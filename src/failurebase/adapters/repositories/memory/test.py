@@ -0,0 +1,264 @@
+"""In-memory test repository module."""
+
+import bisect
+from datetime import datetime
+
+from .event import MemoryEventRepository
+from ..base import AbstractRepository, PaginationList
+from ...models import Test, DEFAULT_PROJECT
+from ...memory import InMemorySession, update
+from ...patterns import like
+from ...exceptions import NotFoundError
+
+
+class MemoryTestRepository(AbstractRepository):
+    """Repository to manage `Test` model kept in memory, it behaves like `TestRepository`.
+
+    Events are counted directly into tests, so there are no deltas to fold.
+    """
+
+    ORDER_KEYS = {
+        'uid': lambda test: test.uid,
+        'file': lambda test: test.file,
+        'total_events_count': lambda test: test.total_events_count,
+    }
+
+    def __init__(self, session: InMemorySession, project: str | None = None) -> None:
+        super().__init__(session)
+        self.store = session.store
+        self.project = project
+
+    def _in_project(self, test: Test) -> bool:
+        return self.project is None or test.project == self.project
+
+    def _get_by_uid(self, uid: str) -> Test | None:
+        test_id = self.store.tests_by_uid.get((self.project or DEFAULT_PROJECT, uid))
+        return None if test_id is None else self.store.tests[test_id]
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects."""
+
+        candidates = None
+        predicates = [self._in_project]
+
+        uid = kwargs.get('uid')
+        if uid is not None:
+            uid_matches = like(uid)
+            predicates.append(lambda test: uid_matches(test.uid))
+
+        file = kwargs.get('file')
+        if file is not None:
+            file_matches = like(file)
+            predicates.append(lambda test: file_matches(test.file))
+
+        for mark in kwargs.get('marks') or ():
+            test_ids = self.store.get_tests_by_mark(mark)
+            if test_ids is not None:
+                candidates = test_ids if candidates is None else candidates & test_ids
+            else:
+                mark_matches = like(mark)
+                predicates.append(lambda test, matches=mark_matches: matches(test.marks))
+
+        tests = (self.store.tests[test_id] for test_id in (self.store.tests if candidates is None else candidates))
+        tests = [test for test in tests if all(predicate(test) for predicate in predicates)]
+
+        ordering = kwargs.get('ordering') or '-uid'
+        key = self.ORDER_KEYS[ordering.lstrip('-')]
+        tests.sort(key=lambda test: (key(test), test.id), reverse=ordering.startswith('-'))
+
+        offset = page_number * page_limit
+        count = len(tests)
+        chunk = tests[offset:offset + page_limit]
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_by_id(self, test_id: int) -> Test:
+        """Returns single object with given id."""
+
+        # ids from path are passed as strings, database compares them as integers
+        test = self.store.tests.get(int(test_id)) if str(test_id).isdigit() else None
+        if test is None or not self._in_project(test):
+            raise NotFoundError(f'Test with id = "{test_id}" does not exist.')
+
+        return test
+
+    def get_by_ids(self, test_ids: list[int]) -> list[Test]:
+        """Returns existing objects with given ids."""
+
+        tests = (self.store.tests.get(test_id) for test_id in set(test_ids))
+
+        return [test for test in tests if test is not None and self._in_project(test)]
+
+    def get_by_uid(self, uid: str) -> Test:
+        """Returns single object with given uid."""
+
+        test = self._get_by_uid(uid)
+        if test is None:
+            raise NotFoundError(f'Test with uid = "{uid}" does not exist.')
+
+        return test
+
+    def get_file_by_uid(self, uid: str) -> str | None:
+        """Returns file of test with given uid or None if there is no such test."""
+
+        test = self._get_by_uid(uid)
+
+        return None if test is None else test.file
+
+    def get_without_segments(self, test_id: int, limit: int) -> list[Test]:
+        """Returns up to limit objects with id greater than given one which have no segments, ordered by id."""
+
+        test_ids = sorted(id_ for id_, test in self.store.tests.items()
+                          if id_ > test_id and id_ not in self.store.segments_by_test and self._in_project(test))
+
+        return [self.store.tests[id_] for id_ in test_ids[:limit]]
+
+    def get_ids_by_segment_prefix(self, bounds: tuple[str, str], fields: tuple[str, ...], limit: int) -> list[int]:
+        """Returns ids of up to limit tests which have segment between bounds in any of given fields.
+
+        The most recently seen tests (then the ones with most events) are returned, segments of every project are
+        kept sorted, so the lookup is a range scan.
+        """
+
+        projects = list(self.store.segments) if self.project is None else [self.project]
+
+        test_ids = set()
+        for project in projects:
+            index = self.store.segments.get(project, [])
+            start, end = bisect.bisect_left(index, (bounds[0],)), bisect.bisect_left(index, (bounds[1],))
+            test_ids.update(test_id for _, field, test_id in index[start:end] if field in fields)
+
+        tests = sorted((self.store.tests[test_id] for test_id in test_ids), key=lambda test: test.id)
+        tests.sort(key=lambda test: (test.folded_last_seen is not None, test.folded_last_seen or datetime.min,
+                                     test.folded_events_count), reverse=True)
+
+        return [test.id for test in tests[:limit]]
+
+    def set_segments(self, test_id: int, segments: dict[str, set[str]], project: str | None = None) -> None:
+        """Replaces segments of test (from given project or project of repository), segments are given per field."""
+
+        previous = self.store.segments_by_test.get(test_id, (None, []))
+
+        project = project or self.project or DEFAULT_PROJECT
+        self.store.set_segments(test_id, project, [(segment, field, test_id) for field, field_segments in
+                                                   segments.items() for segment in field_segments])
+        self.session.on_rollback(lambda: self.store.set_segments(test_id, *previous))
+
+    def upsert(self, uid: str, file: str, marks: str, first_seen: datetime | None = None) -> int:
+        """Creates test or updates file and marks of existing one with given uid, returns its id.
+
+        First seen time is set only when test is created (or when it has none yet).
+        """
+
+        test = self._get_by_uid(uid)
+
+        if test is None:
+            test = Test(id=self.store.next_id('tests'), project=self.project or DEFAULT_PROJECT, uid=uid, file=file,
+                        marks=marks, folded_events_count=0, first_seen=first_seen, archived_events_count=0)
+            self.store.add_test(test)
+            self.session.on_rollback(lambda: self.store.remove_test(test))
+        else:
+            self._update(test, file=file, marks=marks, first_seen=test.first_seen or first_seen)
+
+        return test.id
+
+    def _update(self, test: Test, **values) -> None:
+        if 'marks' in values:
+            update(self.session, test, reindex=lambda: self.store.add_test(test),
+                   deindex=lambda: self.store.remove_test(test), **values)
+        else:
+            update(self.session, test, **values)
+
+    def update_by_id(self, test_id: int, uid: str, **values) -> bool:
+        """Updates passed columns of test, returns False when test with given id and uid does not exist in project."""
+
+        test = self._get_by_uid(uid)
+        if test is None or test.id != test_id:
+            return False
+
+        self._update(test, **values)
+
+        return True
+
+    def add_events_count_delta(self, test_id: int, uid: str | None = None, delta: int = 1,
+                               timestamp: datetime | None = None) -> bool:
+        """Adds change of events count (and time of the event) to test.
+
+        When uid is passed delta is added only if test with given id and uid exists, returns False otherwise.
+        """
+
+        test = self.store.tests.get(test_id)
+        if test is None or uid is not None and (test.project, test.uid) != (self.project or DEFAULT_PROJECT, uid):
+            return False
+
+        values = {'folded_events_count': test.folded_events_count + delta}
+        if timestamp is not None and (test.folded_last_seen is None or test.folded_last_seen < timestamp):
+            values['folded_last_seen'] = timestamp
+        update(self.session, test, **values)
+
+        return True
+
+    def get_counters(self, test_ids: list[int]) -> dict[int, tuple[int, datetime | None, datetime | None]]:
+        """Returns exact events count, first seen and last seen time of tests by their ids."""
+
+        tests = (self.store.tests.get(test_id) for test_id in set(test_ids))
+
+        return {test.id: (test.total_events_count, test.first_seen, test.last_seen)
+                for test in tests if test is not None}
+
+    def fold_events_count_deltas(self, limit: int) -> int:
+        """Events counts are updated directly, there is nothing to fold."""
+
+        return 0
+
+    def reconcile_events_counts(self) -> int:
+        """Rebuilds events counts and first/last seen times of all tests from events (and archived counts).
+
+        Returns number of tests whose events count was wrong.
+        """
+
+        wrong = 0
+        for test in self.store.tests.values():
+            timestamps = [self.store.events[event_id].server_timestamp
+                          for event_id in self.store.events_by_test.get(test.id, ())]
+            first_seen, last_seen = min(timestamps, default=None), max(timestamps, default=None)
+            archived_events_count = test.archived_events_count or 0
+            if archived_events_count > 0:
+                first_seen, last_seen = test.first_seen or first_seen, last_seen or test.folded_last_seen
+
+            events_count = len(timestamps) + archived_events_count
+            wrong += test.folded_events_count != events_count
+            update(self.session, test, first_seen=first_seen, folded_last_seen=last_seen,
+                   folded_events_count=events_count)
+
+        return wrong
+
+    def get_project_counts(self) -> list[tuple[str, int, int]]:
+        """Returns (project, number of tests, number of events) of all projects which have some tests."""
+
+        counts = {}
+        for test in self.store.tests.values():
+            tests_count, events_count = counts.get(test.project, (0, 0))
+            counts[test.project] = (tests_count + 1, events_count + test.total_events_count)
+
+        return [(project, *counts[project]) for project in sorted(counts)]
+
+    def add_archived_events_counts(self, counts: dict[int, int]) -> None:
+        """Records that given numbers of events of tests were moved to archive."""
+
+        for test_id, count in counts.items():
+            test = self.store.tests.get(test_id)
+            if test is not None:
+                update(self.session, test, archived_events_count=(test.archived_events_count or 0) + count)
+
+    def delete_by_id(self, test_id: int) -> Test:
+        """Deletes single object with given id (with its events and segments)."""
+
+        test = self.get_by_id(test_id)
+
+        MemoryEventRepository(self.session).delete_by_ids(list(self.store.events_by_test.get(test_id, ())))
+        self.set_segments(test_id, {})
+        self.store.remove_test(test)
+        self.session.on_rollback(lambda: self.store.add_test(test))
+
+        return test
@@ -0,0 +1,41 @@
+"""Project repository module."""
+
+from .base import AbstractRepository, PaginationList
+from ..models import Project
+
+
+class ProjectRepository(AbstractRepository):
+    """Repository to manage `Project` model (settings of projects)."""
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects."""
+
+        query = self.session.query(Project).order_by(Project.name)
+        count = query.count()
+        offset = page_number * page_limit
+        chunk = query.offset(offset).limit(page_limit).all()
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_all(self) -> list[Project]:
+        """Returns settings of all projects which have some."""
+
+        return self.session.query(Project).order_by(Project.name).all()
+
+    def get_with_retention(self) -> list[Project]:
+        """Returns projects whose events are deleted after some time."""
+
+        return self.session.query(Project).filter(Project.retention_days.is_not(None)).order_by(Project.name).all()
+
+    def save(self, name: str, **values) -> Project:
+        """Creates or updates settings of project."""
+
+        project = self.session.get(Project, name)
+        if project is None:
+            project = Project(name=name)
+            self.session.add(project)
+
+        for key, value in values.items():
+            setattr(project, key, value)
+
+        return project
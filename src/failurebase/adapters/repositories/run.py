@@ -0,0 +1,73 @@
+"""Run repository module."""
+
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .base import AbstractRepository, PaginationList
+from ..models import Run, Event, Test, DEFAULT_PROJECT
+from ..exceptions import NotFoundError
+
+
+class RunRepository(AbstractRepository):
+    """Repository to manage `Run` model, repository of project sees only runs of the project."""
+
+    def __init__(self, session: Session, project: str | None = None) -> None:
+        super().__init__(session)
+        self.project = project
+
+    def _in_project(self) -> list:
+        """Returns filters which limit objects to project of repository."""
+
+        return [] if self.project is None else [Run.project == self.project]
+
+    def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
+        """Returns many paginated objects, the most recently started first."""
+
+        filters = self._in_project()
+
+        branch = kwargs.get('branch')
+        if branch is not None:
+            filters.append(Run.branch == branch)
+
+        query = self.session.query(Run).filter(*filters).order_by(Run.started_at.desc(), Run.id.desc())
+        count = query.count()
+        offset = page_number * page_limit
+        chunk = query.offset(offset).limit(page_limit).all()
+
+        return PaginationList(chunk, count, page_number, page_limit, offset + page_limit < count, page_number > 0)
+
+    def get_by_id(self, run_id: int) -> Run:
+        """Returns single object with given id."""
+
+        run = self.session.query(Run).filter(Run.id == run_id, *self._in_project()).first()
+        if run is None:
+            raise NotFoundError(f'Run with id = "{run_id}" does not exist.')
+
+        return run
+
+    def create(self, run: Run) -> Run:
+        """Adds new object to session."""
+
+        run.project = self.project or DEFAULT_PROJECT
+        self.session.add(run)
+
+        return run
+
+    def get_counters(self, run_id: int, started_at: datetime) -> tuple[int, int, int]:
+        """Returns numbers of events, failed tests and tests which failed for the first time in run.
+
+        Events are counted by range scan of `(run_id, server_timestamp)` index.
+        """
+
+        events_count, tests_count = self.session.execute(
+            select(func.count(Event.id), func.count(Event.test_id.distinct())).where(Event.run_id == run_id)
+        ).one()
+
+        new_tests_count = self.session.execute(
+            select(func.count(Test.id)).where(
+                Test.id.in_(select(Event.test_id).where(Event.run_id == run_id)), Test.first_seen >= started_at
+            )
+        ).scalar_one()
+
+        return events_count, tests_count, new_tests_count
@@ -1,12 +1,25 @@
 """Test repository module."""
 
+import importlib
+from datetime import datetime
+from collections import defaultdict
+from sqlalchemy import select, update, delete, insert, exists, literal, func, case, DateTime
+from sqlalchemy.orm import Session
+
 from .base import AbstractRepository, PaginationList
-from ..models import Test
-from ..exceptions import NotFoundError
+from ..models import Test, Event, EventsCountDelta, EventSignature, EventBucket, TestSegment, DEFAULT_PROJECT
+from ..exceptions import NotFoundError, ConcurrentUpdateError
 
 
 class TestRepository(AbstractRepository):
-    """Repository to manage `Test` model."""
+    """Repository to manage `Test` model.
+
+    Repository of project reads only tests of the project and creates tests in it, repository without
+    project (for maintenance) reads tests of all projects and creates them in the default one.
+    """
+
+    # Dialects with `INSERT ... ON CONFLICT`, their modules are imported on first upsert (only the used one).
+    UPSERT_DIALECTS = ('sqlite', 'postgresql')
 
     POSSIBLE_ORDER_CLAUSES = {
         'uid': Test.uid.asc(),
@@ -17,11 +30,25 @@ class TestRepository(AbstractRepository):
         '-total_events_count': Test.total_events_count.desc()
     }
 
+    def __init__(self, session: Session, project: str | None = None) -> None:
+        super().__init__(session)
+        self.project = project
+
+    def _in_project(self, model: type = Test) -> list:
+        """Returns filters which limit objects to project of repository."""
+
+        return [] if self.project is None else [model.project == self.project]
+
+    def _with_uid(self, uid: str) -> tuple:
+        """Returns filters of test with given uid, uid is unique only in project."""
+
+        return Test.project == (self.project or DEFAULT_PROJECT), Test.uid == uid
+
     def get_many(self, page_number: int, page_limit: int, **kwargs) -> PaginationList:
         """Returns many paginated objects."""
 
         query = self.session.query(Test)
-        filters = []
+        filters = self._in_project()
         order_clause = Test.uid.desc()
 
         uid = kwargs.get('uid')
@@ -59,28 +86,232 @@ class TestRepository(AbstractRepository):
     def get_by_id(self, test_id: int) -> Test:
         """Returns single object with given id."""
 
-        test = self.session.query(Test).get(test_id)
+        test = self.session.query(Test).filter(Test.id == test_id, *self._in_project()).first()
         if test is None:
             raise NotFoundError(f'Test with id = "{test_id}" does not exist.')
 
         return test
 
+    def get_by_ids(self, test_ids: list[int]) -> list[Test]:
+        """Returns existing objects with given ids."""
+
+        return self.session.query(Test).filter(Test.id.in_(set(test_ids)), *self._in_project()).all()
+
     def get_by_uid(self, uid: int) -> Test:
         """Returns single object with given uid."""
 
-        test = self.session.query(Test).filter(Test.uid == uid).first()
+        test = self.session.query(Test).filter(*self._with_uid(uid)).first()
         if test is None:
             raise NotFoundError(f'Test with uid = "{uid}" does not exist.')
 
         return test
 
+    def get_file_by_uid(self, uid: str) -> str | None:
+        """Returns file of test with given uid or None if there is no such test."""
+
+        return self.session.execute(select(Test.file).where(*self._with_uid(uid))).scalar_one_or_none()
+
+    def get_without_segments(self, test_id: int, limit: int) -> list[Test]:
+        """Returns up to limit objects with id greater than given one which have no segments, ordered by id."""
+
+        has_segments = select(TestSegment.test_id).where(TestSegment.test_id == Test.id).exists()
+
+        return (self.session.query(Test).filter(Test.id > test_id, ~has_segments, *self._in_project())
+                .order_by(Test.id).limit(limit).all())
+
+    def get_ids_by_segment_prefix(self, bounds: tuple[str, str], fields: tuple[str, ...], limit: int) -> list[int]:
+        """Returns ids of up to limit tests which have segment between bounds in any of given fields.
+
+        The most recently seen tests (then the ones with most events) are returned, bounds are compared bytewise.
+        """
+
+        segment = TestSegment.segment
+        if self.session.get_bind().dialect.name == 'postgresql':
+            segment = segment.collate('C')  # upper bound ends with the highest code point
+
+        matches = select(TestSegment.test_id).where(
+            *self._in_project(TestSegment), segment >= bounds[0], segment < bounds[1], TestSegment.field.in_(fields)
+        ).distinct().subquery()
+        statement = select(Test.id).join(matches, matches.c.test_id == Test.id).order_by(
+            Test.folded_last_seen.desc().nulls_last(), Test.folded_events_count.desc(), Test.id
+        ).limit(limit)
+
+        return list(self.session.execute(statement).scalars())
+
+    def set_segments(self, test_id: int, segments: dict[str, set[str]], project: str | None = None) -> None:
+        """Replaces segments of test (from given project or project of repository), segments are given per field."""
+
+        self.session.execute(delete(TestSegment).where(TestSegment.test_id == test_id))
+
+        project = project or self.project or DEFAULT_PROJECT
+        rows = [{'segment': segment, 'field': field, 'test_id': test_id, 'project': project}
+                for field, field_segments in segments.items() for segment in field_segments]
+        if rows:
+            self.session.execute(insert(TestSegment), rows)
+
+    def upsert(self, uid: str, file: str, marks: str, first_seen: datetime | None = None) -> int:
+        """Creates test or updates file and marks of existing one with given uid, returns its id.
+
+        First seen time is set only when test is created (or when it has none yet).
+
+        Single `INSERT ... ON CONFLICT` statement is used where database supports it, so concurrent first
+        failures of the same test do not collide.
+        """
+
+        dialect = self.session.get_bind().dialect.name
+
+        if dialect not in self.UPSERT_DIALECTS:
+            try:
+                test = self.get_by_uid(uid)
+            except NotFoundError:
+                test = Test(project=self.project or DEFAULT_PROJECT, uid=uid, file=file, marks=marks,
+                            total_events_count=0, first_seen=first_seen)
+                self.session.add(test)
+            else:
+                test.file, test.marks = file, marks
+                if test.first_seen is None:
+                    test.first_seen = first_seen
+            self.session.flush()
+
+            return test.id
+
+        dialect_insert = importlib.import_module(f'sqlalchemy.dialects.{dialect}').insert
+        statement = dialect_insert(Test).values(project=self.project or DEFAULT_PROJECT, uid=uid, file=file,
+                                                marks=marks, folded_events_count=0, first_seen=first_seen)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Test.project, Test.uid],
+            set_={'file': statement.excluded.file, 'marks': statement.excluded.marks,
+                  'first_seen': func.coalesce(Test.first_seen, statement.excluded.first_seen)}
+        ).returning(Test.id)
+
+        return self.session.execute(statement).scalar_one()
+
+    def update_by_id(self, test_id: int, uid: str, **values) -> bool:
+        """Updates passed columns of test, returns False when test with given id and uid does not exist in project."""
+
+        statement = update(Test).where(Test.id == test_id, *self._with_uid(uid)).values(**values)
+
+        return self.session.execute(statement).rowcount > 0
+
+    def add_events_count_delta(self, test_id: int, uid: str | None = None, delta: int = 1,
+                               timestamp: datetime | None = None) -> bool:
+        """Appends change of events count (and time of the event) of test without touching row of the test.
+
+        When uid is passed delta is added only if test with given id and uid exists, returns False otherwise.
+        """
+
+        values = select(literal(test_id), literal(delta), literal(timestamp, DateTime()))
+        if uid is not None:
+            values = values.where(exists().where(Test.id == test_id, *self._with_uid(uid)))
+
+        statement = insert(EventsCountDelta).from_select(['test_id', 'delta', 'timestamp'], values)
+
+        return self.session.execute(statement).rowcount > 0
+
+    def get_counters(self, test_ids: list[int]) -> dict[int, tuple[int, datetime | None, datetime | None]]:
+        """Returns exact events count, first seen and last seen time of tests by their ids."""
+
+        statement = select(
+            Test.id, Test.total_events_count, Test.first_seen, Test.folded_last_seen, Test.pending_last_seen
+        ).where(Test.id.in_(set(test_ids)))
+
+        return {
+            test_id: (count, first_seen, max(filter(None, (folded_last_seen, pending_last_seen)), default=None))
+            for test_id, count, first_seen, folded_last_seen, pending_last_seen in self.session.execute(statement)
+        }
+
+    def fold_events_count_deltas(self, limit: int) -> int:
+        """Moves up to limit the oldest deltas into events counts of tests, returns number of folded deltas.
+
+        Deltas are deleted before counts are updated and the whole fold is given up when some of them were
+        already deleted, so concurrent folds (e.g. from many workers) never count the same delta twice.
+        """
+
+        deltas = self.session.execute(
+            select(EventsCountDelta.id, EventsCountDelta.test_id, EventsCountDelta.delta, EventsCountDelta.timestamp)
+            .order_by(EventsCountDelta.id)
+            .limit(limit)
+        ).all()
+
+        if not deltas:
+            return 0
+
+        statement = delete(EventsCountDelta).where(EventsCountDelta.id.in_([delta.id for delta in deltas]))
+        if self.session.execute(statement).rowcount != len(deltas):
+            raise ConcurrentUpdateError('Events count deltas were folded by other transaction.')
+
+        counts = defaultdict(int)
+        last_seen = {}
+        for delta in deltas:
+            counts[delta.test_id] += delta.delta
+            if delta.timestamp is not None:
+                last_seen[delta.test_id] = max(delta.timestamp, last_seen.get(delta.test_id, delta.timestamp))
+
+        for test_id, count in counts.items():
+            values = {'folded_events_count': Test.folded_events_count + count}
+            if test_id in last_seen:
+                values['folded_last_seen'] = case(
+                    (Test.folded_last_seen > last_seen[test_id], Test.folded_last_seen), else_=last_seen[test_id]
+                )
+            self.session.execute(update(Test).where(Test.id == test_id).values(**values))
+
+        return len(deltas)
+
+    def reconcile_events_counts(self) -> int:
+        """Rebuilds events counts and first/last seen times of all tests from events table (and archived counts).
+
+        Returns number of tests whose events count was wrong.
+        """
+
+        self.session.execute(delete(EventsCountDelta))
+
+        # archived events are not in events table, seen times and counts of tests keep including them
+        archived_events_count = func.coalesce(Test.archived_events_count, 0)
+        events = select(Event.server_timestamp).where(Event.test_id == Test.id)
+        first_seen = events.with_only_columns(func.min(Event.server_timestamp)).scalar_subquery()
+        last_seen = events.with_only_columns(func.max(Event.server_timestamp)).scalar_subquery()
+        self.session.execute(update(Test).values(
+            first_seen=case((archived_events_count > 0, func.coalesce(Test.first_seen, first_seen)), else_=first_seen),
+            folded_last_seen=case((archived_events_count > 0, func.coalesce(last_seen, Test.folded_last_seen)),
+                                  else_=last_seen),
+        ))
+
+        events_count = (select(func.count(Event.id)).where(Event.test_id == Test.id).scalar_subquery()
+                        + archived_events_count)
+        statement = update(Test).where(Test.folded_events_count != events_count).values(
+            folded_events_count=events_count
+        )
+
+        return self.session.execute(statement).rowcount
+
+    def get_project_counts(self) -> list[tuple[str, int, int]]:
+        """Returns (project, number of tests, number of events) of all projects which have some tests."""
+
+        statement = (select(Test.project, func.count(Test.id), func.coalesce(func.sum(Test.total_events_count), 0))
+                     .group_by(Test.project).order_by(Test.project))
+
+        return [tuple(row) for row in self.session.execute(statement).all()]
+
+    def add_archived_events_counts(self, counts: dict[int, int]) -> None:
+        """Records that given numbers of events of tests were moved to archive."""
+
+        for test_id, count in counts.items():
+            self.session.execute(update(Test).where(Test.id == test_id).values(
+                archived_events_count=func.coalesce(Test.archived_events_count, 0) + count
+            ))
+
     def delete_by_id(self, test_id: int) -> None:
         """Deletes single object with given id."""
 
-        test = self.session.query(Test).filter(Test.id == test_id).first()
+        test = self.session.query(Test).filter(Test.id == test_id, *self._in_project()).first()
         if test is None:
             raise NotFoundError(f'Test with id = "{test_id}" does not exist.')
 
+        events = select(Event.id).where(Event.test_id == test_id)
+        self.session.execute(delete(EventBucket).where(EventBucket.event_id.in_(events)))
+        self.session.execute(delete(EventSignature).where(EventSignature.event_id.in_(events)))
+        self.session.execute(delete(EventsCountDelta).where(EventsCountDelta.test_id == test_id))
+        self.session.execute(delete(TestSegment).where(TestSegment.test_id == test_id))
         self.session.delete(test)
 
         return test
\ No newline at end of file
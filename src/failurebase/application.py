@@ -1,11 +1,17 @@
 """Application module."""
 
+from datetime import datetime, timedelta
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
 
-from .containers import Application
+from .containers import create_container
 from .settings import Settings
+from .background import PeriodicTask
 from .endpoints import api
+from .middlewares import (RequestDecodingMiddleware, MessagePackResponseMiddleware, AdmissionMiddleware,
+                          ProjectPathMiddleware)
 
 
 origins = [
@@ -14,15 +20,23 @@ origins = [
     "http://localhost:8080",
 ]
 
+INGEST_ROUTES = (
+    ('POST', '/api/events'),
+    ('POST', '/api/events/bulk'),
+    ('POST', '/api/runs/{run_id}/events'),
+)
 
-def create_app() -> FastAPI:
-    """Failurebase app factory."""
 
-    container = Application()
-    container.config.from_pydantic(Settings())
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """Failurebase app factory, serve it with `uvicorn --factory failurebase.application:create_app`.
 
-    db = container.adapters.db()
-    db.create_database()
+    Nothing is sent to database here. Schema is created on startup when `CREATE_DATABASE_ON_STARTUP` is
+    set, otherwise it has to be created beforehand with `python -m failurebase create-database`.
+    """
+
+    settings = settings or Settings()
+
+    container = create_container(settings)
 
     app = FastAPI()
 
@@ -34,10 +48,64 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # The last added middleware is the outermost one: responses are converted to MessagePack before
+    # they are compressed, ingestion requests are rejected before their bodies are decoded and project
+    # paths are rewritten before anything else sees them.
+    app.add_middleware(MessagePackResponseMiddleware)
+    app.add_middleware(RequestDecodingMiddleware, max_body_size=settings.MAX_REQUEST_BODY_SIZE)
+    app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE,
+                       compresslevel=settings.GZIP_COMPRESS_LEVEL)
+    app.add_middleware(AdmissionMiddleware, controller=container.services.admission_controller(),
+                       routes=INGEST_ROUTES)
+    app.add_middleware(ProjectPathMiddleware)
+
     app.container = container
     app.include_router(api.router)
 
+    app.state.background_tasks = [
+        PeriodicTask('fold-events-counts', settings.EVENTS_COUNT_FOLD_INTERVAL,
+                     lambda: container.services.test_service().fold_events_counts(
+                         settings.EVENTS_COUNT_FOLD_BATCH_SIZE)),
+        PeriodicTask('sync-failure-rates', settings.FAILURE_RATES_SYNC_INTERVAL,
+                     lambda: container.services.test_service().sync_failure_rates(
+                         settings.FAILURE_RATES_SYNC_BATCH_SIZE)),
+        PeriodicTask('apply-retention', settings.RETENTION_INTERVAL,
+                     lambda: container.services.project_service().apply_retention(settings.RETENTION_BATCH_SIZE)),
+        PeriodicTask('refresh-analytics', settings.ANALYTICS_REFRESH_INTERVAL if settings.ANALYTICS_ENABLED else 0,
+                     lambda: container.services.analytics_service().refresh()),
+    ]
+    if settings.ARCHIVE_DIRECTORY:
+        app.state.background_tasks.append(
+            PeriodicTask('archive-events', settings.ARCHIVE_INTERVAL,
+                         lambda: container.services.event_service().archive_events(
+                             datetime.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS), settings.ARCHIVE_BATCH_SIZE))
+        )
+    if settings.FEED_BACKEND == 'database':
+        app.state.background_tasks.append(
+            PeriodicTask('poll-event-feed', settings.FEED_POLL_INTERVAL,
+                         lambda: container.services.event_feed().poll(container.services.event_service()))
+        )
+
+    @app.on_event('startup')
+    async def startup() -> None:
+        container.services.threadpool().start()
+        if settings.CREATE_DATABASE_ON_STARTUP:
+            await run_in_threadpool(container.adapters.db().create_database)
+        for task in app.state.background_tasks:
+            task.start()
+
+    @app.on_event('shutdown')
+    async def shutdown() -> None:
+        for task in app.state.background_tasks:
+            await task.stop()
+
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # Keeps `failurebase.application:app` working, the app is created on first access instead of import.
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,44 @@
+"""Background tasks module."""
+
+import asyncio
+import logging
+from typing import Callable
+from starlette.concurrency import run_in_threadpool
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Calls blocking function in thread pool every given number of seconds while app is running."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]) -> None:
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Schedules task in running event loop, task with non-positive interval is disabled."""
+
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Cancels task and waits until it finishes."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.func)
+            except Exception:
+                logger.exception('Background task "%s" failed.', self.name)
@@ -0,0 +1,133 @@
+"""Command line interface module."""
+
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+from .adapters.backup import read_lines
+from .containers import create_container
+from .settings import Settings
+
+
+def create_database(container, args: argparse.Namespace) -> None:
+    """Creates missing database tables."""
+
+    container.adapters.db().create_database()
+    print('Database is up to date.')
+
+
+def fold_counts(container, args: argparse.Namespace) -> None:
+    """Folds pending events count deltas."""
+
+    folded = container.services.test_service().fold_events_counts(args.batch_size)
+    print(f'Folded {folded} events count deltas.')
+
+
+def reconcile_counts(container, args: argparse.Namespace) -> None:
+    """Rebuilds events counts from stored events."""
+
+    corrected = container.services.test_service().reconcile_events_counts()
+    print(f'Corrected events counts of {corrected} tests.')
+
+
+def index_similarity(container, args: argparse.Namespace) -> None:
+    """Computes similarity signatures of events stored before they were introduced."""
+
+    processed = container.services.event_service().index_similarity(args.batch_size)
+    print(f'Indexed {processed} events.')
+
+
+def index_suggestions(container, args: argparse.Namespace) -> None:
+    """Builds suggest segments of tests stored before they were introduced."""
+
+    processed = container.services.test_service().index_segments(args.batch_size)
+    print(f'Indexed {processed} tests.')
+
+
+def archive_events(container, args: argparse.Namespace) -> None:
+    """Moves old events to archive segments."""
+
+    before = datetime.now() - timedelta(days=args.older_than_days)
+    archived = container.services.event_service().archive_events(before, args.batch_size)
+    print(f'Archived {archived} events.')
+
+
+def apply_retention(container, args: argparse.Namespace) -> None:
+    """Deletes events older than retention of their projects."""
+
+    deleted = container.services.project_service().apply_retention(args.batch_size)
+    print(f'Deleted {deleted} events.')
+
+
+def backup(container, args: argparse.Namespace) -> None:
+    """Writes consistent snapshot of database into file."""
+
+    config = container.config
+    with open(args.output, 'wb') as file:
+        for chunk in container.adapters.db().backup(config.BACKUP_SQLITE_PAGES_PER_STEP(),
+                                                     config.BACKUP_SQLITE_STEP_SLEEP(), config.BACKUP_BATCH_SIZE()):
+            file.write(chunk)
+    print(f'Database was backed up into {args.output}.')
+
+
+def restore(container, args: argparse.Namespace) -> None:
+    """Loads backup into empty database."""
+
+    db = container.adapters.db()
+    db.create_database()
+    with (sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')) as file:
+        restored = db.restore(read_lines(file), args.batch_size)
+    print(f'Restored {restored} rows.')
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Runs maintenance command."""
+
+    parser = argparse.ArgumentParser(prog='python -m failurebase', description='Failurebase maintenance commands.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create-database', help='create missing database tables')
+    create_parser.set_defaults(handler=create_database)
+
+    fold_parser = subparsers.add_parser('fold-counts', help='fold pending events count deltas into tests')
+    fold_parser.add_argument('--batch-size', type=int, default=10000)
+    fold_parser.set_defaults(handler=fold_counts)
+
+    reconcile_parser = subparsers.add_parser('reconcile-counts', help='rebuild events counts from stored events')
+    reconcile_parser.set_defaults(handler=reconcile_counts)
+
+    index_parser = subparsers.add_parser('index-similarity', help='compute similarity signatures of events '
+                                                                  'which do not have them')
+    index_parser.add_argument('--batch-size', type=int, default=1000)
+    index_parser.set_defaults(handler=index_similarity)
+
+    suggest_parser = subparsers.add_parser('index-suggestions', help='build suggest segments of tests which do '
+                                                                     'not have them')
+    suggest_parser.add_argument('--batch-size', type=int, default=1000)
+    suggest_parser.set_defaults(handler=index_suggestions)
+
+    archive_parser = subparsers.add_parser('archive-events', help='move old events to archive segments '
+                                                                  '(ARCHIVE_DIRECTORY has to be set)')
+    archive_parser.add_argument('--older-than-days', type=float, required=True)
+    archive_parser.add_argument('--batch-size', type=int, default=10000)
+    archive_parser.set_defaults(handler=archive_events)
+
+    retention_parser = subparsers.add_parser('apply-retention', help='delete events older than retention of '
+                                                                     'their projects')
+    retention_parser.add_argument('--batch-size', type=int, default=10000)
+    retention_parser.set_defaults(handler=apply_retention)
+
+    backup_parser = subparsers.add_parser('backup', help='write consistent snapshot of database into file')
+    backup_parser.add_argument('--output', required=True)
+    backup_parser.set_defaults(handler=backup)
+
+    restore_parser = subparsers.add_parser('restore', help='load backup into empty database')
+    restore_parser.add_argument('--input', required=True, help='backup file, "-" for standard input')
+    restore_parser.add_argument('--batch-size', type=int, default=1000)
+    restore_parser.set_defaults(handler=restore)
+
+    args = parser.parse_args(argv)
+
+    container = create_container(Settings())
+
+    args.handler(container, args)
@@ -3,11 +3,34 @@
 from dependency_injector import containers, providers
 
 from .adapters.database import Database
+from .adapters.memory import MemoryDatabase
+from .adapters.archive import SegmentArchive
 from .services.event import EventService
 from .services.test import TestService
 from .services.uow import DatabaseUnitOfWork
+from .services.cache import TestCache
+from .services.feed import EventFeed
+from .services.change import ChangeService
+from .services.project import ProjectService
+from .services.run import RunService
+from .services.analytics import AnalyticsService
+from .services.columns import EventColumns
+from .services.rates import FailureRates
+from .services.latest import LatestEvents
+from .services.admission import AdmissionController
+from .services.singleflight import SingleFlight
+from .services.threadpool import Threadpool
 from .adapters.repositories.event import EventRepository
 from .adapters.repositories.test import TestRepository
+from .adapters.repositories.change import ChangeRepository
+from .adapters.repositories.project import ProjectRepository
+from .adapters.repositories.run import RunRepository
+from .adapters.repositories.memory.event import MemoryEventRepository
+from .adapters.repositories.memory.test import MemoryTestRepository
+from .adapters.repositories.memory.change import MemoryChangeRepository
+from .adapters.repositories.memory.project import MemoryProjectRepository
+from .adapters.repositories.memory.run import MemoryRunRepository
+from .settings import Settings
 
 
 class Adapters(containers.DeclarativeContainer):
@@ -15,11 +38,51 @@ class Adapters(containers.DeclarativeContainer):
 
     config = providers.Configuration()
 
-    db = providers.Singleton(Database, db_url=config.DATABASE_URI)
+    db = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Singleton(Database, db_url=config.DATABASE_URI, pool_size=config.DATABASE_POOL_SIZE,
+                                     max_overflow=config.DATABASE_MAX_OVERFLOW,
+                                     pool_timeout=config.DATABASE_POOL_TIMEOUT,
+                                     sqlite_wal=config.DATABASE_SQLITE_WAL),
+        memory=providers.Singleton(MemoryDatabase),
+    )
+
+    # in-memory repositories do not read archive, so events are never moved there
+    archive = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Singleton(SegmentArchive, directory=config.ARCHIVE_DIRECTORY),
+        memory=providers.Singleton(SegmentArchive, directory=None),
+    )
+
+    event_repository = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Object(EventRepository),
+        memory=providers.Object(MemoryEventRepository),
+    )
 
-    event_repository = providers.Object(EventRepository)
+    test_repository = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Object(TestRepository),
+        memory=providers.Object(MemoryTestRepository),
+    )
+
+    change_repository = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Object(ChangeRepository),
+        memory=providers.Object(MemoryChangeRepository),
+    )
+
+    project_repository = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Object(ProjectRepository),
+        memory=providers.Object(MemoryProjectRepository),
+    )
 
-    test_repository = providers.Object(TestRepository)
+    run_repository = providers.Selector(
+        config.STORAGE_BACKEND,
+        database=providers.Object(RunRepository),
+        memory=providers.Object(MemoryRunRepository),
+    )
 
 
 class Services(containers.DeclarativeContainer):
@@ -29,21 +92,95 @@ class Services(containers.DeclarativeContainer):
 
     adapters = providers.DependenciesContainer()
 
+    test_cache = providers.Singleton(TestCache, max_size=config.TEST_CACHE_SIZE)
+
+    read_coalescer = providers.Singleton(SingleFlight)
+
+    threadpool = providers.Singleton(Threadpool, size=config.THREADPOOL_SIZE)
+
+    admission_controller = providers.Singleton(
+        AdmissionController,
+        max_concurrency=config.INGEST_MAX_CONCURRENCY,
+        max_queue=config.INGEST_MAX_QUEUE,
+        queue_timeout=config.INGEST_QUEUE_TIMEOUT,
+        client_rate=config.INGEST_CLIENT_RATE,
+        client_burst=config.INGEST_CLIENT_BURST,
+    )
+
+    failure_rates = providers.Singleton(
+        FailureRates,
+        short_half_life=config.FAILURE_RATE_SHORT_HALF_LIFE,
+        long_half_life=config.FAILURE_RATE_LONG_HALF_LIFE,
+        synced=config.FAILURE_RATES_SYNC_INTERVAL.as_(lambda interval: interval > 0),
+    )
+
+    event_feed = providers.Singleton(
+        EventFeed,
+        max_queue_size=config.FEED_QUEUE_SIZE,
+        polling=config.FEED_BACKEND.as_(lambda backend: backend == 'database'),
+        poll_batch_size=config.FEED_POLL_BATCH_SIZE,
+    )
+
+    latest_events = providers.Singleton(
+        LatestEvents,
+        max_size=config.LATEST_EVENTS_BUFFER_SIZE,
+        enabled=config.LATEST_EVENTS_BUFFER_ENABLED,
+    )
+
+    event_columns = providers.Singleton(EventColumns, enabled=config.ANALYTICS_ENABLED)
+
     database_unit_of_work = providers.Factory(
         DatabaseUnitOfWork,
         session_factory=adapters.db.provided.session_factory,
         event_repository_cls=adapters.event_repository,
-        test_repository_cls=adapters.test_repository
+        test_repository_cls=adapters.test_repository,
+        change_repository_cls=adapters.change_repository,
+        project_repository_cls=adapters.project_repository,
+        run_repository_cls=adapters.run_repository,
+        archive=adapters.archive,
     )
 
     event_service = providers.Factory(
         EventService,
         uow=database_unit_of_work,
+        test_cache=test_cache,
+        event_feed=event_feed,
+        failure_rates=failure_rates,
+        archive=adapters.archive,
+        latest_events=latest_events,
     )
 
     test_service = providers.Factory(
         TestService,
         uow=database_unit_of_work,
+        test_cache=test_cache,
+        failure_rates=failure_rates,
+        latest_events=latest_events,
+        settle_time=config.CURSOR_SETTLE_TIME,
+    )
+
+    change_service = providers.Factory(
+        ChangeService,
+        uow=database_unit_of_work,
+        settle_time=config.CURSOR_SETTLE_TIME,
+    )
+
+    run_service = providers.Factory(
+        RunService,
+        uow=database_unit_of_work,
+    )
+
+    analytics_service = providers.Factory(
+        AnalyticsService,
+        uow=database_unit_of_work,
+        event_columns=event_columns,
+        refresh_batch_size=config.ANALYTICS_REFRESH_BATCH_SIZE,
+    )
+
+    project_service = providers.Factory(
+        ProjectService,
+        uow=database_unit_of_work,
+        latest_events=latest_events,
     )
 
 
@@ -64,3 +201,12 @@ class Application(containers.DeclarativeContainer):
         config=config,
         adapters=adapters,
     )
+
+
+def create_container(settings: Settings) -> Application:
+    """Returns main container configured with given settings."""
+
+    container = Application()
+    container.config.from_pydantic(settings)
+
+    return container
@@ -0,0 +1,54 @@
+"""Admin handlers module."""
+
+from datetime import datetime
+from fastapi import APIRouter, Depends, Response, HTTPException, status
+from fastapi.responses import StreamingResponse
+from dependency_injector.wiring import inject, Provide
+
+from ..routes import DecodedBodyRoute
+from ...adapters.database import Database
+from ...adapters.exceptions import BackupNotSupportedError
+from ...containers import Application
+from ...schemas.common import HTTPExceptionSchema
+
+
+router = APIRouter(route_class=DecodedBodyRoute)
+
+
+@router.get(
+    '/admin/backup',
+    response_class=StreamingResponse,
+    responses={
+        200: {'content': {'application/gzip': {}},
+              'description': 'Gzip compressed NDJSON snapshot of database, it can be loaded with '
+                             '`python -m failurebase restore`'},
+        501: {'model': HTTPExceptionSchema, 'description': 'Storage cannot be backed up'},
+    }
+)
+@inject
+def get_backup(
+
+    db: Database = Depends(Provide[Application.adapters.db]),
+
+    sqlite_pages_per_step: int = Depends(Provide[Application.config.BACKUP_SQLITE_PAGES_PER_STEP]),
+
+    sqlite_step_sleep: float = Depends(Provide[Application.config.BACKUP_SQLITE_STEP_SLEEP]),
+
+    batch_size: int = Depends(Provide[Application.config.BACKUP_BATCH_SIZE])
+
+) -> Response:
+    """Streams consistent snapshot of database taken while it is in use."""
+
+    try:
+        chunks = db.backup(sqlite_pages_per_step, sqlite_step_sleep, batch_size)
+    except BackupNotSupportedError as error:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(error))
+
+    filename = f'failurebase-{datetime.now():%Y%m%d-%H%M%S}.ndjson.gz'
+
+    return StreamingResponse(
+        chunks,
+        media_type='application/gzip',
+        # Identity encoding keeps GZip middleware from compressing the stream again.
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'Content-Encoding': 'identity'},
+    )
@@ -0,0 +1,146 @@
+"""Analytics handlers module."""
+
+from typing import Annotated, Literal
+from datetime import datetime
+from fastapi import APIRouter, Depends, status, Response, HTTPException, Query
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+
+from .validators import validate_group_keys
+from ..event.validators import validate_start_server_timestamp, validate_end_server_timestamp
+from ..validators import validate_test_marks
+from ..dependencies import get_analytics_service
+from ..routes import DecodedBodyRoute
+from ...services.analytics import AnalyticsService
+from ...schemas.analytics import GroupsSchema, AnalyticsHistogramSchema, CoOccurrenceSchema
+from ...schemas.common import HTTPExceptionSchema
+
+
+router = APIRouter(route_class=DecodedBodyRoute)
+
+
+def get_filters(
+
+    start_server_timestamp: datetime | None = Depends(validate_start_server_timestamp),
+
+    end_server_timestamp: datetime | None = Depends(validate_end_server_timestamp),
+
+    test_uid: Annotated[
+        str | None, Query(title='Test UID', description='Part of unique identifier of test.', max_length=2000)
+    ] = None,
+
+    test_marks: list[str] | None = Depends(validate_test_marks),
+
+    test_file: Annotated[
+        str | None, Query(title='Test File Path', description='Part of file path of test.', max_length=1000)
+    ] = None,
+
+) -> dict:
+    """Returns filters of events shared by analytics endpoints, tests have to have all given marks."""
+
+    return {'start': start_server_timestamp, 'end': end_server_timestamp, 'test_uid': test_uid,
+            'test_file': test_file, 'test_marks': test_marks}
+
+
+def ensure_available(analytics_service: AnalyticsService) -> None:
+    """Raises HTTP error when analytics is disabled (or NumPy is not installed)."""
+
+    if not analytics_service.available:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                            detail='Analytics is disabled or NumPy is not installed')
+
+
+@router.get(
+    '/analytics/groups',
+    responses={
+        200: {'model': GroupsSchema, 'description': 'Numbers of filtered events per group, the biggest first'},
+        501: {'model': HTTPExceptionSchema, 'description': 'Analytics is not available'},
+    }
+)
+def get_groups(
+
+    by: list[str] = Depends(validate_group_keys),
+
+    limit: Annotated[
+        int, Query(title='Limit', description='Maximal number of returned groups.', ge=1, le=10000)
+    ] = 100,
+
+    filters: dict = Depends(get_filters),
+
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+
+) -> Response:
+    """Returns numbers of events grouped by one or two keys, e.g. per mark per day.
+
+    Events are counted once for every mark of their test, so groups by mark overlap.
+    """
+
+    ensure_available(analytics_service)
+    groups = analytics_service.get_groups(by, limit, **filters)
+
+    json_compatible_content = jsonable_encoder(groups)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.get(
+    '/analytics/histogram',
+    responses={
+        200: {'model': AnalyticsHistogramSchema, 'description': 'Numbers of filtered events in equal time buckets'},
+        501: {'model': HTTPExceptionSchema, 'description': 'Analytics is not available'},
+    }
+)
+def get_histogram(
+
+    points: Annotated[
+        int, Query(title='Points', description='Number of equal time buckets the range is split into.',
+                   ge=1, le=10000)
+    ] = 100,
+
+    filters: dict = Depends(get_filters),
+
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+
+) -> Response:
+    """Returns numbers of events in equal time buckets, range defaults to time of the oldest and the newest one."""
+
+    ensure_available(analytics_service)
+    histogram = analytics_service.get_histogram(points, **filters)
+
+    json_compatible_content = jsonable_encoder(histogram)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.get(
+    '/analytics/co-occurrence',
+    responses={
+        200: {'model': CoOccurrenceSchema, 'description': 'Co-occurrence matrix of the most failing tests'},
+        501: {'model': HTTPExceptionSchema, 'description': 'Analytics is not available'},
+    }
+)
+def get_co_occurrence(
+
+    by: Annotated[
+        Literal['run', 'window'], Query(title='Occurrence', description='Tests fail together when they fail in '
+                                                                        'the same run or time window.')
+    ] = 'run',
+
+    window: Annotated[
+        int, Query(title='Window', description='Length of time window in seconds.', ge=1)
+    ] = 3600,
+
+    limit: Annotated[
+        int, Query(title='Limit', description='Number of the most failing tests in matrix.', ge=1, le=500)
+    ] = 20,
+
+    filters: dict = Depends(get_filters),
+
+    analytics_service: AnalyticsService = Depends(get_analytics_service),
+
+) -> Response:
+    """Returns numbers of runs (or time windows) in which pairs of the most failing tests failed together."""
+
+    ensure_available(analytics_service)
+    co_occurrence = analytics_service.get_co_occurrence(by, window, limit, **filters)
+
+    json_compatible_content = jsonable_encoder(co_occurrence)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
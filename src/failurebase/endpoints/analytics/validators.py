@@ -0,0 +1,36 @@
+"""Analytics validators module."""
+
+from enum import Enum
+from typing import Annotated
+from fastapi import Query
+
+from ..validators import RequestValidationError
+
+
+class GroupKey(str, Enum):
+    """Possible values of grouping query parameter."""
+
+    TEST: str = 'test'
+    FILE: str = 'file'
+    MARK: str = 'mark'
+    FINGERPRINT: str = 'fingerprint'
+    PROJECT: str = 'project'
+    DAY: str = 'day'
+
+
+def validate_group_keys(
+    by: Annotated[
+        list[GroupKey], Query(title='Group By', description='One or two keys events are grouped by, e.g. '
+                                                            '`by=mark&by=day`. Fingerprint is the first line of '
+                                                            'message with numbers masked.')
+    ]
+) -> list[str]:
+    """Validates if one or two different keys are received."""
+
+    keys = [key.value for key in by]
+
+    if not 1 <= len(keys) <= 2 or len(set(keys)) != len(keys):
+        raise RequestValidationError(('query', 'by'), 'one or two different keys are expected',
+                                     'value_error.by.count')
+
+    return keys
@@ -4,8 +4,20 @@ from fastapi import APIRouter
 
 from .event import router as event_router
 from .test import router as test_router
+from .change import router as change_router
+from .admin import router as admin_router
+from .metrics import router as metrics_router
+from .project import router as project_router
+from .run import router as run_router
+from .analytics import router as analytics_router
 
 router = APIRouter(prefix='/api')
 
 router.include_router(event_router)
 router.include_router(test_router)
+router.include_router(change_router)
+router.include_router(admin_router)
+router.include_router(metrics_router)
+router.include_router(project_router)
+router.include_router(run_router)
+router.include_router(analytics_router)
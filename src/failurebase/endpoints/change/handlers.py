@@ -0,0 +1,47 @@
+"""Change handlers module."""
+
+from typing import Annotated
+from fastapi import APIRouter, Depends, status, Response, Query
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from dependency_injector.wiring import inject, Provide
+
+from ..dependencies import get_change_service
+from ..routes import DecodedBodyRoute
+from ...services.change import ChangeService
+from ...containers import Application
+from ...schemas.change import ChangesSchema
+
+
+router = APIRouter(route_class=DecodedBodyRoute)
+
+
+@router.get(
+    '/changes',
+    responses={
+        200: {'model': ChangesSchema, 'description': 'Changes recorded after cursor'}
+    }
+)
+@inject
+def get_changes(
+
+    cursor: Annotated[
+        int, Query(title='Cursor', description='Cursor returned with the previous batch, 0 to start from '
+                                               'the beginning of change log.', ge=0)
+    ] = 0,
+
+    limit: Annotated[
+        int | None, Query(title='Batch Size', description='Maximal number of returned changes.', ge=1, le=10000)
+    ] = None,
+
+    change_service: ChangeService = Depends(get_change_service),
+
+    default_limit: int = Depends(Provide[Application.config.CHANGES_PER_PAGE])
+
+) -> Response:
+    """Returns events created and tombstones of events and tests deleted after cursor."""
+
+    changes = change_service.get_since(cursor, limit or default_limit)
+
+    json_compatible_content = jsonable_encoder(changes)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
@@ -0,0 +1,115 @@
+"""Common dependencies module."""
+
+from typing import Any, Callable, Iterator
+from fastapi import Depends
+from dependency_injector.wiring import inject, Provide
+
+from .validators import validate_project
+from ..services.event import EventService
+from ..services.test import TestService
+from ..services.run import RunService
+from ..services.analytics import AnalyticsService
+from ..services.project import ProjectService
+from ..services.change import ChangeService
+from ..adapters.database import Database
+from ..containers import Application
+
+
+@inject
+def get_database(db: Database = Depends(Provide[Application.adapters.db])) -> Database:
+    """Returns database adapter (`@inject` wrapper of generator is not generator, so it is separate)."""
+
+    return db
+
+
+def get_session(db: Database = Depends(get_database)) -> Iterator[Any]:
+    """Yields session of request, units of work of request services use it and it is closed after response.
+
+    In-memory storage yields None, its units of work open their own sessions.
+    """
+
+    with db.request_session() as session:
+        yield session
+
+
+@inject
+def get_event_service(
+    project: str = Depends(validate_project),
+    session: Any = Depends(get_session),
+    event_service_factory: Callable[..., EventService] = Depends(Provide[Application.services.event_service.provider])
+) -> EventService:
+    """Returns event service scoped to project of request."""
+
+    return event_service_factory(uow__project=project, uow__session=session)
+
+
+@inject
+def get_detached_event_service(
+    project: str = Depends(validate_project),
+    event_service_factory: Callable[..., EventService] = Depends(Provide[Application.services.event_service.provider])
+) -> EventService:
+    """Returns event service scoped to project of request whose units of work open their own sessions.
+
+    It is meant for work shared by more requests, which can outlive the request (and its session).
+    """
+
+    return event_service_factory(uow__project=project)
+
+
+@inject
+def get_test_service(
+    project: str = Depends(validate_project),
+    session: Any = Depends(get_session),
+    test_service_factory: Callable[..., TestService] = Depends(Provide[Application.services.test_service.provider])
+) -> TestService:
+    """Returns test service scoped to project of request."""
+
+    return test_service_factory(uow__project=project, uow__session=session)
+
+
+@inject
+def get_run_service(
+    project: str = Depends(validate_project),
+    session: Any = Depends(get_session),
+    run_service_factory: Callable[..., RunService] = Depends(Provide[Application.services.run_service.provider])
+) -> RunService:
+    """Returns run service scoped to project of request."""
+
+    return run_service_factory(uow__project=project, uow__session=session)
+
+
+@inject
+def get_analytics_service(
+    project: str = Depends(validate_project),
+    session: Any = Depends(get_session),
+    analytics_service_factory: Callable[..., AnalyticsService] = Depends(
+        Provide[Application.services.analytics_service.provider]
+    )
+) -> AnalyticsService:
+    """Returns analytics service scoped to project of request."""
+
+    return analytics_service_factory(uow__project=project, uow__session=session)
+
+
+@inject
+def get_project_service(
+    session: Any = Depends(get_session),
+    project_service_factory: Callable[..., ProjectService] = Depends(
+        Provide[Application.services.project_service.provider]
+    )
+) -> ProjectService:
+    """Returns project service using session of request."""
+
+    return project_service_factory(uow__session=session)
+
+
+@inject
+def get_change_service(
+    session: Any = Depends(get_session),
+    change_service_factory: Callable[..., ChangeService] = Depends(
+        Provide[Application.services.change_service.provider]
+    )
+) -> ChangeService:
+    """Returns change service using session of request."""
+
+    return change_service_factory(uow__session=session)
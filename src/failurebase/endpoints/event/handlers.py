@@ -1,23 +1,27 @@
 """Event handlers module."""
 
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 from datetime import datetime
 from fastapi import APIRouter, Depends, status, Response, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.encoders import jsonable_encoder
 from dependency_injector.wiring import inject, Provide
 
 from .validators import (validate_start_server_timestamp, validate_end_server_timestamp,
                          validate_start_client_timestamp, validate_end_client_timestamp, EventsOrder)
-from ..validators import validate_test_marks
+from ..validators import validate_test_marks, validate_project
+from ..dependencies import get_event_service, get_detached_event_service
+from ..routes import DecodedBodyRoute
 from ...services.event import EventService
+from ...services.feed import EventFeed, EventFilter, Subscription, Lag
+from ...services.singleflight import SingleFlight
 from ...containers import Application
-from ...schemas.event import CreateEventSchema, GetEventSchema
+from ...schemas.event import CreateEventSchema, GetEventSchema, SimilarEventsSchema, FacetsSchema
 from ...schemas.common import HTTPExceptionSchema, IdsSchema, StatusesSchema, PaginationSchema
 from ...adapters.exceptions import NotFoundError
 
 
-router = APIRouter()
+router = APIRouter(route_class=DecodedBodyRoute)
 
 
 @router.get(
@@ -27,7 +31,7 @@ router = APIRouter()
     }
 )
 @inject
-def get_events(
+async def get_events(
 
     page: Annotated[
         int, Query(title='Page number', description='The list of returned objects is broken down into smaller '
@@ -66,21 +70,39 @@ def get_events(
                           regex=f'^({"|".join(o.value for o in EventsOrder)})$')
     ] = None,
 
-    event_service: EventService = Depends(Provide[Application.services.event_service]),
+    run_id: Annotated[
+        int | None, Query(title='Run ID', description='Only failures reported in given run.')
+    ] = None,
+
+    project: str = Depends(validate_project),
+
+    event_service: EventService = Depends(get_detached_event_service),
+
+    read_coalescer: SingleFlight = Depends(Provide[Application.services.read_coalescer]),
 
-    page_limit: int = Depends(Provide[Application.config.EVENTS_PER_PAGE])
+    page_limit: int = Depends(Provide[Application.config.EVENTS_PER_PAGE]),
+
+    wait_timeout: float = Depends(Provide[Application.config.COALESCING_WAIT_TIMEOUT])
 
 ) -> Response:
-    """Returns events per given page."""
+    """Returns events per given page.
 
-    paginated_events = event_service.get_many(page, page_limit, start_server_timestamp, end_server_timestamp,
-                                              start_client_timestamp, end_client_timestamp, message, traceback,
-                                              test_uid, test_marks, test_file, ordering)
+    Identical concurrent requests share one database query and its rendered response. The query may
+    outlive the request which started it, so it does not use session of request.
+    """
 
-    json_compatible_content = jsonable_encoder(paginated_events)
-    import time
-    time.sleep(1)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+    def render() -> bytes:
+        paginated_events = event_service.get_many(page, page_limit, start_server_timestamp, end_server_timestamp,
+                                                  start_client_timestamp, end_client_timestamp, message, traceback,
+                                                  test_uid, test_marks, test_file, ordering, run_id)
+        return JSONResponse(content=jsonable_encoder(paginated_events)).body
+
+    key = ('events', project, page, page_limit, start_server_timestamp, end_server_timestamp,
+           start_client_timestamp, end_client_timestamp, message, traceback, test_uid,
+           tuple(sorted(set(test_marks))) if test_marks is not None else None, test_file, ordering, run_id)
+    body = await read_coalescer.do_async(key, render, wait_timeout)
+
+    return Response(status_code=status.HTTP_200_OK, content=body, media_type='application/json')
 
 
 @router.post(
@@ -89,12 +111,11 @@ def get_events(
         200: {'model': GetEventSchema, 'description': 'Created item'},
     }
 )
-@inject
 def create_event(
 
     event_schema: CreateEventSchema,
 
-    event_service: EventService = Depends(Provide[Application.services.event_service]),
+    event_service: EventService = Depends(get_event_service),
 
 ) -> Response:
     """Creates new event and test (if it is required)."""
@@ -104,6 +125,147 @@ def create_event(
     return JSONResponse(status_code=status.HTTP_201_CREATED, content=json_compatible_content)
 
 
+@router.post(
+    '/events/bulk',
+    responses={
+        201: {'model': IdsSchema, 'description': 'IDs of created items in order of received events'},
+    }
+)
+def create_events(
+
+    event_schemas: list[CreateEventSchema],
+
+    event_service: EventService = Depends(get_event_service),
+
+) -> Response:
+    """Creates many events (and tests if it is required) in single transaction."""
+
+    ids_schema = event_service.create_many(event_schemas)
+    json_compatible_content = jsonable_encoder(ids_schema)
+    return JSONResponse(status_code=status.HTTP_201_CREATED, content=json_compatible_content)
+
+
+@router.get(
+    '/events/stream',
+    response_class=StreamingResponse,
+    responses={
+        200: {'content': {'text/event-stream': {}},
+              'description': 'Server-Sent Events: `failure` with created event and `lag` with number of events '
+                             'which were dropped because client did not keep up'},
+    }
+)
+@inject
+async def stream_events(
+
+    message: Annotated[
+        str | None, Query(title='Failure Message', description='Error message as a cause of failure.', max_length=2000)
+    ] = None,
+
+    traceback: Annotated[
+        str | None, Query(title='Traceback Of Error', description='Additional information of failure.', max_length=3000)
+    ] = None,
+
+    test_uid: Annotated[
+        str | None, Query(title='Test UID', description='Unique identifier of test.', max_length=2000)
+    ] = None,
+
+    test_marks: list[str] | None = Depends(validate_test_marks),
+
+    test_file: Annotated[
+        str | None, Query(title='Test File Path', description='File path of test.', max_length=1000)
+    ] = None,
+
+    project: str = Depends(validate_project),
+
+    event_feed: EventFeed = Depends(Provide[Application.services.event_feed]),
+
+    heartbeat_interval: float = Depends(Provide[Application.config.FEED_HEARTBEAT_INTERVAL])
+
+) -> Response:
+    """Streams newly created events which match passed filters."""
+
+    event_filter = EventFilter(message, traceback, test_uid, tuple(test_marks) if test_marks is not None else None,
+                               test_file, project)
+    subscription = event_feed.subscribe(event_filter)
+
+    return StreamingResponse(
+        server_sent_events(event_feed, subscription, heartbeat_interval),
+        media_type='text/event-stream',
+        # Identity encoding keeps GZip middleware from buffering the stream.
+        headers={'Cache-Control': 'no-cache', 'Content-Encoding': 'identity', 'X-Accel-Buffering': 'no'},
+    )
+
+
+async def server_sent_events(event_feed: EventFeed, subscription: Subscription,
+                             heartbeat_interval: float) -> AsyncIterator[str]:
+    """Yields events of subscription in SSE format until client disconnects."""
+
+    try:
+        yield ': connected\n\n'
+        while True:
+            item = await subscription.get(heartbeat_interval)
+            if item is None:
+                yield ': heartbeat\n\n'
+            elif isinstance(item, Lag):
+                yield f'event: lag\ndata: {{"dropped": {item.dropped}}}\n\n'
+            else:
+                yield f'id: {item.id}\nevent: failure\ndata: {item.data}\n\n'
+    finally:
+        event_feed.unsubscribe(subscription)
+
+
+@router.get(
+    '/events/facets',
+    responses={
+        200: {'model': FacetsSchema, 'description': 'Numbers of filtered items per mark and per directory'}
+    }
+)
+def get_facets(
+
+    start_server_timestamp: datetime | None = Depends(validate_start_server_timestamp),
+
+    end_server_timestamp: datetime | None = Depends(validate_end_server_timestamp),
+
+    start_client_timestamp: datetime | None = Depends(validate_start_client_timestamp),
+
+    end_client_timestamp: datetime | None = Depends(validate_end_client_timestamp),
+
+    message: Annotated[
+        str | None, Query(title='Failure Message', description='Error message as a cause of failure.', max_length=2000)
+    ] = None,
+
+    traceback: Annotated[
+        str | None, Query(title='Traceback Of Error', description='Additional information of failure.', max_length=3000)
+    ] = None,
+
+    test_uid: Annotated[
+        str | None, Query(title='Test UID', description='Unique identifier of test.', max_length=2000)
+    ] = None,
+
+    test_marks: list[str] | None = Depends(validate_test_marks),
+
+    test_file: Annotated[
+        str | None, Query(title='Test File Path', description='File path of test.', max_length=1000)
+    ] = None,
+
+    max_depth: Annotated[
+        int | None, Query(title='Maximal Depth', description='Number of levels of returned directory tree '
+                                                             '(the whole tree by default).', ge=1)
+    ] = None,
+
+    event_service: EventService = Depends(get_event_service),
+
+) -> Response:
+    """Returns numbers of events (filtered like events list) per test mark and per directory of test file."""
+
+    facets = event_service.get_facets(start_server_timestamp, end_server_timestamp, start_client_timestamp,
+                                      end_client_timestamp, message, traceback, test_uid, test_marks, test_file,
+                                      max_depth)
+
+    json_compatible_content = jsonable_encoder(facets)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
 @router.get(
     '/events/{event_id}',
     responses={
@@ -111,12 +273,11 @@ def create_event(
         404: {'model': HTTPExceptionSchema, 'description': 'Item was not found'},
     }
 )
-@inject
 def get_event(
 
     event_id: int,
 
-    event_service: EventService = Depends(Provide[Application.services.event_service]),
+    event_service: EventService = Depends(get_event_service),
 
 ) -> Response:
     """Item returned by requested ID."""
@@ -130,18 +291,54 @@ def get_event(
         return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
 
 
+@router.get(
+    '/events/{event_id}/similar',
+    responses={
+        200: {'model': SimilarEventsSchema, 'description': 'Events with similar traceback, the most similar first'},
+        404: {'model': HTTPExceptionSchema, 'description': 'Item was not found'},
+    }
+)
+@inject
+def get_similar_events(
+
+    event_id: int,
+
+    limit: Annotated[
+        int, Query(title='Limit', description='Maximal number of returned events.', ge=1, le=100)
+    ] = 10,
+
+    min_similarity: Annotated[
+        float, Query(title='Minimal Similarity', description='Minimal Jaccard similarity of tracebacks.',
+                     ge=0.0, le=1.0)
+    ] = 0.5,
+
+    event_service: EventService = Depends(get_event_service),
+
+    candidates_per_bucket: int = Depends(Provide[Application.config.SIMILAR_EVENTS_CANDIDATES_PER_BUCKET])
+
+) -> Response:
+    """Events whose tracebacks are similar to traceback of event with requested ID."""
+
+    try:
+        similar_events = event_service.get_similar(event_id, limit, min_similarity, candidates_per_bucket)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Event with ID "{event_id}" was not found')
+    else:
+        json_compatible_content = jsonable_encoder(similar_events)
+        return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
 @router.post(  # DELETE can be blocked by proxy server
     '/events/delete',
     responses={
         207: {'model': StatusesSchema, 'description': 'List of deletion statuses for each processed object.'},
     }
 )
-@inject
 def delete(
 
     ids_schema: IdsSchema,
 
-    event_service: EventService = Depends(Provide[Application.services.event_service]),
+    event_service: EventService = Depends(get_event_service),
 
 ) -> Response:
     """Items deleted by passed IDs."""
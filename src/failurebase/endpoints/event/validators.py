@@ -6,6 +6,7 @@ from enum import Enum
 from fastapi import Query
 
 from ..validators import RequestValidationError
+from ...schemas.common import parse_timestamp
 
 
 def validate_timestamp(parameter_name: str, timestamp: str | None = None) -> datetime | None:
@@ -13,7 +14,7 @@ def validate_timestamp(parameter_name: str, timestamp: str | None = None) -> dat
 
     if timestamp is not None:
         try:
-            return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%f')
+            return parse_timestamp(timestamp)
         except ValueError:
             raise RequestValidationError(
                 ('path', parameter_name),
@@ -0,0 +1,47 @@
+"""Metrics handlers module."""
+
+from fastapi import APIRouter, Depends, status, Response
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from dependency_injector.wiring import inject, Provide
+
+from ..routes import DecodedBodyRoute
+from ...services.admission import AdmissionController
+from ...services.singleflight import SingleFlight
+from ...services.threadpool import Threadpool
+from ...adapters.database import Database
+from ...containers import Application
+from ...schemas.metrics import MetricsSchema
+
+
+router = APIRouter(route_class=DecodedBodyRoute)
+
+
+@router.get(
+    '/metrics',
+    responses={
+        200: {'model': MetricsSchema, 'description': 'Current server metrics'}
+    }
+)
+@inject
+async def get_metrics(
+
+    admission_controller: AdmissionController = Depends(Provide[Application.services.admission_controller]),
+
+    read_coalescer: SingleFlight = Depends(Provide[Application.services.read_coalescer]),
+
+    threadpool: Threadpool = Depends(Provide[Application.services.threadpool]),
+
+    db: Database = Depends(Provide[Application.adapters.db])
+
+) -> Response:
+    """Returns server metrics, e.g. depth of ingestion queue or number of requests waiting for thread.
+
+    It runs in event loop, so it answers also when all threads are busy.
+    """
+
+    metrics = MetricsSchema(admission=admission_controller.metrics(), coalescing=read_coalescer.metrics(),
+                            threadpool=threadpool.metrics(), database_pool=db.pool_metrics())
+
+    json_compatible_content = jsonable_encoder(metrics)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
@@ -0,0 +1,59 @@
+"""Project handlers module."""
+
+from typing import Annotated
+from fastapi import APIRouter, Depends, status, Response, Path
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+
+from ..validators import PROJECT_NAME_REGEX
+from ..dependencies import get_project_service
+from ..routes import DecodedBodyRoute
+from ...services.project import ProjectService
+from ...schemas.project import ProjectSchema, ProjectsSchema, UpdateProjectSchema
+
+
+router = APIRouter(route_class=DecodedBodyRoute)
+
+
+@router.get(
+    '/projects',
+    responses={
+        200: {'model': ProjectsSchema, 'description': 'All projects'}
+    }
+)
+def get_projects(
+
+    project_service: ProjectService = Depends(get_project_service)
+
+) -> Response:
+    """Returns projects with numbers of their tests and events."""
+
+    projects = project_service.get_many()
+
+    json_compatible_content = jsonable_encoder(projects)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.post(
+    '/projects/{name}',
+    responses={
+        200: {'model': ProjectSchema, 'description': 'Updated item'}
+    }
+)
+def update_project(
+
+    name: Annotated[
+        str, Path(title='Project', description='Name of project.', regex=PROJECT_NAME_REGEX)
+    ],
+
+    project_schema: UpdateProjectSchema,
+
+    project_service: ProjectService = Depends(get_project_service)
+
+) -> Response:
+    """Updates settings of project (it is created if it does not exist yet)."""
+
+    project = project_service.update(name, project_schema)
+
+    json_compatible_content = jsonable_encoder(project)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
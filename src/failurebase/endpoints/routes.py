@@ -0,0 +1,30 @@
+"""Routes module."""
+
+from typing import Any, Callable, Coroutine
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+
+# key of scope under which middlewares put body which they already decoded (e.g. from MessagePack)
+DECODED_BODY = 'failurebase.decoded_body'
+
+
+class DecodedBodyRequest(Request):
+    """Request which returns body decoded by middleware as its JSON, when there is one."""
+
+    async def json(self) -> Any:
+        if DECODED_BODY in self.scope:
+            return self.scope[DECODED_BODY]
+        return await super().json()
+
+
+class DecodedBodyRoute(APIRoute):
+    """Route which validates bodies decoded by middlewares as they are, without encoding them to JSON first."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def decoded_body_handler(request: Request) -> Response:
+            return await handler(DecodedBodyRequest(request.scope, request.receive))
+
+        return decoded_body_handler
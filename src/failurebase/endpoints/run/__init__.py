@@ -0,0 +1,6 @@
+from .handlers import router
+
+
+__all__ = [
+    'router'
+]
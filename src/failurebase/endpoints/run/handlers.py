@@ -0,0 +1,224 @@
+"""Run handlers module."""
+
+from typing import Annotated, AsyncIterator
+from fastapi import APIRouter, Depends, status, Response, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from dependency_injector.wiring import inject, Provide
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from ..dependencies import get_run_service, get_event_service
+from ..routes import DecodedBodyRoute
+from ...services.run import RunService
+from ...services.event import EventService
+from ...containers import Application
+from ...schemas.run import CreateRunSchema, CloseRunSchema, GetRunSchema
+from ...schemas.event import CreateEventSchema
+from ...schemas.common import HTTPExceptionSchema, IdsSchema, PaginationSchema
+from ...adapters.exceptions import NotFoundError, RunClosedError
+
+
+router = APIRouter(route_class=DecodedBodyRoute)
+
+
+@router.get(
+    '/runs',
+    responses={
+        200: {'model': PaginationSchema, 'description': 'Requested items, the most recently started first'}
+    }
+)
+@inject
+def get_runs(
+
+    page: Annotated[
+        int, Query(title='Page number', description='The list of returned objects is broken down into smaller '
+                                                    'chunks that can be retrieved via the page index.')
+    ] = 0,
+
+    branch: Annotated[
+        str | None, Query(title='Branch', description='Only runs of given branch.', max_length=200)
+    ] = None,
+
+    run_service: RunService = Depends(get_run_service),
+
+    page_limit: int = Depends(Provide[Application.config.RUNS_PER_PAGE])
+
+) -> Response:
+    """Returns runs per given page."""
+
+    paginated_runs = run_service.get_many(page, page_limit, branch)
+
+    json_compatible_content = jsonable_encoder(paginated_runs)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.post(
+    '/runs',
+    responses={
+        201: {'model': GetRunSchema, 'description': 'Opened item'},
+    }
+)
+def open_run(
+
+    run_schema: CreateRunSchema,
+
+    run_service: RunService = Depends(get_run_service),
+
+) -> Response:
+    """Opens new run, failures can be appended to it until it is closed."""
+
+    run = run_service.open(run_schema)
+
+    json_compatible_content = jsonable_encoder(run)
+    return JSONResponse(status_code=status.HTTP_201_CREATED, content=json_compatible_content)
+
+
+@router.get(
+    '/runs/{run_id}',
+    responses={
+        200: {'model': GetRunSchema, 'description': 'Item requested by ID with its summary'},
+        404: {'model': HTTPExceptionSchema, 'description': 'Item was not found'},
+    }
+)
+def get_run(
+
+    run_id: int,
+
+    run_service: RunService = Depends(get_run_service),
+
+) -> Response:
+    """Returns run with summary counters (they are computed when the run is closed)."""
+
+    try:
+        run = run_service.get_one(run_id)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Run with ID "{run_id}" was not found')
+    else:
+        json_compatible_content = jsonable_encoder(run)
+        return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.post(
+    '/runs/{run_id}/close',
+    responses={
+        200: {'model': GetRunSchema, 'description': 'Closed item with its summary'},
+        404: {'model': HTTPExceptionSchema, 'description': 'Item was not found'},
+        409: {'model': HTTPExceptionSchema, 'description': 'Item is already closed'},
+    }
+)
+def close_run(
+
+    run_id: int,
+
+    close_schema: CloseRunSchema | None = None,
+
+    run_service: RunService = Depends(get_run_service),
+
+) -> Response:
+    """Closes run and computes its summary."""
+
+    try:
+        run = run_service.close(run_id, close_schema or CloseRunSchema())
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Run with ID "{run_id}" was not found')
+    except RunClosedError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Run with ID "{run_id}" is already closed')
+    else:
+        json_compatible_content = jsonable_encoder(run)
+        return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.post(
+    '/runs/{run_id}/events',
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'description': 'Events in the format of `POST /api/events`, one JSON object per line.',
+            'content': {'application/x-ndjson': {'schema': {'type': 'string'}}},
+        }
+    },
+    responses={
+        201: {'model': IdsSchema, 'description': 'IDs of created items in order of received events'},
+        404: {'model': HTTPExceptionSchema, 'description': 'Run was not found'},
+        409: {'model': HTTPExceptionSchema, 'description': 'Run is already closed'},
+        413: {'model': HTTPExceptionSchema, 'description': 'Line of body is too long'},
+    }
+)
+@inject
+async def append_events(
+
+    run_id: int,
+
+    request: Request,
+
+    run_service: RunService = Depends(get_run_service),
+
+    event_service: EventService = Depends(get_event_service),
+
+    batch_size: int = Depends(Provide[Application.config.RUN_APPEND_BATCH_SIZE]),
+
+    max_line_size: int = Depends(Provide[Application.config.RUN_APPEND_MAX_LINE_SIZE])
+
+) -> Response:
+    """Appends failures to open run, body is stream of events (NDJSON, it can be compressed).
+
+    Events are stored in batches while the body is received, so the whole run can be uploaded in single
+    request without holding it in memory. Every batch is stored in its own transaction: when some line is
+    invalid, events of the previous batches stay in the run.
+    """
+
+    try:
+        run = await run_in_threadpool(run_service.get_one, run_id)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Run with ID "{run_id}" was not found')
+    if run.finished_at is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Run with ID "{run_id}" is already closed')
+
+    ids = []
+    batch = []
+
+    async def store() -> None:
+        try:
+            ids_schema = await run_in_threadpool(event_service.create_many, batch, run_id)
+        except RunClosedError:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail=f'Run with ID "{run_id}" was closed during upload')
+        ids.extend(ids_schema.ids)
+        batch.clear()
+
+    line_number = 0
+    async for line in read_lines(request.stream(), max_line_size):
+        line_number += 1
+        try:
+            batch.append(CreateEventSchema.parse_raw(line))
+        except ValidationError as error:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=[{**item, 'loc': ('body', line_number, *item['loc'])}
+                                        for item in error.errors()])
+        if len(batch) >= batch_size:
+            await store()
+
+    if batch:
+        await store()
+
+    json_compatible_content = jsonable_encoder(IdsSchema(ids=ids))
+    return JSONResponse(status_code=status.HTTP_201_CREATED, content=json_compatible_content)
+
+
+async def read_lines(chunks: AsyncIterator[bytes], max_line_size: int) -> AsyncIterator[bytes]:
+    """Yields non-empty lines of chunked body, body with longer line than `max_line_size` bytes is refused."""
+
+    rest = b''
+    async for chunk in chunks:
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        if len(rest) > max_line_size or any(len(line) > max_line_size for line in lines):
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f'Line of body exceeds {max_line_size} bytes.')
+        for line in lines:
+            if line.strip():
+                yield line
+
+    if rest.strip():
+        yield rest
@@ -1,21 +1,24 @@
 """Test handlers module."""
 
 from typing import Annotated
+from datetime import datetime
 from fastapi import APIRouter, Depends, status, Response, HTTPException, Query
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from dependency_injector.wiring import inject, Provide
 
-from .validators import TestsOrder
+from .validators import TestsOrder, SuggestField
 from ..validators import validate_test_marks
+from ..dependencies import get_test_service
+from ..routes import DecodedBodyRoute
 from ...services.test import TestService
 from ...containers import Application
-from ...schemas.test import GetTestSchema
+from ...schemas.test import GetTestSchema, AnomaliesSchema, HistorySchema, SuggestionsSchema
 from ...schemas.common import HTTPExceptionSchema, StatusesSchema, IdsSchema, PaginationSchema
 from ...adapters.exceptions import NotFoundError
 
 
-router = APIRouter()
+router = APIRouter(route_class=DecodedBodyRoute)
 
 
 @router.get(
@@ -48,7 +51,7 @@ def get_tests(
                           regex=f'^({"|".join(o.value for o in TestsOrder)})$')
     ] = None,
 
-    test_service: TestService = Depends(Provide[Application.services.test_service]),
+    test_service: TestService = Depends(get_test_service),
 
     page_limit: int = Depends(Provide[Application.config.TESTS_PER_PAGE])
 
@@ -58,8 +61,75 @@ def get_tests(
     paginated_tests = test_service.get_many(page, page_limit, uid, file, test_marks, ordering)
 
     json_compatible_content = jsonable_encoder(paginated_tests)
-    import time
-    time.sleep(1)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.get(
+    '/tests/anomalies',
+    responses={
+        200: {'model': AnomaliesSchema, 'description': 'Tests failing more often than usually'}
+    }
+)
+def get_anomalies(
+
+    threshold: Annotated[
+        float, Query(title='Threshold', description='Minimal deviation of recent failure count from count '
+                                                    'expected at baseline rate, in standard deviations.', ge=0)
+    ] = 3.0,
+
+    min_events: Annotated[
+        float, Query(title='Minimal Events', description='Minimal recent (exponentially weighted) number of '
+                                                         'failures.', ge=0)
+    ] = 3.0,
+
+    limit: Annotated[
+        int, Query(title='Limit', description='Maximal number of returned tests.', ge=1, le=1000)
+    ] = 50,
+
+    test_service: TestService = Depends(get_test_service),
+
+) -> Response:
+    """Returns tests whose recent failure rate deviates from their baseline rate."""
+
+    anomalies = test_service.get_anomalies(threshold, min_events, limit)
+
+    json_compatible_content = jsonable_encoder(anomalies)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
+@router.get(
+    '/tests/suggest',
+    responses={
+        200: {'model': SuggestionsSchema, 'description': 'Tests matching typed text'}
+    }
+)
+@inject
+def suggest(
+
+    q: Annotated[
+        str, Query(title='Query', description='Beginning of any word (and the rest of value after it) of test '
+                                              'uid or file, case-insensitive.', min_length=1, max_length=100)
+    ],
+
+    field: Annotated[
+        SuggestField, Query(title='Field', description='Test property which is searched.')
+    ] = SuggestField.ALL,
+
+    limit: Annotated[
+        int, Query(title='Limit', description='Maximal number of returned tests.', ge=1, le=100)
+    ] = 10,
+
+    test_service: TestService = Depends(get_test_service),
+
+    candidates: int = Depends(Provide[Application.config.SUGGEST_CANDIDATES])
+
+) -> Response:
+    """Returns tests matching typed text, the most recently failing first."""
+
+    fields = ('uid', 'file') if field is SuggestField.ALL else (field.value,)
+    suggestions = test_service.suggest(q, fields, limit, candidates)
+
+    json_compatible_content = jsonable_encoder(suggestions)
     return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
 
 
@@ -70,12 +140,11 @@ def get_tests(
         404: {'model': HTTPExceptionSchema, 'description': 'Item was not found'},
     }
 )
-@inject
 def get_test(
 
     test_id: str,
 
-    test_service: TestService = Depends(Provide[Application.services.test_service]),
+    test_service: TestService = Depends(get_test_service),
 
 ) -> Response:
     """Item returned by requested ID."""
@@ -89,18 +158,55 @@ def get_test(
         return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
 
 
+@router.get(
+    '/tests/{test_id}/history',
+    responses={
+        200: {'model': HistorySchema, 'description': 'Failure timeline of item requested by ID'},
+        404: {'model': HTTPExceptionSchema, 'description': 'Item was not found'},
+    }
+)
+def get_history(
+
+    test_id: int,
+
+    start: Annotated[
+        datetime | None, Query(title='Start', description='Beginning of timeline (first seen time by default).')
+    ] = None,
+
+    end: Annotated[
+        datetime | None, Query(title='End', description='End of timeline (last seen time by default).')
+    ] = None,
+
+    points: Annotated[
+        int, Query(title='Points', description='Number of equal time buckets the timeline is split into.',
+                   ge=1, le=1000)
+    ] = 100,
+
+    test_service: TestService = Depends(get_test_service),
+
+) -> Response:
+    """Numbers of events of item requested by ID in equal time buckets."""
+
+    try:
+        history = test_service.get_history(test_id, start, end, points)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Test with id "{test_id}" was not found')
+    else:
+        json_compatible_content = jsonable_encoder(history)
+        return JSONResponse(status_code=status.HTTP_200_OK, content=json_compatible_content)
+
+
 @router.post(  # DELETE can be blocked by proxy server
     '/tests/delete',
     responses={
         207: {'model': StatusesSchema, 'description': 'List of deletion statuses for each object ID.'},
     }
 )
-@inject
 def delete(
 
     ids_schema: IdsSchema,
 
-    event_service: TestService = Depends(Provide[Application.services.test_service]),
+    event_service: TestService = Depends(get_test_service),
 
 ) -> Response:
     """Items deleted by passed IDs."""
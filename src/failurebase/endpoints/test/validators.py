@@ -12,3 +12,11 @@ class TestsOrder(Enum):
 
     ASC_TOTAL_EVENTS_COUNT: str = 'total_events_count'
     DESC_TOTAL_EVENTS_COUNT: str = '-total_events_count'
+
+
+class SuggestField(Enum):
+    """Possible values of field query parameter of suggestions."""
+
+    UID: str = 'uid'
+    FILE: str = 'file'
+    ALL: str = 'all'
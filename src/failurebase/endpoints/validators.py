@@ -2,7 +2,12 @@
 
 import json
 from typing import Annotated
-from fastapi import HTTPException, Query
+from fastapi import HTTPException, Query, Header
+
+from ..adapters.models import DEFAULT_PROJECT
+
+
+PROJECT_NAME_REGEX = r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,99}$'
 
 
 class RequestValidationError(HTTPException):
@@ -36,3 +41,15 @@ def validate_test_marks(
             )
 
         return data
+
+
+def validate_project(
+    x_project: Annotated[
+        str | None, Header(title='Project', description='Name of project, requests without it work with '
+                                                        f'"{DEFAULT_PROJECT}" project. It can be also passed in path: '
+                                                        '`/api/projects/{project}/...`.', regex=PROJECT_NAME_REGEX)
+    ] = None
+) -> str:
+    """Returns project of request."""
+
+    return x_project or DEFAULT_PROJECT
@@ -0,0 +1,11 @@
+from .encoding import RequestDecodingMiddleware, MessagePackResponseMiddleware
+from .admission import AdmissionMiddleware
+from .project import ProjectPathMiddleware
+
+
+__all__ = [
+    'RequestDecodingMiddleware',
+    'MessagePackResponseMiddleware',
+    'AdmissionMiddleware',
+    'ProjectPathMiddleware',
+]
@@ -0,0 +1,50 @@
+"""Admission middleware module."""
+
+import re
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..services.admission import AdmissionController
+
+
+class AdmissionMiddleware:
+    """Passes requests to given routes (method and path) through admission controller.
+
+    Paths can have parameters in braces (e.g. `/api/runs/{run_id}/events`), each matches one path segment.
+    Rejected requests get 429 response with `Retry-After` header before their body is read.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, routes: tuple[tuple[str, str], ...]) -> None:
+        self.app = app
+        self.controller = controller
+        self.routes = frozenset(route for route in routes if '{' not in route[1])
+        self.patterns = [(method, re.compile(re.sub(r'\\{[^/]+?\\}', '[^/]+', re.escape(path)) + '$'))
+                         for method, path in routes if '{' in path]
+
+    def _matches(self, method: str, path: str) -> bool:
+        path = path.rstrip('/')
+        return (method, path) in self.routes or any(method == route_method and pattern.match(path)
+                                                    for route_method, pattern in self.patterns)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope['type'] != 'http' or not self._matches(scope['method'], scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope['client'][0] if scope.get('client') else ''
+        rejection = await self.controller.acquire(client)
+
+        if rejection is not None:
+            detail = ('Too many requests from client.' if rejection.reason == 'rate_limited'
+                      else 'Server is overloaded with ingestion.')
+            response = JSONResponse({'detail': detail}, status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                    headers={'Retry-After': str(rejection.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
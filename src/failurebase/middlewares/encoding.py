@@ -0,0 +1,281 @@
+"""Encoding middlewares module."""
+
+import json
+import zlib
+import importlib.util
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..endpoints.routes import DECODED_BODY
+
+
+# Optional codecs are imported by the first request which uses them, so processes which never receive
+# MessagePack or zstd bodies do not load them.
+MSGPACK_INSTALLED = importlib.util.find_spec('msgpack') is not None
+ZSTANDARD_INSTALLED = importlib.util.find_spec('zstandard') is not None
+
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+DECODING_ERRORS = (zlib.error, ValueError)
+
+
+class _GzipDecoder:
+    """Incremental decoder of gzip (or zlib) stream which never inflates more than requested amount."""
+
+    def __init__(self) -> None:
+        self._decoder = zlib.decompressobj(wbits=zlib.MAX_WBITS | 32)
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        decoded = self._decoder.decompress(data, max_length)
+        if self._decoder.unconsumed_tail:
+            raise _TooLarge()
+        return decoded
+
+    def flush(self) -> bytes:
+        return self._decoder.flush()
+
+
+class _ZstdDecoder:
+    """Incremental decoder of zstd stream which stops as soon as it inflates more than requested amount.
+
+    Decompressor writes inflated data in pieces of at most `WRITE_SIZE` bytes, so at most that much
+    is inflated over the limit.
+    """
+
+    WRITE_SIZE = 64 * 1024
+
+    def __init__(self) -> None:
+        import zstandard
+
+        self._error = zstandard.ZstdError
+        self._output = _LimitedBuffer()
+        self._decoder = zstandard.ZstdDecompressor().stream_writer(self._output, write_size=self.WRITE_SIZE,
+                                                                     closefd=False)
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        self._output.limit = max_length
+        try:
+            self._decoder.write(data)
+        except self._error as error:
+            raise ValueError(str(error)) from None
+        return self._output.take()
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class _LimitedBuffer:
+    """Writable buffer which refuses to hold more than `limit` bytes."""
+
+    def __init__(self) -> None:
+        self.limit = 0
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data: bytes) -> int:
+        self._size += len(data)
+        if self._size > self.limit:
+            raise _TooLarge()
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks, self._size = [], 0
+        return data
+
+
+class _TooLarge(Exception):
+    """Throws when decoded body exceeds the limit."""
+
+
+def get_decoders() -> dict:
+    """Returns decoders of supported content encodings."""
+
+    decoders = {'gzip': _GzipDecoder, 'x-gzip': _GzipDecoder, 'deflate': _GzipDecoder}
+    if ZSTANDARD_INSTALLED:
+        decoders['zstd'] = _ZstdDecoder
+
+    return decoders
+
+
+class RequestDecodingMiddleware:
+    """Decodes compressed and MessagePack request bodies.
+
+    Compressed bodies are inflated chunk by chunk while application reads them, so large payloads are
+    never held twice in memory, and the size of inflated body is limited to protect against
+    decompression bombs. MessagePack bodies are unpacked once and the result is put into scope, where
+    `DecodedBodyRoute` passes it to validation instead of parsing body as JSON.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+        self.decoders = get_decoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = headers.get('content-encoding', 'identity').strip().lower()
+        content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        is_msgpack = content_type in MSGPACK_CONTENT_TYPES
+
+        if encoding == 'identity' and not is_msgpack:
+            await self.app(scope, receive, send)
+            return
+
+        if encoding != 'identity' and encoding not in self.decoders:
+            await self._reject(scope, receive, send, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                               f'Content encoding "{encoding}" is not supported.')
+            return
+
+        if is_msgpack and not MSGPACK_INSTALLED:
+            await self._reject(scope, receive, send, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                               'MessagePack content type is not supported.')
+            return
+
+        scope = dict(scope)
+        scope['headers'] = list(scope['headers'])
+        mutable_headers = MutableHeaders(scope=scope)
+        del mutable_headers['content-encoding']
+        del mutable_headers['content-length']
+        if is_msgpack:
+            mutable_headers['content-type'] = 'application/json'
+
+        if encoding != 'identity':
+            receive = self._decoding_receive(receive, self.decoders[encoding]())
+        if is_msgpack:
+            receive = self._msgpack_receive(receive, scope)
+
+        await self.app(scope, receive, send)
+
+    def _decoding_receive(self, receive: Receive, decoder) -> Receive:
+        """Returns receive callable which inflates incoming body chunks."""
+
+        size = 0
+
+        async def decoding_receive() -> Message:
+            nonlocal size
+
+            message = await receive()
+            if message['type'] != 'http.request':
+                return message
+
+            try:
+                body = decoder.decode(message.get('body', b''), self.max_body_size - size + 1)
+                if not message.get('more_body', False):
+                    body += decoder.flush()
+            except DECODING_ERRORS as error:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, f'Body cannot be decoded: {error}') from None
+            except _TooLarge:
+                size = self.max_body_size + 1
+            else:
+                size += len(body)
+
+            if size > self.max_body_size:
+                raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    f'Decoded body exceeds {self.max_body_size} bytes.')
+
+            return {**message, 'body': body}
+
+        return decoding_receive
+
+    def _msgpack_receive(self, receive: Receive, scope: Scope) -> Receive:
+        """Returns receive callable which reads whole MessagePack body and puts its content into scope."""
+
+        import msgpack
+
+        converted = False
+
+        async def msgpack_receive() -> Message:
+            nonlocal converted
+
+            if converted:
+                return await receive()
+
+            chunks, size, more_body = [], 0, True
+            while more_body:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    return message
+                chunks.append(message.get('body', b''))
+                size += len(chunks[-1])
+                more_body = message.get('more_body', False)
+                if size > self.max_body_size:
+                    raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        f'Body exceeds {self.max_body_size} bytes.')
+
+            converted = True
+            body = b''.join(chunks)
+            try:
+                scope[DECODED_BODY] = msgpack.unpackb(body)
+            except (ValueError, TypeError, msgpack.UnpackException) as error:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, f'Body is not valid MessagePack: {error}') from None
+
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        return msgpack_receive
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str) -> None:
+        """Sends error response without calling application."""
+
+        await JSONResponse({'detail': detail}, status_code=status_code)(scope, receive, send)
+
+
+class MessagePackResponseMiddleware:
+    """Encodes JSON responses as MessagePack when client accepts it."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope['type'] != 'http' or not MSGPACK_INSTALLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept = Headers(scope=scope).get('accept', '')
+        if not any(content_type in accept for content_type in MSGPACK_CONTENT_TYPES):
+            await self.app(scope, receive, send)
+            return
+
+        import msgpack
+
+        start_message = None
+        chunks = []
+
+        async def msgpack_send(message: Message) -> None:
+            nonlocal start_message
+
+            if message['type'] == 'http.response.start':
+                content_type = Headers(raw=message['headers']).get('content-type', '')
+                if content_type.startswith('application/json'):
+                    start_message = message
+                    return
+
+            if start_message is None:
+                await send(message)
+                return
+
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+
+            body = msgpack.packb(json.loads(b''.join(chunks) or b'null'))
+            headers = MutableHeaders(raw=start_message['headers'])
+            headers['content-type'] = 'application/msgpack'
+            headers['content-length'] = str(len(body))
+            headers.add_vary_header('Accept')
+
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+        await self.app(scope, receive, msgpack_send)
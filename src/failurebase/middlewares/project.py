@@ -0,0 +1,29 @@
+"""Project middleware module."""
+
+import re
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ProjectPathMiddleware:
+    """Rewrites `/api/projects/{project}/...` paths to `/api/...` with `X-Project` header.
+
+    Endpoints read project only from the header, so both forms share the same routes. Paths of project
+    endpoints themselves (`/api/projects` and `/api/projects/{project}`) are left untouched.
+    """
+
+    PATH = re.compile(r'^/api/projects/([^/]+)(/[^/].*)$')
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope['type'] in ('http', 'websocket'):
+            match = self.PATH.match(scope['path'])
+            if match is not None:
+                project, rest = match.groups()
+                headers = [(name, value) for name, value in scope['headers'] if name != b'x-project']
+                headers.append((b'x-project', project.encode('latin-1')))
+                scope = {**scope, 'path': f'/api{rest}', 'raw_path': f'/api{rest}'.encode(), 'headers': headers}
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,53 @@
+"""Analytics schemas module."""
+
+from datetime import datetime
+from pydantic import BaseModel
+
+from .test import HistoryPointSchema
+
+
+class GroupSchema(BaseModel):
+    """Number of events in group, `keys` are values of grouping keys in the requested order."""
+
+    keys: list[str]
+    count: int
+
+
+class GroupsSchema(BaseModel):
+    """Schema to return numbers of selected events per group, the biggest groups first."""
+
+    by: list[str]
+    count: int
+    groups: list[GroupSchema]
+
+
+class AnalyticsHistogramSchema(BaseModel):
+    """Schema to return numbers of selected events over time, every point covers `bucket_size` seconds."""
+
+    start: datetime | None
+    end: datetime | None
+    bucket_size: float
+    points: list[HistoryPointSchema]
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        }
+
+
+class CoOccurringTestSchema(BaseModel):
+    """Test in co-occurrence matrix."""
+
+    id: int
+    uid: str
+
+
+class CoOccurrenceSchema(BaseModel):
+    """Schema to return numbers of runs (or time windows) in which pairs of the most failing tests failed together.
+
+    `matrix[i][j]` belongs to `tests[i]` and `tests[j]`, diagonal holds number of runs in which test failed.
+    """
+
+    by: str
+    tests: list[CoOccurringTestSchema]
+    matrix: list[list[int]]
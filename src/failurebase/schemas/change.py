@@ -0,0 +1,32 @@
+"""Change schemas module."""
+
+from datetime import datetime
+from pydantic import BaseModel
+
+from .event import GetEventSchema
+from ..adapters.models import ChangeType
+
+
+class ChangeSchema(BaseModel):
+    """Single change: created event (with its data), tombstone of deleted event or test or archived event.
+
+    Archived event is not in database anymore, but it can still be read by id.
+    """
+
+    cursor: int
+    type: ChangeType
+    id: int
+    event: GetEventSchema | None = None
+
+
+class ChangesSchema(BaseModel):
+    """Schema to return batch of changes, `cursor` has to be passed to get the next batch."""
+
+    items: list[ChangeSchema]
+    cursor: int
+    has_more: bool
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        }
@@ -2,8 +2,10 @@
 
 from datetime import datetime
 from pydantic import BaseModel, validator
+from pydantic.validators import str_validator
 
 from .test import CreateTestSchema, GetTestSchema
+from .common import parse_timestamp
 
 
 create_event_schema_example = {
@@ -20,12 +22,12 @@ create_event_schema_example = {
 
 
 class CreateEventSchema(BaseModel):
-    """Schema to handle incoming data of event."""
+    """Schema to handle incoming data of event, timestamp is parsed once, when payload is validated."""
 
     test: CreateTestSchema
     message: str
     traceback: str
-    timestamp: str
+    timestamp: datetime
 
     class Config:
         orm_mode = True
@@ -33,18 +35,11 @@ class CreateEventSchema(BaseModel):
             'example': create_event_schema_example
         }
 
-    @validator('timestamp')
+    @validator('timestamp', pre=True)
     def timestamp_should_be_string_or_datetime(cls, v):
-        """Validates timestamp string format."""
+        """Validates timestamp string format and parses it."""
 
-        datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%f")
-        return v
-
-    @property
-    def deserialized_timestamp(self):
-        """Dumps timestamp string to datetime object."""
-
-        return datetime.strptime(self.timestamp, '%Y-%m-%dT%H:%M:%S.%f')
+        return parse_timestamp(str_validator(v))
 
 
 class GetEventSchema(BaseModel):
@@ -56,6 +51,7 @@ class GetEventSchema(BaseModel):
     traceback: str
     client_timestamp: datetime
     server_timestamp: datetime
+    run_id: int | None = None
 
     class Config:
         orm_mode = True
@@ -70,3 +66,48 @@ class GetEventsSchema(BaseModel):
     events: list[GetEventSchema]
     page_number: int
     page_limit: int
+
+
+class SimilarEventSchema(BaseModel):
+    """Event with Jaccard similarity of its traceback to traceback of requested event."""
+
+    similarity: float
+    event: GetEventSchema
+
+
+class SimilarEventsSchema(BaseModel):
+    """Schema to return events similar to requested one, the most similar first."""
+
+    items: list[SimilarEventSchema]
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        }
+
+
+class MarkFacetSchema(BaseModel):
+    """Number of filtered events of tests with given mark."""
+
+    mark: str
+    count: int
+
+
+class DirectoryFacetSchema(BaseModel):
+    """Number of filtered events of tests in directory (`path` is prefix of their file) and its subdirectories."""
+
+    name: str
+    path: str
+    count: int
+    children: list['DirectoryFacetSchema'] = []
+
+
+DirectoryFacetSchema.update_forward_refs()
+
+
+class FacetsSchema(BaseModel):
+    """Schema to return numbers of filtered events per mark and per directory, the biggest first."""
+
+    count: int
+    marks: list[MarkFacetSchema]
+    directories: DirectoryFacetSchema
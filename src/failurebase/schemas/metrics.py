@@ -0,0 +1,57 @@
+"""Metrics schemas module."""
+
+from pydantic import BaseModel
+
+
+class RejectedSchema(BaseModel):
+    """Numbers of rejected requests per reason."""
+
+    rate_limited: int
+    overloaded: int
+
+
+class AdmissionMetricsSchema(BaseModel):
+    """State of ingestion admission control."""
+
+    in_flight: int
+    max_concurrency: int
+    queue_depth: int
+    max_queue: int
+    admitted: int
+    rejected: RejectedSchema
+    clients: int
+
+
+class CoalescingMetricsSchema(BaseModel):
+    """State of coalescing of identical concurrent reads."""
+
+    in_flight: int
+    executed: int
+    coalesced: int
+    timed_out: int
+
+
+class ThreadpoolMetricsSchema(BaseModel):
+    """State of threadpool of sync handlers and background tasks."""
+
+    size: int
+    busy: int
+    waiting: int
+
+
+class DatabasePoolMetricsSchema(BaseModel):
+    """State of database connection pool."""
+
+    size: int
+    max_overflow: int
+    checked_out: int
+    overflow: int
+
+
+class MetricsSchema(BaseModel):
+    """Schema to return server metrics."""
+
+    admission: AdmissionMetricsSchema
+    coalescing: CoalescingMetricsSchema
+    threadpool: ThreadpoolMetricsSchema
+    database_pool: DatabasePoolMetricsSchema | None
@@ -0,0 +1,25 @@
+"""Project schemas module."""
+
+from pydantic import BaseModel, Field
+
+
+class ProjectSchema(BaseModel):
+    """Schema to return project with numbers of its tests and events (archived ones included)."""
+
+    name: str
+    tests_count: int
+    events_count: int
+    retention_days: float | None = None
+
+
+class ProjectsSchema(BaseModel):
+    """Schema to return all projects."""
+
+    items: list[ProjectSchema]
+
+
+class UpdateProjectSchema(BaseModel):
+    """Schema to handle incoming settings of project."""
+
+    retention_days: float | None = Field(description='Events older than this many days are deleted, null keeps '
+                                                     'them forever.', gt=0)
@@ -0,0 +1,53 @@
+"""Run schemas module."""
+
+from datetime import datetime
+from pydantic import BaseModel, Field, validator
+from pydantic.validators import str_validator
+
+from .common import parse_timestamp
+
+
+def _parse_optional_timestamp(value):
+    """Parses timestamp string in the format of event timestamps, None is kept."""
+
+    return None if value is None else parse_timestamp(str_validator(value))
+
+
+class CreateRunSchema(BaseModel):
+    """Schema to handle incoming data of opened run, it starts now when start time is not passed."""
+
+    name: str | None = Field(None, max_length=200, description='Name of run, e.g. number of CI build.')
+    branch: str | None = Field(None, max_length=200)
+    commit: str | None = Field(None, max_length=100)
+    started_at: datetime | None = None
+
+    _parse_started_at = validator('started_at', pre=True, allow_reuse=True)(_parse_optional_timestamp)
+
+
+class CloseRunSchema(BaseModel):
+    """Schema to handle incoming data of closed run, it finishes now when end time is not passed."""
+
+    finished_at: datetime | None = None
+
+    _parse_finished_at = validator('finished_at', pre=True, allow_reuse=True)(_parse_optional_timestamp)
+
+
+class GetRunSchema(BaseModel):
+    """Schema to return run to client, counters are known once the run is closed."""
+
+    id: int
+    project: str
+    name: str | None
+    branch: str | None
+    commit: str | None
+    started_at: datetime
+    finished_at: datetime | None
+    events_count: int | None
+    tests_count: int | None
+    new_tests_count: int | None
+
+    class Config:
+        orm_mode = True
+        json_encoders = {
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        }
@@ -1,7 +1,10 @@
 """Test schemas module."""
 
 import json
-from pydantic import BaseModel, Json
+from datetime import datetime
+from pydantic import BaseModel, Json, PrivateAttr
+
+from ..adapters.models import DEFAULT_PROJECT
 
 
 class CreateTestSchema(BaseModel):
@@ -11,29 +14,38 @@ class CreateTestSchema(BaseModel):
     marks: list[str]
     file: str
 
+    _serialized_marks: str | None = PrivateAttr(None)
+
     class Config:
         orm_mode = True
 
     @property
     def serialized_marks(self):
-        """Dumps list of marks to json string."""
+        """Dumps list of marks to json string (once, marks are not changed after validation)."""
 
-        return json.dumps(self.marks)
+        if self._serialized_marks is None:
+            self._serialized_marks = json.dumps(self.marks)
+
+        return self._serialized_marks
 
 
 class GetTestSchema(BaseModel):
     """Schema to return data of test to client."""
 
     id: int
+    project: str = DEFAULT_PROJECT
     uid: str
     marks: Json
     file: str
     total_events_count: int
+    first_seen: datetime | None = None
+    last_seen: datetime | None = None
 
     class Config:
         orm_mode = True
         json_encoders = {
-            Json: lambda v: json.loads(v.marks)
+            Json: lambda v: json.loads(v.marks),
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
         }
 
 
@@ -43,3 +55,58 @@ class GetTestsSchema(BaseModel):
     tests: list[GetTestSchema]
     page_number: int
     page_limit: int
+
+
+class AnomalySchema(BaseModel):
+    """Test which fails more often than usually, rates are in failures per hour."""
+
+    test: GetTestSchema
+    current_rate: float
+    baseline_rate: float
+    score: float
+
+
+class AnomaliesSchema(BaseModel):
+    """Schema to return anomalous tests, the most anomalous first."""
+
+    items: list[AnomalySchema]
+
+
+class HistoryPointSchema(BaseModel):
+    """Number of events of test in bucket starting at given time."""
+
+    timestamp: datetime
+    count: int
+
+
+class HistorySchema(BaseModel):
+    """Schema to return failure timeline of test, every point covers `bucket_size` seconds."""
+
+    test: GetTestSchema
+    start: datetime | None
+    end: datetime | None
+    bucket_size: float
+    points: list[HistoryPointSchema]
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        }
+
+
+class SuggestionSchema(BaseModel):
+    """Test matching typed text with its recent (exponentially weighted) failure count."""
+
+    test: GetTestSchema
+    recent_failures: float
+
+
+class SuggestionsSchema(BaseModel):
+    """Schema to return suggested tests, the most recently failing first."""
+
+    items: list[SuggestionSchema]
+
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        }
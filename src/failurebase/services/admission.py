@@ -0,0 +1,127 @@
+"""Admission module."""
+
+import math
+import time
+import asyncio
+from typing import NamedTuple
+from collections import OrderedDict
+
+from failurebase.services.singleflight import TIMEOUT_ERRORS
+
+
+class Rejection(NamedTuple):
+    """Reason of rejected request and number of seconds after which client may retry."""
+
+    reason: str
+    retry_after: int
+
+
+class TokenBucket:
+    """Allows `burst` requests at once and `rate` requests per second on average."""
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.timestamp = now
+
+    def take(self, now: float) -> float:
+        """Takes token, returns 0 when it was available otherwise number of seconds until it will be."""
+
+        self.tokens = min(self.burst, self.tokens + (now - self.timestamp) * self.rate)
+        self.timestamp = now
+
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+
+        return (1.0 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Admission control of ingestion requests.
+
+    Every client has its own token bucket (`client_rate` of 0 disables it) and at most `max_concurrency`
+    admitted requests are processed at once by all clients together, the rest waits in queue of
+    `max_queue` requests for at most `queue_timeout` seconds. Requests which are not handled by the
+    controller (reads) are never limited, so they keep the remaining threads and database connections.
+
+    Controller is used only from event loop, so it does not need any locks.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, client_rate: float,
+                 client_burst: float, max_clients: int = 10000) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = max(client_burst, 1.0)
+        self.max_clients = max_clients
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected: dict[str, int] = {'rate_limited': 0, 'overloaded': 0}
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self, client: str) -> Rejection | None:
+        """Waits for free slot, returns rejection when request should not be processed.
+
+        Admitted request has to call `release` when it is finished.
+        """
+
+        if self.client_rate > 0:
+            retry_after = self._take_token(client)
+            if retry_after > 0:
+                return self._reject('rate_limited', retry_after)
+
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            return self._reject('overloaded', self.queue_timeout)
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except TIMEOUT_ERRORS:
+            return self._reject('overloaded', self.queue_timeout)
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        return None
+
+    def release(self) -> None:
+        """Frees slot of admitted request."""
+
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> dict:
+        """Returns current state and counters of controller."""
+
+        return {
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self.queued,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': dict(self.rejected),
+            'clients': len(self._buckets),
+        }
+
+    def _take_token(self, client: str) -> float:
+        now = time.monotonic()
+
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.client_rate, self.client_burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+
+        return bucket.take(now)
+
+    def _reject(self, reason: str, retry_after: float) -> Rejection:
+        self.rejected[reason] += 1
+        return Rejection(reason, max(1, math.ceil(retry_after)))
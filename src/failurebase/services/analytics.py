@@ -0,0 +1,132 @@
+"""Analytics service module."""
+
+import json
+from datetime import datetime, timedelta
+
+from failurebase.services.uow import DatabaseUnitOfWork
+from failurebase.services.columns import EventColumns, ColumnsTest, Selection
+from failurebase.adapters.models import ChangeType
+from failurebase.schemas.analytics import (GroupsSchema, GroupSchema, AnalyticsHistogramSchema, CoOccurrenceSchema,
+                                           CoOccurringTestSchema)
+from failurebase.schemas.test import HistoryPointSchema
+
+
+class AnalyticsService:
+    """Service to answer aggregate questions about Events (of project of unit of work) from columnar snapshot.
+
+    Snapshot is refreshed before every question, so answers include all committed Events.
+    """
+
+    def __init__(self, uow: DatabaseUnitOfWork, event_columns: EventColumns, refresh_batch_size: int = 100000) -> None:
+        self.uow = uow
+        self.event_columns = event_columns
+        self.refresh_batch_size = refresh_batch_size
+
+    @property
+    def available(self) -> bool:
+        """Returns False when analytics is disabled or NumPy is not installed."""
+
+        return self.event_columns.enabled
+
+    def refresh(self) -> int:
+        """Appends Events created since the last refresh and drops deleted ones, returns number of appended Events.
+
+        Changes recorded before the first refresh are skipped, Events deleted by them are not read at all.
+        """
+
+        columns = self.event_columns
+        if not columns.enabled:
+            return 0
+
+        appended = 0
+
+        with columns.refresh_lock:
+            if columns.change_cursor is None:
+                with self.uow.for_project(None) as uow:
+                    columns.change_cursor = uow.change_repository.get_last_id()
+
+            while True:
+                with self.uow.for_project(None) as uow:
+                    rows = uow.event_repository.get_columns(columns.cursor, self.refresh_batch_size)
+                    # tests are read with every batch, so their changed marks and files are picked up as well
+                    tests = uow.test_repository.get_by_ids(list({row[1] for row in rows}))
+                    columns.update_tests(ColumnsTest(test.id, test.project, test.uid, test.file,
+                                                     json.loads(test.marks)) for test in tests)
+                    known_tests = {test.id for test in tests}
+
+                # events of tests deleted in the meantime are skipped
+                columns.append([row for row in rows if row[1] in known_tests])
+                if rows:
+                    columns.cursor = rows[-1][0]
+
+                appended += len(rows)
+                if len(rows) < self.refresh_batch_size:
+                    break
+
+            while True:
+                with self.uow.for_project(None) as uow:
+                    changes = [(change.id, change.type, change.object_id) for change in
+                               uow.change_repository.get_after(columns.change_cursor, self.refresh_batch_size)]
+
+                # snapshot keeps only events of database, archived ones are dropped like deleted ones
+                columns.remove(object_id for _, type_, object_id in changes
+                               if type_ in (ChangeType.EVENT_DELETED, ChangeType.EVENT_ARCHIVED))
+                columns.remove_tests(object_id for _, type_, object_id in changes if type_ == ChangeType.TEST_DELETED)
+                if changes:
+                    columns.change_cursor = changes[-1][0]
+
+                if len(changes) < self.refresh_batch_size:
+                    break
+
+        return appended
+
+    def _select(self, start: datetime | None, end: datetime | None, test_uid: str | None, test_file: str | None,
+                test_marks: list[str] | None) -> Selection:
+
+        self.refresh()
+
+        return self.event_columns.select(self.uow.project, start, end, test_uid, test_file, test_marks)
+
+    def get_groups(self, by: list[str], limit: int, start: datetime | None = None, end: datetime | None = None,
+                   test_uid: str | None = None, test_file: str | None = None,
+                   test_marks: list[str] | None = None) -> GroupsSchema:
+        """Returns numbers of selected Events grouped by one or two keys, the biggest groups first."""
+
+        selection = self._select(start, end, test_uid, test_file, test_marks)
+
+        return GroupsSchema(by=by, count=len(selection), groups=[
+            GroupSchema(keys=keys, count=count) for keys, count in selection.counts(by, limit)
+        ])
+
+    def get_histogram(self, points: int, start: datetime | None = None, end: datetime | None = None,
+                      test_uid: str | None = None, test_file: str | None = None,
+                      test_marks: list[str] | None = None) -> AnalyticsHistogramSchema:
+        """Returns numbers of selected Events in `points` equal buckets between start and end.
+
+        Range defaults to time of the oldest and the newest selected Event.
+        """
+
+        selection = self._select(start, end, test_uid, test_file, test_marks)
+
+        first, last = selection.time_range()
+        start, end = start or first, end or last
+        if start is None or end is None or start > end:
+            return AnalyticsHistogramSchema(start=start, end=end, bucket_size=0, points=[])
+
+        bucket_size, counts = selection.histogram(start, end, points)
+
+        return AnalyticsHistogramSchema(start=start, end=end, bucket_size=bucket_size, points=[
+            HistoryPointSchema(timestamp=start + timedelta(seconds=index * bucket_size), count=count)
+            for index, count in enumerate(counts)
+        ])
+
+    def get_co_occurrence(self, by: str, window: int, limit: int, start: datetime | None = None,
+                          end: datetime | None = None, test_uid: str | None = None, test_file: str | None = None,
+                          test_marks: list[str] | None = None) -> CoOccurrenceSchema:
+        """Returns how often pairs of the most failing Tests failed in the same run (or time window)."""
+
+        selection = self._select(start, end, test_uid, test_file, test_marks)
+        tests, matrix = selection.co_occurrence(by, window, limit)
+
+        return CoOccurrenceSchema(by=by, tests=[CoOccurringTestSchema(id=test.id, uid=test.uid) for test in tests],
+                                  matrix=matrix)
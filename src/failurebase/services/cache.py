@@ -0,0 +1,74 @@
+"""Cache module."""
+
+import threading
+from typing import NamedTuple
+from collections import OrderedDict
+
+
+class CachedTest(NamedTuple):
+    """Last known state of test row."""
+
+    id: int
+    file: str
+    marks: str
+
+
+class TestCache:
+    """Bounded LRU cache which maps project and test uid to id and last known file and marks.
+
+    Cache is kept per process, so it can be stale when other worker deletes the test. Users of the cache
+    have to verify that cached id still points to the same uid (e.g. in WHERE clause of update).
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._tests: OrderedDict[tuple[str, str], CachedTest] = OrderedDict()
+        self._uids: dict[int, tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, uid: tuple[str, str]) -> CachedTest | None:
+        """Returns cached test or None."""
+
+        with self._lock:
+            test = self._tests.get(uid)
+            if test is not None:
+                self._tests.move_to_end(uid)
+
+        return test
+
+    def set(self, uid: tuple[str, str], test: CachedTest) -> None:
+        """Stores test, the least recently used one is removed when cache is full."""
+
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            previous = self._tests.pop(uid, None)
+            if previous is not None:
+                self._uids.pop(previous.id, None)
+
+            self._tests[uid] = test
+            self._uids[test.id] = uid
+
+            while len(self._tests) > self.max_size:
+                _, removed = self._tests.popitem(last=False)
+                self._uids.pop(removed.id, None)
+
+    def invalidate(self, test_ids: list[int]) -> None:
+        """Removes tests with given ids."""
+
+        with self._lock:
+            for test_id in test_ids:
+                uid = self._uids.pop(test_id, None)
+                if uid is not None:
+                    self._tests.pop(uid, None)
+
+    def clear(self) -> None:
+        """Removes all tests."""
+
+        with self._lock:
+            self._tests.clear()
+            self._uids.clear()
+
+    def __len__(self) -> int:
+        return len(self._tests)
@@ -0,0 +1,44 @@
+"""Change service module."""
+
+from failurebase.services.uow import DatabaseUnitOfWork
+from failurebase.adapters.models import ChangeType
+from failurebase.schemas.event import GetEventSchema
+from failurebase.schemas.change import ChangeSchema, ChangesSchema
+
+
+class ChangeService:
+    """Service to read change log."""
+
+    def __init__(self, uow: DatabaseUnitOfWork, settle_time: float = 0.0) -> None:
+        self.uow = uow
+        self.settle_time = settle_time
+
+    def get_since(self, cursor: int, limit: int) -> ChangesSchema:
+        """Returns up to limit changes recorded after cursor.
+
+        Creations of events which were deleted in the meantime are skipped (their tombstones follow), but
+        they still move the cursor forward. Changes after gap in cursors are returned once the gap is filled
+        by transaction which committed later or once it is older than settle time.
+        """
+
+        with self.uow as uow:
+
+            changes = uow.change_repository.get_after(cursor, limit + 1, self.settle_time)
+            has_more = len(changes) > limit
+            changes = changes[:limit]
+
+            events = uow.change_repository.get_events([change.object_id for change in changes
+                                                       if change.type == ChangeType.EVENT_CREATED])
+
+            items = []
+            for change in changes:
+                if change.type != ChangeType.EVENT_CREATED:
+                    items.append(ChangeSchema(cursor=change.id, type=change.type, id=change.object_id))
+                elif change.object_id in events:
+                    items.append(ChangeSchema(cursor=change.id, type=change.type, id=change.object_id,
+                                              event=GetEventSchema.from_orm(events[change.object_id])))
+
+            changes_schema = ChangesSchema(items=items, cursor=changes[-1].id if changes else cursor,
+                                           has_more=has_more)
+
+        return changes_schema
@@ -0,0 +1,449 @@
+"""Event columns module."""
+
+import re
+import math
+import threading
+import importlib.util
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, NamedTuple
+
+
+EPOCH = datetime(1970, 1, 1)
+DAY = 86400
+
+# Dense key spaces up to this size are counted with `bincount`, bigger ones are sorted.
+MAX_DENSE_KEYS = 1 << 24
+
+_NUMBERS = re.compile(r'\d+')
+
+
+def fingerprint(message: str) -> str:
+    """Returns the first line of message with numbers masked, failures with the same cause share it."""
+
+    return _NUMBERS.sub('#', message.split('\n', 1)[0].strip())[:200]
+
+
+def to_seconds(timestamp: datetime) -> int:
+    """Returns naive timestamp as whole seconds since epoch (without conversion to UTC)."""
+
+    return int((timestamp - EPOCH).total_seconds())
+
+
+class ColumnsTest(NamedTuple):
+    """Attributes of test which events are grouped and filtered by."""
+
+    id: int
+    project: str
+    uid: str
+    file: str
+    marks: list[str]
+
+
+class Dictionary:
+    """Dictionary encoding of strings, codes are assigned in order of the first occurrence."""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get(self, value: str) -> int | None:
+        return self._codes.get(value)
+
+    def matching(self, predicate: Callable[[str], bool]) -> 'numpy.ndarray':
+        """Returns boolean array of codes whose values pass predicate."""
+
+        import numpy
+
+        return numpy.fromiter((predicate(value) for value in self.values), bool, len(self.values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class EventColumns:
+    """Columnar snapshot of events (of all projects) for aggregate queries.
+
+    Events are kept in parallel NumPy arrays ordered by id: id, dense code of test, run id (-1 without run),
+    server timestamp in seconds, code of message fingerprint and flag of still existing event. Strings are
+    dictionary encoded and attributes of tests (project, file, marks) are kept per test, so filters and
+    group keys of tests are computed once per test and spread to events by their test codes.
+
+    Snapshot is appended with events newer than `cursor` and deleted events are only flagged, so it is
+    refreshed incrementally. Every query works on whole arrays, there are no loops over events.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    DTYPES = {'ids': 'int64', 'tests': 'int32', 'runs': 'int64', 'timestamps': 'int64', 'fingerprints': 'int32',
+              'alive': 'bool'}
+
+    def __init__(self, enabled: bool = True) -> None:
+        # NumPy is imported when snapshot is used, so it is not loaded by processes which never query analytics
+        self.enabled = enabled and importlib.util.find_spec('numpy') is not None
+        self.refresh_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.cursor = 0  # id of the last appended event
+        self.change_cursor: int | None = None  # cursor of the last applied change, None before the first refresh
+
+        self._size = 0
+        self._capacity = 0
+        self._columns: dict[str, 'numpy.ndarray'] = {}
+        if self.enabled:
+            import numpy
+            self._columns = {name: numpy.zeros(0, dtype) for name, dtype in self.DTYPES.items()}
+
+        self._test_codes: dict[int, int] = {}  # test id -> dense code
+        self._tests: list[ColumnsTest | None] = []  # by code, None when test was deleted
+        self.projects = Dictionary()
+        self.files = Dictionary()
+        self.marks = Dictionary()
+        self.fingerprints = Dictionary()
+        self._test_arrays: dict[str, 'numpy.ndarray'] | None = None  # built from tests when needed
+
+    def invalidate(self) -> None:
+        """Drops snapshot, it is loaded again by the next refresh."""
+
+        with self.refresh_lock, self._lock:
+            self._reset()
+
+    def __len__(self) -> int:
+        return int(self._columns['alive'][:self._size].sum())
+
+    def _grow(self, size: int) -> None:
+        import numpy
+
+        if size <= self._capacity:
+            return
+        capacity = max(self.INITIAL_CAPACITY, self._capacity)
+        while capacity < size:
+            capacity *= 2
+
+        for name, dtype in self.DTYPES.items():
+            column = numpy.zeros(capacity, dtype)
+            column[:self._size] = self._columns[name][:self._size]
+            self._columns[name] = column
+        self._capacity = capacity
+
+    def update_tests(self, tests: Iterable[ColumnsTest]) -> None:
+        """Adds tests or updates their attributes (e.g. marks) which are used by the following queries."""
+
+        with self._lock:
+            for test in tests:
+                code = self._test_codes.get(test.id)
+                if code is None:
+                    code = self._test_codes[test.id] = len(self._tests)
+                    self._tests.append(test)
+                else:
+                    self._tests[code] = test
+            self._test_arrays = None
+
+    def append(self, rows: list[tuple[int, int, int | None, datetime, str]]) -> None:
+        """Appends (id, test id, run id, server timestamp, message) rows ordered by id and newer than cursor.
+
+        Tests of events have to be added with `update_tests` beforehand.
+        """
+
+        if not rows:
+            return
+
+        with self._lock:
+            start, end = self._size, self._size + len(rows)
+            self._grow(end)
+            ids, test_ids, run_ids, timestamps, messages = zip(*rows)
+            columns = self._columns
+            columns['ids'][start:end] = ids
+            columns['tests'][start:end] = [self._test_codes[test_id] for test_id in test_ids]
+            columns['runs'][start:end] = [-1 if run_id is None else run_id for run_id in run_ids]
+            columns['timestamps'][start:end] = [to_seconds(timestamp) for timestamp in timestamps]
+            columns['fingerprints'][start:end] = [self.fingerprints.encode(fingerprint(message))
+                                                  for message in messages]
+            columns['alive'][start:end] = True
+            self._size = end
+            self.cursor = ids[-1]
+
+    def remove(self, event_ids: Iterable[int]) -> None:
+        """Flags deleted events, unknown ids are ignored."""
+
+        import numpy
+
+        event_ids = numpy.fromiter(event_ids, numpy.int64)
+        with self._lock:
+            ids = self._columns['ids'][:self._size]
+            positions = numpy.searchsorted(ids, event_ids)
+            found = positions < len(ids)
+            positions = positions[found]
+            positions = positions[ids[positions] == event_ids[found]]
+            if len(positions):
+                self._columns['alive'][positions] = False
+
+    def remove_tests(self, test_ids: Iterable[int]) -> None:
+        """Flags events of deleted tests, tests are not matched by any filter afterwards."""
+
+        import numpy
+
+        with self._lock:
+            codes = [self._test_codes[test_id] for test_id in test_ids if test_id in self._test_codes]
+            if not codes:
+                return
+            for code in codes:
+                self._tests[code] = None
+            self._columns['alive'][:self._size] &= ~numpy.isin(self._columns['tests'][:self._size], codes)
+            self._test_arrays = None
+
+    def _get_test_arrays(self) -> dict[str, 'numpy.ndarray']:
+        """Returns per-test arrays: project and file codes, existence flags and marks in CSR layout."""
+
+        import numpy
+
+        if self._test_arrays is None:
+            tests = self._tests
+            marks = [[self.marks.encode(mark) for mark in dict.fromkeys(test.marks)] if test else []
+                     for test in tests]
+            counts = numpy.fromiter((len(test_marks) for test_marks in marks), numpy.int64, len(tests))
+            self._test_arrays = {
+                'exists': numpy.fromiter((test is not None for test in tests), bool, len(tests)),
+                'projects': numpy.fromiter((self.projects.encode(test.project) if test else -1 for test in tests),
+                                           numpy.int32, len(tests)),
+                'files': numpy.fromiter((self.files.encode(test.file) if test else -1 for test in tests),
+                                        numpy.int32, len(tests)),
+                'marks_counts': counts,
+                'marks_offsets': numpy.concatenate(([0], numpy.cumsum(counts)[:-1])).astype(numpy.int64),
+                'marks': numpy.fromiter((code for test_marks in marks for code in test_marks), numpy.int32,
+                                        int(counts.sum())),
+            }
+
+        return self._test_arrays
+
+    def select(self, project: str | None = None, start: datetime | None = None, end: datetime | None = None,
+               test_uid: str | None = None, test_file: str | None = None,
+               test_marks: list[str] | None = None) -> 'Selection':
+        """Returns existing events passing filters, uid and file are matched as case-insensitive substrings and
+        tests have to have all given marks."""
+
+        import numpy
+
+        with self._lock:
+            test_arrays = self._get_test_arrays()
+            size = self._size
+            columns = {name: column[:size] for name, column in self._columns.items()}
+            tests = list(self._tests)
+
+        test_mask = test_arrays['exists'].copy()
+        if project is not None:
+            code = self.projects.get(project)
+            test_mask &= test_arrays['projects'] == (-2 if code is None else code)
+        if test_file is not None and tests:
+            test_mask &= self.files.matching(lambda value: test_file.lower() in value.lower())[test_arrays['files']]
+        if test_uid is not None:
+            test_mask &= numpy.fromiter((test is not None and test_uid.lower() in test.uid.lower() for test in tests),
+                                        bool, len(tests))
+        for mark in test_marks or ():
+            code = self.marks.get(mark)
+            has_mark = numpy.zeros(len(tests), bool)
+            if code is not None:
+                owners = numpy.repeat(numpy.arange(len(tests)), test_arrays['marks_counts'])
+                has_mark[owners[test_arrays['marks'] == code]] = True
+            test_mask &= has_mark
+
+        mask = columns['alive'] & test_mask[columns['tests']]
+        if start is not None:
+            mask &= columns['timestamps'] >= to_seconds(start)
+        if end is not None:
+            mask &= columns['timestamps'] <= to_seconds(end)
+
+        return Selection(self, tests, test_arrays, columns, mask)
+
+
+class Selection:
+    """Events selected from snapshot, their columns are copied when they are used for the first time.
+
+    Copied columns do not change when snapshot is refreshed.
+    """
+
+    def __init__(self, snapshot: EventColumns, tests: list[ColumnsTest | None], test_arrays: dict,
+                 columns: dict[str, 'numpy.ndarray'], mask: 'numpy.ndarray') -> None:
+        import numpy
+
+        self.snapshot = snapshot
+        self.tests = tests
+        self.test_arrays = test_arrays
+        self._all_columns = columns
+        self._mask = mask
+        self._columns: dict[str, 'numpy.ndarray'] = {}
+        self._size = int(numpy.count_nonzero(mask))
+        self._first_day = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> 'numpy.ndarray':
+        """Returns column of selected events."""
+
+        if name not in self._columns:
+            self._columns[name] = self._all_columns[name][self._mask]
+        return self._columns[name]
+
+    def counts(self, keys: list[str], limit: int) -> list[tuple[list[str], int]]:
+        """Returns numbers of events grouped by one or two keys, the biggest groups first (ties by keys).
+
+        Events of test are counted once for every its mark, so groups by mark overlap.
+        """
+
+        labels = [self._labels(key) for key in keys]
+        codes = [self._codes(key) for key in keys if key != 'mark']
+
+        if 'mark' not in keys:
+            groups, counts = _count([code for code, _ in codes], [size for _, size in codes])
+        else:
+            sizes = [size for _, size in codes]
+            if len(self.tests) * math.prod(sizes) <= MAX_DENSE_KEYS:
+                # events are counted per test (and other key) first, test counts are spread to marks of tests
+                groups, counts = _count([self.column('tests')] + [code for code, _ in codes], [len(self.tests)] + sizes)
+                owners, marks = self._explode(groups[0])
+                groups, weights = [marks] + [group[owners] for group in groups[1:]], counts[owners]
+            else:
+                owners, marks = self._explode(self.column('tests'))
+                groups, weights = [marks] + [code[owners] for code, _ in codes], None
+            groups, counts = _count(groups, [len(self.snapshot.marks)] + sizes, weights)
+            groups = groups if keys[0] == 'mark' else groups[::-1]
+
+        rows = [([label(int(group[index])) for label, group in zip(labels, groups)], int(counts[index]))
+                for index in _top(counts, limit)]
+
+        return sorted(rows, key=lambda row: (-row[1], row[0]))
+
+    def histogram(self, start: datetime, end: datetime, points: int) -> tuple[float, list[int]]:
+        """Returns bucket size in seconds and numbers of events in `points` equal buckets between start and end."""
+
+        import numpy
+
+        span = to_seconds(end) - to_seconds(start)
+        bucket_size = span / points if span > 0 else 1.0
+        indexes = ((self.column('timestamps') - to_seconds(start)) // bucket_size).astype(numpy.int64)
+        counts = numpy.bincount(numpy.clip(indexes, 0, points - 1), minlength=points)
+
+        return bucket_size, [int(count) for count in counts[:points]]
+
+    def time_range(self) -> tuple[datetime | None, datetime | None]:
+        """Returns server timestamps of the oldest and the newest selected event."""
+
+        if not len(self):
+            return None, None
+
+        timestamps = self.column('timestamps')
+        return (EPOCH + timedelta(seconds=int(timestamps.min())),
+                EPOCH + timedelta(seconds=int(timestamps.max())))
+
+    def co_occurrence(self, by: str, window: int, limit: int) -> tuple[list[ColumnsTest], list[list[int]]]:
+        """Returns the most failing tests and numbers of runs (or time windows) in which every pair of them failed.
+
+        Diagonal holds number of runs (windows) in which the test failed.
+        """
+
+        import numpy
+
+        test_counts = numpy.bincount(self.column('tests'), minlength=len(self.tests))
+        top = _top(test_counts, limit)
+        top = top[test_counts[top] > 0]
+
+        positions = numpy.full(len(self.tests), -1, numpy.int64)
+        positions[top] = numpy.arange(len(top))
+
+        groups = self.column('runs') if by == 'run' else self.column('timestamps') // window
+        selected = (positions[self.column('tests')] >= 0) & (groups >= 0)
+        group_codes, group_index = numpy.unique(groups[selected], return_inverse=True)
+
+        failed = numpy.zeros((len(group_codes), len(top)), numpy.float32)
+        failed[group_index, positions[self.column('tests')[selected]]] = 1.0
+        matrix = (failed.T @ failed).astype(numpy.int64)
+
+        return [self.tests[code] for code in top], matrix.tolist()
+
+    def _codes(self, key: str) -> tuple['numpy.ndarray', int]:
+        """Returns per-event codes of key and size of their space."""
+
+        if key == 'test':
+            return self.column('tests'), len(self.tests)
+        if key == 'file':
+            return self.test_arrays['files'][self.column('tests')], len(self.snapshot.files)
+        if key == 'project':
+            return self.test_arrays['projects'][self.column('tests')], len(self.snapshot.projects)
+        if key == 'fingerprint':
+            return self.column('fingerprints'), len(self.snapshot.fingerprints)
+
+        days = self.column('timestamps') // DAY
+        if not len(days):
+            return days, 1
+        self._first_day = int(days.min())
+        return days - self._first_day, int(days.max()) - self._first_day + 1
+
+    def _labels(self, key: str) -> Callable[[int], str]:
+        if key == 'test':
+            return lambda code: self.tests[code].uid
+        if key == 'day':
+            return lambda code: (EPOCH + timedelta(days=self._first_day + code)).date().isoformat()
+
+        return {'file': self.snapshot.files, 'project': self.snapshot.projects, 'mark': self.snapshot.marks,
+                'fingerprint': self.snapshot.fingerprints}[key].values.__getitem__
+
+    def _explode(self, tests: 'numpy.ndarray') -> tuple['numpy.ndarray', 'numpy.ndarray']:
+        """Returns (position in given array, mark code) pairs for every mark of given tests."""
+
+        import numpy
+
+        counts = self.test_arrays['marks_counts'][tests]
+        owners = numpy.repeat(numpy.arange(len(tests)), counts)
+        starts = numpy.repeat(self.test_arrays['marks_offsets'][tests] - (numpy.cumsum(counts) - counts), counts)
+
+        return owners, self.test_arrays['marks'][starts + numpy.arange(len(owners))]
+
+
+def _count(codes: list['numpy.ndarray'], sizes: list[int],
+           weights: 'numpy.ndarray | None' = None) -> tuple[list['numpy.ndarray'], 'numpy.ndarray']:
+    """Returns distinct combinations of codes (one array per key) and their (weighted) counts."""
+
+    import numpy
+
+    combined = numpy.zeros(len(codes[0]), numpy.int64)
+    space = 1
+    for code, size in zip(codes, sizes):
+        combined = combined * max(size, 1) + code
+        space *= max(size, 1)
+
+    if space <= MAX_DENSE_KEYS:
+        counts = numpy.bincount(combined, weights, minlength=space)
+        keys = numpy.flatnonzero(counts)
+        counts = counts[keys]
+    else:
+        keys, inverse = numpy.unique(combined, return_inverse=True)
+        counts = numpy.bincount(inverse, weights, minlength=len(keys))
+
+    groups = []
+    for size in reversed(sizes):
+        groups.append(keys % max(size, 1))
+        keys = keys // max(size, 1)
+
+    return groups[::-1], counts.astype(numpy.int64)
+
+
+def _top(counts: 'numpy.ndarray', limit: int) -> 'numpy.ndarray':
+    """Returns positions of up to limit the biggest counts, the biggest first (ties by position)."""
+
+    import numpy
+
+    if len(counts) > limit:
+        candidates = numpy.argpartition(-counts, limit - 1)[:limit]
+    else:
+        candidates = numpy.arange(len(counts))
+
+    return candidates[numpy.lexsort((candidates, -counts[candidates]))]
@@ -1,21 +1,41 @@
 """Event service module."""
 
-import json
 from datetime import datetime
+from collections import Counter
 from fastapi import status
 
 from failurebase.services.uow import DatabaseUnitOfWork
-from failurebase.adapters.models import Event, Test
-from failurebase.adapters.exceptions import NotFoundError
-from failurebase.schemas.event import GetEventSchema, CreateEventSchema
+from failurebase.services.cache import TestCache, CachedTest
+from failurebase.services.feed import EventFeed, EventFilter
+from failurebase.services.latest import LatestEvents
+from failurebase.services.rates import FailureRates, RateSample
+from failurebase.services import similarity, suggest
+from failurebase.services.facets import count_facets
+from failurebase.adapters.models import Event, ChangeType, DEFAULT_PROJECT
+from failurebase.adapters.archive import SegmentArchive, ArchivedEvent
+from failurebase.adapters.exceptions import NotFoundError, RunClosedError, ConcurrentUpdateError
+from failurebase.schemas.event import (GetEventSchema, CreateEventSchema, SimilarEventSchema, SimilarEventsSchema,
+                                      FacetsSchema)
+from failurebase.schemas.test import GetTestSchema
 from failurebase.schemas.common import PaginationSchema, IdsSchema, StatusesSchema
 
 
 class EventService:
     """Service to manage Event objects."""
 
-    def __init__(self, uow: DatabaseUnitOfWork) -> None:
+    # Candidates with estimated similarity this much below the requested one are still compared exactly,
+    # standard deviation of the estimate from 64 hashes is at most 0.0625.
+    SIMILARITY_ESTIMATE_MARGIN = 0.15
+
+    def __init__(self, uow: DatabaseUnitOfWork, test_cache: TestCache, event_feed: EventFeed,
+                 failure_rates: FailureRates, archive: SegmentArchive | None = None,
+                 latest_events: LatestEvents | None = None) -> None:
         self.uow = uow
+        self.test_cache = test_cache
+        self.event_feed = event_feed
+        self.failure_rates = failure_rates
+        self.archive = archive
+        self.latest_events = latest_events or LatestEvents(0)
 
     def get_one(self, event_id: int) -> GetEventSchema:
         """Returns single Event by id."""
@@ -30,8 +50,25 @@ class EventService:
                  end_server_timestamp: datetime | None, start_client_timestamp: datetime | None,
                  end_client_timestamp: datetime | None, message: str | None, traceback: str | None,
                  test_uid: str | None, test_marks: list[str] | None, test_file: str | None,
-                 ordering: str | None) -> PaginationSchema:
-        """Returns many Events which are filtered by passed parameters."""
+                 ordering: str | None, run_id: int | None = None) -> PaginationSchema:
+        """Returns many Events which are filtered by passed parameters.
+
+        The newest Events without timestamp (and run) filters are served from buffer of latest Events when
+        possible.
+        """
+
+        project = self.uow.project
+        if self.latest_events.enabled and project is not None and ordering in (None, '-server_timestamp') \
+                and run_id is None and start_server_timestamp is None and end_server_timestamp is None \
+                and start_client_timestamp is None and end_client_timestamp is None:
+            event_filter = EventFilter(message, traceback, test_uid,
+                                       tuple(test_marks) if test_marks is not None else None, test_file)
+            pagination_schema = self.latest_events.get_page(project, page_number, page_limit, event_filter)
+            if pagination_schema is None and not self.latest_events.is_loaded(project):
+                self._load_latest_events(project)
+                pagination_schema = self.latest_events.get_page(project, page_number, page_limit, event_filter)
+            if pagination_schema is not None:
+                return pagination_schema
 
         with self.uow as uow:
 
@@ -39,7 +76,7 @@ class EventService:
                 page_number=page_number, page_limit=page_limit, start_server_timestamp=start_server_timestamp,
                 end_server_timestamp=end_server_timestamp, start_client_timestamp=start_client_timestamp,
                 end_client_timestamp=end_client_timestamp, message=message, traceback=traceback, test_uid=test_uid,
-                test_marks=test_marks, test_file=test_file, ordering=ordering
+                test_marks=test_marks, test_file=test_file, ordering=ordering, run_id=run_id
             )
 
             event_schemas = [GetEventSchema.from_orm(event) for event in paginated_events.chunk]
@@ -51,35 +88,306 @@ class EventService:
 
         return pagination_schema
 
+    def _load_latest_events(self, project: str) -> None:
+        """Fills buffer of latest Events of project from database."""
+
+        generation = self.latest_events.get_generation(project)
+
+        with self.uow as uow:
+            paginated_events = uow.event_repository.get_many(page_number=0, page_limit=self.latest_events.max_size)
+            event_schemas = [GetEventSchema.from_orm(event) for event in paginated_events.chunk]
+
+        self.latest_events.load(project, event_schemas, paginated_events.count, generation)
+
+    def get_facets(self, start_server_timestamp: datetime | None, end_server_timestamp: datetime | None,
+                   start_client_timestamp: datetime | None, end_client_timestamp: datetime | None,
+                   message: str | None, traceback: str | None, test_uid: str | None,
+                   test_marks: list[str] | None, test_file: str | None, max_depth: int | None) -> FacetsSchema:
+        """Returns numbers of Events filtered by passed parameters per mark and per directory of Test file."""
+
+        with self.uow as uow:
+
+            rows = uow.event_repository.get_counts_by_test(
+                start_server_timestamp=start_server_timestamp, end_server_timestamp=end_server_timestamp,
+                start_client_timestamp=start_client_timestamp, end_client_timestamp=end_client_timestamp,
+                message=message, traceback=traceback, test_uid=test_uid, test_marks=test_marks, test_file=test_file
+            )
+
+        return count_facets(rows, max_depth)
+
+    def get_newer(self, event_id: int, limit: int) -> list[GetEventSchema]:
+        """Returns up to limit Events created after Event with given id."""
+
+        with self.uow as uow:
+            events = uow.event_repository.get_newer(event_id, limit)
+            event_schemas = [GetEventSchema.from_orm(event) for event in events]
+
+        return event_schemas
+
+    def get_last_id(self) -> int:
+        """Returns id of the newest Event."""
+
+        with self.uow as uow:
+            return uow.event_repository.get_last_id()
+
     def create(self, event_schema: CreateEventSchema) -> GetEventSchema:
         """Creates new Event and Test if it does not exist in database."""
 
+        resolved_tests = {}
+
         with self.uow as uow:
 
-            try:
-                test_obj = uow.test_repository.get_by_uid(event_schema.test.uid)
-            except NotFoundError:
-                test_obj = None
+            event_obj, test_id = self._create(uow, event_schema, resolved_tests)
+
+            uow.flush()
+            uow.change_repository.add(ChangeType.EVENT_CREATED, [event_obj.id])
+            self._index_similarity(uow, [event_obj])
+
+            counters = uow.test_repository.get_counters([test_id])[test_id]
+            event_schema = self._to_schema(event_obj, event_schema, counters)
+
+            uow.commit()
 
-            if test_obj is None:
-                test_obj = Test(uid=event_schema.test.uid, file=event_schema.test.file,
-                                marks=event_schema.test.serialized_marks, total_events_count=1)
+        self._cache_tests(resolved_tests)
+        self.failure_rates.record([RateSample(event_schema.id, test_id, event_schema.server_timestamp.timestamp())])
+        self.event_feed.notify([event_schema])
+        if self.latest_events.enabled:
+            self.latest_events.add(event_schema.test.project, [event_schema])
 
-            else:
-                test_obj.file = event_schema.test.file
-                test_obj.marks = event_schema.test.serialized_marks
-                test_obj.total_events_count += 1
+        return event_schema
+
+    def create_many(self, event_schemas: list[CreateEventSchema], run_id: int | None = None) -> IdsSchema:
+        """Creates many Events (and their Tests if required) in single transaction, optionally in open Run."""
+
+        resolved_tests = {}
+        created_schemas = []
+
+        with self.uow as uow:
 
-            event_obj = Event(message=event_schema.message, traceback=event_schema.traceback, test=test_obj,
-                              client_timestamp=event_schema.deserialized_timestamp, server_timestamp=datetime.now())
+            if run_id is not None and uow.run_repository.get_by_id(run_id).finished_at is not None:
+                raise RunClosedError(f'Run with id = "{run_id}" is already closed.')
 
-            uow.event_repository.create(event_obj)
+            event_objs = [self._create(uow, event_schema, resolved_tests, run_id)[0]
+                          for event_schema in event_schemas]
+
+            uow.flush()
+            ids_schema = IdsSchema(ids=[event_obj.id for event_obj in event_objs])
+            uow.change_repository.add(ChangeType.EVENT_CREATED, ids_schema.ids)
+            self._index_similarity(uow, event_objs)
+            samples = [RateSample(event_obj.id, event_obj.test_id, event_obj.server_timestamp.timestamp())
+                       for event_obj in event_objs]
+
+            if self.event_feed.wants_notifications or self.latest_events.enabled:
+                counters = uow.test_repository.get_counters([event_obj.test_id for event_obj in event_objs])
+                created_schemas = [self._to_schema(event_obj, event_schema, counters[event_obj.test_id])
+                                   for event_obj, event_schema in zip(event_objs, event_schemas)]
 
             uow.commit()
 
-            event_schema = GetEventSchema.from_orm(event_obj)
+        self._cache_tests(resolved_tests)
+        self.failure_rates.record(samples)
+        self.event_feed.notify(created_schemas)
+        if self.latest_events.enabled:
+            self.latest_events.add(self.uow.project or DEFAULT_PROJECT, created_schemas)
 
-        return event_schema
+        return ids_schema
+
+    def get_similar(self, event_id: int, limit: int, min_similarity: float,
+                    candidates_per_bucket: int) -> SimilarEventsSchema:
+        """Returns Events whose tracebacks are similar to traceback of Event with given id.
+
+        Candidates come from LSH buckets shared with the Event, they are narrowed down by similarity
+        estimated from signatures and the rest is ranked by exact Jaccard similarity of shingles.
+        """
+
+        with self.uow as uow:
+
+            event = uow.event_repository.get_by_id(event_id)
+            shingles = similarity.shingles(event.traceback)
+
+            packed = uow.event_repository.get_signatures([event_id]).get(event_id)
+            signature = similarity.unpack(packed) if packed is not None else similarity.signature(shingles)
+            if signature is None:
+                return SimilarEventsSchema(items=[])
+
+            candidates = Counter(uow.event_repository.get_bucket_members(similarity.buckets(signature),
+                                                                         candidates_per_bucket))
+            candidates.pop(event_id, None)
+
+            estimates = sorted(
+                ((similarity.estimate(signature, similarity.unpack(packed)), candidate_id)
+                 for candidate_id, packed in uow.event_repository.get_signatures(list(candidates)).items()),
+                reverse=True
+            )
+            shortlist = [candidate_id for estimate, candidate_id in estimates
+                         if estimate >= min_similarity - self.SIMILARITY_ESTIMATE_MARGIN][:limit * 5]
+
+            scored = sorted(
+                ((similarity.jaccard(shingles, similarity.shingles(candidate.traceback)), candidate)
+                 for candidate in uow.event_repository.get_by_ids(shortlist)),
+                key=lambda item: (item[0], item[1].id), reverse=True
+            )
+            similar_events_schema = SimilarEventsSchema(items=[
+                SimilarEventSchema(similarity=round(score, 4), event=GetEventSchema.from_orm(candidate))
+                for score, candidate in scored[:limit] if score >= min_similarity
+            ])
+
+        return similar_events_schema
+
+    def index_similarity(self, batch_size: int) -> int:
+        """Computes signatures of Events which do not have them yet, returns number of processed Events."""
+
+        processed = 0
+        last_id = 0
+
+        while True:
+            with self.uow as uow:
+                events = uow.event_repository.get_without_signature(last_id, batch_size)
+                if not events:
+                    break
+                last_id = events[-1].id
+                self._index_similarity(uow, events)
+                uow.commit()
+
+            processed += len(events)
+
+        return processed
+
+    def archive_events(self, before: datetime, batch_size: int) -> int:
+        """Moves Events created before given time to archive segments, returns number of moved Events.
+
+        Segment files are written before Events are deleted and removed when deletion is not committed,
+        so every Event is readable from database or from archive at any time. Moved Events stay counted
+        in their Tests. Archiving stops when other process deleted the same Events first.
+        """
+
+        if self.archive is None or not self.archive.enabled:
+            return 0
+
+        archived = 0
+
+        while True:
+            with self.uow as uow:
+                events = uow.event_repository.get_older(before, batch_size)
+                if not events:
+                    break
+
+                days = {}
+                for event in events:
+                    days.setdefault(event.server_timestamp.date(), []).append(ArchivedEvent(
+                        event.id, event.test_id, event.test.uid, event.message, event.traceback,
+                        event.client_timestamp, event.server_timestamp
+                    ))
+                counts = Counter(event.test_id for event in events)
+                event_ids = [event.id for event in events]
+
+                paths = []
+                try:
+                    for day_events in days.values():
+                        paths.append(self.archive.write(day_events))
+                    uow.event_repository.delete_by_ids(event_ids)
+                    uow.test_repository.add_archived_events_counts(counts)
+                    uow.change_repository.add(ChangeType.EVENT_ARCHIVED, event_ids)
+                    uow.commit()
+                except BaseException as error:
+                    for path in paths:
+                        self.archive.remove(path)
+                    if isinstance(error, ConcurrentUpdateError):
+                        break
+                    raise
+
+            archived += len(event_ids)
+            if len(event_ids) < batch_size:
+                break
+
+        if archived and self.latest_events.enabled:
+            self.latest_events.invalidate()
+
+        return archived
+
+    @staticmethod
+    def _index_similarity(uow: DatabaseUnitOfWork, event_objs: list[Event]) -> None:
+        """Stores MinHash signatures and LSH buckets of tracebacks of Events."""
+
+        signatures = []
+        for event_obj in event_objs:
+            signature = similarity.signature(similarity.shingles(event_obj.traceback))
+            if signature is not None:
+                signatures.append((event_obj.id, similarity.pack(signature), similarity.buckets(signature)))
+
+        uow.event_repository.add_signatures(signatures)
+
+    @staticmethod
+    def _to_schema(event_obj: Event, event_schema: CreateEventSchema,
+                   counters: tuple[int, datetime | None, datetime | None]) -> GetEventSchema:
+        """Returns schema of just created Event without loading it (and its Test) back from database."""
+
+        total_events_count, first_seen, last_seen = counters
+
+        # Values are already validated, `construct` skips validating them again (and parsing marks back).
+        return GetEventSchema.construct(
+            id=event_obj.id,
+            test=GetTestSchema.construct(id=event_obj.test_id, project=event_obj.project, uid=event_schema.test.uid,
+                                         marks=event_schema.test.marks, file=event_schema.test.file,
+                                         total_events_count=total_events_count, first_seen=first_seen,
+                                         last_seen=last_seen),
+            message=event_obj.message,
+            traceback=event_obj.traceback,
+            client_timestamp=event_obj.client_timestamp,
+            server_timestamp=event_obj.server_timestamp,
+            run_id=event_obj.run_id
+        )
+
+    def _create(self, uow: DatabaseUnitOfWork, event_schema: CreateEventSchema,
+                resolved_tests: dict[tuple[str, str], CachedTest], run_id: int | None = None) -> tuple[Event, int]:
+        """Adds new Event to current session and creates or updates its Test, returns event and test id.
+
+        Row of known test is written only when its file or marks changed, unknown tests are upserted.
+        Suggest segments are rebuilt when test is created or its file changes.
+        The event is counted by appending delta, so failures of hot test do not contend for its row.
+        """
+
+        test_schema = event_schema.test
+        marks = test_schema.serialized_marks
+        server_timestamp = datetime.now()
+        test_id = None
+        key = (uow.project or DEFAULT_PROJECT, test_schema.uid)
+
+        cached_test = resolved_tests.get(key) or self.test_cache.get(key)
+        if cached_test is not None:
+            if cached_test.file != test_schema.file or cached_test.marks != marks:
+                if uow.test_repository.update_by_id(cached_test.id, test_schema.uid, file=test_schema.file,
+                                                    marks=marks):
+                    uow.test_repository.add_events_count_delta(cached_test.id, timestamp=server_timestamp)
+                    test_id = cached_test.id
+                    if cached_test.file != test_schema.file:
+                        uow.test_repository.set_segments(test_id, suggest.test_segments(test_schema.uid,
+                                                                                        test_schema.file))
+            elif uow.test_repository.add_events_count_delta(cached_test.id, test_schema.uid,
+                                                            timestamp=server_timestamp):
+                test_id = cached_test.id
+
+        if test_id is None:
+            previous_file = uow.test_repository.get_file_by_uid(test_schema.uid)
+            test_id = uow.test_repository.upsert(test_schema.uid, test_schema.file, marks, server_timestamp)
+            uow.test_repository.add_events_count_delta(test_id, timestamp=server_timestamp)
+            if previous_file != test_schema.file:  # test is new or moved, its suggest segments are (re)built
+                uow.test_repository.set_segments(test_id, suggest.test_segments(test_schema.uid, test_schema.file))
+
+        resolved_tests[key] = CachedTest(test_id, test_schema.file, marks)
+
+        event_obj = Event(message=event_schema.message, traceback=event_schema.traceback, test_id=test_id,
+                          client_timestamp=event_schema.timestamp, server_timestamp=server_timestamp, run_id=run_id)
+
+        uow.event_repository.create(event_obj)
+
+        return event_obj, test_id
+
+    def _cache_tests(self, resolved_tests: dict[tuple[str, str], CachedTest]) -> None:
+        """Remembers tests of committed events."""
+
+        for key, cached_test in resolved_tests.items():
+            self.test_cache.set(key, cached_test)
 
     def delete(self, ids_schema: IdsSchema):
         """Deletes Events by passed ids."""
@@ -90,14 +398,25 @@ class EventService:
 
             with self.uow as uow:
 
+                counts = Counter()
                 for id_ in ids_schema.ids:
                     try:
-                        uow.event_repository.delete_by_id(id_)
+                        event = uow.event_repository.delete_by_id(id_)
                     except NotFoundError:
                         statuses.append({'id': id_, 'status': status.HTTP_404_NOT_FOUND})
                     else:
+                        counts[event.test_id] += 1
                         statuses.append({'id': id_, 'status': status.HTTP_200_OK})
 
+                deleted_ids = [status_['id'] for status_ in statuses if status_['status'] == status.HTTP_200_OK]
+                for test_id, count in counts.items():
+                    uow.test_repository.add_events_count_delta(test_id, delta=-count)
+                uow.change_repository.add(ChangeType.EVENT_DELETED, deleted_ids)
                 uow.commit()
 
+            if self.latest_events.enabled and self.uow.project is None:
+                self.latest_events.invalidate()
+            elif self.latest_events.enabled:
+                self.latest_events.remove(self.uow.project, deleted_ids)
+
         return StatusesSchema(statuses=statuses)
@@ -0,0 +1,54 @@
+"""Facets module."""
+
+import re
+import json
+from collections import Counter
+
+from failurebase.schemas.event import FacetsSchema
+
+_SEPARATORS = re.compile(r'[/\\]')
+
+
+def count_facets(rows: list[tuple[str, str, int]], max_depth: int | None = None) -> FacetsSchema:
+    """Returns numbers of events per mark and per directory from (marks, file, count) rows of tests.
+
+    Directories are prefixes of files which end before path separator, so `path` of directory can be used
+    as file filter of events. Tree is cut at `max_depth` levels (the whole one is returned by default).
+    """
+
+    marks = Counter()
+    root = {'name': '', 'path': '', 'count': 0, 'children': {}}
+
+    for serialized_marks, file, count in rows:
+        root['count'] += count
+
+        for mark in set(json.loads(serialized_marks)):
+            marks[mark] += count
+
+        node, start, depth = root, 0, 0
+        for separator in _SEPARATORS.finditer(file):
+            end = separator.start()
+            if end > start:  # empty names (leading or doubled separators) are skipped
+                if max_depth is not None and depth == max_depth:
+                    break
+                path = file[:end]
+                node = node['children'].setdefault(path, {'name': file[start:end], 'path': path, 'count': 0,
+                                                          'children': {}})
+                node['count'] += count
+                depth += 1
+            start = separator.end()
+
+    return FacetsSchema(
+        count=root['count'],
+        marks=[{'mark': mark, 'count': count}
+               for mark, count in sorted(marks.items(), key=lambda item: (-item[1], item[0]))],
+        directories=_to_tree(root)
+    )
+
+
+def _to_tree(node: dict) -> dict:
+    """Returns directory with list of children, the biggest first."""
+
+    children = sorted(node['children'].values(), key=lambda child: (-child['count'], child['name']))
+
+    return node | {'children': [_to_tree(child) for child in children]}
@@ -0,0 +1,183 @@
+"""Event feed module."""
+
+import json
+import asyncio
+import threading
+from typing import NamedTuple
+from dataclasses import dataclass
+
+from fastapi.encoders import jsonable_encoder
+
+from failurebase.schemas.event import GetEventSchema
+from failurebase.adapters.models import DEFAULT_PROJECT
+
+
+class FeedEvent(NamedTuple):
+    """Event serialized once for all subscribers."""
+
+    id: int
+    data: str
+    test_uid: str
+    test_file: str
+    test_marks: str
+    message: str
+    traceback: str
+    project: str = DEFAULT_PROJECT
+
+
+class Lag(NamedTuple):
+    """Notice that subscriber was too slow and given number of events was dropped."""
+
+    dropped: int
+
+
+@dataclass(frozen=True)
+class EventFilter:
+    """Filters of subscription, they work like the same filters of events list."""
+
+    message: str | None = None
+    traceback: str | None = None
+    test_uid: str | None = None
+    test_marks: tuple[str, ...] | None = None
+    test_file: str | None = None
+    project: str | None = None  # events of all projects by default
+
+    def matches(self, event: FeedEvent) -> bool:
+        """Returns True if event passes all filters."""
+
+        return (self.project in (None, event.project)
+                and _contains(event.message, self.message) and _contains(event.traceback, self.traceback)
+                and _contains(event.test_uid, self.test_uid) and _contains(event.test_file, self.test_file)
+                and all(mark in event.test_marks for mark in self.test_marks or ()))
+
+
+def _contains(value: str, pattern: str | None) -> bool:
+    """Case-insensitive substring match (as ILIKE '%pattern%')."""
+
+    return pattern is None or pattern.lower() in value.lower()
+
+
+class Subscription:
+    """Bounded queue of events for single subscriber, it lives in event loop of the subscriber."""
+
+    def __init__(self, event_filter: EventFilter, max_queue_size: int) -> None:
+        self.event_filter = event_filter
+        self.dropped = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[FeedEvent] = asyncio.Queue(maxsize=max_queue_size)
+
+    def put(self, event: FeedEvent) -> None:
+        """Schedules event to be queued, it can be called from any thread."""
+
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # loop of disconnected subscriber is already closed
+            pass
+
+    def _put(self, event: FeedEvent) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout: float) -> FeedEvent | Lag | None:
+        """Returns lag notice if events were dropped, next event or None if nothing came within timeout."""
+
+        if self.dropped:
+            lag, self.dropped = Lag(self.dropped), 0
+            return lag
+
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventFeed:
+    """In-process broker which fans out newly created events to subscribers.
+
+    Events are published by `EventService` of the same process. When app runs in many workers the feed
+    polls events table instead (`poll` is called periodically), so every subscriber gets events created
+    by all workers.
+    """
+
+    def __init__(self, max_queue_size: int, polling: bool = False, poll_batch_size: int = 1000) -> None:
+        self.max_queue_size = max_queue_size
+        self.polling = polling
+        self.poll_batch_size = poll_batch_size
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._last_id: int | None = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        """Returns True if anybody listens."""
+
+        return bool(self._subscriptions)
+
+    @property
+    def wants_notifications(self) -> bool:
+        """Returns True if services should pass created events to `notify`."""
+
+        return not self.polling and self.has_subscribers
+
+    def subscribe(self, event_filter: EventFilter) -> Subscription:
+        """Registers subscriber, it has to be called from running event loop."""
+
+        subscription = Subscription(event_filter, self.max_queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes subscriber."""
+
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def notify(self, events: list[GetEventSchema]) -> None:
+        """Publishes events created by this process, it does nothing when feed polls database."""
+
+        if self.wants_notifications:
+            self.publish(events)
+
+    def publish(self, events: list[GetEventSchema]) -> None:
+        """Passes events to matching subscribers."""
+
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        if not subscriptions:
+            return
+
+        for event in events:
+            content = jsonable_encoder(event)
+            feed_event = FeedEvent(event.id, json.dumps(content), event.test.uid, event.test.file,
+                                   json.dumps(content['test']['marks']), event.message, event.traceback,
+                                   event.test.project)
+            for subscription in subscriptions:
+                if subscription.event_filter.matches(feed_event):
+                    subscription.put(feed_event)
+
+    def poll(self, event_service) -> int:
+        """Publishes events created since the previous poll, returns number of published events.
+
+        Polling starts from the newest event when the first subscriber appears and stops when the last one
+        leaves, so idle feed does not query database.
+        """
+
+        if not self.has_subscribers:
+            self._last_id = None
+            return 0
+
+        if self._last_id is None:
+            self._last_id = event_service.get_last_id()
+            return 0
+
+        events = event_service.get_newer(self._last_id, self.poll_batch_size)
+        if events:
+            self._last_id = events[-1].id
+            self.publish(events)
+
+        return len(events)
@@ -0,0 +1,194 @@
+"""Latest events module."""
+
+import json
+import bisect
+import threading
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from fastapi.encoders import jsonable_encoder
+
+from failurebase.services.feed import EventFilter, FeedEvent
+from failurebase.schemas.event import GetEventSchema
+from failurebase.schemas.common import PaginationSchema
+
+
+class _Entry(NamedTuple):
+    """Buffered event serialized without its test."""
+
+    key: tuple[datetime, int]  # (server timestamp, id), entries are sorted by it
+    test_id: int
+    content: dict
+
+
+class _TestState(NamedTuple):
+    """The newest known state of test of buffered events."""
+
+    content: dict
+    marks: str
+
+
+class _Buffer:
+    """Buffered events of single project."""
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.count = 0  # number of all events of project
+        self.generation = 0  # incremented by every change, load started before change is discarded
+        self.entries: list[_Entry] = []
+        self.tests: dict[int, _TestState] = {}
+
+
+class LatestEvents:
+    """Bounded in-memory buffers of the newest events of projects, serialized, which serve the default events list.
+
+    Buffer of project is loaded from database by the first request it cannot answer, then it is fed by
+    events created and deleted by this process, so it can be used only when all writes go through one
+    process (it is enabled by setting). Tests of buffered events are kept separately
+    and updated by every created event, so all events of the same test show its current counters.
+
+    Pages of events without filters are served while they fit into the buffer, filtered pages only
+    while the buffer holds all events of project (otherwise their count is not known).
+    """
+
+    def __init__(self, max_size: int, enabled: bool = True) -> None:
+        self.max_size = max_size
+        self.enabled = enabled and max_size > 0
+        self._buffers: dict[str, _Buffer] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, project: str) -> bool:
+        """Returns True if buffer of project is loaded."""
+
+        with self._lock:
+            return self._buffer(project).loaded
+
+    def get_generation(self, project: str) -> int:
+        """Returns generation of buffer of project which has to be passed to `load`."""
+
+        with self._lock:
+            return self._buffer(project).generation
+
+    def load(self, project: str, events: Iterable[GetEventSchema], count: int, generation: int) -> bool:
+        """Replaces buffer with events read from database, returns False if it changed since `generation`."""
+
+        entries, tests = [], {}
+        for event in events:
+            entry, test_state = self._serialize(event)
+            entries.append(entry)
+            tests.setdefault(entry.test_id, test_state)
+        entries.sort(key=lambda entry: entry.key)
+
+        with self._lock:
+            buffer = self._buffer(project)
+            if generation != buffer.generation:
+                return False
+            buffer.entries = entries[-self.max_size:]
+            buffer.tests = tests
+            buffer.count = count
+            buffer.loaded = True
+
+        return True
+
+    def add(self, project: str, events: Iterable[GetEventSchema]) -> None:
+        """Adds created events."""
+
+        serialized = [self._serialize(event) for event in events]
+
+        with self._lock:
+            buffer = self._buffer(project)
+            buffer.generation += 1
+            if not buffer.loaded:
+                return
+
+            for entry, test_state in serialized:
+                buffer.count += 1
+                buffer.tests[entry.test_id] = test_state
+                if len(buffer.entries) >= self.max_size and entry.key < buffer.entries[0].key:
+                    continue
+                bisect.insort(buffer.entries, entry, key=lambda item: item.key)
+                if len(buffer.entries) > self.max_size:
+                    del buffer.entries[0]
+
+            self._prune_tests(buffer)
+
+    def remove(self, project: str, event_ids: Iterable[int]) -> None:
+        """Removes deleted events."""
+
+        event_ids = set(event_ids)
+
+        with self._lock:
+            buffer = self._buffer(project)
+            buffer.generation += 1
+            if not buffer.loaded or not event_ids:
+                return
+
+            buffer.entries = [entry for entry in buffer.entries if entry.key[1] not in event_ids]
+            buffer.count -= len(event_ids)
+            self._prune_tests(buffer)
+
+    def invalidate(self, project: str | None = None) -> None:
+        """Drops buffer of project (of all projects by default), it is loaded again by the next request."""
+
+        with self._lock:
+            for name in [project] if project is not None else list(self._buffers):
+                buffer = self._buffer(name)
+                buffer.generation += 1
+                buffer.loaded = False
+                buffer.entries = []
+                buffer.tests = {}
+
+    def get_page(self, project: str, page_number: int, page_limit: int,
+                 event_filter: EventFilter) -> PaginationSchema | None:
+        """Returns page of the newest events or None if it cannot be served from buffer."""
+
+        offset = page_number * page_limit
+
+        with self._lock:
+            buffer = self._buffer(project)
+            if not buffer.loaded:
+                return None
+
+            complete = buffer.count == len(buffer.entries)
+            if event_filter == EventFilter():
+                if not complete and offset + page_limit > len(buffer.entries):
+                    return None
+                count = buffer.count
+                entries = buffer.entries[::-1][offset:offset + page_limit]
+            else:
+                if not complete:
+                    return None
+                matched = [entry for entry in reversed(buffer.entries)
+                           if event_filter.matches(self._feed_event(buffer, entry))]
+                count = len(matched)
+                entries = matched[offset:offset + page_limit]
+
+            items = [{**entry.content, 'test': buffer.tests[entry.test_id].content} for entry in entries]
+
+        return PaginationSchema.construct(items=items, count=count, page_number=page_number, page_limit=page_limit,
+                                          next_page=offset + page_limit < count, prev_page=page_number > 0)
+
+    def _buffer(self, project: str) -> _Buffer:
+        buffer = self._buffers.get(project)
+        if buffer is None:
+            buffer = self._buffers[project] = _Buffer()
+
+        return buffer
+
+    @staticmethod
+    def _feed_event(buffer: _Buffer, entry: _Entry) -> FeedEvent:
+        test_state = buffer.tests[entry.test_id]
+        return FeedEvent(entry.key[1], '', test_state.content['uid'], test_state.content['file'], test_state.marks,
+                         entry.content['message'], entry.content['traceback'], test_state.content['project'])
+
+    def _prune_tests(self, buffer: _Buffer) -> None:
+        if len(buffer.tests) > 2 * self.max_size:
+            test_ids = {entry.test_id for entry in buffer.entries}
+            buffer.tests = {test_id: state for test_id, state in buffer.tests.items() if test_id in test_ids}
+
+    @staticmethod
+    def _serialize(event: GetEventSchema) -> tuple[_Entry, _TestState]:
+        content = jsonable_encoder(event)
+        test_content = content.pop('test')
+        return (_Entry((event.server_timestamp, event.id), event.test.id, content),
+                _TestState(test_content, json.dumps(test_content['marks'])))
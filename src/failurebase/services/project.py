@@ -0,0 +1,82 @@
+"""Project service module."""
+
+from datetime import datetime, timedelta
+from collections import Counter
+
+from failurebase.services.uow import DatabaseUnitOfWork
+from failurebase.services.latest import LatestEvents
+from failurebase.adapters.models import ChangeType
+from failurebase.adapters.exceptions import ConcurrentUpdateError
+from failurebase.schemas.project import ProjectSchema, ProjectsSchema, UpdateProjectSchema
+
+
+class ProjectService:
+    """Service to manage projects, it works with all of them (its unit of work is not scoped)."""
+
+    def __init__(self, uow: DatabaseUnitOfWork, latest_events: LatestEvents | None = None) -> None:
+        self.uow = uow
+        self.latest_events = latest_events or LatestEvents(0)
+
+    def get_many(self) -> ProjectsSchema:
+        """Returns projects which have some tests or settings, with their counts."""
+
+        with self.uow as uow:
+            counts = {name: (tests_count, events_count)
+                      for name, tests_count, events_count in uow.test_repository.get_project_counts()}
+            retentions = {project.name: project.retention_days for project in uow.project_repository.get_all()}
+
+        return ProjectsSchema(items=[
+            ProjectSchema(name=name, tests_count=counts.get(name, (0, 0))[0], events_count=counts.get(name, (0, 0))[1],
+                          retention_days=retentions.get(name))
+            for name in sorted(counts.keys() | retentions.keys())
+        ])
+
+    def update(self, name: str, project_schema: UpdateProjectSchema) -> ProjectSchema:
+        """Stores settings of project."""
+
+        with self.uow as uow:
+            uow.project_repository.save(name, retention_days=project_schema.retention_days)
+            uow.commit()
+
+        return next(project for project in self.get_many().items if project.name == name)
+
+    def apply_retention(self, batch_size: int) -> int:
+        """Deletes Events older than retention of their projects, returns number of deleted Events.
+
+        Events are deleted in batches by range scan of `(project, server_timestamp)` index. Archived
+        Events are not deleted, project whose Events are being deleted by other process is skipped.
+        """
+
+        with self.uow as uow:
+            retentions = [(project.name, project.retention_days)
+                          for project in uow.project_repository.get_with_retention()]
+
+        deleted = 0
+
+        for name, retention_days in retentions:
+            before = datetime.now() - timedelta(days=retention_days)
+            project_uow = self.uow.for_project(name)
+
+            while True:
+                with project_uow as uow:
+                    events = uow.event_repository.get_older(before, batch_size)
+                    if not events:
+                        break
+                    event_ids = [event.id for event in events]
+                    counts = Counter(event.test_id for event in events)
+                    try:
+                        uow.event_repository.delete_by_ids(event_ids)
+                    except ConcurrentUpdateError:
+                        break
+                    for test_id, count in counts.items():
+                        uow.test_repository.add_events_count_delta(test_id, delta=-count)
+                    uow.change_repository.add(ChangeType.EVENT_DELETED, event_ids)
+                    uow.commit()
+
+                if self.latest_events.enabled:
+                    self.latest_events.remove(name, event_ids)
+                deleted += len(event_ids)
+                if len(event_ids) < batch_size:
+                    break
+
+        return deleted
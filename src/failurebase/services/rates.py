@@ -0,0 +1,138 @@
+"""Failure rates module."""
+
+import math
+import threading
+from typing import NamedTuple, Iterable
+
+
+class RateSample(NamedTuple):
+    """Single failure applied to rates."""
+
+    event_id: int
+    test_id: int
+    timestamp: float
+
+
+class Anomaly(NamedTuple):
+    """Test failing more often than usually, rates are given in failures per hour."""
+
+    test_id: int
+    current_rate: float
+    baseline_rate: float
+    score: float
+
+
+class FailureRates:
+    """Exponentially weighted failure rates of tests, recent one and long-term baseline.
+
+    Every test has fixed-size state: two exponentially decayed counts of failures and time they were
+    decayed to. Contribution of failure from time `t` to the count is `exp(-(now - t) / tau)`, so the
+    state does not depend on the order in which failures are applied, which makes it possible to rebuild
+    it by replaying stored events while new ones are recorded.
+
+    Events are recorded by ingestion of this process and the rest (events from other workers, and all
+    events after restart) is replayed from database when `synced` is set. Replay reads events after cursor,
+    which is moved only past events that surely committed, so events after it can be read again. Ids of
+    events applied after cursor are remembered, so no event is counted twice (whether it is recorded or
+    replayed first), and events up to cursor are never applied again.
+    """
+
+    # Failures older than this many baseline half-lives are not replayed, they would add less than 0.4%.
+    REPLAY_HALF_LIVES = 8
+
+    def __init__(self, short_half_life: float, long_half_life: float, synced: bool = True) -> None:
+        self.short_tau = short_half_life / math.log(2)
+        self.long_tau = long_half_life / math.log(2)
+        self.replay_horizon = long_half_life * self.REPLAY_HALF_LIVES
+        self.synced = synced
+        self.cursor: int | None = None  # id up to which all events were replayed
+        self._states: dict[int, list[float]] = {}  # test id -> [short count, long count, timestamp]
+        self._applied: set[int] = set()  # ids of applied events after cursor
+        self._lock = threading.Lock()
+
+    def record(self, samples: Iterable[RateSample]) -> None:
+        """Applies failures ingested by this process."""
+
+        with self._lock:
+            for sample in samples:
+                if not self.synced:
+                    self._apply(sample)
+                elif self._is_new(sample):
+                    self._apply(sample)
+                    self._applied.add(sample.event_id)
+
+    def replay(self, samples: Iterable[RateSample], cursor: int) -> None:
+        """Applies failures read from database which were not applied yet and moves cursor.
+
+        All events up to cursor have to be among replayed ones (or the ones replayed before).
+        """
+
+        with self._lock:
+            for sample in samples:
+                if self._is_new(sample):
+                    self._apply(sample)
+                    self._applied.add(sample.event_id)
+            self.cursor = max(cursor, self.cursor or 0)
+            self._applied = {event_id for event_id in self._applied if event_id > self.cursor}
+
+    def _is_new(self, sample: RateSample) -> bool:
+        return sample.event_id > (self.cursor or 0) and sample.event_id not in self._applied
+
+    def forget(self, test_ids: Iterable[int]) -> None:
+        """Removes states of deleted tests."""
+
+        with self._lock:
+            for test_id in test_ids:
+                self._states.pop(test_id, None)
+
+    def _apply(self, sample: RateSample) -> None:
+        state = self._states.get(sample.test_id)
+        if state is None:
+            self._states[sample.test_id] = [1.0, 1.0, sample.timestamp]
+        elif sample.timestamp >= state[2]:
+            elapsed = sample.timestamp - state[2]
+            state[0] = state[0] * math.exp(-elapsed / self.short_tau) + 1.0
+            state[1] = state[1] * math.exp(-elapsed / self.long_tau) + 1.0
+            state[2] = sample.timestamp
+        else:
+            age = state[2] - sample.timestamp
+            state[0] += math.exp(-age / self.short_tau)
+            state[1] += math.exp(-age / self.long_tau)
+
+    def recent_counts(self, test_ids: Iterable[int], now: float) -> dict[int, float]:
+        """Returns recent (exponentially weighted with short half-life) failure counts of tests."""
+
+        with self._lock:
+            states = [(test_id, self._states.get(test_id)) for test_id in test_ids]
+
+        return {test_id: state[0] * math.exp(-max(0.0, now - state[2]) / self.short_tau) if state else 0.0
+                for test_id, state in states}
+
+    def anomalies(self, now: float, threshold: float, min_events: float) -> list[Anomaly]:
+        """Returns tests whose recent failure count exceeds count expected from baseline, the worst first.
+
+        Score is deviation of recent (decayed) failure count from the count expected at baseline rate,
+        in standard deviations of Poisson distribution (with one failure added to avoid division by zero).
+        """
+
+        with self._lock:
+            states = [(test_id, *state) for test_id, state in self._states.items()]
+
+        anomalies = []
+        for test_id, short_count, long_count, timestamp in states:
+            elapsed = max(0.0, now - timestamp)
+            short_count *= math.exp(-elapsed / self.short_tau)
+            if short_count < min_events:
+                continue
+            long_count *= math.exp(-elapsed / self.long_tau)
+
+            expected = long_count / self.long_tau * self.short_tau
+            score = (short_count - expected) / math.sqrt(expected + 1.0)
+            if score >= threshold:
+                anomalies.append(Anomaly(test_id, short_count / self.short_tau * 3600,
+                                         long_count / self.long_tau * 3600, score))
+
+        return sorted(anomalies, key=lambda anomaly: anomaly.score, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._states)
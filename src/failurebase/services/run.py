@@ -0,0 +1,68 @@
+"""Run service module."""
+
+from datetime import datetime
+
+from failurebase.services.uow import DatabaseUnitOfWork
+from failurebase.adapters.models import Run
+from failurebase.adapters.exceptions import RunClosedError
+from failurebase.schemas.run import CreateRunSchema, CloseRunSchema, GetRunSchema
+from failurebase.schemas.common import PaginationSchema
+
+
+class RunService:
+    """Service to manage lifecycle of runs, failures are appended to them by `EventService.create_many`."""
+
+    def __init__(self, uow: DatabaseUnitOfWork) -> None:
+        self.uow = uow
+
+    def get_one(self, run_id: int) -> GetRunSchema:
+        """Returns single Run by id."""
+
+        with self.uow as uow:
+            run = uow.run_repository.get_by_id(run_id)
+            run_schema = GetRunSchema.from_orm(run)
+
+        return run_schema
+
+    def get_many(self, page_number: int, page_limit: int, branch: str | None) -> PaginationSchema:
+        """Returns many Runs, the most recently started first."""
+
+        with self.uow as uow:
+            paginated_runs = uow.run_repository.get_many(page_number=page_number, page_limit=page_limit,
+                                                         branch=branch)
+            pagination_schema = PaginationSchema(
+                items=[GetRunSchema.from_orm(run) for run in paginated_runs.chunk], count=paginated_runs.count,
+                page_number=paginated_runs.page_number, page_limit=paginated_runs.page_limit,
+                next_page=paginated_runs.next_page, prev_page=paginated_runs.prev_page
+            )
+
+        return pagination_schema
+
+    def open(self, run_schema: CreateRunSchema) -> GetRunSchema:
+        """Creates new Run which accepts failures until it is closed."""
+
+        with self.uow as uow:
+            run = uow.run_repository.create(Run(name=run_schema.name, branch=run_schema.branch,
+                                                commit=run_schema.commit,
+                                                started_at=run_schema.started_at or datetime.now()))
+            uow.flush()
+            run_schema = GetRunSchema.from_orm(run)
+            uow.commit()
+
+        return run_schema
+
+    def close(self, run_id: int, close_schema: CloseRunSchema) -> GetRunSchema:
+        """Closes Run and stores its summary counters, failures cannot be appended to closed Run."""
+
+        with self.uow as uow:
+            run = uow.run_repository.get_by_id(run_id)
+            if run.finished_at is not None:
+                raise RunClosedError(f'Run with id = "{run_id}" is already closed.')
+
+            run.events_count, run.tests_count, run.new_tests_count = uow.run_repository.get_counters(
+                run_id, run.started_at)
+            run.finished_at = close_schema.finished_at or datetime.now()
+            run_schema = GetRunSchema.from_orm(run)
+            uow.commit()
+
+        return run_schema
@@ -0,0 +1,110 @@
+"""Similarity module.
+
+Tracebacks are compared as sets of shingles (three consecutive tokens, digits are masked so line numbers
+and parameter values do not matter much). Every set is summarized by MinHash signature computed with one
+permutation hashing: each shingle is hashed once and falls into one of `SIGNATURE_SIZE` bins which keep the
+minimal value (empty bins borrow the value of the next non-empty one). The fraction of equal positions of
+two signatures estimates Jaccard similarity of their sets.
+
+Signatures are split into `BANDS` bands and every band is hashed into bucket key. Events which share at
+least one bucket are candidates, with 16 bands of 4 rows the pair with similarity 0.5 becomes candidate
+with probability 0.64 and the pair with similarity 0.8 with probability 0.999.
+
+Changing any constant here invalidates stored signatures and buckets.
+"""
+
+import re
+import struct
+import hashlib
+
+
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+SHINGLE_SIZE = 3
+
+_EMPTY = 1 << 32
+_OFFSET = 0x9E3779B1  # added per step of borrowing, so borrowed values differ from original ones
+_SIGNATURE_FORMAT = f'<{SIGNATURE_SIZE}I'
+
+_TOKENS = re.compile(r'[a-z_]+|\d+|[^\sa-z_\d]')
+
+
+def _hash(data: bytes) -> int:
+    """Returns stable (not randomized per process) 64-bit hash."""
+
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def shingles(text: str) -> set[str]:
+    """Returns shingles of normalized text."""
+
+    tokens = ['#' if token[0].isdigit() else token for token in _TOKENS.findall(text.lower())]
+    if len(tokens) <= SHINGLE_SIZE:
+        return {' '.join(tokens)} if tokens else set()
+
+    return {' '.join(tokens[index:index + SHINGLE_SIZE]) for index in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(first: set, second: set) -> float:
+    """Returns Jaccard similarity of two sets."""
+
+    if not first and not second:
+        return 1.0
+
+    return len(first & second) / len(first | second)
+
+
+def signature(shingle_set: set[str]) -> tuple[int, ...] | None:
+    """Returns MinHash signature of shingles or None if there are no shingles."""
+
+    if not shingle_set:
+        return None
+
+    bins = [_EMPTY] * SIGNATURE_SIZE
+    for shingle in shingle_set:
+        value = _hash(shingle.encode())
+        index = value % SIGNATURE_SIZE
+        value >>= 32
+        if value < bins[index]:
+            bins[index] = value
+
+    if _EMPTY in bins:
+        filled = [index for index, value in enumerate(bins) if value != _EMPTY]
+        densified = list(bins)
+        for index, value in enumerate(bins):
+            if value == _EMPTY:
+                steps = min((filled_index - index) % SIGNATURE_SIZE for filled_index in filled)
+                densified[index] = (bins[(index + steps) % SIGNATURE_SIZE] + steps * _OFFSET) & 0xFFFFFFFF
+        bins = densified
+
+    return tuple(bins)
+
+
+def estimate(first: tuple[int, ...], second: tuple[int, ...]) -> float:
+    """Returns Jaccard similarity estimated from two signatures."""
+
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_SIZE
+
+
+def buckets(signature_: tuple[int, ...]) -> list[int]:
+    """Returns LSH bucket keys (signed 64-bit integers) of signature, one per band."""
+
+    keys = []
+    for band in range(BANDS):
+        data = struct.pack(f'<H{ROWS}I', band, *signature_[band * ROWS:(band + 1) * ROWS])
+        keys.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True))
+
+    return keys
+
+
+def pack(signature_: tuple[int, ...]) -> bytes:
+    """Returns compact binary form of signature."""
+
+    return struct.pack(_SIGNATURE_FORMAT, *signature_)
+
+
+def unpack(data: bytes) -> tuple[int, ...]:
+    """Returns signature from its binary form."""
+
+    return struct.unpack(_SIGNATURE_FORMAT, data)
@@ -0,0 +1,99 @@
+"""Single flight module."""
+
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Callable, Hashable
+from concurrent.futures import Future
+
+from starlette.concurrency import run_in_threadpool
+
+
+# before Python 3.11 timeouts of futures and of asyncio are not built-in `TimeoutError`
+TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, concurrent.futures.TimeoutError)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls, so they share one execution and its result.
+
+    The first caller of given key runs the function and the callers which come while it runs wait for its
+    result (or exception, which is raised to all of them). Waiting is bounded, waiter which does not get
+    the result in `timeout` seconds runs the function itself. Results are not cached, the next call after
+    execution finished runs the function again.
+
+    Sync callers (threads) and async callers (event loop) share in-flight executions, async waiters
+    do not occupy threads while they wait. Execution may outlive the caller which started it, so function
+    must not use resources of that caller (e.g. session of its request).
+    """
+
+    def __init__(self) -> None:
+        self.executed = 0
+        self.coalesced = 0
+        self.timed_out = 0
+        self._calls: dict[Hashable, Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any], timeout: float) -> Any:
+        """Returns result of function, shared with concurrent calls of the same key."""
+
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, func)
+            return future.result()
+
+        try:
+            return future.result(timeout)
+        except TIMEOUT_ERRORS:
+            return self._fallback(func)
+
+    async def do_async(self, key: Hashable, func: Callable[[], Any], timeout: float) -> Any:
+        """Returns result of (sync) function run in threadpool, shared with concurrent calls of the same key."""
+
+        future, leader = self._join(key)
+        if leader:
+            # Execution is not cancelled with the leader (e.g. when its client disconnects), others wait for it.
+            task = asyncio.ensure_future(run_in_threadpool(self._run, key, future, func))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), None if leader else timeout)
+        except TIMEOUT_ERRORS:
+            return await run_in_threadpool(self._fallback, func)
+
+    def metrics(self) -> dict:
+        """Returns numbers of executions, of callers which shared them and of callers which did not wait."""
+
+        return {'in_flight': len(self._calls), 'executed': self.executed, 'coalesced': self.coalesced,
+                'timed_out': self.timed_out}
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+
+            future = self._calls[key] = Future()
+            self.executed += 1
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, func: Callable[[], Any]) -> None:
+        try:
+            result = func()
+        except BaseException as error:
+            self._finish(key)
+            future.set_exception(error)
+        else:
+            self._finish(key)
+            future.set_result(result)
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            del self._calls[key]
+
+    def _fallback(self, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.timed_out += 1
+        return func()
@@ -0,0 +1,46 @@
+"""Suggest module.
+
+Test uid and file are indexed by their segments: lowercased suffixes which start at the beginning of some
+word (run of letters and digits), cut to `SEGMENT_LENGTH` characters. Text typed by user is a prefix of
+some segment when it starts at word boundary of the indexed value, e.g. `valid_lo`, `login/valid` and
+`atests/login` all match `webui/tests/atests/login/valid_login_DS18`. Prefix of segment is looked up with
+range scan of ordered index, so lookup does not depend on the number of tests.
+"""
+
+import re
+
+
+SEGMENT_LENGTH = 100
+MAX_SEGMENTS = 64  # per value, words further away from the beginning of very long values are not indexed
+
+# Greater than any character, `prefix <= segment < prefix + _MAX_CHARACTER` holds for segments with prefix.
+_MAX_CHARACTER = '\U0010ffff'
+
+_WORDS = re.compile(r'[^\W_]+')
+
+
+def segments(value: str) -> set[str]:
+    """Returns segments of value."""
+
+    value = value.lower()
+    starts = [0] + [word.start() for word in _WORDS.finditer(value)]
+
+    return {value[start:start + SEGMENT_LENGTH] for start in starts[:MAX_SEGMENTS]} - {''}
+
+
+def prefix_range(query: str) -> tuple[str, str] | None:
+    """Returns bounds of segments which start with normalized query or None if query has no words."""
+
+    word = _WORDS.search(query.lower())
+    if word is None:
+        return None
+
+    prefix = query.lower()[word.start():][:SEGMENT_LENGTH]
+
+    return prefix, prefix + _MAX_CHARACTER
+
+
+def test_segments(uid: str, file: str) -> dict[str, set[str]]:
+    """Returns segments of test per field."""
+
+    return {'uid': segments(uid), 'file': segments(file)}
@@ -1,18 +1,31 @@
 """Test service module."""
 
+import time
+from datetime import datetime, timedelta
 from fastapi import status
 
 from failurebase.services.uow import DatabaseUnitOfWork
-from failurebase.schemas.test import GetTestSchema
+from failurebase.services.cache import TestCache
+from failurebase.services.rates import FailureRates, RateSample
+from failurebase.services.latest import LatestEvents
+from failurebase.services import suggest
+from failurebase.schemas.test import (GetTestSchema, AnomalySchema, AnomaliesSchema, HistorySchema, HistoryPointSchema,
+                                     SuggestionSchema, SuggestionsSchema)
 from failurebase.schemas.common import IdsSchema, StatusesSchema, PaginationSchema
-from failurebase.adapters.exceptions import NotFoundError
+from failurebase.adapters.models import ChangeType
+from failurebase.adapters.exceptions import NotFoundError, ConcurrentUpdateError
 
 
 class TestService:
     """Service to manage Test objects."""
 
-    def __init__(self, uow: DatabaseUnitOfWork) -> None:
+    def __init__(self, uow: DatabaseUnitOfWork, test_cache: TestCache, failure_rates: FailureRates,
+                 latest_events: LatestEvents | None = None, settle_time: float = 0.0) -> None:
         self.uow = uow
+        self.test_cache = test_cache
+        self.failure_rates = failure_rates
+        self.latest_events = latest_events or LatestEvents(0)
+        self.settle_time = settle_time
 
     def get_many(self, page_number: int, page_limit: int, uid: str | None, file: str | None,
                  marks: str | None, ordering: str | None) -> list[GetTestSchema]:
@@ -42,6 +55,87 @@ class TestService:
 
         return test_schema
 
+    def suggest(self, query: str, fields: tuple[str, ...], limit: int, candidates: int) -> SuggestionsSchema:
+        """Returns Tests whose uid or file has word starting with query, the most recently failing first.
+
+        Up to `candidates` matching Tests are read from segment index and ranked by recent failure count
+        (then by total events count), so very short queries rank only part of their matches.
+        """
+
+        bounds = suggest.prefix_range(query)
+        if bounds is None:
+            return SuggestionsSchema(items=[])
+
+        with self.uow as uow:
+            test_ids = uow.test_repository.get_ids_by_segment_prefix(bounds, fields, candidates)
+            test_schemas = [GetTestSchema.from_orm(test) for test in uow.test_repository.get_by_ids(test_ids)]
+
+        recent_counts = self.failure_rates.recent_counts([test.id for test in test_schemas], time.time())
+        test_schemas.sort(key=lambda test: (recent_counts[test.id], test.total_events_count, test.uid), reverse=True)
+
+        return SuggestionsSchema(items=[SuggestionSchema(test=test, recent_failures=recent_counts[test.id])
+                                        for test in test_schemas[:limit]])
+
+    def index_segments(self, batch_size: int) -> int:
+        """Builds suggest segments of Tests stored before they were introduced, returns number of Tests."""
+
+        processed = 0
+        last_id = 0
+
+        while True:
+            with self.uow as uow:
+                tests = uow.test_repository.get_without_segments(last_id, batch_size)
+                if not tests:
+                    break
+                last_id = tests[-1].id
+                for test in tests:
+                    uow.test_repository.set_segments(test.id, suggest.test_segments(test.uid, test.file), test.project)
+                uow.commit()
+
+            processed += len(tests)
+
+        return processed
+
+    def get_history(self, test_id: int, start: datetime | None, end: datetime | None,
+                    points: int) -> HistorySchema:
+        """Returns numbers of Events of Test in `points` equal buckets between start and end.
+
+        Range defaults to first and last seen time of the Test. Empty buckets are included, so the timeline
+        has always the requested number of points (a single one when range is empty).
+        """
+
+        # server timestamps are naive local times
+        start, end = (value.astimezone().replace(tzinfo=None) if value is not None and value.tzinfo else value
+                      for value in (start, end))
+
+        with self.uow as uow:
+            test = uow.test_repository.get_by_id(test_id)
+            test_schema = GetTestSchema.from_orm(test)
+
+            if start is None or end is None:
+                first_seen, last_seen = test_schema.first_seen, test_schema.last_seen
+                if first_seen is None or last_seen is None:  # test stored before seen times were tracked
+                    first_seen, last_seen = uow.event_repository.get_time_range(test_schema.id)
+                start, end = start or first_seen, end or last_seen
+
+            if start is None or end is None or start > end:
+                return HistorySchema(test=test_schema, start=start, end=end, bucket_size=0, points=[])
+
+            span = (end - start).total_seconds()
+            if span <= 0:
+                points, bucket_size = 1, 1.0
+            else:
+                bucket_size = span / points
+
+            counts = [0] * points
+            for index, count in uow.event_repository.get_histogram(test_schema.id, start, end, bucket_size).items():
+                counts[min(max(index, 0), points - 1)] += count  # end belongs to the last bucket
+
+        return HistorySchema(test=test_schema, start=start, end=end, bucket_size=bucket_size, points=[
+            HistoryPointSchema(timestamp=start + timedelta(seconds=index * bucket_size), count=count)
+            for index, count in enumerate(counts)
+        ])
+
     def delete(self, ids_schema: IdsSchema):
         """Deletes Tests by passed ids."""
 
@@ -59,6 +153,94 @@ class TestService:
                     else:
                         statuses.append({'id': id_, 'status': status.HTTP_200_OK})
 
+                deleted_ids = [status_['id'] for status_ in statuses if status_['status'] == status.HTTP_200_OK]
+                uow.change_repository.add(ChangeType.TEST_DELETED, deleted_ids)
                 uow.commit()
 
+            self.test_cache.invalidate(deleted_ids)
+            self.failure_rates.forget(deleted_ids)
+            if deleted_ids and self.latest_events.enabled:
+                self.latest_events.invalidate(self.uow.project)  # events of deleted tests are not known
+
         return StatusesSchema(statuses=statuses)
+
+    def get_anomalies(self, threshold: float, min_events: float, limit: int) -> AnomaliesSchema:
+        """Returns Tests which fail more often than usually, the most anomalous first."""
+
+        anomalies = self.failure_rates.anomalies(time.time(), threshold, min_events)
+
+        with self.uow as uow:
+            # rates are kept for tests of all projects, tests of other projects are not returned
+            tests = {test.id: test for test in uow.test_repository.get_by_ids([anomaly.test_id
+                                                                              for anomaly in anomalies])}
+            anomalies_schema = AnomaliesSchema(items=[
+                AnomalySchema(test=GetTestSchema.from_orm(tests[anomaly.test_id]),
+                              current_rate=anomaly.current_rate, baseline_rate=anomaly.baseline_rate,
+                              score=anomaly.score)
+                for anomaly in anomalies if anomaly.test_id in tests
+            ][:limit])
+
+        return anomalies_schema
+
+    def sync_failure_rates(self, batch_size: int) -> int:
+        """Replays Events which were not applied to failure rates yet, returns number of read Events.
+
+        The first sync replays all Events which still matter for baseline rate. Events with lower ids can
+        commit later (e.g. on PostgreSQL), so cursor of failure rates moves only past Events older than
+        settle time, the newer ones are read again by the next sync (and skipped when they were applied).
+        """
+
+        now = time.time()
+        since = datetime.fromtimestamp(now - self.failure_rates.replay_horizon)
+        settled = datetime.fromtimestamp(now - self.settle_time)
+        cursor = read_cursor = self.failure_rates.cursor or 0
+        unsettled = False
+        replayed = 0
+
+        while True:
+            with self.uow as uow:
+                rows = uow.event_repository.get_timestamps(read_cursor, since, batch_size)
+
+            for event_id, _, timestamp in rows:
+                unsettled = unsettled or timestamp > settled
+                if not unsettled:
+                    cursor = event_id
+            if rows:
+                read_cursor = rows[-1][0]
+            self.failure_rates.replay((RateSample(event_id, test_id, timestamp.timestamp())
+                                       for event_id, test_id, timestamp in rows), cursor)
+
+            replayed += len(rows)
+            if len(rows) < batch_size:
+                return replayed
+
+    def fold_events_counts(self, batch_size: int) -> int:
+        """Folds pending events count deltas into Tests, returns number of folded deltas."""
+
+        folded = 0
+
+        while True:
+            with self.uow as uow:
+                try:
+                    count = uow.test_repository.fold_events_count_deltas(batch_size)
+                except ConcurrentUpdateError:
+                    break
+                uow.commit()
+
+            folded += count
+            if count < batch_size:
+                break
+
+        return folded
+
+    def reconcile_events_counts(self) -> int:
+        """Rebuilds events counts of all Tests from stored Events, returns number of corrected Tests."""
+
+        with self.uow as uow:
+            count = uow.test_repository.reconcile_events_counts()
+            uow.commit()
+
+        if count and self.latest_events.enabled:
+            self.latest_events.invalidate()
+
+        return count
@@ -0,0 +1,31 @@
+"""Threadpool module."""
+
+from anyio import to_thread, CapacityLimiter
+
+
+class Threadpool:
+    """Size and saturation of threadpool which runs sync handlers and background tasks.
+
+    It is AnyIO default thread limiter, which exists only in running event loop, so it is sized on startup.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._limiter: CapacityLimiter | None = None
+
+    def start(self) -> None:
+        """Sizes default thread limiter of running event loop."""
+
+        self._limiter = to_thread.current_default_thread_limiter()
+        self._limiter.total_tokens = self.size
+
+    def metrics(self) -> dict:
+        """Returns numbers of threads, of busy ones and of calls waiting for free thread."""
+
+        if self._limiter is None:
+            return {'size': self.size, 'busy': 0, 'waiting': 0}
+
+        statistics = self._limiter.statistics()
+
+        return {'size': int(statistics.total_tokens), 'busy': statistics.borrowed_tokens,
+                'waiting': statistics.tasks_waiting}
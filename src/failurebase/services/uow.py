@@ -1,39 +1,77 @@
 """Unit of Work module."""
 
+import copy
 from typing import Callable, Type, Any
 
+from ..adapters.archive import SegmentArchive
 from ..adapters.repositories.event import EventRepository
 from ..adapters.repositories.test import TestRepository
+from ..adapters.repositories.change import ChangeRepository
+from ..adapters.repositories.project import ProjectRepository
+from ..adapters.repositories.run import RunRepository
 
 
 class DatabaseUnitOfWork:
-    """UoW to manage database repositories repositories."""
+    """UoW to manage database repositories repositories.
+
+    Event, Test and Run repositories are scoped to given project, without project they see all projects.
+    Given session (e.g. the one of request) is used instead of new one and it is not closed on exit.
+    """
 
     def __init__(self,
                  session_factory: Callable,
                  event_repository_cls: Type[EventRepository],
-                 test_repository_cls: Type[TestRepository]) -> None:
+                 test_repository_cls: Type[TestRepository],
+                 change_repository_cls: Type[ChangeRepository],
+                 project_repository_cls: Type[ProjectRepository],
+                 run_repository_cls: Type[RunRepository],
+                 archive: SegmentArchive | None = None,
+                 project: str | None = None,
+                 session: Any = None) -> None:
 
         self.session_factory = session_factory
         self.event_repository_cls = event_repository_cls
         self.test_repository_cls = test_repository_cls
+        self.change_repository_cls = change_repository_cls
+        self.project_repository_cls = project_repository_cls
+        self.run_repository_cls = run_repository_cls
+        self.archive = archive
+        self.project = project
+        self.shared_session = session
+
+    def for_project(self, project: str | None) -> 'DatabaseUnitOfWork':
+        """Returns the same unit of work scoped to given project."""
+
+        uow = copy.copy(self)
+        uow.project = project
+
+        return uow
 
     def __enter__(self) -> 'EventUoW':
-        """Creates session, Event and Test repositories."""
+        """Creates session (unless it is given), Event, Test, Change, Project and Run repositories."""
 
-        self.session = self.session_factory()
-        self.event_repository = self.event_repository_cls(self.session)
-        self.test_repository = self.test_repository_cls(self.session)
+        self.session = self.shared_session if self.shared_session is not None else self.session_factory()
+        self.event_repository = self.event_repository_cls(self.session, self.archive, project=self.project)
+        self.test_repository = self.test_repository_cls(self.session, project=self.project)
+        self.change_repository = self.change_repository_cls(self.session)
+        self.project_repository = self.project_repository_cls(self.session)
+        self.run_repository = self.run_repository_cls(self.session, project=self.project)
 
         return self
 
+    def flush(self) -> None:
+        """Sends pending changes of current session to database, e.g. to get ids of new objects."""
+
+        self.session.flush()
+
     def commit(self) -> None:
         """Commits current session."""
 
         self.session.commit()
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        """Closes current session."""
+        """Rolls back uncommitted changes and closes current session (unless it is given)."""
 
         self.session.rollback()
-        self.session.close()
+        if self.session is not self.shared_session:
+            self.session.close()
@@ -1,8 +1,9 @@
 """Settings module."""
 
 import os
+from typing import Literal
 from pathlib import Path
-from pydantic import BaseSettings
+from pydantic import BaseSettings, validator
 
 
 CONFIGURATION_FILE_VARIABLE = 'FAILUREBASE_CONFIGURATION'
@@ -31,13 +32,120 @@ class ConfigurationError(Exception):
 
 
 class Settings(BaseSettings):
-    """Main app settings."""
+    """Main app settings.
+
+    Configuration file is located when settings are created (not when this module is imported), pass
+    `_env_file=None` to create settings only from environment variables and keyword arguments.
+    """
 
     DATABASE_URI: str
 
+    # 'memory' keeps everything in process memory (with indexes of common queries) and loses it on exit,
+    # it is meant for disposable instances, e.g. of local pipelines. Archive and backup are not supported.
+    STORAGE_BACKEND: Literal['database', 'memory'] = 'database'
+
+    # Connections of database pool, every open unit of work holds one (a thread waits for free connection
+    # for up to DATABASE_POOL_TIMEOUT seconds, then the request fails).
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+
+    # SQLite database file is switched to write-ahead log, so readers (e.g. backups) do not block writers.
+    DATABASE_SQLITE_WAL: bool = True
+
+    # Threads running sync handlers and background tasks, by default as many as database connections, so
+    # requests wait for free thread (without timeout) rather than for free connection.
+    THREADPOOL_SIZE: int | None = None
+
     EVENTS_PER_PAGE: int
     TESTS_PER_PAGE: int
+    RUNS_PER_PAGE: int = 20
+
+    # Events of streamed run upload stored in single transaction, and the longest line (event) of the upload.
+    RUN_APPEND_BATCH_SIZE: int = 500
+    RUN_APPEND_MAX_LINE_SIZE: int = 1024 * 1024
+
+    MAX_REQUEST_BODY_SIZE: int = 32 * 1024 * 1024
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+
+    # Ingestion requests processed at once, keep it well below the number of threads and database
+    # connections, so reads always have the rest of them.
+    INGEST_MAX_CONCURRENCY: int = 8
+    INGEST_MAX_QUEUE: int = 100
+    INGEST_QUEUE_TIMEOUT: float = 5.0
+    INGEST_CLIENT_RATE: float = 50.0
+    INGEST_CLIENT_BURST: float = 200.0
+
+    TEST_CACHE_SIZE: int = 10000
+
+    # Seconds identical concurrent read waits for the one which is in progress before it runs on its own.
+    COALESCING_WAIT_TIMEOUT: float = 10.0
+
+    EVENTS_COUNT_FOLD_INTERVAL: float = 5.0
+    EVENTS_COUNT_FOLD_BATCH_SIZE: int = 10000
+
+    CREATE_DATABASE_ON_STARTUP: bool = True
+
+    CHANGES_PER_PAGE: int = 500
+
+    # Ids (cursors) are taken when rows are inserted, but transactions can commit out of order (e.g. on
+    # PostgreSQL), so readers which resume from the last seen id wait this many seconds for rows with lower
+    # ids to become visible. It should be longer than any transaction which writes events or changes.
+    CURSOR_SETTLE_TIME: float = 5.0
+
+    SIMILAR_EVENTS_CANDIDATES_PER_BUCKET: int = 100
+
+    SUGGEST_CANDIDATES: int = 1000
+
+    FAILURE_RATE_SHORT_HALF_LIFE: float = 3600.0
+    FAILURE_RATE_LONG_HALF_LIFE: float = 7 * 86400.0
+    FAILURE_RATES_SYNC_INTERVAL: float = 10.0
+    FAILURE_RATES_SYNC_BATCH_SIZE: int = 10000
+
+    ARCHIVE_DIRECTORY: str | None = None
+    ARCHIVE_AFTER_DAYS: float = 90.0
+    ARCHIVE_INTERVAL: float = 3600.0
+    ARCHIVE_BATCH_SIZE: int = 10000
+
+    RETENTION_INTERVAL: float = 3600.0
+    RETENTION_BATCH_SIZE: int = 10000
+
+    # SQLite databases in write-ahead log mode (see DATABASE_SQLITE_WAL) are dumped from single read snapshot,
+    # other ones are copied first in steps of this many pages (-1 copies all pages in single step, which blocks
+    # writers until it is done). Copy which is restarted by writes too many times is finished in single step.
+    BACKUP_SQLITE_PAGES_PER_STEP: int = 1024
+    BACKUP_SQLITE_STEP_SLEEP: float = 0.0
+    BACKUP_BATCH_SIZE: int = 1000
+
+    # Columnar snapshot of events for analytics endpoints, it needs NumPy. Snapshot is refreshed before
+    # every analytics request and periodically, so requests do not have to load many new events.
+    ANALYTICS_ENABLED: bool = True
+    ANALYTICS_REFRESH_INTERVAL: float = 60.0
+    ANALYTICS_REFRESH_BATCH_SIZE: int = 100000
+
+    # Buffer of the newest events kept in memory for the default events list. Enable it only when all
+    # events are created and deleted by this process (single worker, no CLI writes), otherwise the list
+    # does not show changes made by the other processes.
+    LATEST_EVENTS_BUFFER_ENABLED: bool = False
+    LATEST_EVENTS_BUFFER_SIZE: int = 1000
+
+    FEED_BACKEND: Literal['memory', 'database'] = 'memory'
+    FEED_QUEUE_SIZE: int = 1000
+    FEED_HEARTBEAT_INTERVAL: float = 15.0
+    FEED_POLL_INTERVAL: float = 1.0
+    FEED_POLL_BATCH_SIZE: int = 1000
+
+    @validator('THREADPOOL_SIZE', always=True)
+    def size_threadpool_to_pool(cls, value: int | None, values: dict) -> int | None:
+        if value is None and 'DATABASE_POOL_SIZE' in values and 'DATABASE_MAX_OVERFLOW' in values:
+            return values['DATABASE_POOL_SIZE'] + values['DATABASE_MAX_OVERFLOW']
+        return value
+
+    def __init__(self, **values) -> None:
+        if '_env_file' not in values:
+            values['_env_file'] = get_configuration_file_path()
+        super().__init__(**values)
 
     class Config:
-        env_file = get_configuration_file_path()
         env_file_encoding = 'utf-8'
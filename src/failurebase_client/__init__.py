@@ -0,0 +1,11 @@
+from .reporter import Reporter, HTTPTransport, DeliveryError, RejectedError
+from .spool import Spool
+
+
+__all__ = [
+    'Reporter',
+    'HTTPTransport',
+    'DeliveryError',
+    'RejectedError',
+    'Spool',
+]
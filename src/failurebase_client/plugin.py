@@ -0,0 +1,95 @@
+"""Pytest plugin module.
+
+Enable it by passing failurebase URL:
+
+    pytest --failurebase-url http://failurebase.local:8000
+
+or by setting `failurebase_url` ini option or `FAILUREBASE_URL` environment variable. Every failed
+test phase (setup, call or teardown) is reported as one event.
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from .reporter import Reporter
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Registers plugin options."""
+
+    group = parser.getgroup('failurebase', 'report failures to failurebase')
+    group.addoption('--failurebase-url', help='URL of failurebase server, reporting is disabled if it is not set')
+    group.addoption('--failurebase-spool', help='directory for failures which could not be sent yet '
+                                                '(default: .failurebase-spool)')
+
+    parser.addini('failurebase_url', 'URL of failurebase server')
+    parser.addini('failurebase_spool', 'directory for failures which could not be sent yet')
+    parser.addini('failurebase_batch_size', 'maximal number of failures sent in one request', default='100')
+    parser.addini('failurebase_flush_interval', 'seconds to wait for full batch', default='1.0')
+    parser.addini('failurebase_close_timeout', 'seconds to wait for sending at the end of session', default='10.0')
+    parser.addini('failurebase_compress', 'compress batches with gzip', type='bool', default=True)
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Starts reporter if failurebase URL is configured."""
+
+    url = config.getoption('failurebase_url') or config.getini('failurebase_url') or os.environ.get('FAILUREBASE_URL')
+    if not url:
+        return
+
+    spool_directory = (config.getoption('failurebase_spool') or config.getini('failurebase_spool')
+                       or os.path.join(config.rootpath, '.failurebase-spool'))
+
+    reporter = Reporter(
+        url,
+        spool_directory,
+        spool_prefix=os.environ.get('PYTEST_XDIST_WORKER', 'main'),
+        batch_size=int(config.getini('failurebase_batch_size')),
+        flush_interval=float(config.getini('failurebase_flush_interval')),
+        compress=config.getini('failurebase_compress'),
+    )
+    reporter.start()
+
+    config.pluginmanager.register(FailurebasePlugin(reporter, float(config.getini('failurebase_close_timeout'))),
+                                  'failurebase-reporter')
+
+
+class FailurebasePlugin:
+    """Reports failures of tests executed in current process."""
+
+    def __init__(self, reporter: Reporter, close_timeout: float) -> None:
+        self.reporter = reporter
+        self.close_timeout = close_timeout
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item, call: pytest.CallInfo):
+        """Reports failed test phase."""
+
+        outcome = yield
+        report = outcome.get_result()
+
+        if report.failed:
+            if call.excinfo is not None:
+                message = call.excinfo.exconly()
+            else:
+                message = (report.longreprtext.splitlines() or [''])[-1]
+            self.reporter.report({
+                'test': {
+                    'uid': item.nodeid,
+                    'marks': list(dict.fromkeys(mark.name for mark in item.iter_markers())),
+                    'file': str(item.path),
+                },
+                'message': message[:2000],
+                'traceback': report.longreprtext[-3000:],
+                'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT),
+            })
+
+    def pytest_unconfigure(self, config: pytest.Config) -> None:
+        """Sends remaining failures."""
+
+        self.reporter.close(self.close_timeout)
@@ -0,0 +1,246 @@
+"""Reporter module."""
+
+import gzip
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import http.client
+from typing import Protocol
+from urllib.parse import urlsplit
+
+from .spool import Spool
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    """Throws when batch cannot be delivered right now, but it can be retried later."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RejectedError(Exception):
+    """Throws when server refuses batch, so retrying the same request does not make sense."""
+
+
+class Transport(Protocol):
+    """Sends serialized batch to server."""
+
+    def send(self, body: bytes, headers: dict[str, str]) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class HTTPTransport:
+    """Sends batches to bulk endpoint over single keep-alive connection."""
+
+    PATH = '/api/events/bulk'
+
+    def __init__(self, url: str, timeout: float = 10.0) -> None:
+        parts = urlsplit(url)
+        self.path = parts.path.rstrip('/') + self.PATH
+        self._connection_cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._netloc = parts.netloc
+        self._timeout = timeout
+        self._connection = None
+
+    def send(self, body: bytes, headers: dict[str, str]) -> None:
+        """Posts body and raises exception if server did not accept it."""
+
+        if self._connection is None:
+            self._connection = self._connection_cls(self._netloc, timeout=self._timeout)
+
+        try:
+            self._connection.request('POST', self.path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException) as error:
+            self.close()
+            raise DeliveryError(f'Connection failed: {error!r}') from None
+
+        if response.will_close:
+            self.close()
+
+        if 200 <= response.status < 300:
+            return
+
+        if response.status in (408, 429) or response.status >= 500:
+            retry_after = response.getheader('Retry-After')
+            raise DeliveryError(f'Server responded with {response.status}.',
+                                float(retry_after) if retry_after and retry_after.isdigit() else None)
+
+        raise RejectedError(f'Server rejected batch with {response.status}: {content[:500]!r}')
+
+    def close(self) -> None:
+        """Closes connection, the next request opens new one."""
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Reporter:
+    """Collects events and sends them in batches from background thread.
+
+    `report` never blocks caller: events are put into bounded in-memory queue and when the queue is
+    full, or the server is not available, batches are written to on-disk spool and delivered later
+    (also by next runs which use the same spool directory).
+    """
+
+    def __init__(self, url: str, spool_directory: str, spool_prefix: str = 'batch', batch_size: int = 100,
+                 flush_interval: float = 1.0, max_queue_size: int = 10000, compress: bool = True,
+                 timeout: float = 10.0, max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0,
+                 transport: Transport | None = None) -> None:
+        self.spool = Spool(spool_directory, spool_prefix)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.transport = transport or HTTPTransport(url, timeout)
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='failurebase-reporter', daemon=True)
+        self._unavailable_until = 0.0
+        self._current_backoff = backoff
+
+    def start(self) -> None:
+        """Starts background thread."""
+
+        self._thread.start()
+
+    def report(self, event: dict) -> None:
+        """Schedules event to be sent, never blocks."""
+
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.spool.write([event])
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Sends queued events, what cannot be sent within timeout is left in spool."""
+
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)  # wakes up thread waiting for next event
+        except queue.Full:
+            # thread does not wait for events when queue is full, it stops after the current batch
+            self._closing.set()
+
+        while self._thread.is_alive() and not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self._closing.set()
+        self._thread.join(max(0.0, deadline - time.monotonic()) + 1)
+
+        leftovers = [event for event in self._drain() if event is not None]
+        if leftovers:
+            self.spool.write(leftovers)
+
+        self.transport.close()
+
+    def _run(self) -> None:
+        """Sends batches until reporter is closed."""
+
+        while not self._closing.is_set():
+            batch, stop = self._collect()
+
+            if batch:
+                self._deliver(batch)
+
+            if stop and self._queue.empty():
+                break
+
+            if not batch and time.monotonic() >= self._unavailable_until:
+                self._deliver_spooled()
+
+    def _collect(self) -> tuple[list[dict], bool]:
+        """Waits for events until batch is full or flush interval elapses."""
+
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            try:
+                event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if event is None:
+                return batch, True
+            batch.append(event)
+
+        return batch, False
+
+    def _deliver(self, batch: list[dict]) -> None:
+        """Sends batch or spills it to disk."""
+
+        if time.monotonic() < self._unavailable_until or self._closing.is_set():
+            self.spool.write(batch)
+            return
+
+        if not self._send(batch):
+            self.spool.write(batch)
+
+    def _deliver_spooled(self) -> None:
+        """Sends one batch from spool, it is called when reporter is idle."""
+
+        claimed = self.spool.claim()
+        if claimed is None:
+            return
+
+        path, batch = claimed
+        if self._send(batch):
+            self.spool.done(path)
+        else:
+            self.spool.release(path)
+
+    def _send(self, batch: list[dict]) -> bool:
+        """Sends batch with retries, returns False if server is not available."""
+
+        body = json.dumps(batch).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.transport.send(body, headers)
+            except DeliveryError as error:
+                delay = error.retry_after or min(self.max_backoff, self.backoff * 2 ** attempt)
+                logger.debug('Delivery of %d events failed (%s), attempt %d.', len(batch), error, attempt + 1)
+                if attempt == self.max_retries or self._closing.wait(delay * random.uniform(0.5, 1.0)):
+                    break
+            except RejectedError as error:
+                logger.warning('%s Batch is kept in "rejected" spool file.', error)
+                Spool(self.spool.directory / 'rejected', self.spool.prefix).write(batch)
+                return True
+            else:
+                self._unavailable_until = 0.0
+                self._current_backoff = self.backoff
+                return True
+
+        self._unavailable_until = time.monotonic() + self._current_backoff
+        self._current_backoff = min(self.max_backoff, self._current_backoff * 2)
+
+        return False
+
+    def _drain(self) -> list:
+        """Takes all items from queue."""
+
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
@@ -0,0 +1,107 @@
+"""On-disk spool module."""
+
+import os
+import json
+import time
+import itertools
+from pathlib import Path
+
+
+class Spool:
+    """Directory based queue of batches which could not be delivered.
+
+    Every batch is kept in its own file named after the moment of writing, so batches are delivered in
+    order and many processes (e.g. `pytest-xdist` workers) can share one directory: writers create files
+    under unique names and readers claim a file by renaming it, which succeeds only in one process.
+    """
+
+    SUFFIX = '.json'
+
+    def __init__(self, directory: str | os.PathLike, prefix: str = 'batch') -> None:
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self._counter = itertools.count()
+
+    def write(self, batch: list[dict]) -> Path:
+        """Stores batch in new file."""
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        name = f'{time.time_ns()}-{self.prefix}-{os.getpid()}-{next(self._counter)}'
+        temporary_path = self.directory / f'{name}.tmp'
+        path = self.directory / f'{name}{self.SUFFIX}'
+
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(batch, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+        return path
+
+    def claim(self) -> tuple[Path, list[dict]] | None:
+        """Takes the oldest stored batch, returns path of claimed file and batch or None if spool is empty."""
+
+        if not self.directory.is_dir():
+            return None
+
+        self._release_abandoned()
+
+        for path in sorted(self.directory.glob(f'*{self.SUFFIX}')):
+            claimed_path = path.with_name(f'{path.name}.{os.getpid()}.sending')
+            try:
+                os.rename(path, claimed_path)
+            except OSError:  # claimed by other process
+                continue
+
+            try:
+                with open(claimed_path, encoding='utf-8') as file:
+                    return claimed_path, json.load(file)
+            except ValueError:
+                claimed_path.rename(path.with_name(f'{path.name}.corrupted'))
+
+        return None
+
+    @staticmethod
+    def done(claimed_path: Path) -> None:
+        """Removes delivered batch."""
+
+        claimed_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def release(claimed_path: Path) -> None:
+        """Gives back claimed batch, so it is delivered later."""
+
+        os.replace(claimed_path, claimed_path.with_name(claimed_path.name.split(f'{Spool.SUFFIX}.')[0] + Spool.SUFFIX))
+
+    def count(self) -> int:
+        """Returns number of stored batches."""
+
+        if not self.directory.is_dir():
+            return 0
+
+        return sum(1 for _ in self.directory.glob(f'*{self.SUFFIX}'))
+
+    def _release_abandoned(self) -> None:
+        """Gives back batches claimed by processes which do not exist anymore."""
+
+        for path in self.directory.glob(f'*{self.SUFFIX}.*.sending'):
+            pid = int(path.name.rsplit('.', 2)[1])
+            if pid != os.getpid() and not _is_running(pid):
+                try:
+                    self.release(path)
+                except OSError:
+                    pass
+
+
+def _is_running(pid: int) -> bool:
+    """Checks if process with given pid exists."""
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
@@ -0,0 +1,150 @@
+"""Benchmark suite entry point.
+
+Usage (from repository root):
+
+    PYTHONPATH=src python -m tests.benchmarks --tests 1000 --events 20000 --output bench.json
+    PYTHONPATH=src python -m tests.benchmarks --compare bench.json
+
+Each run creates a fresh SQLite database in a temporary directory, fills it with seeded synthetic data
+and prints machine-readable JSON with throughput and p50/p95/p99 latencies (in milliseconds) of every
+scenario. Results of two commits can be compared with `--compare`. Import and startup time of the app
+is measured separately by `python -m tests.benchmarks.startup` and CPU cost of decoding ingested events
+by `python -m tests.benchmarks.parsing`.
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+from .data import DataGenerator, DatasetParameters, load_dataset
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Returns parsed command line arguments."""
+
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmarks', description='Failurebase benchmark suite.')
+    parser.add_argument('--tests', type=int, default=DatasetParameters.tests, help='number of generated tests')
+    parser.add_argument('--events', type=int, default=DatasetParameters.events, help='number of generated events')
+    parser.add_argument('--marks', type=int, default=DatasetParameters.marks, help='number of distinct marks')
+    parser.add_argument('--days', type=int, default=DatasetParameters.days, help='time span of generated events')
+    parser.add_argument('--seed', type=int, default=DatasetParameters.seed, help='seed of data generator')
+    parser.add_argument('--repeat', type=int, default=50, help='number of requests per scenario')
+    parser.add_argument('--page-limit', type=int, default=50, help='number of items per page')
+    parser.add_argument('--scenario', default='*', help='glob pattern of scenarios to run')
+    parser.add_argument('--output', type=Path, help='file to store results in (stdout by default)')
+    parser.add_argument('--compare', type=Path, help='results of previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative p95 slowdown reported as regression (default: 0.2)')
+
+    return parser.parse_args()
+
+
+def git_revision() -> str | None:
+    """Returns hash of checked out commit."""
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure(directory: Path, page_limit: int) -> None:
+    """Writes configuration file of benchmarked app and points app to it."""
+
+    configuration = directory / '.env.benchmark'
+    configuration.write_text(f'DATABASE_URI=sqlite:///{directory / "benchmark.db"}\n'
+                             f'EVENTS_PER_PAGE={page_limit}\n'
+                             f'TESTS_PER_PAGE={page_limit}\n')
+
+    os.environ['FAILUREBASE_CONFIGURATION'] = str(configuration)
+
+
+def compare(current: dict, previous: dict, tolerance: float) -> bool:
+    """Prints comparison of two runs and returns True if any scenario regressed."""
+
+    regressed = False
+
+    print(f'{"scenario":<40} {"p95 before":>12} {"p95 after":>12} {"rps before":>12} {"rps after":>12}',
+          file=sys.stderr)
+
+    for name, after in current['scenarios'].items():
+        before = previous['scenarios'].get(name)
+        if before is None:
+            continue
+
+        slower = before['p95'] and after['p95'] > before['p95'] * (1 + tolerance)
+        regressed |= bool(slower)
+
+        print(f'{name:<40} {before["p95"]:>12.2f} {after["p95"]:>12.2f} {before["throughput"]:>12.1f} '
+              f'{after["throughput"]:>12.1f}{"  REGRESSION" if slower else ""}', file=sys.stderr)
+
+    return regressed
+
+
+def main() -> int:
+    """Runs benchmark suite."""
+
+    arguments = parse_arguments()
+    parameters = DatasetParameters(tests=arguments.tests, events=arguments.events, marks=arguments.marks,
+                                   days=arguments.days, seed=arguments.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        configure(Path(directory), arguments.page_limit)
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import create_engine
+        from failurebase.application import create_app
+        from .scenarios import Benchmark, run_scenarios
+
+        # Entering the client runs startup of the app: database schema and background tasks.
+        with TestClient(create_app()) as client:
+            engine = create_engine(client.app.container.config()['DATABASE_URI'])
+
+            generator = DataGenerator(parameters)
+            tests = generator.generate_tests()
+            events = generator.generate_events(tests)
+            load_dataset(engine, tests, events)
+
+            # The hottest test first, scenarios use it to build realistic filters.
+            tests.sort(key=lambda test: test['total_events_count'], reverse=True)
+
+            benchmark = Benchmark(client, engine, generator, tests, arguments.repeat,
+                                  {'events': arguments.page_limit, 'tests': arguments.page_limit})
+            scenarios = run_scenarios(benchmark, arguments.scenario)
+
+            engine.dispose()
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': vars(parameters),
+            'repeat': arguments.repeat,
+            'page_limit': arguments.page_limit,
+        },
+        'scenarios': scenarios,
+    }
+
+    output = json.dumps(results, indent=2)
+    if arguments.output is None:
+        print(output)
+    else:
+        arguments.output.write_text(output)
+
+    if arguments.compare is not None:
+        return int(compare(results, json.loads(arguments.compare.read_text()), arguments.tolerance))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
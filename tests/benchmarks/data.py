@@ -0,0 +1,172 @@
+"""Synthetic data generator module."""
+
+import json
+import random
+import itertools
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+MARKS = ['CRT', 'CIT', 'regression', 'smoke', 'sanity', 'tput', 'attach', 'detach', 'login', 'mfa', 'flaky',
+         'nightly', 'slow', 'network', 'database', 'ui', 'api', 'performance', 'security', 'upgrade']
+
+DIRECTORIES = ['atests', 'login', 'payments', 'network', 'storage', 'ui', 'api', 'regression', 'upgrade', 'sg1',
+               'sg17', 'fr16012', 'fr31912', 'resources', 'pcap_verification', 'flows', 'cells', 'sessions']
+
+EXCEPTIONS = [
+    ('AssertionError', 'expected {value} but got {other}'),
+    ('TimeoutError', 'operation timed out after {value} seconds'),
+    ('ConnectionError', 'connection to 10.0.{value}.{other} refused'),
+    ('KeyError', "'{name}'"),
+    ('ValueError', 'invalid literal for int() with base 10: {value!r}'),
+    ('ExecutionException', 'Moler caught some error messages during execution: >>{name} is not online<<'),
+    ('LoginError', 'password should contain at least {value} digits'),
+    ('MissingMessage', 'message {name} was not found in flow {value}'),
+]
+
+FUNCTIONS = ['wrapped', 'run', 'execute', 'call', '_verify_results', '_verify_missing_message', 'expect_messages',
+             'login', 'send', 'receive', 'connect', '_check_exceptions_occured', 'setup', 'teardown', 'step']
+
+STATEMENTS = ['self._verify_results(parsed_awaited_messages)', 'raise ExecutionException(err_msg)',
+              'cls._check_exceptions_occured(caught_exception)', 'assert result == expected',
+              'response = self.session.send(request, timeout=timeout)', 'return func(*args, **kwargs)',
+              'value = int(raw_value)', 'self.connection.open()', 'raise MissingMessage(err_msg)']
+
+
+@dataclass
+class DatasetParameters:
+    """Parameters of generated dataset."""
+
+    tests: int = 1000
+    events: int = 20000
+    marks: int = 20
+    days: int = 90
+    seed: int = 0
+
+
+class DataGenerator:
+    """Generates reproducible synthetic tests and events.
+
+    Failures are not spread evenly: tests are picked from a Zipf-like distribution, so a few flaky tests
+    collect most of the events, and traceback depths follow a log-normal distribution like real stacks do.
+    """
+
+    def __init__(self, parameters: DatasetParameters) -> None:
+        self.parameters = parameters
+        self.random = random.Random(parameters.seed)
+        self.marks = self._generate_marks(parameters.marks)
+        self.end = datetime(2023, 6, 30, 12, 0, 0)
+        self.start = self.end - timedelta(days=parameters.days)
+        self._counter = itertools.count()
+
+    def generate_tests(self) -> list[dict]:
+        """Returns tests as dictionaries with columns of `Test` model."""
+
+        tests = []
+        for index in range(self.parameters.tests):
+            directories = self.random.sample(DIRECTORIES, self.random.randint(1, 4))
+            name = f'{self.random.choice(FUNCTIONS)}_{index}'
+            tests.append(dict(
+                uid='.'.join(['main', *directories, name]),
+                file='/home/tester/repos/' + '/'.join(directories) + f'/{name}.py',
+                marks=json.dumps(self._pick_marks()),
+                total_events_count=0
+            ))
+
+        return tests
+
+    def generate_events(self, tests: list[dict]) -> list[dict]:
+        """Returns events as dictionaries with columns of `Event` model and index of related test."""
+
+        weights = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(tests))))
+        span = (self.end - self.start).total_seconds()
+
+        events = []
+        for test_index in self.random.choices(range(len(tests)), cum_weights=weights, k=self.parameters.events):
+            server_timestamp = self.start + timedelta(seconds=self.random.uniform(0, span))
+            message, traceback = self.generate_failure()
+            events.append(dict(
+                test_index=test_index,
+                message=message,
+                traceback=traceback,
+                client_timestamp=server_timestamp - timedelta(milliseconds=self.random.randint(50, 2000)),
+                server_timestamp=server_timestamp
+            ))
+            tests[test_index]['total_events_count'] += 1
+
+        return events
+
+    def generate_failure(self) -> tuple[str, str]:
+        """Returns message and traceback of single failure."""
+
+        exception, template = self.random.choice(EXCEPTIONS)
+        message = f'{exception}: ' + template.format(value=self.random.randint(0, 255),
+                                                     other=self.random.randint(0, 255),
+                                                     name=self.random.choice(FUNCTIONS))
+
+        depth = max(1, min(25, round(self.random.lognormvariate(1.5, 0.6))))
+        frames = ['Traceback (most recent call last):\n']
+        for _ in range(depth):
+            path = '/'.join(self.random.sample(DIRECTORIES, self.random.randint(1, 3)))
+            frames.append(f'  File "/opt/tester/{path}/{self.random.choice(FUNCTIONS)}.py", '
+                          f'line {self.random.randint(1, 900)}, in {self.random.choice(FUNCTIONS)}\n'
+                          f'    {self.random.choice(STATEMENTS)}\n')
+        frames.append(message)
+
+        return message[:2000], ''.join(frames)[-3000:]
+
+    def event_payload(self, tests: list[dict]) -> dict:
+        """Returns body of `POST /api/events` request.
+
+        Every fourth payload reports a new test, the rest report failures of already existing tests.
+        """
+
+        if tests and next(self._counter) % 4:
+            test = self.random.choice(tests)
+            test = dict(uid=test['uid'], marks=json.loads(test['marks']), file=test['file'])
+        else:
+            name = f'new_{self.random.choice(FUNCTIONS)}_{self.random.getrandbits(48):x}'
+            test = dict(uid=f'main.generated.{name}', marks=self._pick_marks(),
+                        file=f'/home/tester/repos/generated/{name}.py')
+
+        message, traceback = self.generate_failure()
+        timestamp = self.end + timedelta(seconds=self.random.uniform(0, 3600))
+
+        return dict(test=test, message=message, traceback=traceback, timestamp=timestamp.strftime(TIMESTAMP_FORMAT))
+
+    def _generate_marks(self, number_of_marks: int) -> list[str]:
+        """Returns pool of marks which contains well known names and generated ones."""
+
+        marks = MARKS[:number_of_marks]
+        marks += [f'MARK_{index}' for index in range(number_of_marks - len(marks))]
+
+        return marks
+
+    def _pick_marks(self) -> list[str]:
+        """Returns few marks, the most popular ones are picked more often."""
+
+        weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.marks))))
+        marks = self.random.choices(self.marks, cum_weights=weights, k=self.random.randint(1, 4))
+
+        return list(dict.fromkeys(marks))
+
+
+def load_dataset(engine, tests: list[dict], events: list[dict], chunk_size: int = 5000) -> None:
+    """Inserts generated rows into database with bulk statements and assigns ids of tests."""
+
+    from failurebase.adapters.models import Test, Event
+
+    with engine.begin() as connection:
+        connection.execute(Test.__table__.insert(), tests)
+
+        ids = dict(connection.execute(Test.__table__.select().with_only_columns(Test.uid, Test.id)).all())
+        for test in tests:
+            test['id'] = ids[test['uid']]
+
+        rows = [dict(message=event['message'], traceback=event['traceback'],
+                     client_timestamp=event['client_timestamp'], server_timestamp=event['server_timestamp'],
+                     test_id=tests[event['test_index']]['id']) for event in events]
+        for start in range(0, len(rows), chunk_size):
+            connection.execute(Event.__table__.insert(), rows[start:start + chunk_size])
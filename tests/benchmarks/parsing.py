@@ -0,0 +1,161 @@
+"""Ingestion decode CPU cost measurement.
+
+Usage (from repository root):
+
+    PYTHONPATH=src python -m tests.benchmarks.parsing --events 5000 --repeat 5 --output parsing.json
+
+Measures CPU microseconds per event spent on turning request payload into values inserted into database
+and into response body, without database and HTTP. The previous decode path (`strptime` in validator and
+again on insert, marks dumped to JSON on every use and response re-validated into `GetEventSchema`) is
+reproduced here, so both are measured in the same run. Timestamp parsing is also measured on its own.
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, validator
+
+from failurebase.adapters.models import DEFAULT_PROJECT
+from failurebase.schemas.common import parse_timestamp, TIMESTAMP_FORMAT
+from failurebase.schemas.event import CreateEventSchema, GetEventSchema
+from failurebase.schemas.test import GetTestSchema
+from failurebase.services.event import EventService
+
+from .data import DataGenerator, DatasetParameters
+
+
+class LegacyCreateTestSchema(BaseModel):
+    """Previous `CreateTestSchema`."""
+
+    uid: str
+    marks: list[str]
+    file: str
+
+    @property
+    def serialized_marks(self):
+        return json.dumps(self.marks)
+
+
+class LegacyCreateEventSchema(BaseModel):
+    """Previous `CreateEventSchema`."""
+
+    test: LegacyCreateTestSchema
+    message: str
+    traceback: str
+    timestamp: str
+
+    @validator('timestamp')
+    def timestamp_should_be_string_or_datetime(cls, v):
+        datetime.strptime(v, TIMESTAMP_FORMAT)
+        return v
+
+    @property
+    def deserialized_timestamp(self):
+        return datetime.strptime(self.timestamp, TIMESTAMP_FORMAT)
+
+
+def legacy_decode(payload: dict, event_id: int) -> dict:
+    """Previous path: validation, insert values (marks are dumped per use) and validated response."""
+
+    event_schema = LegacyCreateEventSchema.parse_obj(payload)
+    marks = event_schema.test.serialized_marks
+    event = SimpleNamespace(id=event_id, test_id=1, message=event_schema.message, traceback=event_schema.traceback,
+                            client_timestamp=event_schema.deserialized_timestamp, server_timestamp=datetime.now())
+
+    response = GetEventSchema(
+        id=event.id,
+        test=GetTestSchema(id=event.test_id, uid=event_schema.test.uid, marks=event_schema.test.serialized_marks,
+                           file=event_schema.test.file, total_events_count=1),
+        message=event.message, traceback=event.traceback, client_timestamp=event.client_timestamp,
+        server_timestamp=event.server_timestamp
+    )
+
+    return {'marks': marks, 'event': event, 'content': jsonable_encoder(response)}
+
+
+def current_decode(payload: dict, event_id: int) -> dict:
+    """Current path of `EventService`."""
+
+    event_schema = CreateEventSchema.parse_obj(payload)
+    marks = event_schema.test.serialized_marks
+    event = SimpleNamespace(id=event_id, test_id=1, project=DEFAULT_PROJECT, message=event_schema.message,
+                            traceback=event_schema.traceback, client_timestamp=event_schema.timestamp,
+                            server_timestamp=datetime.now(), run_id=None)
+
+    response = EventService._to_schema(event, event_schema, (1, None, None))
+
+    return {'marks': marks, 'event': event, 'content': jsonable_encoder(response)}
+
+
+def measure(func, values: list, repeat: int) -> float:
+    """Returns the best CPU time in microseconds per value of `repeat` runs."""
+
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.process_time()
+        for index, value in enumerate(values):
+            func(value, index)
+        best = min(best, time.process_time() - started)
+
+    return best / len(values) * 1e6
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Returns parsed command line arguments."""
+
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmarks.parsing',
+                                     description='Failurebase ingestion decode CPU cost.')
+    parser.add_argument('--events', type=int, default=5000, help='number of decoded payloads per run')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs, the best one is reported')
+    parser.add_argument('--seed', type=int, default=DatasetParameters.seed, help='seed of data generator')
+    parser.add_argument('--output', type=Path, help='file to store results in (stdout by default)')
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs measurement."""
+
+    arguments = parse_arguments()
+
+    generator = DataGenerator(DatasetParameters(tests=100, seed=arguments.seed))
+    tests = generator.generate_tests()
+    payloads = [generator.event_payload(tests) for _ in range(arguments.events)]
+    timestamps = [payload['timestamp'] for payload in payloads]
+
+    legacy = legacy_decode(payloads[0], 0)['content']
+    current = current_decode(payloads[0], 0)['content']
+    assert {**legacy, 'server_timestamp': None} == {**current, 'server_timestamp': None}, (legacy, current)
+
+    results = {
+        'events': arguments.events,
+        'repeat': arguments.repeat,
+        'us_per_event': {
+            'before': measure(legacy_decode, payloads, arguments.repeat),
+            'after': measure(current_decode, payloads, arguments.repeat),
+        },
+        'us_per_timestamp': {
+            'strptime': measure(lambda value, _: datetime.strptime(value, TIMESTAMP_FORMAT), timestamps,
+                                arguments.repeat),
+            'parse_timestamp': measure(lambda value, _: parse_timestamp(value), timestamps, arguments.repeat),
+        },
+    }
+    results['speedup'] = results['us_per_event']['before'] / results['us_per_event']['after']
+
+    output = json.dumps(results, indent=2)
+    if arguments.output is None:
+        print(output)
+    else:
+        arguments.output.write_text(output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
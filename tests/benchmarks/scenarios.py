@@ -0,0 +1,244 @@
+"""Benchmark scenarios module."""
+
+import json
+import math
+import time
+import fnmatch
+from dataclasses import dataclass, field
+from typing import Callable
+from sqlalchemy import Engine, text
+
+from .data import DataGenerator, TIMESTAMP_FORMAT
+
+
+ORDERINGS = {
+    'events': ['message', '-message', 'server_timestamp', '-server_timestamp', 'client_timestamp',
+               '-client_timestamp', 'test_uid', '-test_uid'],
+    'tests': ['uid', '-uid', 'file', '-file', 'total_events_count', '-total_events_count'],
+}
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Returns nearest-rank percentile of already sorted values."""
+
+    if not sorted_values:
+        return 0.0
+
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class ScenarioResult:
+    """Measurements of single scenario."""
+
+    name: str
+    operations_per_call: int = 1
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        """Returns machine-readable summary, latencies are in milliseconds."""
+
+        latencies = sorted(self.latencies)
+        calls = len(latencies)
+
+        return {
+            'calls': calls,
+            'operations': calls * self.operations_per_call,
+            'errors': self.errors,
+            'throughput': calls * self.operations_per_call / self.elapsed if self.elapsed else 0.0,
+            'mean': sum(latencies) / calls * 1000 if calls else 0.0,
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+
+class Benchmark:
+    """Runs scenarios against application and collects their results."""
+
+    def __init__(self, client, engine: Engine, generator: DataGenerator, tests: list[dict], repeat: int,
+                 page_limits: dict[str, int]) -> None:
+        self.client = client
+        self.engine = engine
+        self.generator = generator
+        self.tests = tests
+        self.repeat = repeat
+        self.page_limits = page_limits
+        self.results: dict[str, ScenarioResult] = {}
+
+    def measure(self, name: str, request: Callable, expected_status: int, operations_per_call: int = 1,
+                repeat: int | None = None) -> ScenarioResult:
+        """Calls request given number of times and records latency of each call.
+
+        The request callable receives index of the call and returns response (or list of responses).
+        """
+
+        result = ScenarioResult(name, operations_per_call)
+
+        started = time.perf_counter()
+        for index in range(self.repeat if repeat is None else repeat):
+            call_started = time.perf_counter()
+            responses = request(index)
+            result.latencies.append(time.perf_counter() - call_started)
+
+            if not isinstance(responses, list):
+                responses = [responses]
+            result.errors += sum(response.status_code != expected_status for response in responses)
+        result.elapsed = time.perf_counter() - started
+
+        self.results[name] = result
+
+        return result
+
+    def ids(self, table: str) -> list[int]:
+        """Returns ids of all rows which currently exist in given table."""
+
+        with self.engine.connect() as connection:
+            return [row[0] for row in connection.execute(text(f'SELECT id FROM {table} ORDER BY id'))]
+
+    def summary(self) -> dict:
+        """Returns summaries of all executed scenarios."""
+
+        return {name: result.summary() for name, result in self.results.items()}
+
+
+def listing_events(benchmark: Benchmark) -> None:
+    """Events list with every filter and ordering."""
+
+    hot_test = benchmark.tests[0]
+    start, end = benchmark.generator.start, benchmark.generator.end
+    recent = (end - (end - start) / 12).strftime(TIMESTAMP_FORMAT)
+
+    filters = {
+        'default': {},
+        'message': {'message': 'TimeoutError'},
+        'traceback': {'traceback': 'line 42,'},
+        'test_uid': {'test_uid': hot_test['uid'].rsplit('.', 1)[-1]},
+        'test_file': {'test_file': '/login/'},
+        'test_marks': {'test_marks': json.dumps(json.loads(hot_test['marks'])[:1])},
+        'server_timestamp': {'start_server_timestamp': recent},
+        'client_timestamp': {'start_client_timestamp': recent,
+                             'end_client_timestamp': end.strftime(TIMESTAMP_FORMAT)},
+    }
+
+    for name, params in filters.items():
+        benchmark.measure(f'events.filter.{name}', lambda _, p=params: benchmark.client.get('/api/events', params=p),
+                          200)
+
+    for ordering in ORDERINGS['events']:
+        benchmark.measure(f'events.order.{ordering}',
+                          lambda _, o=ordering: benchmark.client.get('/api/events', params={'ordering': o}), 200)
+
+
+def listing_tests(benchmark: Benchmark) -> None:
+    """Tests list with every filter and ordering."""
+
+    hot_test = benchmark.tests[0]
+
+    filters = {
+        'default': {},
+        'uid': {'uid': hot_test['uid'].rsplit('.', 1)[-1]},
+        'file': {'file': '/login/'},
+        'test_marks': {'test_marks': json.dumps(json.loads(hot_test['marks'])[:1])},
+    }
+
+    for name, params in filters.items():
+        benchmark.measure(f'tests.filter.{name}', lambda _, p=params: benchmark.client.get('/api/tests', params=p),
+                          200)
+
+    for ordering in ORDERINGS['tests']:
+        benchmark.measure(f'tests.order.{ordering}',
+                          lambda _, o=ordering: benchmark.client.get('/api/tests', params={'ordering': o}), 200)
+
+
+def deep_pagination(benchmark: Benchmark) -> None:
+    """First, middle and last pages of events and tests lists."""
+
+    for resource in ('events', 'tests'):
+        count = benchmark.client.get(f'/api/{resource}').json()['count']
+        last_page = max(0, math.ceil(count / benchmark.page_limits[resource]) - 1)
+
+        for fraction in (0, 10, 50, 90, 100):
+            page = last_page * fraction // 100
+            benchmark.measure(f'{resource}.page.{fraction}%',
+                              lambda _, r=resource, p=page: benchmark.client.get(f'/api/{r}', params={'page': p}), 200)
+
+
+def details(benchmark: Benchmark) -> None:
+    """Single event and test requested by id."""
+
+    event_ids = benchmark.ids('events')
+    test_ids = benchmark.ids('tests')
+
+    benchmark.measure('events.detail', lambda index: benchmark.client.get(
+        f'/api/events/{event_ids[index * 7919 % len(event_ids)]}'), 200)
+    benchmark.measure('tests.detail', lambda index: benchmark.client.get(
+        f'/api/tests/{test_ids[index * 7919 % len(test_ids)]}'), 200)
+
+
+def ingestion(benchmark: Benchmark, batch_size: int = 50) -> None:
+    """Events reported one by one, as sequence of requests and in bulk requests."""
+
+    generator, tests = benchmark.generator, benchmark.tests
+
+    benchmark.measure('events.ingest.single',
+                      lambda _: benchmark.client.post('/api/events', json=generator.event_payload(tests)), 201)
+
+    benchmark.measure(
+        f'events.ingest.batch{batch_size}',
+        lambda _: [benchmark.client.post('/api/events', json=generator.event_payload(tests))
+                   for _ in range(batch_size)],
+        201, operations_per_call=batch_size, repeat=max(1, benchmark.repeat // 10)
+    )
+
+    benchmark.measure(
+        f'events.ingest.bulk{batch_size}',
+        lambda _: benchmark.client.post('/api/events/bulk',
+                                        json=[generator.event_payload(tests) for _ in range(batch_size)]),
+        201, operations_per_call=batch_size, repeat=max(1, benchmark.repeat // 10)
+    )
+
+
+def deletes(benchmark: Benchmark, batch_size: int = 10) -> None:
+    """Events and tests deleted by ids."""
+
+    event_ids = benchmark.ids('events')
+    test_ids = benchmark.ids('tests')
+
+    benchmark.measure(
+        f'events.delete.batch{batch_size}',
+        lambda index: benchmark.client.post(
+            '/api/events/delete', json={'ids': event_ids[index * batch_size:(index + 1) * batch_size]}),
+        207, operations_per_call=batch_size, repeat=min(benchmark.repeat, len(event_ids) // batch_size)
+    )
+
+    benchmark.measure(
+        'tests.delete.single',
+        lambda index: benchmark.client.post('/api/tests/delete', json={'ids': [test_ids[-(index + 1)]]}),
+        207, repeat=min(benchmark.repeat, len(test_ids) // 2)
+    )
+
+
+# Destructive scenarios go last, so they do not change data seen by read scenarios.
+SCENARIOS = {
+    'listing_events': listing_events,
+    'listing_tests': listing_tests,
+    'deep_pagination': deep_pagination,
+    'details': details,
+    'ingestion': ingestion,
+    'deletes': deletes,
+}
+
+
+def run_scenarios(benchmark: Benchmark, pattern: str = '*') -> dict:
+    """Runs scenarios with names matching given pattern and returns their summary."""
+
+    for name, scenario in SCENARIOS.items():
+        if fnmatch.fnmatch(name, pattern):
+            scenario(benchmark)
+
+    return benchmark.summary()
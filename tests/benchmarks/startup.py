@@ -0,0 +1,152 @@
+"""Import and startup time measurement.
+
+Usage (from repository root):
+
+    PYTHONPATH=src python -m tests.benchmarks.startup --repeat 10 --output startup.json
+
+Every run starts fresh interpreter, so imports are cold (apart from the OS file cache), and measures
+milliseconds spent on importing the package, importing the app module, creating the app, running its
+startup (on new and on existing database) and serving the first request. It also lists heavy modules
+which were pulled in by importing the bare package.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from .scenarios import percentile
+
+
+PHASES = ('import_package', 'import_application', 'create_app', 'startup', 'first_request')
+
+HEAVY_MODULES = ('fastapi', 'starlette', 'sqlalchemy', 'pydantic', 'dependency_injector')
+
+PROBE = f'''
+import sys
+import json
+import time
+import asyncio
+
+started = time.perf_counter()
+import failurebase
+package_imported = time.perf_counter()
+heavy_modules = [module for module in {HEAVY_MODULES!r} if module in sys.modules]
+
+from failurebase.application import create_app
+application_imported = time.perf_counter()
+
+app = create_app()
+app_created = time.perf_counter()
+
+
+async def serve():
+    await app.router.startup()
+    started_up = time.perf_counter()
+
+    async def receive():
+        return {{'type': 'http.request', 'body': b'', 'more_body': False}}
+
+    statuses = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    scope = {{'type': 'http', 'asgi': {{'version': '3.0'}}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': '/api/tests', 'raw_path': b'/api/tests', 'query_string': b'',
+             'root_path': '', 'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 0),
+             'server': ('localhost', 80)}}
+    await app(scope, receive, send)
+    served = time.perf_counter()
+
+    await app.router.shutdown()
+    assert statuses == [200], statuses
+
+    return started_up, served
+
+
+started_up, served = asyncio.run(serve())
+
+print(json.dumps({{
+    'import_package': package_imported - started,
+    'import_application': application_imported - package_imported,
+    'create_app': app_created - application_imported,
+    'startup': started_up - app_created,
+    'first_request': served - started_up,
+    'heavy_modules': heavy_modules,
+}}))
+'''
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Returns parsed command line arguments."""
+
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmarks.startup',
+                                     description='Failurebase import and startup time.')
+    parser.add_argument('--repeat', type=int, default=10, help='number of measured interpreter starts')
+    parser.add_argument('--output', type=Path, help='file to store results in (stdout by default)')
+
+    return parser.parse_args()
+
+
+def probe(configuration: Path) -> dict:
+    """Measures single start of fresh interpreter."""
+
+    env = dict(os.environ, FAILUREBASE_CONFIGURATION=str(configuration))
+    output = subprocess.check_output([sys.executable, '-c', PROBE], env=env, text=True)
+
+    return json.loads(output)
+
+
+def summarize(samples: list[dict]) -> dict:
+    """Returns p50/p95/max of every phase in milliseconds."""
+
+    summary = {}
+    for phase in PHASES + ('total',):
+        values = sorted(1000 * (sum(sample[name] for name in PHASES) if phase == 'total' else sample[phase])
+                        for sample in samples)
+        summary[phase] = {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'max': values[-1]}
+
+    return summary
+
+
+def main() -> int:
+    """Runs measurement."""
+
+    arguments = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        database = Path(directory) / 'startup.db'
+        configuration = Path(directory) / '.env.startup'
+        configuration.write_text(f'DATABASE_URI=sqlite:///{database}\nEVENTS_PER_PAGE=50\nTESTS_PER_PAGE=50\n')
+
+        cold = []
+        warm = []
+        for _ in range(arguments.repeat):
+            database.unlink(missing_ok=True)
+            cold.append(probe(configuration))
+            warm.append(probe(configuration))
+
+    results = {
+        'repeat': arguments.repeat,
+        'heavy_modules_of_package_import': warm[-1]['heavy_modules'],
+        'new_database': summarize(cold),
+        'existing_database': summarize(warm),
+    }
+
+    output = json.dumps(results, indent=2)
+    if arguments.output is None:
+        print(output)
+    else:
+        arguments.output.write_text(output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
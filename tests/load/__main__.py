@@ -0,0 +1,103 @@
+"""Load test entry point.
+
+Usage (from repository root):
+
+    PYTHONPATH=src python -m tests.load --workers 4 --clients 100 --duration 60 --output load.json
+    PYTHONPATH=src python -m tests.load --database-uri postgresql://localhost/failurebase_load
+
+Starts `failurebase.application:create_app` under uvicorn with given number of workers on localhost, seeds
+database with synthetic data and replays mix of ingest, list, detail and delete requests from many
+async clients. Prints JSON with sustained RPS, error rates, tail latencies and number of database
+lock errors (collected from server logs) overall and per time interval.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+from .driver import Server, LoadDriver, Mix, summarize
+from ..benchmarks.data import DataGenerator, DatasetParameters, load_dataset
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Returns parsed command line arguments."""
+
+    parser = argparse.ArgumentParser(prog='python -m tests.load', description='Failurebase load test.')
+    parser.add_argument('--workers', type=int, default=2, help='number of uvicorn workers')
+    parser.add_argument('--clients', type=int, default=50, help='number of concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='duration of load in seconds')
+    parser.add_argument('--interval', type=float, default=1, help='length of timeline interval in seconds')
+    parser.add_argument('--mix', type=Mix.parse, default=Mix(),
+                        help='weights of operations (default: ingest=5,list=3,detail=1,delete=1)')
+    parser.add_argument('--database-uri', help='URI of local database (temporary SQLite file by default), '
+                                               'it should be empty')
+    parser.add_argument('--tests', type=int, default=500, help='number of seeded tests')
+    parser.add_argument('--events', type=int, default=10000, help='number of seeded events')
+    parser.add_argument('--seed', type=int, default=0, help='seed of data generator')
+    parser.add_argument('--output', type=Path, help='file to store results in (stdout by default)')
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs load test."""
+
+    arguments = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        database_uri = arguments.database_uri or f'sqlite:///{Path(directory) / "load.db"}'
+        configuration = Path(directory) / '.env.load'
+        configuration.write_text(f'DATABASE_URI={database_uri}\nEVENTS_PER_PAGE=50\nTESTS_PER_PAGE=50\n')
+        os.environ['FAILUREBASE_CONFIGURATION'] = str(configuration)
+
+        from sqlalchemy import create_engine, select
+        from failurebase.adapters.models import Base, Event
+
+        engine = create_engine(database_uri)
+        Base.metadata.create_all(engine)
+
+        generator = DataGenerator(DatasetParameters(tests=arguments.tests, events=arguments.events,
+                                                    seed=arguments.seed))
+        tests = generator.generate_tests()
+        load_dataset(engine, tests, generator.generate_events(tests))
+
+        with engine.connect() as connection:
+            event_ids = list(connection.execute(select(Event.id)).scalars())
+        engine.dispose()
+
+        with Server(configuration, arguments.workers) as server:
+            driver = LoadDriver(server.url, generator, tests, event_ids, arguments.mix, arguments.clients,
+                                arguments.duration)
+            started = time.monotonic()
+            driver.run()
+            lock_errors = list(server.lock_errors)
+
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(),
+            'workers': arguments.workers,
+            'clients': arguments.clients,
+            'duration': arguments.duration,
+            'mix': vars(arguments.mix),
+            'database': engine.dialect.name,
+        },
+        **summarize(driver.samples, lock_errors, started, arguments.interval),
+    }
+
+    output = json.dumps(results, indent=2)
+    if arguments.output is None:
+        print(output)
+    else:
+        arguments.output.write_text(output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
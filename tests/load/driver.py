@@ -0,0 +1,223 @@
+"""Load driver module."""
+
+import os
+import re
+import sys
+import time
+import random
+import socket
+import asyncio
+import threading
+import subprocess
+from pathlib import Path
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+
+from ..benchmarks.data import DataGenerator
+from ..benchmarks.scenarios import percentile
+
+
+# Messages which databases (through SQLAlchemy) log when writer waits too long for lock or connection.
+LOCK_ERRORS = re.compile(r'database is locked|database table is locked|deadlock detected|could not obtain lock|'
+                         r'lock timeout|QueuePool limit')
+
+
+def free_port() -> int:
+    """Returns port which is not used on localhost."""
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """Runs `failurebase.application:create_app` factory under uvicorn in subprocess."""
+
+    def __init__(self, configuration: Path, workers: int, port: int | None = None) -> None:
+        self.configuration = configuration
+        self.workers = workers
+        self.port = port or free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.lock_errors: list[float] = []
+        self._process = None
+        self._reader = None
+
+    def __enter__(self) -> 'Server':
+        """Starts server and waits until it responds."""
+
+        source = str(Path(__file__).resolve().parents[2] / 'src')
+        env = dict(os.environ, FAILUREBASE_CONFIGURATION=str(self.configuration),
+                   PYTHONPATH=os.pathsep.join(filter(None, [source, os.environ.get('PYTHONPATH')])))
+
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', '--factory', 'failurebase.application:create_app',
+             '--host', '127.0.0.1', '--port', str(self.port), '--workers', str(self.workers), '--no-access-log',
+             '--log-level', 'warning'],
+            env=env, stderr=subprocess.PIPE, text=True
+        )
+        self._reader = threading.Thread(target=self._read_logs, daemon=True)
+        self._reader.start()
+
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f'Server exited with code {self._process.returncode}.')
+            try:
+                httpx.get(f'{self.url}/api/tests', timeout=1).raise_for_status()
+            except httpx.HTTPError:
+                time.sleep(0.2)
+            else:
+                return self
+
+        raise RuntimeError('Server did not start within 60 seconds.')
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Stops server."""
+
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+    def _read_logs(self) -> None:
+        """Collects moments of lock errors logged by workers."""
+
+        for line in self._process.stderr:
+            if LOCK_ERRORS.search(line):
+                self.lock_errors.append(time.monotonic())
+
+
+@dataclass
+class Sample:
+    """Single request made by load driver."""
+
+    started: float
+    operation: str
+    latency: float
+    error: bool
+
+
+@dataclass
+class Mix:
+    """Weights of replayed operations."""
+
+    ingest: int = 5
+    list: int = 3
+    detail: int = 1
+    delete: int = 1
+
+    @classmethod
+    def parse(cls, value: str) -> 'Mix':
+        """Creates mix from string like `ingest=5,list=3,detail=1,delete=1`."""
+
+        weights = {}
+        for item in filter(None, value.split(',')):
+            name, _, weight = item.partition('=')
+            if name not in cls.__dataclass_fields__:
+                raise ValueError(f'Unknown operation "{name}".')
+            weights[name] = int(weight)
+
+        return cls(**{name: 0 for name in cls.__dataclass_fields__} | weights)
+
+
+@dataclass
+class LoadDriver:
+    """Replays mix of requests from many concurrent async clients."""
+
+    url: str
+    generator: DataGenerator
+    tests: list[dict]
+    event_ids: list[int]
+    mix: Mix
+    clients: int = 50
+    duration: float = 30.0
+    samples: list[Sample] = field(default_factory=list)
+
+    def run(self) -> None:
+        """Runs clients until duration elapses."""
+
+        asyncio.run(self._run())
+
+    async def _run(self) -> None:
+        limits = httpx.Limits(max_connections=self.clients, max_keepalive_connections=self.clients)
+        async with httpx.AsyncClient(base_url=self.url, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + self.duration
+            await asyncio.gather(*(self._client(client, deadline, random.Random(index))
+                                   for index in range(self.clients)))
+
+    async def _client(self, client: httpx.AsyncClient, deadline: float, rand: random.Random) -> None:
+        operations = list(vars(self.mix))
+        weights = list(vars(self.mix).values())
+
+        while time.monotonic() < deadline:
+            operation = rand.choices(operations, weights)[0]
+            started = time.monotonic()
+            try:
+                error = await getattr(self, f'_{operation}')(client, rand)
+            except httpx.HTTPError:
+                error = True
+            self.samples.append(Sample(started, operation, time.monotonic() - started, error))
+
+    async def _ingest(self, client: httpx.AsyncClient, rand: random.Random) -> bool:
+        response = await client.post('/api/events', json=self.generator.event_payload(self.tests))
+        if response.status_code == 201:
+            self.event_ids.append(response.json()['id'])
+        return response.status_code != 201
+
+    async def _list(self, client: httpx.AsyncClient, rand: random.Random) -> bool:
+        resource = rand.choice(['events', 'events', 'tests'])
+        response = await client.get(f'/api/{resource}', params={'page': rand.randint(0, 20)})
+        return response.status_code != 200
+
+    async def _detail(self, client: httpx.AsyncClient, rand: random.Random) -> bool:
+        if not self.event_ids:
+            return False
+        response = await client.get(f'/api/events/{rand.choice(self.event_ids)}')
+        return response.status_code not in (200, 404)  # deleted concurrently
+
+    async def _delete(self, client: httpx.AsyncClient, rand: random.Random) -> bool:
+        if not self.event_ids:
+            return False
+        ids = [self.event_ids.pop(rand.randrange(len(self.event_ids)))
+               for _ in range(min(5, len(self.event_ids)))]
+        response = await client.post('/api/events/delete', json={'ids': ids})
+        return response.status_code != 207
+
+
+def summarize(samples: list[Sample], lock_errors: list[float], started: float, interval: float) -> dict:
+    """Returns overall and per interval statistics of load run."""
+
+    def statistics(chunk: list[Sample], elapsed: float) -> dict:
+        latencies = sorted(sample.latency for sample in chunk)
+        errors = sum(sample.error for sample in chunk)
+        return {
+            'requests': len(chunk),
+            'rps': len(chunk) / elapsed if elapsed else 0.0,
+            'error_rate': errors / len(chunk) if chunk else 0.0,
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+        }
+
+    elapsed = max((sample.started + sample.latency for sample in samples), default=started) - started
+
+    buckets: dict[int, list[Sample]] = {}
+    for sample in samples:
+        buckets.setdefault(int((sample.started - started) // interval), []).append(sample)
+    locks = Counter(int((moment - started) // interval) for moment in lock_errors)
+
+    operations: dict[str, list[Sample]] = {}
+    for sample in samples:
+        operations.setdefault(sample.operation, []).append(sample)
+
+    return {
+        'total': statistics(samples, elapsed) | {'lock_errors': len(lock_errors)},
+        'operations': {name: statistics(chunk, elapsed) for name, chunk in sorted(operations.items())},
+        'timeline': [
+            {'second': index * interval} | statistics(buckets.get(index, []), interval) | {'lock_errors': locks[index]}
+            for index in range(max(buckets, default=-1) + 1)
+        ],
+    }
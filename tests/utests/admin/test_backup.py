@@ -0,0 +1,134 @@
+import io
+import gzip
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, func
+
+from failurebase.application import create_app
+from failurebase.adapters import backup as backup_module
+from failurebase.adapters.backup import backup, restore, read_lines
+from failurebase.adapters.database import Database
+from failurebase.adapters.exceptions import DatabaseNotEmptyError, InvalidBackupError
+from failurebase.adapters.models import Base, Event, Test
+from failurebase.settings import Settings
+
+
+def restore_into(tmp_path, data: bytes) -> Database:
+    db = Database(f'sqlite:///{tmp_path / "restored.db"}')
+    db.create_database()
+    db.restore(read_lines(io.BytesIO(data)))
+    return db
+
+
+class TestBackup:
+
+    def test_backup_endpoint(self, client, database_session, tmp_path):
+
+        response = client.get('/api/admin/backup')
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/gzip'
+        assert response.headers['content-disposition'].startswith('attachment; filename="failurebase-')
+
+        db = restore_into(tmp_path, response.content)
+        engine = create_engine(f'sqlite:///{tmp_path / "restored.db"}')
+        with engine.connect() as connection:
+            assert connection.execute(select(func.count()).select_from(Event)).scalar_one() == \
+                   database_session.query(Event).count()
+            restored = connection.execute(select(Test.uid, Test.first_seen).order_by(Test.id)).all()
+        assert restored == [tuple(row) for row in database_session.query(Test.uid, Test.first_seen).order_by(Test.id)]
+        engine.dispose()
+        db._engine.dispose()
+
+    def test_backup_in_steps(self, client, database_session, tmp_path):
+
+        engine = create_engine(client.app.container.config()['DATABASE_URI'])
+        data = b''.join(backup(engine, sqlite_pages_per_step=1, batch_size=2))
+        engine.dispose()
+
+        lines = gzip.decompress(data).decode().splitlines()
+        assert '"format": "failurebase-backup"' in lines[0]
+        assert lines[-1] == f'{{"end": true, "rows": {len(lines) - 2 - len(Base.metadata.sorted_tables)}}}'
+
+    def test_copy_in_steps_is_finished_when_database_is_written(self, tmp_path):
+
+        source = sqlite3.connect(tmp_path / 'live.db', isolation_level=None)
+        source.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)')
+        source.executemany('INSERT INTO items (value) VALUES (?)', [('x' * 1000,) for _ in range(100)])
+        writer = sqlite3.connect(tmp_path / 'live.db', isolation_level=None)
+        steps = []
+
+        class WrittenBetweenSteps:
+            """Other connection writes after every step, so the copy is restarted every time."""
+
+            def backup(self, target, progress=None, **kwargs):
+                def write(status, remaining, total):
+                    steps.append(remaining)
+                    writer.execute('UPDATE items SET value = ? WHERE id = 1', (str(len(steps)),))
+                    if progress is not None:
+                        progress(status, remaining, total)
+                source.backup(target, progress=write, **kwargs)
+
+        target = sqlite3.connect(tmp_path / 'snapshot.db')
+        backup_module._copy(WrittenBetweenSteps(), target, pages_per_step=1, step_sleep=0.0)
+
+        # the first step, restarts and the rest copied in single step (before the last write)
+        assert len(steps) == 1 + backup_module.SQLITE_MAX_RESTARTS + 1 + 1 and steps[-1] == 0
+        assert target.execute('SELECT COUNT(*), MIN(value) FROM items').fetchone() == (100, str(len(steps) - 1))
+        for connection in (source, writer, target):
+            connection.close()
+
+    def test_wal_database_is_dumped_from_snapshot(self, tmp_path, monkeypatch):
+
+        db = Database(f'sqlite:///{tmp_path / "live.db"}', sqlite_wal=True)
+        db.create_database()
+        with db._engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+
+        monkeypatch.setattr(backup_module, '_copy', None)
+        data = b''.join(db.backup(batch_size=2))
+        db._engine.dispose()
+
+        lines = gzip.decompress(data).decode().splitlines()
+        assert lines[-1] == '{"end": true, "rows": 0}'
+
+    def test_memory_storage_cannot_be_backed_up(self, client, tmp_path):
+
+        settings = Settings(_env_file=None, DATABASE_URI='sqlite://', EVENTS_PER_PAGE=3, TESTS_PER_PAGE=3,
+                            STORAGE_BACKEND='memory')
+        try:
+            with TestClient(create_app(settings)) as memory_client:
+                response = memory_client.get('/api/admin/backup')
+        finally:
+            # applications wire endpoints to their own containers
+            client.app.container.wire()
+
+        assert response.status_code == 501
+        assert response.json() == {'detail': 'In-memory storage cannot be backed up.'}
+
+    def test_restore_into_not_empty_database(self, client, database_session, tmp_path):
+
+        data = client.get('/api/admin/backup').content
+        db = restore_into(tmp_path, data)
+
+        with pytest.raises(DatabaseNotEmptyError):
+            db.restore(read_lines(io.BytesIO(data)))
+        db._engine.dispose()
+
+    def test_restore_truncated_backup(self, client, database_session, tmp_path):
+
+        lines = gzip.decompress(client.get('/api/admin/backup').content).decode().splitlines()
+        db = Database(f'sqlite:///{tmp_path / "restored.db"}')
+        db.create_database()
+
+        with pytest.raises(InvalidBackupError):
+            db.restore(lines[:-1])
+        with pytest.raises(InvalidBackupError):
+            db.restore(['{"format": "something-else"}'])
+
+        engine = create_engine(f'sqlite:///{tmp_path / "restored.db"}')
+        with engine.connect() as connection:
+            assert connection.execute(select(func.count()).select_from(Event)).scalar_one() == 0
+        engine.dispose()
+        db._engine.dispose()
@@ -0,0 +1,79 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from failurebase.services.columns import EventColumns, ColumnsTest
+
+numpy = pytest.importorskip('numpy')
+
+
+START = datetime(2023, 1, 1)
+
+
+@pytest.fixture()
+def snapshot():
+
+    generator = random.Random(7)
+    tests = [ColumnsTest(test_id, 'default' if test_id % 4 else 'other', f'suite/case_{test_id}',
+                         f'suite/file_{test_id % 5}.py', generator.sample(['a', 'b', 'c', 'd'], test_id % 3))
+             for test_id in range(1, 41)]
+    rows = [(event_id, generator.choice(tests).id, generator.choice([None, 1, 2, 3]),
+             START + timedelta(hours=generator.randrange(24 * 10)), f'Error {generator.randrange(3)}: line {event_id}')
+            for event_id in range(1, 2001)]
+
+    columns = EventColumns()
+    columns.INITIAL_CAPACITY = 16  # growth is exercised as well
+    columns.update_tests(tests)
+    for index in range(0, len(rows), 300):
+        columns.append(rows[index:index + 300])
+
+    columns.remove(range(1, 2001, 7))
+    columns.remove_tests([1, 2])
+
+    alive = [row for row in rows if row[0] % 7 != 1 and row[1] not in (1, 2)]
+    yield columns, {test.id: test for test in tests}, alive
+
+
+class TestEventColumns:
+
+    def test_counts_match_rows(self, snapshot):
+
+        columns, tests, rows = snapshot
+        rows = [row for row in rows if tests[row[1]].project == 'default']
+        selection = columns.select(project='default')
+
+        expected = Counter((mark, row[3].date().isoformat()) for row in rows for mark in tests[row[1]].marks)
+        assert dict((tuple(keys), count) for keys, count in selection.counts(['mark', 'day'], 1000)) == expected
+
+        expected = Counter((row[3].date().isoformat(), tests[row[1]].file) for row in rows)
+        assert dict((tuple(keys), count) for keys, count in selection.counts(['day', 'file'], 1000)) == expected
+
+        top = selection.counts(['test'], 3)
+        assert [count for _, count in top] == sorted(Counter(row[1] for row in rows).values(), reverse=True)[:3]
+
+    def test_filters(self, snapshot):
+
+        columns, tests, rows = snapshot
+        selection = columns.select(start=START + timedelta(days=2), end=START + timedelta(days=5),
+                                   test_file='FILE_3', test_marks=['a', 'b'])
+
+        expected = [row for row in rows if START + timedelta(days=2) <= row[3] <= START + timedelta(days=5)
+                    and tests[row[1]].file == 'suite/file_3.py' and {'a', 'b'} <= set(tests[row[1]].marks)]
+        assert len(selection) == len(expected) > 0
+
+    def test_co_occurrence(self, snapshot):
+
+        columns, tests, rows = snapshot
+        top, matrix = columns.select().co_occurrence('run', 0, 5)
+
+        runs = {test.id: {row[2] for row in rows if row[1] == test.id and row[2] is not None} for test in top}
+        assert matrix == [[len(runs[first.id] & runs[second.id]) for second in top] for first in top]
+
+    def test_invalidate(self, snapshot):
+
+        columns, _, _ = snapshot
+        columns.invalidate()
+
+        assert (len(columns), columns.cursor, len(columns.select())) == (0, 0, 0)
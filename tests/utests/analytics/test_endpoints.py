@@ -0,0 +1,101 @@
+import pytest
+
+from ..data import event_data
+
+from failurebase.services.columns import EventColumns
+
+numpy = pytest.importorskip('numpy')
+
+
+def with_uid(uid: str, **kwargs) -> dict:
+    return {**event_data, 'test': {**event_data['test'], 'uid': uid}, **kwargs}
+
+
+class TestAnalytics:
+
+    def test_groups(self, client, database_session):
+
+        response = client.get('/api/analytics/groups?by=mark&limit=4')
+
+        assert response.status_code == 200
+        assert response.json()['count'] == 5
+        assert [(group['keys'], group['count']) for group in response.json()['groups']] == [
+            (['CRT'], 3), (['LOGIN_MFA'], 2), (['LOGIN_NO_SOCIAL_MEDIA'], 2), (['regression'], 2)
+        ]
+
+        content = client.get('/api/analytics/groups?by=day&by=mark&test_marks=["CRT"]&limit=3').json()
+        assert content['count'] == 3
+        assert content['groups'][0] == {'keys': ['2023-06-03', 'CRT'], 'count': 3}
+
+        content = client.get('/api/analytics/groups?by=fingerprint').json()
+        assert content['groups'][0] == {'keys': ['SocialMediaLoginError: unknown issue'], 'count': 2}
+
+        content = client.get('/api/analytics/groups?by=file&test_file=ATESTS/login').json()
+        assert [group['count'] for group in content['groups']] == [1, 1, 1]
+
+    def test_snapshot_is_refreshed(self, client, database_session):
+
+        assert client.get('/api/analytics/groups?by=test').json()['count'] == 5
+
+        client.post('/api/events', json=with_uid('new', message='Error 1'))
+        client.post('/api/events', json=with_uid('new', message='Error 2'))
+        client.post('/api/events', json=with_uid('new'), headers={'X-Project': 'other'})
+
+        content = client.get('/api/analytics/groups?by=test&by=fingerprint').json()
+        assert (content['count'], content['groups'][0]) == (7, {'keys': ['new', 'Error #'], 'count': 2})
+
+        test_id = client.get('/api/tests?uid=new').json()['items'][0]['id']
+        client.post('/api/tests/delete', json={'ids': [test_id]})
+
+        assert client.get('/api/analytics/groups?by=test').json()['count'] == 5
+        assert client.get('/api/projects/other/analytics/groups?by=test').json()['groups'] == [
+            {'keys': ['new'], 'count': 1}
+        ]
+
+    def test_histogram(self, client, database_session):
+
+        content = client.get('/api/analytics/histogram?points=2&start_server_timestamp=2023-06-03T12:00:00.0'
+                             '&end_server_timestamp=2023-06-03T16:00:00.0').json()
+
+        assert content['bucket_size'] == 7200
+        assert [point['count'] for point in content['points']] == [2, 1]
+
+        content = client.get('/api/analytics/histogram?points=3&test_marks=["regression"]').json()
+        assert (content['start'], content['end']) == ('2022-11-26T19:02:08.000000', '2022-12-21T18:34:38.000000')
+        assert [point['count'] for point in content['points']] == [1, 0, 1]
+
+    def test_co_occurrence(self, client, database_session):
+
+        content = client.get(f'/api/analytics/co-occurrence?by=window&window={24 * 3600}&limit=3'
+                             f'&start_server_timestamp=2023-01-01T00:00:00.0').json()
+
+        assert len(content['tests']) == 3
+        assert content['matrix'] == [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+
+        run_id = client.post('/api/runs', json={'name': '#1'}).json()['id']
+        body = b"\n".join((
+            b'{"message": "a", "traceback": "", "timestamp": "2023-04-02T09:45:21.2318", '
+            b'"test": {"uid": "first", "file": "f.py", "marks": []}}',
+            b'{"message": "b", "traceback": "", "timestamp": "2023-04-02T09:45:21.2318", '
+            b'"test": {"uid": "second", "file": "f.py", "marks": []}}',
+        ))
+        client.post(f'/api/runs/{run_id}/events', content=body, headers={'Content-Type': 'application/x-ndjson'})
+
+        content = client.get('/api/analytics/co-occurrence?test_file=f.py').json()
+        assert [test['uid'] for test in content['tests']] == ['first', 'second']
+        assert content['matrix'] == [[1, 1], [1, 1]]
+
+    def test_validation(self, client, database_session):
+
+        assert client.get('/api/analytics/groups').status_code == 422
+        assert client.get('/api/analytics/groups?by=day&by=mark&by=test').status_code == 422
+        assert client.get('/api/analytics/groups?by=mark&by=mark').status_code == 422
+        assert client.get('/api/analytics/groups?by=message').status_code == 422
+        assert client.get('/api/analytics/co-occurrence?by=commit').status_code == 422
+
+    def test_disabled(self, client, database_session):
+
+        with client.app.container.services.event_columns.override(EventColumns(enabled=False)):
+            response = client.get('/api/analytics/groups?by=mark')
+
+        assert response.status_code == 501
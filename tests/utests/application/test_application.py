@@ -0,0 +1,127 @@
+import os
+import sys
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+
+from failurebase.application import create_app
+from failurebase.adapters.database import Database
+from failurebase.adapters.repositories.event import EventRepository
+from failurebase.adapters.repositories.test import TestRepository
+from failurebase.adapters.repositories.change import ChangeRepository
+from failurebase.adapters.repositories.project import ProjectRepository
+from failurebase.adapters.repositories.run import RunRepository
+from failurebase.services.uow import DatabaseUnitOfWork
+from failurebase.settings import Settings, CONFIGURATION_FILE_VARIABLE
+
+
+def make_settings(tmp_path, **kwargs):
+    return Settings(_env_file=None, DATABASE_URI=f'sqlite:///{tmp_path / "app.db"}', EVENTS_PER_PAGE=3,
+                    TESTS_PER_PAGE=3, EVENTS_COUNT_FOLD_INTERVAL=0, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def session_app_wiring(client):
+
+    yield
+
+    # Applications created here wire endpoints to their own containers.
+    client.app.container.wire()
+
+
+class TestCreateApp:
+
+    def test_import_does_not_need_configuration(self):
+
+        env = {name: value for name, value in os.environ.items() if name != CONFIGURATION_FILE_VARIABLE}
+        code = 'import sys, failurebase, failurebase.application; print("fastapi" in sys.modules)'
+
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == 'True'
+
+    def test_optional_codecs_are_not_imported_by_app(self, tmp_path):
+
+        code = ('import sys\n'
+                'from failurebase.application import create_app\n'
+                'from failurebase.settings import Settings\n'
+                f'create_app(Settings(_env_file=None, DATABASE_URI="sqlite:///{tmp_path / "app.db"}", '
+                'EVENTS_PER_PAGE=3, TESTS_PER_PAGE=3))\n'
+                'print([module for module in ("numpy", "msgpack", "zstandard") if module in sys.modules])')
+
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == '[]'
+
+    def test_database_is_created_on_startup(self, tmp_path):
+
+        app = create_app(make_settings(tmp_path))
+
+        assert not (tmp_path / 'app.db').exists()
+
+        with TestClient(app) as client:
+            response = client.get('/api/tests')
+
+        assert response.status_code == 200
+        assert 'tests' in inspect(create_engine(f'sqlite:///{tmp_path / "app.db"}')).get_table_names()
+
+    def test_database_is_not_created_when_disabled(self, tmp_path):
+
+        with TestClient(create_app(make_settings(tmp_path, CREATE_DATABASE_ON_STARTUP=False))):
+            pass
+
+        assert inspect(create_engine(f'sqlite:///{tmp_path / "app.db"}')).get_table_names() == []
+
+    def test_threadpool_is_sized_to_database_pool(self, tmp_path):
+
+        assert make_settings(tmp_path).THREADPOOL_SIZE == 15
+        assert make_settings(tmp_path, DATABASE_POOL_SIZE=20, DATABASE_MAX_OVERFLOW=0).THREADPOOL_SIZE == 20
+        assert make_settings(tmp_path, THREADPOOL_SIZE=4).THREADPOOL_SIZE == 4
+
+        with TestClient(create_app(make_settings(tmp_path, DATABASE_POOL_SIZE=3, DATABASE_MAX_OVERFLOW=1))) as client:
+            metrics = client.get('/api/metrics').json()
+
+        assert metrics['threadpool'] == {'size': 4, 'busy': 0, 'waiting': 0}
+        assert metrics['database_pool'] == {'size': 3, 'max_overflow': 1, 'checked_out': 0, 'overflow': 0}
+
+    def test_memory_storage_has_no_request_session(self, tmp_path):
+
+        with TestClient(create_app(make_settings(tmp_path, STORAGE_BACKEND='memory'))) as client:
+            assert client.post('/api/projects/nightly', json={}).status_code == 200
+            projects = client.get('/api/projects').json()
+            metrics = client.get('/api/metrics').json()
+
+        assert [project['name'] for project in projects['items']] == ['nightly']
+        assert metrics['database_pool'] is None
+
+
+class TestRequestSession:
+
+    def test_units_of_work_share_request_session(self, tmp_path):
+
+        database = Database(f'sqlite:///{tmp_path / "app.db"}')
+        database.create_database()
+        created = []
+
+        def session_factory():
+            created.append(database.session_factory())
+            return created[-1]
+
+        with database.request_session() as session:
+            uow = DatabaseUnitOfWork(session_factory, EventRepository, TestRepository, ChangeRepository,
+                                     ProjectRepository, RunRepository, session=session)
+            for project in ('default', 'other'):
+                with uow.for_project(project) as opened_uow:
+                    assert opened_uow.session is session
+                    opened_uow.project_repository.save(project)
+                    opened_uow.commit()
+
+            with uow as opened_uow:
+                assert [project.name for project in opened_uow.project_repository.get_all()] == ['default', 'other']
+
+        assert created == []
+        assert not session.in_transaction()
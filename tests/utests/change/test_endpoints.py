@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func
+
+from failurebase.adapters.models import Change, ChangeType
+
+
+data = {
+    'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+    'message': 'TputError: level of tput is too low',
+    'traceback': '... sth :) ...',
+    'timestamp': '2023-04-02T09:45:21.2318'
+}
+
+
+class TestGetChanges:
+
+    def test_get_changes(self, client, database_session):
+
+        cursor = database_session.query(func.max(Change.id)).scalar() or 0
+
+        created = client.post('/api/events', json=data).json()
+        bulk_ids = client.post('/api/events/bulk', json=[data, data]).json()['ids']
+        client.post('/api/events/delete', json={'ids': [bulk_ids[0], 999999]})
+
+        response = client.get(f'/api/changes?cursor={cursor}')
+
+        assert response.status_code == 200
+
+        content = response.json()
+
+        assert [(item['type'], item['id']) for item in content['items']] == [
+            ('event_created', created['id']),
+            ('event_created', bulk_ids[1]),
+            ('event_deleted', bulk_ids[0]),
+        ]
+        # Event is returned in its current state, its test has two events by now (three created, one deleted).
+        test = client.get(f'/api/tests/{created["test"]["id"]}').json()
+        assert test['total_events_count'] == 2
+        assert content['items'][0]['event'] == created | {'test': test}
+        assert content['items'][2]['event'] is None
+        assert content['cursor'] > cursor
+        assert content['has_more'] is False
+
+        client.post('/api/tests/delete', json={'ids': [created['test']['id']]})
+
+        content = client.get(f'/api/changes?cursor={content["cursor"]}').json()
+
+        assert [(item['type'], item['id']) for item in content['items']] == [('test_deleted', created['test']['id'])]
+
+    def test_get_changes_in_batches(self, client, database_session):
+
+        cursor = database_session.query(func.max(Change.id)).scalar() or 0
+        ids = client.post('/api/events/bulk', json=[data] * 5).json()['ids']
+
+        received = []
+        has_more = True
+        while has_more:
+            content = client.get(f'/api/changes?cursor={cursor}&limit=2').json()
+            assert len(content['items']) <= 2
+            received.extend(item['id'] for item in content['items'])
+            cursor, has_more = content['cursor'], content['has_more']
+
+        assert received == ids
+        assert client.get(f'/api/changes?cursor={cursor}').json() == {'items': [], 'cursor': cursor,
+                                                                         'has_more': False}
+
+    def test_changes_after_recent_gap_are_held_back(self, client, database_session):
+
+        cursor = database_session.query(func.max(Change.id)).scalar() or 0
+        # change with id cursor + 2 is not committed yet (or it was rolled back)
+        database_session.add_all([
+            Change(id=cursor + 1, type=ChangeType.TEST_DELETED.value, object_id=1, timestamp=datetime.now()),
+            Change(id=cursor + 3, type=ChangeType.TEST_DELETED.value, object_id=3, timestamp=datetime.now()),
+        ])
+        database_session.commit()
+
+        with client.app.container.config.CURSOR_SETTLE_TIME.override(30.0):
+
+            content = client.get(f'/api/changes?cursor={cursor}').json()
+            assert [item['id'] for item in content['items']] == [1]
+
+            database_session.add(Change(id=cursor + 2, type=ChangeType.TEST_DELETED.value, object_id=2,
+                                        timestamp=datetime.now()))
+            database_session.commit()
+
+            content = client.get(f'/api/changes?cursor={content["cursor"]}').json()
+            assert [item['id'] for item in content['items']] == [2, 3]
+
+            database_session.add(Change(id=cursor + 5, type=ChangeType.TEST_DELETED.value, object_id=5,
+                                        timestamp=datetime.now() - timedelta(minutes=1)))
+            database_session.commit()
+
+            # gap which is older than settle time was left by rolled back transaction
+            content = client.get(f'/api/changes?cursor={content["cursor"]}').json()
+            assert [item['id'] for item in content['items']] == [5]
+
+    def test_get_changes_validation(self, client):
+
+        assert client.get('/api/changes?cursor=-1').status_code == 422
+        assert client.get('/api/changes?limit=0').status_code == 422
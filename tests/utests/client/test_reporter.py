@@ -0,0 +1,146 @@
+import gzip
+import json
+import time
+import threading
+
+from failurebase_client import Reporter, DeliveryError, RejectedError
+
+
+class FakeTransport:
+
+    def __init__(self, error=None):
+        self.error = error
+        self.batches = []
+
+    def send(self, body, headers):
+        if self.error is not None:
+            raise self.error
+        if headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.batches.append(json.loads(body))
+
+    def close(self):
+        pass
+
+
+def make_event(index):
+    return {
+        'test': {'uid': f'tests/test_demo.py::test_{index}', 'marks': ['smoke'], 'file': 'tests/test_demo.py'},
+        'message': f'AssertionError: {index}',
+        'traceback': 'assert False',
+        'timestamp': '2023-04-02T09:45:21.231800',
+    }
+
+
+def make_reporter(transport, tmp_path, **kwargs):
+    kwargs = dict(batch_size=2, flush_interval=0.05, backoff=0.01, max_backoff=0.02, max_retries=1) | kwargs
+    return Reporter('http://localhost', tmp_path / 'spool', transport=transport, **kwargs)
+
+
+class TestReporter:
+
+    def test_report_sends_batches(self, tmp_path):
+
+        transport = FakeTransport()
+        reporter = make_reporter(transport, tmp_path, compress=True)
+        reporter.start()
+
+        for index in range(5):
+            reporter.report(make_event(index))
+
+        reporter.close()
+
+        assert [len(batch) for batch in transport.batches] == [2, 2, 1]
+        assert [event['message'] for batch in transport.batches for event in batch] == \
+               [f'AssertionError: {index}' for index in range(5)]
+        assert reporter.spool.count() == 0
+
+    def test_report_spools_when_server_is_unavailable(self, tmp_path):
+
+        transport = FakeTransport(DeliveryError('Connection refused'))
+        reporter = make_reporter(transport, tmp_path)
+        reporter.start()
+
+        for index in range(5):
+            reporter.report(make_event(index))
+
+        reporter.close()
+
+        assert transport.batches == []
+        assert reporter.spool.count() > 0
+
+        transport = FakeTransport()
+        reporter = make_reporter(transport, tmp_path)
+        reporter.start()
+
+        deadline = time.monotonic() + 5
+        while reporter.spool.count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        reporter.close()
+
+        assert sorted(event['message'] for batch in transport.batches for event in batch) == \
+               sorted(f'AssertionError: {index}' for index in range(5))
+        assert reporter.spool.count() == 0
+
+    def test_report_keeps_rejected_batches(self, tmp_path):
+
+        transport = FakeTransport(RejectedError('Server rejected batch with 422'))
+        reporter = make_reporter(transport, tmp_path)
+        reporter.start()
+
+        reporter.report(make_event(0))
+        reporter.close()
+
+        assert reporter.spool.count() == 0
+        assert len(list((tmp_path / 'spool' / 'rejected').glob('*.json'))) == 1
+
+    def test_report_does_not_block_when_queue_is_full(self, tmp_path):
+
+        transport = FakeTransport()
+        reporter = make_reporter(transport, tmp_path, max_queue_size=1)
+
+        for index in range(3):
+            reporter.report(make_event(index))
+
+        assert reporter.spool.count() == 2
+
+        reporter.start()
+        reporter.close()
+
+        delivered = [event for batch in transport.batches for event in batch]
+
+        assert len(delivered) + reporter.spool.count() == 3
+        assert delivered[0]['message'] == 'AssertionError: 0'
+
+    def test_close_is_bounded_when_queue_is_full(self, tmp_path):
+
+        sending, release = threading.Event(), threading.Event()
+
+        class StalledTransport(FakeTransport):
+
+            def send(self, body, headers):
+                sending.set()
+                release.wait(5)
+                super().send(body, headers)
+
+        transport = StalledTransport()
+        reporter = make_reporter(transport, tmp_path, batch_size=1, max_queue_size=1)
+        reporter.start()
+
+        reporter.report(make_event(0))
+        assert sending.wait(5)
+        for index in range(1, 3):
+            reporter.report(make_event(index))
+
+        # thread is stuck in delivery, so nothing takes the queued event
+        start = time.monotonic()
+        reporter.close(timeout=0.1)
+
+        assert time.monotonic() - start < 3
+        assert reporter.spool.count() == 2
+
+        release.set()
+        reporter._thread.join(5)
+        assert not reporter._thread.is_alive()
+        assert len(transport.batches) == 1
@@ -5,16 +5,17 @@ from sqlalchemy.orm import Session
 
 from .data import events, tests
 
-from failurebase import app
-from failurebase.adapters.models import Test, Event
+from failurebase import create_app
+from failurebase.adapters.models import (Test, Event, EventsCountDelta, Change, EventSignature, EventBucket,
+                                      TestSegment, Project, Run, ArchivedEventDeletion)
 
 
 @pytest.fixture(scope='session')
 def client():
 
-    client = TestClient(app)
+    with TestClient(create_app()) as client:
 
-    yield client
+        yield client
 
 
 @pytest.fixture(scope='session')
@@ -32,8 +33,16 @@ def database_session(client, config):
 
     with Session(engine) as session:
 
+        session.query(Change).delete()
+        session.query(ArchivedEventDeletion).delete()
+        session.query(EventBucket).delete()
+        session.query(EventSignature).delete()
+        session.query(EventsCountDelta).delete()
+        session.query(TestSegment).delete()
         session.query(Event).delete()
+        session.query(Run).delete()
         session.query(Test).delete()
+        session.query(Project).delete()
 
         for test, event in zip(tests.values(), events.values()):
             test_obj = Test(**test)
@@ -42,4 +51,7 @@ def database_session(client, config):
 
         session.commit()
 
+        client.app.container.services.latest_events().invalidate()
+        client.app.container.services.event_columns().invalidate()
+
         yield session
@@ -87,3 +87,16 @@ events = {
         server_timestamp=datetime(2022, 12, 21, 18, 34, 38, 231),
     )
 }
+
+
+# Body of created event, it is posted by tests of endpoints and middlewares.
+event_data = {
+    'test': {
+        'uid': 'main.2022_3.sg34.fr43915.call',
+        'marks': ['regression', 'attach'],
+        'file': '/home/test_env/repos/pytestws/2022_3/sg34/fr43915/call.py',
+    },
+    'message': 'TputError: level of tput is too low',
+    'traceback': 'Traceback (most recent call last):\n' * 50,
+    'timestamp': '2023-04-02T09:45:21.2318'
+}
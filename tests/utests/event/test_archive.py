@@ -0,0 +1,264 @@
+import re
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event as orm_event
+
+from failurebase.adapters import archive as archive_module
+from failurebase.adapters.archive import SegmentArchive, ArchivedEvent, ArchiveFilter, whole_words
+from failurebase.adapters.models import Event, Test, DEFAULT_PROJECT
+from failurebase.services.latest import LatestEvents
+
+from ..data import event_data
+
+
+def make_events(start_id: int, day: datetime, count: int) -> list[ArchivedEvent]:
+    return [ArchivedEvent(start_id + index, index % 3, f'uid-{index % 3}', f'ValueError: wrong value {index}',
+                          f'Traceback\n  File "case_{index}.py"\nValueError: wrong value {index}',
+                          day + timedelta(seconds=index), day + timedelta(seconds=index, microseconds=5))
+            for index in range(count)]
+
+
+class TestSegmentArchive:
+
+    def test_write_and_read(self, tmp_path):
+
+        archive = SegmentArchive(str(tmp_path))
+        first = make_events(1, datetime(2023, 1, 1), 50)
+        second = make_events(51, datetime(2023, 1, 2), 50)
+
+        path = archive.write(first)
+        archive.write(second)
+
+        assert re.fullmatch(r'2023/01/2023-01-01_1-50_[0-9a-f]{12}\.fbseg', path.relative_to(tmp_path).as_posix())
+        duplicate = archive.write(first)
+        assert duplicate != path
+        archive.remove(duplicate)
+        assert archive.count() == 100
+        assert list(archive.scan(ArchiveFilter())) == first + second
+        assert archive.get_by_id(77) == second[26]
+        assert archive.get_by_id(101) is None
+
+    def test_segments_are_skipped_by_index(self, tmp_path):
+
+        archive = SegmentArchive(str(tmp_path))
+        archive.write(make_events(1, datetime(2023, 1, 1), 10))
+        archive.write(make_events(11, datetime(2023, 1, 2), 10))
+        first, second = archive.get_indexes()
+
+        in_second_day = ArchiveFilter(start_server_timestamp=datetime(2023, 1, 2))
+        assert not first.may_contain(in_second_day) and second.may_contain(in_second_day)
+
+        assert not first.may_contain(ArchiveFilter(tests={7: 'uid-7'}))
+        assert first.may_contain(ArchiveFilter(tests={2: 'uid-2'}))
+
+        assert first.may_contain(ArchiveFilter(message='Error: wrong va'))
+        assert not first.may_contain(ArchiveFilter(traceback='Error: something else'))
+
+        events = list(archive.scan(ArchiveFilter(message='wrong value 1', tests={1: 'uid-1'})))
+        assert [event.id for event in events] == [2, 12]
+
+        # the same wildcards as ILIKE of database
+        events = list(archive.scan(ArchiveFilter(message='WRONG_value%7')))
+        assert [event.id for event in events] == [8, 18]
+        assert [event.id for event in archive.scan(ArchiveFilter(message='wrong value 1%'))] == [2, 12]
+
+    @pytest.mark.parametrize('ordering', ['-server_timestamp', 'server_timestamp', '-client_timestamp',
+                                          'message', '-test_uid'])
+    def test_select(self, tmp_path, ordering):
+
+        archive = SegmentArchive(str(tmp_path))
+        events = make_events(1, datetime(2023, 1, 1), 30) + make_events(31, datetime(2023, 1, 2), 30)
+        archive.write(events[:30])
+        archive.write(events[30:])
+
+        name, reverse = ordering.lstrip('-'), ordering.startswith('-')
+        expected = sorted(events, key=lambda event: (getattr(event, name), event.id), reverse=reverse)
+
+        assert archive.select(ArchiveFilter(), ordering, 7) == expected[:7]
+        # only events ordered before bound are selected
+        bound = getattr(expected[40], name)
+        before_bound = [event for event in expected if getattr(event, name) != bound
+                        and (getattr(event, name) > bound) == reverse]
+        assert archive.select(ArchiveFilter(), ordering, 50, bound) == before_bound
+        assert archive.select(ArchiveFilter(), ordering, 7, bound) == before_bound[:7]
+
+        message_filter = ArchiveFilter(message='value 1', deleted_ids=lambda first_id, last_id: frozenset({2}))
+        assert archive.select(message_filter, ordering, 100) == [event for event in expected
+                                                                 if message_filter.matches(event)]
+
+    def test_only_needed_columns_are_decompressed(self, tmp_path, monkeypatch):
+
+        archive = SegmentArchive(str(tmp_path))
+        archive.write(make_events(1, datetime(2023, 1, 1), 10))
+        archive.write(make_events(11, datetime(2023, 1, 2), 10))
+
+        decompressed = []
+        decompress = archive_module.zlib.decompress
+        monkeypatch.setattr(archive_module.zlib, 'decompress',
+                            lambda data: decompressed.append(data) or decompress(data))
+
+        # events ordered before bound (newer than the newest archived one) cannot be in archive
+        assert archive.select(ArchiveFilter(), '-server_timestamp', 10, datetime(2023, 1, 3)) == []
+        assert decompressed == []
+
+        assert archive.count(ArchiveFilter(start_server_timestamp=datetime(2023, 1, 2, 0, 0, 5))) == 5
+        assert len(decompressed) == 2  # timestamps and test ids of the newer segment only
+
+        assert archive.count_by_test(ArchiveFilter(), lambda test_ids: {1: 'uid-1'}) == {1: 6}
+        assert len(decompressed) == 2 + 2 * 2  # test ids and uids of both segments
+
+    def test_directory_is_listed_periodically(self, tmp_path):
+
+        archive = SegmentArchive(str(tmp_path), refresh_interval=3600)
+        assert archive.get_indexes() == []
+
+        SegmentArchive(str(tmp_path)).write(make_events(1, datetime(2023, 1, 1), 10))
+        assert archive.get_indexes() == []
+
+        archive.write(make_events(11, datetime(2023, 1, 2), 10))
+        assert len(archive.get_indexes()) == 1
+
+        archive.refresh_interval = 0
+        assert len(archive.get_indexes()) == 2
+
+    def test_whole_words(self):
+
+        assert whole_words('Error: wrong va') == {'wrong'}
+        assert whole_words(' by zero') == {'by'}
+        assert whole_words(' by%zero ') == set()
+        assert whole_words(' a_b c ') == {'c'}
+
+    def test_disabled_archive(self):
+
+        assert SegmentArchive(None).get_indexes() == []
+
+
+class TestArchiveEvents:
+
+    @pytest.fixture()
+    def archive(self, client, tmp_path):
+
+        archive = SegmentArchive(str(tmp_path))
+        with client.app.container.adapters.archive.override(archive):
+            yield archive
+
+    @pytest.fixture()
+    def latest_events(self, client):
+
+        latest_events = LatestEvents(max_size=1000)
+        with client.app.container.services.latest_events.override(latest_events):
+            yield latest_events
+
+    def get_all(self, client, query: str = '') -> list[dict]:
+
+        items, page = [], 0
+        while True:
+            content = client.get(f'/api/events?page={page}&{query}').json()
+            items.extend(content['items'])
+            if not content['next_page']:
+                return items
+            page += 1
+
+    def test_archived_events_are_queryable(self, client, database_session, archive, latest_events):
+
+        orderings = ['ordering=test_uid&message=Error', 'ordering=server_timestamp', 'ordering=-client_timestamp',
+                     'ordering=-message&test_marks=["regression"]']
+        events_before = self.get_all(client)
+        ordered_before = [self.get_all(client, query) for query in orderings]
+        tests_before = {test.id: test.total_events_count for test in database_session.query(Test)}
+
+        archived = client.app.container.services.event_service().archive_events(datetime(2023, 6, 3, 13),
+                                                                                 batch_size=2)
+
+        assert archived == 3
+        assert not latest_events.is_loaded(DEFAULT_PROJECT)
+        assert archive.count() == 3
+        assert len(archive.get_indexes()) == 3
+        assert database_session.query(Event).count() == len(events_before) - 3
+
+        assert self.get_all(client) == events_before
+        assert [self.get_all(client, query) for query in orderings] == ordered_before
+
+        oldest = events_before[-1]
+        assert client.get(f'/api/events/{oldest["id"]}').json() == oldest
+        assert client.get(f'/api/events?test_uid={oldest["test"]["uid"]}').json()['items'] == [oldest]
+        assert client.get('/api/events?end_server_timestamp=2023-01-01T00:00:00.000000').json()['count'] == 2
+
+        facets = client.get('/api/events/facets?message=Error').json()
+        assert facets['count'] == client.get('/api/events?message=Error').json()['count']
+
+        client.app.container.services.test_service().reconcile_events_counts()
+        database_session.expire_all()
+        assert {test.id: test.total_events_count for test in database_session.query(Test)} == tests_before
+
+        changes = client.get('/api/changes').json()['items']
+        assert [change['type'] for change in changes].count('event_archived') == 3
+
+        second_oldest = events_before[-2]
+        statuses = client.post('/api/events/delete', json={'ids': [second_oldest['id']]}).json()['statuses']
+        assert statuses == [{'id': second_oldest['id'], 'status': 200}]
+        assert client.get(f'/api/events/{second_oldest["id"]}').status_code == 404
+        assert client.get('/api/events').json()['count'] == len(events_before) - 1
+        assert second_oldest not in self.get_all(client)
+        client.app.container.services.test_service().reconcile_events_counts()
+        test = client.get(f'/api/tests/{second_oldest["test"]["id"]}').json()
+        assert test['total_events_count'] == tests_before[second_oldest['test']['id']] - 1
+        events_before.remove(second_oldest)
+
+        client.post('/api/tests/delete', json={'ids': [oldest['test']['id']]})
+
+        assert client.get(f'/api/events/{oldest["id"]}').status_code == 404
+        assert len(self.get_all(client)) == len(events_before) - 1
+
+    def test_pages_read_only_needed_stored_events(self, client, database_session, archive):
+
+        for _ in range(12):
+            client.post('/api/events', json=event_data)
+        client.app.container.services.event_service().archive_events(datetime(2023, 6, 3, 13), batch_size=10)
+        pages = {query: self.get_all(client, query) for query in ('ordering=-server_timestamp&message=Error',
+                                                                  'ordering=server_timestamp')}
+
+        loaded = []
+        listener = lambda target, context: loaded.append(target.id)
+        orm_event.listen(Event, 'load', listener)
+        try:
+            for query, items in pages.items():
+                loaded.clear()
+                page = client.get(f'/api/events?page=4&{query}').json()['items']
+                assert page == items[12:15]
+                assert len(loaded) <= 3
+        finally:
+            orm_event.remove(Event, 'load', listener)
+
+    def test_events_archived_by_other_process_are_kept(self, client, database_session, archive, monkeypatch):
+
+        events_before = self.get_all(client)
+        other_archive = SegmentArchive(archive.directory)
+        write = archive.write
+        deleted_ids = []
+
+        def write_after_other_process(events):
+            # other process archives the same events (into its own segment) and deletes them first
+            other_archive.write(events)
+            deleted_ids.extend(event.id for event in events)
+            database_session.execute(delete(Event).where(Event.id.in_(deleted_ids)))
+            for archived_event in events:
+                test = database_session.get(Test, archived_event.test_id)
+                test.archived_events_count = (test.archived_events_count or 0) + 1
+            database_session.commit()
+            return write(events)
+
+        monkeypatch.setattr(archive, 'write', write_after_other_process)
+
+        event_service = client.app.container.services.event_service()
+        assert event_service.archive_events(datetime(2023, 6, 3, 13), batch_size=2) == 0
+
+        archive.refresh_interval = 0
+        assert archive.count() == len(deleted_ids) > 0
+        assert self.get_all(client) == events_before
+        changes = client.get('/api/changes').json()['items']
+        assert [change['type'] for change in changes].count('event_archived') == 0
+
+    def test_disabled_archive_does_nothing(self, client, database_session):
+
+        assert client.app.container.services.event_service().archive_events(datetime.now(), batch_size=10) == 0
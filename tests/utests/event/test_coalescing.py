@@ -0,0 +1,132 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from failurebase.adapters.database import Database
+from failurebase.services.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_execution(self):
+
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def query():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return b'{"items": []}'
+
+        with ThreadPoolExecutor(4) as executor:
+            leader = executor.submit(single_flight.do, 'key', query, 5)
+            started.wait(5)
+            waiters = [executor.submit(single_flight.do, 'key', query, 5) for _ in range(3)]
+            while single_flight.coalesced < 3:
+                time.sleep(0.001)
+            release.set()
+            results = [future.result() for future in [leader, *waiters]]
+
+        assert results == [b'{"items": []}'] * 4
+        assert len(calls) == 1
+        assert single_flight.metrics() == {'in_flight': 0, 'executed': 1, 'coalesced': 3, 'timed_out': 0}
+
+        assert single_flight.do('key', lambda: 'again', 5) == 'again'
+
+    def test_error_is_raised_to_all_callers(self):
+
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def query():
+            release.wait(5)
+            raise ValueError('broken query')
+
+        async def run():
+            leader = asyncio.ensure_future(single_flight.do_async('key', query, 5))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(single_flight.do_async('key', query, 5))
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(leader, waiter, return_exceptions=True)
+
+        errors = asyncio.run(run())
+
+        assert [str(error) for error in errors] == ['broken query', 'broken query']
+        assert single_flight.metrics()['executed'] == 1
+
+    def test_wait_is_bounded(self):
+
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        async def run():
+            leader = asyncio.ensure_future(single_flight.do_async('key', lambda: release.wait(5) and 'slow', 5))
+            await asyncio.sleep(0)
+            waiter = await single_flight.do_async('key', lambda: 'own', 0.01)
+            release.set()
+            return await leader, waiter
+
+        assert asyncio.run(run()) == ('slow', 'own')
+        assert single_flight.metrics()['timed_out'] == 1
+
+    def test_leader_cancellation_does_not_cancel_execution(self):
+
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        async def run():
+            leader = asyncio.ensure_future(single_flight.do_async('key', lambda: release.wait(5) and 'shared', 5))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(single_flight.do_async('key', lambda: 'own', 5))
+            await asyncio.sleep(0)
+            leader.cancel()
+            release.set()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        assert asyncio.run(run()) == 'shared'
+
+
+class TestGetEventsCoalescing:
+
+    def test_events_are_coalesced(self, client, database_session):
+
+        coalescer = SingleFlight()
+
+        with client.app.container.services.read_coalescer.override(coalescer):
+            first = client.get('/api/events', params={'test_marks': '["b", "a"]'})
+            second = client.get('/api/events', params={'test_marks': '["a", "b"]'})
+
+        assert first.status_code == second.status_code == 200
+        assert first.headers['content-type'] == 'application/json'
+        assert first.json() == second.json()
+        assert coalescer.metrics()['executed'] == 2
+
+        metrics = client.get('/api/metrics').json()
+        assert set(metrics['coalescing']) == {'in_flight', 'executed', 'coalesced', 'timed_out'}
+
+    def test_shared_query_does_not_use_request_session(self, client, database_session, monkeypatch):
+
+        # query can outlive the request which started it, whose session is closed with the request
+        request_sessions = []
+        request_session = Database.request_session
+
+        def counted_request_session(self):
+            request_sessions.append(self)
+            return request_session(self)
+
+        monkeypatch.setattr(Database, 'request_session', counted_request_session)
+
+        with client.app.container.services.read_coalescer.override(SingleFlight()):
+            response = client.get('/api/events', params={'message': 'shared'})
+
+        assert response.status_code == 200
+        assert request_sessions == []
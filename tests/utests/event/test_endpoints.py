@@ -1,8 +1,9 @@
 import pytest
 
-from ..data import tests, events
+from ..data import tests, events, event_data
 
 from failurebase.adapters.models import Event, Test
+from failurebase.adapters.repositories.test import TestRepository
 
 
 class TestGetManyEvents:
@@ -141,6 +142,52 @@ class TestCreateEvent:
         assert number_of_events_after == number_of_events_before + 1
         assert number_of_tests_after == number_of_tests_before + 1
 
+    def test_create_event_of_known_test(self, client, database_session):
+
+        data = {
+            'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+            'message': 'TputError: level of tput is too low',
+            'traceback': '... sth :) ...',
+            'timestamp': '2023-04-02T09:45:21.2318'
+        }
+
+        first = client.post('/api/events', json=data).json()
+        second = client.post('/api/events', json=data).json()
+
+        data['test']['file'] = '/tmp/moved/call.py'
+        third = client.post('/api/events', json=data).json()
+
+        assert first['test']['id'] == second['test']['id'] == third['test']['id']
+        assert [first['test']['total_events_count'], second['test']['total_events_count'],
+                third['test']['total_events_count']] == [1, 2, 3]
+
+        test = database_session.query(Test).filter(Test.uid == data['test']['uid']).one()
+
+        assert test.total_events_count == 3
+        assert test.file == '/tmp/moved/call.py'
+
+    def test_create_event_of_deleted_test(self, client, database_session):
+
+        data = {
+            'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+            'message': 'TputError: level of tput is too low',
+            'traceback': '... sth :) ...',
+            'timestamp': '2023-04-02T09:45:21.2318'
+        }
+
+        first = client.post('/api/events', json=data).json()
+        client.post('/api/tests/delete', json={'ids': [first['test']['id']]})
+        second = client.post('/api/events', json=data).json()
+
+        # Removed behind the back of the app, e.g. by other worker.
+        TestRepository(database_session).delete_by_id(second['test']['id'])
+        database_session.commit()
+        third = client.post('/api/events', json=data).json()
+
+        assert second['test']['total_events_count'] == third['test']['total_events_count'] == 1
+        assert database_session.query(Test).filter(Test.uid == data['test']['uid']).count() == 1
+        assert database_session.query(Event).filter(Event.test_id == third['test']['id']).count() == 1
+
     @pytest.mark.parametrize(
         'data,errs',
         [
@@ -197,6 +244,71 @@ class TestCreateEvent:
         assert number_of_tests_after == number_of_tests_before
 
 
+class TestCreateManyEvents:
+
+    def test_create_events(self, client, database_session):
+
+        number_of_events_before = database_session.query(Event).count()
+        number_of_tests_before = database_session.query(Test).count()
+
+        data = [
+            {
+                'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+                'message': 'TputError: level of tput is too low',
+                'traceback': '... sth :) ...',
+                'timestamp': '2023-04-02T09:45:21.2318'
+            },
+            {
+                'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+                'message': 'TputError: level of tput is still too low',
+                'traceback': '... sth :) ...',
+                'timestamp': '2023-04-02T09:46:21.2318'
+            },
+            {
+                'test': {'uid': tests['test_1']['uid'], 'marks': ['CRT'], 'file': tests['test_1']['file']},
+                'message': 'LoginError: password should contain at least one digit',
+                'traceback': '... sth :) ...',
+                'timestamp': '2023-04-02T09:47:21.2318'
+            },
+        ]
+
+        response = client.post('/api/events/bulk', json=data)
+
+        assert response.status_code == 201
+
+        content = response.json()
+
+        assert len(content['ids']) == len(data)
+
+        number_of_events_after = database_session.query(Event).count()
+        number_of_tests_after = database_session.query(Test).count()
+
+        assert number_of_events_after == number_of_events_before + 3
+        assert number_of_tests_after == number_of_tests_before + 1
+
+        database_session.expire_all()
+        test = database_session.query(Test).filter(Test.uid == 'main.2022_3.sg34.fr43915.call').one()
+
+        assert test.total_events_count == 2
+
+    def test_create_events_validation(self, client, database_session):
+
+        number_of_events_before = database_session.query(Event).count()
+
+        data = [
+            {'test': {'uid': 'a', 'marks': [], 'file': 'a'}, 'message': 'a', 'traceback': 'a',
+             'timestamp': '2023-04-02T09:45:21.2318'},
+            {'test': {'uid': 'a', 'marks': [], 'file': 'a'}, 'message': 'a', 'traceback': 'a',
+             'timestamp': 'wrong-format'},
+        ]
+
+        response = client.post('/api/events/bulk', json=data)
+
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'] == ['body', 1, 'timestamp']
+        assert database_session.query(Event).count() == number_of_events_before
+
+
 class TestDeleteEvents:
 
     def test_delete(self, client, database_session):
@@ -240,3 +352,110 @@ class TestDeleteEvents:
         assert len(content['statuses']) == 1
         assert content['statuses'][0]['id'] == non_existing_id
         assert content['statuses'][0]['status'] == 404
+
+
+class TestGetSimilarEvents:
+
+    traceback = '''Traceback (most recent call last):
+  File "/home/test_env/tests/test_login.py", line 42, in test_login
+    response = client.get("/login", timeout=30)
+  File "/home/test_env/lib/client.py", line 117, in get
+    raise TimeoutError("no response from 10.0.0.5 after 30 seconds")
+TimeoutError: no response from 10.0.0.5 after 30 seconds'''
+
+    def make_event(self, uid, traceback):
+        return {
+            'test': {'uid': uid, 'marks': ['regression'], 'file': '/tmp/test_login.py'},
+            'message': traceback.splitlines()[-1],
+            'traceback': traceback,
+            'timestamp': '2023-04-02T09:45:21.2318'
+        }
+
+    def test_get_similar_events(self, client, database_session):
+
+        similar = self.traceback.replace('42', '57').replace('10.0.0.5', '10.0.0.9')
+        similar = similar.replace('client.get', 'client.post')
+        different = 'KeyError: missing key "user" in session storage of request handler'
+
+        event_id = client.post('/api/events', json=self.make_event('test_login', self.traceback)).json()['id']
+        ids = client.post('/api/events/bulk', json=[self.make_event('test_login_2', similar),
+                                                    self.make_event('test_login_3', self.traceback),
+                                                    self.make_event('test_other', different)]).json()['ids']
+
+        response = client.get(f'/api/events/{event_id}/similar')
+
+        assert response.status_code == 200
+
+        items = response.json()['items']
+
+        assert [item['event']['id'] for item in items] == [ids[1], ids[0]]
+        assert items[0]['similarity'] == 1.0
+        assert 0.5 <= items[1]['similarity'] < 1.0
+
+        client.post('/api/events/delete', json={'ids': [ids[1]]})
+
+        items = client.get(f'/api/events/{event_id}/similar?min_similarity=0.99').json()['items']
+
+        assert items == []
+
+    def test_get_similar_events_of_not_indexed_event(self, client, database_session):
+
+        event_id = client.post('/api/events', json=self.make_event('test_login', self.traceback)).json()['id']
+        event = database_session.query(Event).filter(Event.id == event_id).one()
+        other = Event(message=event.message, traceback=event.traceback, test_id=event.test_id,
+                      client_timestamp=event.client_timestamp)
+        database_session.add(other)
+        database_session.commit()
+
+        assert client.get(f'/api/events/{other.id}/similar').json()['items'][0]['event']['id'] == event_id
+        assert client.app.container.services.event_service().index_similarity(batch_size=2) >= 1
+        assert client.get(f'/api/events/{event_id}/similar').json()['items'][0]['event']['id'] == other.id
+
+    def test_get_similar_events_of_non_existing_event(self, client, database_session):
+
+        assert client.get('/api/events/999999/similar').status_code == 404
+
+
+class TestGetFacets:
+
+    def test_get_facets(self, client, database_session):
+
+        response = client.get('/api/events/facets')
+
+        assert response.status_code == 200
+
+        content = response.json()
+
+        assert content['count'] == 5
+        assert content['marks'][:2] == [{'mark': 'CRT', 'count': 3}, {'mark': 'LOGIN_MFA', 'count': 2}]
+
+        home = content['directories']['children'][0]
+        assert (home['path'], home['count']) == ('/home', 5)
+        assert [(child['name'], child['count']) for child in home['children']] == [('test_user', 3), ('test_env', 2)]
+
+    def test_facets_follow_deleted_events(self, client, database_session):
+
+        headers = {'X-Project': 'facets'}
+        event_ids = [client.post('/api/events', json=event_data, headers=headers).json()['id'] for _ in range(3)]
+        client.post('/api/events/delete', json={'ids': event_ids[:2]}, headers=headers)
+
+        assert client.get('/api/events', headers=headers).json()['count'] == 1
+        assert client.get('/api/events/facets', headers=headers).json()['count'] == 1
+        assert client.get('/api/events/facets?message=tput', headers=headers).json()['count'] == 1
+
+        client.app.container.services.test_service().fold_events_counts(100)
+        assert client.get('/api/events/facets', headers=headers).json()['count'] == 1
+
+    @pytest.mark.parametrize(
+        'query_parameters',
+        ['test_marks=["CRT"]', 'message=Error', 'start_server_timestamp=2023-01-01T00:00:00.000000']
+    )
+    def test_get_facets_with_query_parameters(self, query_parameters, client, database_session):
+
+        events_count = client.get('/api/events?' + query_parameters).json()['count']
+
+        content = client.get('/api/events/facets?max_depth=1&' + query_parameters).json()
+
+        assert content['count'] == events_count
+        assert sum(directory['count'] for directory in content['directories']['children']) == events_count
+        assert all(directory['children'] == [] for directory in content['directories']['children'])
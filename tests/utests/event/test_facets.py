@@ -0,0 +1,32 @@
+import json
+
+from failurebase.services.facets import count_facets
+
+
+class TestCountFacets:
+
+    def test_count_facets(self):
+
+        rows = [
+            (json.dumps(['a', 'b']), '/srv/tests/x.py', 2),
+            (json.dumps(['b']), '/srv/tests/unit/y.py', 3),
+            (json.dumps([]), 'C:\\tests\\z.py', 1),
+            (json.dumps(['a', 'a']), 'top.py', 4),
+        ]
+
+        facets = count_facets(rows)
+
+        assert facets.count == 10
+        assert [(mark.mark, mark.count) for mark in facets.marks] == [('a', 6), ('b', 5)]
+
+        srv, windows = facets.directories.children
+        assert (srv.path, srv.count) == ('/srv', 5)
+        assert (srv.children[0].path, srv.children[0].count) == ('/srv/tests', 5)
+        assert (srv.children[0].children[0].path, srv.children[0].children[0].count) == ('/srv/tests/unit', 3)
+        assert (windows.name, windows.children[0].path) == ('C:', 'C:\\tests')
+
+    def test_depth_is_limited(self):
+
+        facets = count_facets([('[]', '/srv/tests/unit/y.py', 1)], max_depth=2)
+
+        assert facets.directories.children[0].children[0].children == []
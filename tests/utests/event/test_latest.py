@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event as sqlalchemy_event
+
+from failurebase.services.feed import EventFilter
+from failurebase.services.latest import LatestEvents
+from failurebase.services.singleflight import SingleFlight
+from failurebase.schemas.event import GetEventSchema
+from failurebase.schemas.test import GetTestSchema
+from failurebase.settings import Settings
+
+from ..data import event_data
+
+
+def make_event(event_id: int, test_id: int = 1, total_events_count: int = 1) -> GetEventSchema:
+    timestamp = datetime(2023, 1, 1) + timedelta(seconds=event_id)
+    test = GetTestSchema.construct(id=test_id, uid=f'uid-{test_id}', marks=['CRT'], file=f'test_{test_id}.py',
+                                   total_events_count=total_events_count, first_seen=None, last_seen=None)
+    return GetEventSchema.construct(id=event_id, test=test, message=f'message {event_id}', traceback='Traceback',
+                                    client_timestamp=timestamp, server_timestamp=timestamp)
+
+
+def ids(page) -> list[int]:
+    return [item['id'] for item in page.items]
+
+
+class TestLatestEvents:
+
+    def test_pages_are_served_within_window(self):
+
+        latest = LatestEvents(max_size=4)
+        assert latest.get_page('default', 0, 2, EventFilter()) is None
+
+        assert latest.load('default', [make_event(event_id) for event_id in range(1, 5)], count=10, generation=0)
+        latest.add('default', [make_event(12), make_event(11, test_id=1, total_events_count=7)])
+
+        page = latest.get_page('default', 0, 2, EventFilter())
+        assert ids(page) == [12, 11]
+        assert (page.count, page.next_page, page.prev_page) == (12, True, False)
+        assert [item['test']['total_events_count'] for item in page.items] == [7, 7]
+
+        assert ids(latest.get_page('default', 1, 2, EventFilter())) == [4, 3]
+        assert latest.get_page('default', 2, 2, EventFilter()) is None
+        assert latest.get_page('default', 0, 2, EventFilter(message='message 1')) is None
+
+        latest.remove('default', [12])
+        assert ids(latest.get_page('default', 0, 3, EventFilter())) == [11, 4, 3]
+        assert latest.get_page('default', 1, 2, EventFilter()) is None
+
+    def test_filtered_pages_are_served_when_all_events_are_buffered(self):
+
+        latest = LatestEvents(max_size=10)
+        latest.load('default', [make_event(1), make_event(2, test_id=2)], count=2, generation=0)
+
+        page = latest.get_page('default', 0, 5, EventFilter(test_uid='UID-2'))
+        assert ids(page) == [2] and page.count == 1
+        assert ids(latest.get_page('default', 0, 5, EventFilter(test_marks=('CRT',)))) == [2, 1]
+
+    def test_load_is_discarded_after_change(self):
+
+        latest = LatestEvents(max_size=10)
+        generation = latest.get_generation('default')
+        latest.remove('default', [1])
+
+        assert not latest.load('default', [make_event(1)], count=1, generation=generation)
+        assert not latest.is_loaded('default')
+
+    def test_projects_are_buffered_separately(self):
+
+        latest = LatestEvents(max_size=10)
+        latest.load('default', [make_event(1)], count=1, generation=0)
+        latest.load('other', [make_event(2, test_id=2)], count=1, generation=0)
+
+        latest.remove('other', [2])
+        assert ids(latest.get_page('default', 0, 5, EventFilter())) == [1]
+        assert ids(latest.get_page('other', 0, 5, EventFilter())) == []
+
+        latest.invalidate('other')
+        assert latest.get_page('other', 0, 5, EventFilter()) is None
+        assert latest.is_loaded('default')
+
+    def test_disabled(self):
+
+        assert not Settings(_env_file=None, DATABASE_URI='sqlite://', EVENTS_PER_PAGE=3,
+                            TESTS_PER_PAGE=3).LATEST_EVENTS_BUFFER_ENABLED
+        assert not LatestEvents(max_size=0).enabled
+        assert not LatestEvents(max_size=10, enabled=False).enabled
+
+
+class TestGetLatestEvents:
+
+    @pytest.fixture(autouse=True)
+    def latest_events(self, client):
+
+        latest_events = LatestEvents(max_size=1000)
+        with client.app.container.services.latest_events.override(latest_events):
+            yield latest_events
+
+    def test_steady_state_does_not_touch_database(self, client, database_session):
+
+        engine = client.app.container.adapters.db()._engine
+        statements = []
+
+        def count_statement(*args):
+            statements.append(args[2])
+
+        with client.app.container.services.read_coalescer.override(SingleFlight()):
+            before = client.get('/api/events').json()
+            created = client.post('/api/events', json=event_data).json()
+
+            sqlalchemy_event.listen(engine, 'before_cursor_execute', count_statement)
+            try:
+                after = client.get('/api/events').json()
+            finally:
+                sqlalchemy_event.remove(engine, 'before_cursor_execute', count_statement)
+
+            assert statements == []
+            assert after['count'] == before['count'] + 1
+            assert after['items'][0] == created
+            assert after['items'][1:] == before['items'][:-1]
+
+            client.post('/api/events/delete', json={'ids': [created['id']]})
+            assert client.get('/api/events').json() == before
+
+            client.app.container.services.latest_events().invalidate()
+            assert client.get('/api/events').json() == before
@@ -0,0 +1,22 @@
+import pytest
+from datetime import datetime
+
+from failurebase.schemas.common import parse_timestamp, TIMESTAMP_FORMAT
+
+
+class TestParseTimestamp:
+
+    @pytest.mark.parametrize('value', [
+        '2023-04-02T09:45:21.2318', '2023-04-02T09:45:21.000001', '2023-12-31T23:59:59.9', '2023-4-2T9:45:21.5'
+    ])
+    def test_parse_timestamp_as_strptime(self, value):
+
+        assert parse_timestamp(value) == datetime.strptime(value, TIMESTAMP_FORMAT)
+
+    @pytest.mark.parametrize('value', [
+        '2023-04-02-09:45:21.2318', '2023-13-02T09:45:21.2318', '2023-04-02T09:45:21', '2023-04-02T09:45:21.1234567', ''
+    ])
+    def test_invalid_timestamp(self, value):
+
+        with pytest.raises(ValueError):
+            parse_timestamp(value)
@@ -0,0 +1,110 @@
+import json
+import asyncio
+
+from failurebase.services.feed import EventFeed, EventFilter, FeedEvent, Lag
+
+
+data = {
+    'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression', 'tput'], 'file': '/tmp/call.py'},
+    'message': 'TputError: level of tput is too low',
+    'traceback': '... sth :) ...',
+    'timestamp': '2023-04-02T09:45:21.2318'
+}
+
+
+def make_feed_event(id_, uid='main.call', marks=('regression',), file='/tmp/call.py', message='Error'):
+    return FeedEvent(id_, '{}', uid, file, json.dumps(list(marks)), message, 'traceback')
+
+
+class TestEventFilter:
+
+    def test_matches(self):
+
+        event = make_feed_event(1, uid='Main.Login.call', marks=('CRT', 'LOGIN'), file='/tmp/login.robot')
+
+        assert EventFilter().matches(event)
+        assert EventFilter(test_uid='login', test_file='login.robot', test_marks=('CRT', 'LOGIN')).matches(event)
+        assert not EventFilter(test_uid='logout').matches(event)
+        assert not EventFilter(test_marks=('CRT', 'CIT')).matches(event)
+        assert not EventFilter(message='timeout').matches(event)
+
+
+class TestEventFeed:
+
+    def test_lag_is_signalled_when_subscriber_is_slow(self):
+
+        async def scenario():
+            feed = EventFeed(max_queue_size=2)
+            subscription = feed.subscribe(EventFilter())
+
+            for id_ in range(1, 6):
+                subscription.put(make_feed_event(id_))
+            await asyncio.sleep(0)
+
+            items = [await subscription.get(0.1) for _ in range(4)]
+            feed.unsubscribe(subscription)
+
+            return items, feed.has_subscribers
+
+        items, has_subscribers = asyncio.run(scenario())
+
+        assert items[0] == Lag(3)
+        assert [item.id for item in items[1:3]] == [1, 2]
+        assert items[3] is None
+        assert not has_subscribers
+
+    def test_created_events_are_published(self, client, database_session):
+
+        feed = client.app.container.services.event_feed()
+
+        async def scenario():
+            matching = feed.subscribe(EventFilter(test_uid='fr43915', test_marks=('tput',)))
+            other = feed.subscribe(EventFilter(test_uid='non-existing-uid'))
+
+            created = (await asyncio.to_thread(client.post, '/api/events', json=data)).json()
+            bulk = (await asyncio.to_thread(client.post, '/api/events/bulk', json=[data, data])).json()
+
+            items = [await matching.get(1) for _ in range(3)]
+            nothing = await other.get(0.1)
+            feed.unsubscribe(matching)
+            feed.unsubscribe(other)
+
+            return created, bulk, items, nothing
+
+        created, bulk, items, nothing = asyncio.run(scenario())
+
+        assert [item.id for item in items] == [created['id'], *bulk['ids']]
+        assert json.loads(items[0].data) == created
+        assert json.loads(items[2].data)['test']['total_events_count'] == 3
+        assert nothing is None
+
+    def test_poll_publishes_events_from_database(self, client, database_session):
+
+        feed = EventFeed(max_queue_size=10, polling=True)
+        event_service = client.app.container.services.event_service(event_feed=feed)
+
+        async def scenario():
+            subscription = feed.subscribe(EventFilter())
+
+            first_poll = feed.poll(event_service)
+            ids = [(await asyncio.to_thread(client.post, '/api/events', json=data)).json()['id'] for _ in range(2)]
+            second_poll = feed.poll(event_service)
+
+            items = [await subscription.get(1) for _ in range(2)]
+            feed.unsubscribe(subscription)
+
+            return first_poll, second_poll, ids, items
+
+        first_poll, second_poll, ids, items = asyncio.run(scenario())
+
+        assert (first_poll, second_poll) == (0, 2)
+        assert [item.id for item in items] == ids
+
+
+class TestStreamEvents:
+
+    def test_stream_events_validates_filters(self, client):
+
+        response = client.get('/api/events/stream?test_marks=CRT')
+
+        assert response.status_code == 422
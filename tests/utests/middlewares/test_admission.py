@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from failurebase.application import create_app
+from failurebase.services.admission import AdmissionController, TokenBucket
+from failurebase.settings import Settings
+
+from ..data import event_data
+
+
+@pytest.fixture(autouse=True)
+def session_app_wiring(client):
+
+    yield
+
+    client.app.container.wire()
+
+
+class TestTokenBucket:
+
+    def test_take(self):
+
+        bucket = TokenBucket(rate=2.0, burst=2.0, now=0.0)
+
+        assert bucket.take(0.0) == 0.0
+        assert bucket.take(0.0) == 0.0
+        assert bucket.take(0.0) == 0.5
+        assert bucket.take(0.5) == 0.0
+
+
+class TestAdmissionController:
+
+    def test_queue_is_bounded(self):
+
+        async def run():
+            controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05, client_rate=0,
+                                             client_burst=0)
+            assert await controller.acquire('a') is None
+
+            waiting = asyncio.ensure_future(controller.acquire('b'))
+            await asyncio.sleep(0)
+            assert controller.metrics()['queue_depth'] == 1
+
+            overloaded = await controller.acquire('c')
+            assert overloaded.reason == 'overloaded' and overloaded.retry_after == 1
+
+            controller.release()
+            assert await waiting is None
+            assert controller.metrics()['in_flight'] == 1
+
+            timed_out = await controller.acquire('d')
+            assert timed_out.reason == 'overloaded'
+
+            controller.release()
+            return controller.metrics()
+
+        metrics = asyncio.run(run())
+
+        assert metrics['in_flight'] == 0 and metrics['queue_depth'] == 0
+        assert metrics['admitted'] == 2
+        assert metrics['rejected'] == {'rate_limited': 0, 'overloaded': 2}
+
+    def test_clients_are_limited(self):
+
+        async def run():
+            controller = AdmissionController(max_concurrency=10, max_queue=0, queue_timeout=1, client_rate=0.1,
+                                             client_burst=1, max_clients=1)
+            assert await controller.acquire('a') is None
+            limited = await controller.acquire('a')
+            assert await controller.acquire('b') is None
+            return limited, controller.metrics()
+
+        limited, metrics = asyncio.run(run())
+
+        assert limited.reason == 'rate_limited' and limited.retry_after == 10
+        assert metrics['clients'] == 1
+
+
+class TestAdmissionMiddleware:
+
+    def test_ingestion_is_rejected(self, tmp_path):
+
+        settings = Settings(_env_file=None, DATABASE_URI=f'sqlite:///{tmp_path / "app.db"}', EVENTS_PER_PAGE=3,
+                            TESTS_PER_PAGE=3, EVENTS_COUNT_FOLD_INTERVAL=0, FAILURE_RATES_SYNC_INTERVAL=0,
+                            INGEST_CLIENT_RATE=0.001, INGEST_CLIENT_BURST=2)
+
+        with TestClient(create_app(settings)) as client:
+            statuses = [client.post('/api/events', json=event_data).status_code for _ in range(3)]
+            rejected = client.post('/api/events/bulk', json=[event_data])
+            read = client.get('/api/events')
+            metrics = client.get('/api/metrics').json()
+
+        assert statuses == [201, 201, 429]
+        assert rejected.status_code == 429
+        assert int(rejected.headers['Retry-After']) > 0
+        assert read.status_code == 200
+        assert metrics['admission']['admitted'] == 2
+        assert metrics['admission']['rejected'] == {'rate_limited': 2, 'overloaded': 0}
+        assert metrics['admission']['queue_depth'] == 0
+
+    def test_ingestion_is_rejected_after_queue_timeout(self, tmp_path):
+
+        settings = Settings(_env_file=None, DATABASE_URI=f'sqlite:///{tmp_path / "app.db"}', EVENTS_PER_PAGE=3,
+                            TESTS_PER_PAGE=3, EVENTS_COUNT_FOLD_INTERVAL=0, FAILURE_RATES_SYNC_INTERVAL=0,
+                            INGEST_MAX_CONCURRENCY=1, INGEST_QUEUE_TIMEOUT=0.05, INGEST_CLIENT_RATE=0)
+
+        with TestClient(create_app(settings)) as client:
+            controller = client.app.container.services.admission_controller()
+            # the only slot is taken by request in progress, so the next one waits in queue until timeout
+            assert client.portal.call(controller.acquire, 'other') is None
+            rejected = client.post('/api/events', json=event_data)
+            client.portal.call(controller.release)
+            accepted = client.post('/api/events', json=event_data)
+
+        assert rejected.status_code == 429
+        assert int(rejected.headers['Retry-After']) > 0
+        assert accepted.status_code == 201
+        assert controller.metrics()['rejected'] == {'rate_limited': 0, 'overloaded': 1}
+
+    def test_metrics(self, client):
+
+        response = client.get('/api/metrics')
+
+        assert response.status_code == 200
+        assert response.json()['admission']['max_concurrency'] == 8
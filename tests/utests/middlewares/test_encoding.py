@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+import starlette.requests
+
+from ..data import event_data
+
+from failurebase.adapters.models import Event
+from failurebase.middlewares import encoding
+
+
+class TestRequestDecoding:
+
+    def test_gzip_body(self, client, database_session):
+
+        number_of_events_before = database_session.query(Event).count()
+
+        body = gzip.compress(json.dumps([event_data, event_data]).encode())
+        response = client.post('/api/events/bulk', content=body,
+                               headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+
+        assert response.status_code == 201
+        assert database_session.query(Event).count() == number_of_events_before + 2
+
+    def test_zstd_body(self, client, database_session):
+
+        zstandard = pytest.importorskip('zstandard')
+
+        body = zstandard.ZstdCompressor().compress(json.dumps(event_data).encode())
+        response = client.post('/api/events', content=body,
+                               headers={'Content-Type': 'application/json', 'Content-Encoding': 'zstd'})
+
+        assert response.status_code == 201
+        assert response.json()['message'] == event_data['message']
+
+    def test_zstd_body_size_is_limited_while_inflating(self):
+
+        zstandard = pytest.importorskip('zstandard')
+
+        decoder = encoding._ZstdDecoder()
+        body = zstandard.ZstdCompressor().compress(b' ' * 100 * 1024 * 1024)
+
+        with pytest.raises(encoding._TooLarge):
+            decoder.decode(body, 1000)
+        assert decoder._output._size <= decoder.WRITE_SIZE
+
+    def test_msgpack_body(self, client, database_session, monkeypatch):
+
+        msgpack = pytest.importorskip('msgpack')
+
+        # unpacked body is validated as it is, it is not encoded to JSON and parsed again
+        monkeypatch.setattr(encoding, 'json', None)
+        monkeypatch.setattr(starlette.requests, 'json', None)
+
+        response = client.post('/api/events', content=msgpack.packb(event_data),
+                               headers={'Content-Type': 'application/msgpack'})
+
+        assert response.status_code == 201
+        assert response.json()['message'] == event_data['message']
+
+    def test_decoded_body_size_is_limited(self, client, config, database_session):
+
+        number_of_events_before = database_session.query(Event).count()
+
+        body = gzip.compress(b' ' * (config['MAX_REQUEST_BODY_SIZE'] + 1))
+        response = client.post('/api/events', content=body,
+                               headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+
+        assert response.status_code == 413
+        assert database_session.query(Event).count() == number_of_events_before
+
+    @pytest.mark.parametrize(
+        'headers,body,status_code',
+        [
+            ({'Content-Encoding': 'br'}, b'{}', 415),
+            ({'Content-Encoding': 'gzip'}, b'not gzip at all', 400),
+        ]
+    )
+    def test_invalid_body(self, headers, body, status_code, client, database_session):
+
+        response = client.post('/api/events', content=body, headers={'Content-Type': 'application/json', **headers})
+
+        assert response.status_code == status_code
+
+
+class TestResponseEncoding:
+
+    def test_gzip_response(self, client, database_session):
+
+        response = client.get('/api/events', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.json()['items']
+
+    def test_msgpack_response(self, client, database_session):
+
+        msgpack = pytest.importorskip('msgpack')
+
+        response = client.get('/api/events', headers={'Accept': 'application/msgpack'})
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/msgpack'
+        assert msgpack.unpackb(response.content) == client.get('/api/events').json()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from ..data import event_data
+
+from failurebase.adapters.models import Event, Test, DEFAULT_PROJECT
+
+
+class TestProjects:
+
+    def test_events_are_isolated_per_project(self, client, database_session):
+
+        default_count = client.get('/api/events').json()['count']
+
+        created = client.post('/api/events', json=event_data, headers={'X-Project': 'alpha'})
+        assert created.status_code == 201
+        assert created.json()['test']['project'] == 'alpha'
+
+        alpha = client.get('/api/events', headers={'X-Project': 'alpha'}).json()
+        assert [item['id'] for item in alpha['items']] == [created.json()['id']]
+        assert client.get('/api/projects/alpha/events').json() == alpha
+        assert client.get('/api/projects/beta/events').json()['count'] == 0
+        assert client.get('/api/events').json()['count'] == default_count
+
+        event_id = created.json()['id']
+        assert client.get(f'/api/events/{event_id}').status_code == 404
+        assert client.get(f'/api/projects/alpha/events/{event_id}').status_code == 200
+
+    def test_events_of_other_project_are_not_deleted(self, client, database_session):
+
+        event_id = client.post('/api/projects/alpha/events', json=event_data).json()['id']
+
+        response = client.post('/api/projects/beta/events/delete', json={'ids': [event_id]})
+        assert response.json()['statuses'] == [{'id': event_id, 'status': 404}]
+        assert client.get(f'/api/projects/alpha/events/{event_id}').status_code == 200
+
+        response = client.post('/api/projects/alpha/events/delete', json={'ids': [event_id]})
+        assert response.json()['statuses'] == [{'id': event_id, 'status': 200}]
+
+    def test_same_uid_in_two_projects(self, client, database_session):
+
+        for project in ('alpha', 'beta'):
+            response = client.post(f'/api/projects/{project}/events', json=event_data)
+            assert response.status_code == 201
+
+        tests = database_session.query(Test).filter(Test.uid == event_data['test']['uid']).all()
+        assert sorted(test.project for test in tests) == ['alpha', 'beta']
+        assert client.get('/api/projects/alpha/tests').json()['count'] == 1
+
+    def test_invalid_project(self, client, database_session):
+
+        assert client.get('/api/events', headers={'X-Project': '../etc'}).status_code == 422
+
+    def test_get_projects(self, client, database_session):
+
+        client.post('/api/events/bulk', json=[event_data, event_data], headers={'X-Project': 'alpha'})
+        assert client.post('/api/projects/beta', json={'retention_days': 7}).status_code == 200
+
+        projects = {item['name']: item for item in client.get('/api/projects').json()['items']}
+
+        assert projects['alpha'] == {'name': 'alpha', 'tests_count': 1, 'events_count': 2, 'retention_days': None}
+        assert projects['beta'] == {'name': 'beta', 'tests_count': 0, 'events_count': 0, 'retention_days': 7}
+        assert projects[DEFAULT_PROJECT]['tests_count'] == database_session.query(Test).filter(
+            Test.project == DEFAULT_PROJECT).count()
+
+    def test_retention_deletes_old_events_of_project(self, client, database_session):
+
+        old, new = [client.post('/api/events', json=event_data, headers={'X-Project': 'alpha'}).json()['id']
+                    for _ in range(2)]
+        default_count = database_session.query(Event).filter(Event.project == DEFAULT_PROJECT).count()
+
+        database_session.query(Event).filter(Event.project.in_(['alpha', DEFAULT_PROJECT]),
+                                             Event.id != new).update(
+            {Event.server_timestamp: datetime.now() - timedelta(days=30)})
+        database_session.commit()
+
+        client.post('/api/projects/alpha', json={'retention_days': 7})
+        deleted = client.app.container.services.project_service().apply_retention(batch_size=1)
+
+        assert deleted == 1
+        assert [item['id'] for item in client.get('/api/projects/alpha/events').json()['items']] == [new]
+        assert client.get('/api/projects/alpha/events/facets').json()['count'] == 1
+        assert client.get('/api/projects/alpha/tests').json()['items'][0]['total_events_count'] == 1
+        assert database_session.query(Event).filter(Event.project == DEFAULT_PROJECT).count() == default_count
@@ -0,0 +1,197 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+
+from failurebase.adapters.database import Database
+from failurebase.adapters.memory import MemoryDatabase
+from failurebase.adapters.models import Event, Run, ChangeType
+from failurebase.adapters.repositories.event import EventRepository
+from failurebase.adapters.repositories.test import TestRepository as DatabaseTestRepository
+from failurebase.adapters.repositories.change import ChangeRepository
+from failurebase.adapters.repositories.project import ProjectRepository
+from failurebase.adapters.repositories.run import RunRepository
+from failurebase.adapters.repositories.memory.event import MemoryEventRepository
+from failurebase.adapters.repositories.memory.test import MemoryTestRepository
+from failurebase.adapters.repositories.memory.change import MemoryChangeRepository
+from failurebase.adapters.repositories.memory.project import MemoryProjectRepository
+from failurebase.adapters.repositories.memory.run import MemoryRunRepository
+from failurebase.services import suggest
+from failurebase.services.uow import DatabaseUnitOfWork
+
+
+START = datetime(2023, 6, 1, 12)
+PROJECTS = ('default', 'other')
+TESTS_COUNT = 12
+EVENTS_COUNT = 60
+
+
+def seed(uow: DatabaseUnitOfWork) -> None:
+    """Stores the same tests, events and runs through repositories, every order key is unique."""
+
+    for project_index, project in enumerate(PROJECTS):
+        with uow.for_project(project) as project_uow:
+            run = project_uow.run_repository.create(Run(name='nightly', started_at=START))
+            project_uow.flush()
+
+            for index in range(project_index * EVENTS_COUNT, (project_index + 1) * EVENTS_COUNT):
+                test_index = index % TESTS_COUNT
+                marks = ['slow', f'owner_{test_index % 3}'] if test_index % 2 else ['fast', 'db']
+                server_timestamp = START + timedelta(seconds=index)
+                test_id = project_uow.test_repository.upsert(f'suite_{test_index % 3}/Case_{test_index}',
+                                                             f'/repo/suite_{test_index % 4}.py', json.dumps(marks),
+                                                             server_timestamp)
+                project_uow.test_repository.add_events_count_delta(test_id, timestamp=server_timestamp)
+                project_uow.event_repository.create(Event(
+                    test_id=test_id, run_id=run.id if index % 5 == 0 else None,
+                    message=f'Error {index * 7 % (2 * EVENTS_COUNT):03d}: value_{index % 4}',
+                    traceback=f'Traceback\n  File "case_{test_index}.py"\nError',
+                    client_timestamp=START + timedelta(minutes=index * 13 % (2 * EVENTS_COUNT)),
+                    server_timestamp=server_timestamp,
+                ))
+
+            project_uow.flush()
+            project_uow.commit()
+
+    with uow as maintenance_uow:
+        maintenance_uow.test_repository.fold_events_count_deltas(10 * EVENTS_COUNT)
+        maintenance_uow.commit()
+
+
+@pytest.fixture()
+def uows(tmp_path):
+
+    database = Database(f'sqlite:///{tmp_path / "conformance.db"}')
+    database.create_database()
+    database_uow = DatabaseUnitOfWork(database.session_factory, EventRepository, DatabaseTestRepository,
+                                      ChangeRepository, ProjectRepository, RunRepository)
+
+    memory_uow = DatabaseUnitOfWork(MemoryDatabase().session_factory, MemoryEventRepository, MemoryTestRepository,
+                                    MemoryChangeRepository, MemoryProjectRepository, MemoryRunRepository)
+
+    for uow in (database_uow, memory_uow):
+        seed(uow)
+
+    yield database_uow, memory_uow
+
+
+def get_page(uow: DatabaseUnitOfWork, repository: str, page_number: int, page_limit: int, **kwargs) -> tuple:
+    """Returns order keys of items (ids when they are unique) and pagination of requested page."""
+
+    key = ORDER_KEYS.get(kwargs.get('ordering', '').lstrip('-'), lambda item: item.id)
+
+    with uow as opened_uow:
+        page = getattr(opened_uow, f'{repository}_repository').get_many(page_number, page_limit, **kwargs)
+        return [key(item) for item in page.chunk], page.count, page.next_page, page.prev_page
+
+
+# Order keys which are shared by many items, order of items with the same key is not defined.
+ORDER_KEYS = {
+    'test_uid': lambda event: event.test.uid,
+    'file': lambda test: test.file,
+    'total_events_count': lambda test: test.total_events_count,
+}
+
+
+EVENT_FILTERS = [
+    {},
+    {'message': 'error 0'},
+    {'message': 'VALUE_1'},
+    {'message': '0_: value'},
+    {'message': '%: value_3'},
+    {'traceback': 'case_1'},
+    {'test_uid': 'suite_1/case'},
+    {'test_file': 'suite_2.py'},
+    {'test_marks': ['slow']},
+    {'test_marks': ['owner_', 'slow']},
+    {'test_marks': ['"fast", "db"']},
+    {'run_id': 1},
+    {'start_server_timestamp': START + timedelta(seconds=20)},
+    {'start_server_timestamp': START + timedelta(seconds=20), 'end_server_timestamp': START + timedelta(seconds=80)},
+    {'start_client_timestamp': START + timedelta(minutes=30), 'end_client_timestamp': START + timedelta(hours=1)},
+    {'message': 'value_2', 'test_marks': ['fast'], 'end_server_timestamp': START + timedelta(seconds=90)},
+]
+
+
+class TestRepositoryConformance:
+
+    @pytest.mark.parametrize('project', [None, 'other'])
+    @pytest.mark.parametrize('filters', EVENT_FILTERS)
+    def test_event_filters(self, uows, project, filters):
+
+        database_uow, memory_uow = (uow.for_project(project) for uow in uows)
+
+        for page_number in range(3):
+            expected = get_page(database_uow, 'event', page_number, 7, **filters)
+            assert get_page(memory_uow, 'event', page_number, 7, **filters) == expected
+
+    @pytest.mark.parametrize('ordering', list(EventRepository.POSSIBLE_ORDER_CLAUSES))
+    @pytest.mark.parametrize('filters', [{}, {'test_marks': ['slow']}, {'message': 'error 01'}])
+    def test_event_ordering(self, uows, ordering, filters):
+
+        database_uow, memory_uow = uows
+
+        for page_number in (0, 1, 5, 17):
+            expected = get_page(database_uow, 'event', page_number, 7, ordering=ordering, **filters)
+            assert get_page(memory_uow, 'event', page_number, 7, ordering=ordering, **filters) == expected
+
+    @pytest.mark.parametrize('filters', [
+        {}, {'uid': 'SUITE_2'}, {'file': 'suite_3'}, {'marks': ['owner_1']}, {'marks': ['fast', 'db']},
+        {'ordering': 'uid'}, {'ordering': 'file'}, {'ordering': '-file'}, {'ordering': 'total_events_count'},
+    ])
+    def test_test_filters(self, uows, filters):
+
+        database_uow, memory_uow = (uow.for_project('default') for uow in uows)
+
+        for page_number in range(3):
+            expected = get_page(database_uow, 'test', page_number, 5, **filters)
+            assert get_page(memory_uow, 'test', page_number, 5, **filters) == expected
+
+    def test_counters(self, uows):
+
+        def read(uow: DatabaseUnitOfWork) -> tuple:
+            with uow as opened_uow:
+                return (sorted(opened_uow.event_repository.get_counts_by_test(test_marks=['slow'])),
+                        sorted(opened_uow.event_repository.get_counts_by_test(message='value_1')),
+                        opened_uow.test_repository.get_counters(list(range(1, 2 * TESTS_COUNT + 1))),
+                        opened_uow.test_repository.get_project_counts(),
+                        opened_uow.run_repository.get_counters(1, START),
+                        opened_uow.event_repository.get_time_range(3),
+                        opened_uow.event_repository.get_histogram(3, START, START + timedelta(minutes=1), 10.0))
+
+        assert read(uows[1].for_project('default')) == read(uows[0].for_project('default'))
+
+    @pytest.mark.parametrize('project', [None, 'other'])
+    def test_segment_prefix_candidates(self, uows, project):
+
+        def read(uow: DatabaseUnitOfWork) -> list:
+            with uow as opened_uow:
+                for test in opened_uow.test_repository.get_many(0, 2 * TESTS_COUNT).chunk:
+                    opened_uow.test_repository.set_segments(test.id, suggest.test_segments(test.uid, test.file),
+                                                            test.project)
+                opened_uow.commit()
+
+            with uow.for_project(project) as opened_uow:
+                return opened_uow.test_repository.get_ids_by_segment_prefix(suggest.prefix_range('case'),
+                                                                            ('uid', 'file'), 5)
+
+        assert read(uows[1]) == read(uows[0])
+
+    def test_writes_are_undone_on_rollback(self, uows):
+
+        _, memory_uow = uows
+        before = get_page(memory_uow, 'event', 0, 100), get_page(memory_uow, 'test', 0, 100)
+
+        with memory_uow.for_project('default') as uow:
+            uow.test_repository.delete_by_id(1)
+            test_id = uow.test_repository.upsert('new', 'new.py', json.dumps(['fast']))
+            assert uow.test_repository.update_by_id(2, 'suite_1/Case_1', marks=json.dumps(['renamed']))
+            uow.event_repository.create(Event(test_id=test_id, message='new', traceback='new',
+                                              client_timestamp=START, server_timestamp=START))
+            uow.change_repository.add(ChangeType.EVENT_CREATED, [1, 2])
+
+        assert (get_page(memory_uow, 'event', 0, 100), get_page(memory_uow, 'test', 0, 100)) == before
+        for marks in (['fast'], ['owner_1'], ['renamed']):
+            expected = get_page(uows[0].for_project('default'), 'test', 0, 100, marks=marks)
+            assert get_page(memory_uow.for_project('default'), 'test', 0, 100, marks=marks) == expected
+        with memory_uow as uow:
+            assert uow.change_repository.get_after(0, 10) == []
@@ -0,0 +1,83 @@
+import gzip
+import json
+
+from ..data import event_data
+
+from failurebase.adapters.models import Event, Run
+
+
+def ndjson(events: list[dict]) -> bytes:
+    return b''.join(json.dumps(event).encode() + b'\n' for event in events)
+
+
+def with_uid(uid: str) -> dict:
+    return {**event_data, 'test': {**event_data['test'], 'uid': uid}}
+
+
+class TestRuns:
+
+    def test_run_lifecycle(self, client, database_session):
+
+        client.post('/api/events', json=with_uid('known'))
+
+        opened = client.post('/api/runs', json={'name': '#1234', 'branch': 'main', 'commit': 'a1b2c3'})
+        assert opened.status_code == 201
+        run = opened.json()
+        assert (run['name'], run['branch'], run['finished_at'], run['events_count']) == ('#1234', 'main', None, None)
+
+        failures = [with_uid('known'), with_uid('new'), with_uid('new')]
+        appended = client.post(f'/api/runs/{run["id"]}/events', content=gzip.compress(ndjson(failures)),
+                               headers={'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'})
+        assert appended.status_code == 201
+        ids = appended.json()['ids']
+        assert len(ids) == 3
+        assert database_session.query(Event).filter(Event.run_id == run['id']).count() == 3
+
+        events = client.get('/api/events', params={'run_id': run['id']}).json()
+        assert events['count'] == 3
+        assert sorted(item['id'] for item in events['items']) == sorted(ids)
+        assert all(item['run_id'] == run['id'] for item in events['items'])
+
+        closed = client.post(f'/api/runs/{run["id"]}/close')
+        assert closed.status_code == 200
+        summary = client.get(f'/api/runs/{run["id"]}').json()
+        assert summary == closed.json()
+        assert summary['finished_at'] is not None
+        assert (summary['events_count'], summary['tests_count'], summary['new_tests_count']) == (3, 2, 1)
+
+        assert client.post(f'/api/runs/{run["id"]}/close').status_code == 409
+        assert client.post(f'/api/runs/{run["id"]}/events', content=ndjson(failures)).status_code == 409
+
+    def test_upload_is_stored_in_batches(self, client, database_session):
+
+        run_id = client.post('/api/runs', json={}).json()['id']
+        body = ndjson([event_data] * 3) + b'\n' + b'{"message": "no test"}\n'
+
+        with client.app.container.config.RUN_APPEND_BATCH_SIZE.override(2):
+            response = client.post(f'/api/runs/{run_id}/events', content=body)
+
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['loc'][:2] == ['body', 4]
+        assert database_session.query(Event).filter(Event.run_id == run_id).count() == 2
+
+    def test_line_length_is_limited(self, client, database_session):
+
+        run_id = client.post('/api/runs', json={}).json()['id']
+
+        body = ndjson([event_data]) + b'x' * 100 * 1024  # line without end
+
+        with client.app.container.config.RUN_APPEND_MAX_LINE_SIZE.override(10 * 1024):
+            response = client.post(f'/api/runs/{run_id}/events', content=body)
+
+        assert response.status_code == 413
+        assert response.json() == {'detail': 'Line of body exceeds 10240 bytes.'}
+        assert database_session.query(Event).filter(Event.run_id == run_id).count() == 0
+
+    def test_runs_of_other_project_are_not_found(self, client, database_session):
+
+        run_id = client.post('/api/projects/alpha/runs', json={'branch': 'main'}).json()['id']
+
+        assert client.get(f'/api/runs/{run_id}').status_code == 404
+        assert client.post(f'/api/runs/{run_id}/events', content=ndjson([event_data])).status_code == 404
+        assert client.get('/api/projects/alpha/runs', params={'branch': 'main'}).json()['count'] == 1
+        assert database_session.query(Run).filter(Run.project == 'alpha').count() == 1
@@ -1,6 +1,8 @@
 import pytest
+from datetime import datetime, timedelta
 
-from failurebase.adapters.models import Test
+from failurebase.adapters.models import Test, Event, EventsCountDelta
+from failurebase.services.rates import FailureRates
 
 from ..data import tests
 
@@ -84,3 +86,247 @@ class TestGetSingleTest:
 
         assert test.uid == content['uid']
         assert test.file == content['file']
+
+
+class TestEventsCount:
+
+    data = {
+        'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+        'message': 'TputError: level of tput is too low',
+        'traceback': '... sth :) ...',
+        'timestamp': '2023-04-02T09:45:21.2318'
+    }
+
+    def test_count_is_exact_before_and_after_fold(self, client, database_session):
+
+        for _ in range(3):
+            test_id = client.post('/api/events', json=self.data).json()['test']['id']
+
+        test = client.get(f'/api/tests/{test_id}').json()
+        assert test['total_events_count'] == 3
+        assert test['first_seen'] <= test['last_seen']
+        assert database_session.query(EventsCountDelta).filter(EventsCountDelta.test_id == test_id).count() == 3
+
+        folded = client.app.container.services.test_service().fold_events_counts(batch_size=2)
+
+        assert folded == 3
+
+        assert database_session.query(EventsCountDelta).count() == 0
+        assert client.get(f'/api/tests/{test_id}').json() == test
+
+        content = client.get('/api/tests?ordering=-total_events_count').json()
+        assert content['items'][0]['id'] == test_id
+
+    def test_reconcile_counts(self, client, database_session):
+
+        test_id = client.post('/api/events', json=self.data).json()['test']['id']
+
+        database_session.query(Test).filter(Test.id == test_id).update({Test.folded_events_count: 100})
+        database_session.commit()
+
+        corrected = client.app.container.services.test_service().reconcile_events_counts()
+
+        events_count = database_session.query(Event).filter(Event.test_id == test_id).count()
+
+        assert corrected >= 1
+        assert database_session.query(EventsCountDelta).count() == 0
+        test = client.get(f'/api/tests/{test_id}').json()
+        event = client.get(f'/api/events?test_uid={self.data["test"]["uid"]}').json()['items'][0]
+        assert test['total_events_count'] == events_count == 1
+        assert test['first_seen'] == test['last_seen'] == event['server_timestamp']
+
+
+class TestSuggest:
+
+    data = TestEventsCount.data
+
+    def test_suggest(self, client, database_session):
+
+        assert client.app.container.services.test_service().index_segments(batch_size=2) == 5
+
+        response = client.get('/api/tests/suggest?q=valid_lo&limit=2')
+
+        assert response.status_code == 200
+
+        items = response.json()['items']
+
+        assert len(items) == 2
+        assert all(item['test']['uid'].startswith('webui/tests/atests/login/valid_login_') for item in items)
+
+        content = client.get('/api/tests/suggest?q=PYTESTWS/2021&field=file').json()
+        assert [item['test']['uid'] for item in content['items']] == ['main.2021_4.sg17.fr31912.attach']
+
+        assert client.get('/api/tests/suggest?q=pytestws&field=uid').json()['items'] == []
+        assert client.get('/api/tests/suggest?q=ogin').json()['items'] == []
+
+    def test_suggest_ranks_by_recent_failures(self, client, database_session):
+
+        with client.app.container.services.failure_rates.override(FailureRates(3600, 7 * 86400)):
+
+            client.post('/api/events/bulk', json=[self.data] * 2)
+            client.post('/api/events', json=self.data | {'test': {'uid': 'main.2022_3.sg34.fr43915.callback',
+                                                                  'marks': [], 'file': '/tmp/callback.py'}})
+
+            items = client.get('/api/tests/suggest?q=fr43915.call').json()['items']
+
+        assert [item['test']['uid'] for item in items] == ['main.2022_3.sg34.fr43915.call',
+                                                            'main.2022_3.sg34.fr43915.callback']
+        assert items[0]['recent_failures'] > items[1]['recent_failures'] > 0
+
+    def test_suggest_candidates_are_the_most_recently_seen(self, client, database_session):
+
+        client.app.container.services.test_service().index_segments(batch_size=2)
+        client.app.container.config.SUGGEST_CANDIDATES.override(1)
+
+        tests_by_uid = {test.uid: test for test in database_session.query(Test)}
+        tests_by_uid['webui/tests/atests/login/valid_login_AS63'].folded_events_count = 5
+        tests_by_uid['webui/tests/atests/login/valid_login_BR89'].folded_last_seen = datetime(2022, 1, 1)
+        database_session.commit()
+
+        items = client.get('/api/tests/suggest?q=valid_lo').json()['items']
+        assert [item['test']['uid'] for item in items] == ['webui/tests/atests/login/valid_login_BR89']
+
+        tests_by_uid['webui/tests/atests/login/valid_login_BR89'].folded_last_seen = None
+        database_session.commit()
+
+        items = client.get('/api/tests/suggest?q=valid_lo').json()['items']
+        assert [item['test']['uid'] for item in items] == ['webui/tests/atests/login/valid_login_AS63']
+
+    def test_index_follows_tests(self, client, database_session):
+
+        test_id = client.post('/api/events', json=self.data).json()['test']['id']
+        client.post('/api/events', json=self.data | {'test': self.data['test'] | {'file': '/srv/moved.py'}})
+
+        assert client.get('/api/tests/suggest?q=moved&field=file').json()['items'][0]['test']['id'] == test_id
+        assert client.get('/api/tests/suggest?q=call.py&field=file').json()['items'] == []
+
+        client.post('/api/tests/delete', json={'ids': [test_id]})
+
+        assert client.get('/api/tests/suggest?q=moved').json()['items'] == []
+
+    @pytest.mark.parametrize('query_parameters', ['q=', 'field=uid', 'q=a&field=marks', 'q=a&limit=0'])
+    def test_suggest_query_parameters_validation(self, query_parameters, client, database_session):
+
+        assert client.get(f'/api/tests/suggest?{query_parameters}').status_code == 422
+
+
+class TestGetHistory:
+
+    data = TestEventsCount.data
+
+    def add_events(self, database_session, test_id: int, timestamps: list[datetime]) -> None:
+        for timestamp in timestamps:
+            database_session.add(Event(message='m', traceback='t', test_id=test_id, client_timestamp=timestamp,
+                                       server_timestamp=timestamp))
+        database_session.commit()
+
+    def test_get_history(self, client, database_session):
+
+        test_id = client.post('/api/events', json=self.data).json()['test']['id']
+        start = datetime(2020, 1, 1)
+        self.add_events(database_session, test_id, [start, start + timedelta(seconds=5), start + timedelta(seconds=10),
+                                                    start + timedelta(seconds=59), start + timedelta(seconds=60)])
+
+        response = client.get(f'/api/tests/{test_id}/history',
+                              params={'start': start.isoformat(), 'end': (start + timedelta(minutes=1)).isoformat(),
+                                      'points': 6})
+
+        assert response.status_code == 200
+
+        content = response.json()
+
+        assert content['test']['id'] == test_id
+        assert content['bucket_size'] == 10
+        assert [point['count'] for point in content['points']] == [2, 1, 0, 0, 0, 2]
+        assert content['points'][1]['timestamp'] == '2020-01-01T00:00:10.000000'
+
+    def test_history_defaults_to_seen_range(self, client, database_session):
+
+        for _ in range(3):
+            test_id = client.post('/api/events', json=self.data).json()['test']['id']
+
+        content = client.get(f'/api/tests/{test_id}/history?points=4').json()
+        events_count = database_session.query(Event).filter(Event.test_id == test_id).count()
+
+        assert content['start'] == content['test']['first_seen']
+        assert content['end'] == content['test']['last_seen']
+        assert sum(point['count'] for point in content['points']) == events_count
+
+    @pytest.mark.parametrize('query_parameters', ['points=0', 'points=1001', 'start=yesterday'])
+    def test_history_query_parameters_validation(self, query_parameters, client, database_session):
+
+        test = database_session.query(Test).first()
+
+        assert client.get(f'/api/tests/{test.id}/history?{query_parameters}').status_code == 422
+
+    def test_history_of_non_existing_test(self, client, database_session):
+
+        assert client.get('/api/tests/999999/history').status_code == 404
+
+
+class TestGetAnomalies:
+
+    data = {
+        'test': {'uid': 'main.2022_3.sg34.fr43915.call', 'marks': ['regression'], 'file': '/tmp/call.py'},
+        'message': 'TputError: level of tput is too low',
+        'traceback': '... sth :) ...',
+        'timestamp': '2023-04-02T09:45:21.2318'
+    }
+
+    def test_get_anomalies(self, client, database_session):
+
+        with client.app.container.services.failure_rates.override(FailureRates(3600, 7 * 86400)):
+
+            client.post('/api/events/bulk', json=[self.data] * 5)
+            test_id = database_session.query(Test.id).filter(Test.uid == self.data['test']['uid']).scalar()
+
+            response = client.get('/api/tests/anomalies?threshold=3&min_events=4')
+
+            assert response.status_code == 200
+
+            items = response.json()['items']
+
+            assert [item['test']['id'] for item in items] == [test_id]
+            assert items[0]['current_rate'] > items[0]['baseline_rate']
+
+            client.post('/api/tests/delete', json={'ids': [test_id]})
+
+            assert client.get('/api/tests/anomalies?threshold=3&min_events=4').json()['items'] == []
+
+    def test_failure_rates_are_replayed(self, client, database_session):
+
+        rates = client.app.container.services.failure_rates
+
+        with rates.override(FailureRates(3600, 7 * 86400)):
+            for _ in range(4):
+                client.post('/api/events', json=self.data)
+            recorded = client.get('/api/tests/anomalies?threshold=0&min_events=0').json()['items']
+
+        with rates.override(FailureRates(3600, 7 * 86400)):
+            assert client.app.container.services.test_service().sync_failure_rates(batch_size=2) >= 4
+            replayed = client.get('/api/tests/anomalies?threshold=0&min_events=0').json()['items']
+
+        assert [item['test']['id'] for item in replayed] == [item['test']['id'] for item in recorded]
+        assert replayed[0]['current_rate'] == pytest.approx(recorded[0]['current_rate'], rel=1e-3)
+
+    def test_failure_rates_cursor_waits_for_recent_events(self, client, database_session):
+
+        rates = FailureRates(3600, 7 * 86400)
+        last_id = client.post('/api/events', json=self.data).json()['id']
+
+        with client.app.container.services.failure_rates.override(rates):
+            test_service = client.app.container.services.test_service(settle_time=60.0)
+
+            # events with lower ids may still commit, so recent events are read again by the next sync
+            assert test_service.sync_failure_rates(batch_size=2) > 0
+            assert rates.cursor < last_id
+            synced = client.get('/api/tests/anomalies?threshold=0&min_events=0').json()['items']
+
+            assert test_service.sync_failure_rates(batch_size=2) > 0
+            resynced = client.get('/api/tests/anomalies?threshold=0&min_events=0').json()['items']
+            assert [item['test']['id'] for item in resynced] == [item['test']['id'] for item in synced]
+            assert [item['current_rate'] for item in resynced] == pytest.approx(
+                [item['current_rate'] for item in synced], rel=1e-3)
+
+            client.app.container.services.test_service(settle_time=0.0).sync_failure_rates(batch_size=2)
+            assert rates.cursor >= last_id
@@ -0,0 +1,72 @@
+import pytest
+
+from failurebase.services.rates import FailureRates, RateSample
+
+
+HOUR = 3600.0
+
+
+def make_rates(**kwargs):
+    return FailureRates(short_half_life=HOUR, long_half_life=7 * 24 * HOUR, **kwargs)
+
+
+class TestFailureRates:
+
+    def test_state_does_not_depend_on_order(self):
+
+        samples = [RateSample(index, 1, 1000.0 + 37.0 * (index % 5)) for index in range(10)]
+        in_order, out_of_order = make_rates(), make_rates()
+
+        in_order.record(sorted(samples, key=lambda sample: sample.timestamp))
+        out_of_order.record(samples)
+
+        assert in_order.anomalies(2000.0, 0, 0)[0] == pytest.approx(out_of_order.anomalies(2000.0, 0, 0)[0])
+
+    def test_burst_is_anomaly_and_steady_rate_is_not(self):
+
+        rates = make_rates()
+        now = 30 * 24 * HOUR
+
+        # Test 1 fails once a day for a month, test 2 as well, but it fails ten times in the last hour.
+        rates.record(RateSample(day, 1, day * 24 * HOUR) for day in range(30))
+        rates.record(RateSample(100 + day, 2, day * 24 * HOUR) for day in range(30))
+        rates.record(RateSample(200 + index, 2, now - index * 60) for index in range(10))
+
+        anomalies = rates.anomalies(now, threshold=3, min_events=3)
+
+        assert [anomaly.test_id for anomaly in anomalies] == [2]
+        assert anomalies[0].current_rate > anomalies[0].baseline_rate
+
+    def test_replay_skips_recorded_events(self):
+
+        samples = [RateSample(index, 1, 1000.0 + index) for index in range(1, 6)]
+        rates = make_rates()
+
+        rates.record(samples[3:])
+        rates.replay(samples, cursor=5)
+
+        expected = make_rates()
+        expected.record(samples)
+
+        assert rates.anomalies(2000.0, 0, 0) == expected.anomalies(2000.0, 0, 0)
+
+        rates.forget([1])
+
+        assert len(rates) == 0
+
+    def test_events_are_applied_once(self):
+
+        samples = [RateSample(index, 1, 1000.0 + index) for index in range(1, 7)]
+        rates = make_rates()
+
+        # events after cursor are read again, events are recorded after they were replayed
+        rates.replay(samples[:4], cursor=2)
+        rates.record(samples[2:4])
+        rates.replay(samples[2:], cursor=6)
+        rates.record(samples)
+
+        expected = make_rates()
+        expected.record(samples)
+
+        assert rates.anomalies(2000.0, 0, 0) == expected.anomalies(2000.0, 0, 0)
+        assert rates.cursor == 6
@@ -0,0 +1,27 @@
+from failurebase.services.suggest import segments, prefix_range, SEGMENT_LENGTH
+
+
+class TestSegments:
+
+    def test_segments_start_at_words(self):
+
+        assert segments('webui/tests/Valid_Login') == {
+            'webui/tests/valid_login', 'tests/valid_login', 'valid_login', 'login'
+        }
+
+    def test_leading_separators_are_kept_in_first_segment(self):
+
+        assert segments('/tmp/a.py') == {'/tmp/a.py', 'tmp/a.py', 'a.py', 'py'}
+
+    def test_segments_are_cut(self):
+
+        assert max(len(segment) for segment in segments('x' * 1000)) == SEGMENT_LENGTH
+
+    def test_prefix_range(self):
+
+        start, end = prefix_range('/Login/va')
+
+        assert start == 'login/va'
+        assert start <= 'login/valid_login' < end
+        assert not start <= 'login/w' < end
+        assert prefix_range('/._') is None